@@ -0,0 +1,19 @@
+"""Offline-Microbenchmarks für Suche, Regelprüfung, Pauschalen und Rendering.
+
+Aufruf aus dem Projektverzeichnis: ``python -m benchmarks`` (Optionen siehe
+``--help``, Schwellen in ``[BENCHMARK]`` der ``config.ini``).
+"""
+
+# Package exports should be side-effect free (``cases`` importiert erst beim Aufruf den Server).
+
+from .harness import Benchmark, Thresholds, compare, git_commit, percentile, run_benchmark, run_suite
+
+__all__ = [
+    "Benchmark",
+    "Thresholds",
+    "compare",
+    "git_commit",
+    "percentile",
+    "run_benchmark",
+    "run_suite",
+]
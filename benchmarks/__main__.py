@@ -0,0 +1,116 @@
+"""Kommandozeile der Benchmark-Suite.
+
+    python -m benchmarks                       # alle Benchmarks, Verlauf fortschreiben
+    python -m benchmarks --only search_icd,search_chop --repeat 50
+    python -m benchmarks --fail-on-regression  # Exit-Code 1 bei Regression (CI)
+    python -m benchmarks --no-save --json      # nur messen, Ergebnis als JSON
+
+Verglichen wird mit dem letzten Lauf im Verlauf (``[BENCHMARK] history_file``).
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import sys
+from pathlib import Path
+from typing import Dict, List
+
+if __package__ in {None, ""}:
+    sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+    __package__ = "benchmarks"
+
+import json_backend
+from runtime_config import load_merged_config
+
+from .harness import Thresholds, append_history, compare, format_table, load_history, run_suite
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def _parse_per_benchmark(value: str) -> Dict[str, float]:
+    limits: Dict[str, float] = {}
+    for item in value.split(","):
+        name, sep, ratio = item.partition(":")
+        if sep and name.strip():
+            try:
+                limits[name.strip()] = float(ratio)
+            except ValueError:
+                continue
+    return limits
+
+
+def main(argv: List[str] | None = None) -> int:
+    config = load_merged_config()
+    section = "BENCHMARK"
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Offline-Microbenchmarks.")
+    parser.add_argument("--only", default="", help="Kommagetrennte Benchmark-Namen.")
+    parser.add_argument("--repeat", type=int, default=config.getint(section, "repeat", fallback=20))
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument("--lang", default="de")
+    parser.add_argument("--no-alloc", action="store_true", help="Ohne tracemalloc-Lauf.")
+    parser.add_argument("--no-save", action="store_true", help="Verlauf nicht fortschreiben.")
+    parser.add_argument("--history", type=Path, default=Path(config.get(section, "history_file", fallback="benchmarks/history.json")))
+    parser.add_argument("--threshold", type=float, default=config.getfloat(section, "time_threshold", fallback=0.25))
+    parser.add_argument("--metric", choices=("p50", "p90", "p95", "mean"), default="p50")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    parser.add_argument("--json", action="store_true", help="Ergebnis als JSON ausgeben.")
+    parser.add_argument("--list", action="store_true", help="Nur die Benchmark-Namen ausgeben.")
+    parser.add_argument("--log-level", default="WARNING", help="Log-Level während der Messung (Standard WARNING).")
+    args = parser.parse_args(argv)
+
+    history_path = args.history if args.history.is_absolute() else ROOT / args.history
+    thresholds = Thresholds(
+        time_ratio=args.threshold,
+        alloc_ratio=config.getfloat(section, "alloc_threshold", fallback=0.5),
+        min_delta_ms=config.getfloat(section, "min_delta_ms", fallback=1.0),
+        min_delta_kib=config.getfloat(section, "min_delta_kib", fallback=64.0),
+        metric=args.metric,
+        per_benchmark=_parse_per_benchmark(config.get(section, "per_benchmark", fallback="")),
+    )
+
+    import server  # lädt die Daten (create_app)
+    from .cases import build_benchmarks, load_cases, offline_llm
+
+    logging.getLogger().setLevel(args.log_level.upper())
+    benchmarks = build_benchmarks(server, load_cases(), lang=args.lang)
+    if args.list:
+        for bench in benchmarks:
+            print(f"{bench.name:<32}{bench.description}")
+        return 0
+    if args.only:
+        wanted = {name.strip() for name in args.only.split(",") if name.strip()}
+        unknown = wanted - {bench.name for bench in benchmarks}
+        if unknown:
+            parser.error(f"Unbekannte Benchmarks: {', '.join(sorted(unknown))}")
+        benchmarks = [bench for bench in benchmarks if bench.name in wanted]
+
+    def _progress(name: str, result: Dict[str, float]) -> None:
+        if not args.json:
+            print(f"  {name}: p50 {result['p50_ms']:.2f} ms", file=sys.stderr)
+
+    with offline_llm(server):
+        run = run_suite(benchmarks, repeat=args.repeat, warmup=args.warmup, allocations=not args.no_alloc, progress=_progress)
+
+    history = load_history(history_path)
+    previous = history[-1] if history else None
+    regressions = compare(run, previous, thresholds)
+    run["regressions"] = regressions
+    if args.json:
+        print(json_backend.dumps(run, indent=True))
+    else:
+        print(format_table(run, previous))
+        if previous:
+            print(f"\nVergleich mit Lauf {previous.get('timestamp')} ({previous.get('git_commit') or '-'})")
+        for reg in regressions:
+            print(
+                f"REGRESSION {reg['benchmark']} {reg['metric']}: {reg['previous']:.2f} -> {reg['current']:.2f} "
+                f"(Grenze +{reg['limit'] * 100:.0f} %)"
+            )
+    if not args.no_save:
+        append_history(history_path, run, keep=config.getint(section, "history_keep", fallback=100))
+    return 1 if regressions and args.fail_on_regression else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
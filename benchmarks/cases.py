@@ -0,0 +1,178 @@
+"""Benchmarks über die echten ``data/``-Dateien und die Baseline-Fälle.
+
+Die Eingaben stammen aus ``data/baseline_results.json``: die deutschen
+Anfragen für Suche und Kontextaufbau, die erwarteten Einzelleistungen für die
+Regelprüfung und die erwarteten Pauschalen für Pauschalenprüfung und
+HTML-Rendering. Alle Benchmarks lesen die Daten zur Laufzeit über das
+``server``-Modul, damit sie auch nach ``load_data()`` auf aktuelle Strukturen
+zeigen. LLM-Aufrufe sind während der Suite gesperrt (``offline_llm``).
+"""
+
+from __future__ import annotations
+
+from contextlib import contextmanager
+from pathlib import Path
+from types import ModuleType
+from typing import Any, Dict, Iterator, List, Sequence, Tuple
+
+import json_backend
+import regelpruefer_einzelleistungen
+import regelpruefer_pauschale
+import utils
+
+from .harness import Benchmark
+
+BASELINE_PATH = Path(__file__).resolve().parents[1] / "data" / "baseline_results.json"
+
+ICD_TERMS = ("fraktur", "diabetes", "appendizitis", "luxation", "J45", "katarakt")
+CHOP_TERMS = ("appendektomie", "reposition", "biopsie", "katheter", "bronchoskopie", "schiel")
+PAUSCHALE_CONTEXT_LKNS = 3  # LKNs pro Pauschale aus den Mapping-Bedingungen
+
+
+def load_cases(path: Path = BASELINE_PATH) -> List[Dict[str, Any]]:
+    data = json_backend.load_file(path)
+    cases = []
+    for case_id, entry in data.items():
+        if case_id.startswith("_") or not isinstance(entry, dict):
+            continue
+        baseline = entry.get("baseline") or {}
+        cases.append({
+            "id": case_id,
+            "query": (entry.get("query") or {}).get("de", ""),
+            "einzelleistungen": [(e["code"], int(e.get("qty") or 1)) for e in baseline.get("einzelleistungen") or []],
+            "pauschale": (baseline.get("pauschale") or {}).get("code"),
+        })
+    return cases
+
+
+class _LLMBlocked(RuntimeError):
+    pass
+
+
+@contextmanager
+def offline_llm(server: ModuleType) -> Iterator[None]:
+    """Sperrt Netzwerkaufrufe an LLM-Anbieter, damit nur lokale Arbeit gemessen wird."""
+
+    def _blocked(*_args: Any, **_kwargs: Any) -> Any:
+        raise _LLMBlocked("LLM-Aufruf während der Benchmark-Suite")
+
+    saved = {name: getattr(server, name) for name in ("chat_completion_safe", "_post_with_retries")}
+    for name in saved:
+        setattr(server, name, _blocked)
+    try:
+        yield
+    finally:
+        for name, func in saved.items():
+            setattr(server, name, func)
+
+
+def _pauschale_context_lkns(server: ModuleType, code: str) -> List[str]:
+    mapping = server.pauschale_mapping_lkns.get(code) or {}
+    lkns = sorted((mapping.get("lkns") or {}).keys()) or sorted(server.pauschale_cond_lkn_index.get(code) or ())
+    return lkns[:PAUSCHALE_CONTEXT_LKNS]
+
+
+def _pauschale_contexts(server: ModuleType, cases: Sequence[Dict[str, Any]]) -> List[Tuple[str, Dict[str, Any], set, set]]:
+    contexts = []
+    for case in cases:
+        code = case["pauschale"]
+        if not code:
+            continue
+        lkns = _pauschale_context_lkns(server, code)
+        precise, broad = server.find_potential_pauschalen_split(set(lkns))
+        context = server._build_pauschale_pruef_kontext(
+            icd_input=[], medication_atcs=[], alter_context_val=None, alter_operator=None,
+            alter_context_source=None, geschlecht_context_val=None, geschlecht_source=None,
+            use_icd_flag=False, lkn_list=lkns, seitigkeit_context_val="unbekannt",
+            anzahl_fuer_pauschale_context=None, pauschale_eval_cache=None,
+        )
+        contexts.append((case["query"], context, precise, broad))
+    return contexts
+
+
+def build_benchmarks(server: ModuleType, cases: Sequence[Dict[str, Any]], lang: str = "de") -> List[Benchmark]:
+    queries = [c["query"] for c in cases if c["query"]]
+    pauschale_queries = [c["query"] for c in cases if c["pauschale"]]
+    keyword_sets = [utils.extract_keywords(q) for q in queries]
+    pauschale_contexts = _pauschale_contexts(server, cases)
+
+    def rank_keywords() -> None:
+        for tokens in keyword_sets:
+            utils.rank_leistungskatalog_entries(
+                tokens, server.leistungskatalog_dict, server.token_doc_freq,
+                limit=100, return_scores=True, include_medical_interpretation=False,
+            )
+
+    def build_context() -> None:
+        for query in queries:
+            server._build_context_for_llm(query, lang)
+
+    def search_pauschalen() -> None:
+        for query in pauschale_queries:
+            server.search_pauschalen(query)
+
+    def search_icd() -> None:
+        for term in ICD_TERMS:
+            server.search_icd(term, lang=lang)
+
+    def search_chop() -> None:
+        for term in CHOP_TERMS:
+            server.search_chop(term)
+
+    def rule_check() -> None:
+        regelwerk = server.regelwerk_kompiliert or server.regelwerk_dict
+        for case in cases:
+            codes = [code for code, _ in case["einzelleistungen"]]
+            for code, qty in case["einzelleistungen"]:
+                fall = {
+                    "LKN": code, "Menge": qty, "Begleit_LKNs": [c for c in codes if c != code],
+                    "ICD": [], "Geschlecht": "unbekannt", "Pauschalen": [], "Medikamente": [], "GTIN": [],
+                }
+                regelpruefer_einzelleistungen.pruefe_abrechnungsfaehigkeit(fall, regelwerk)
+
+    def determine_pauschale() -> None:
+        for query, context, precise, broad in pauschale_contexts:
+            regelpruefer_pauschale.determine_applicable_pauschale(
+                query, [], dict(context, __pauschale_eval_cache={}),
+                server.pauschale_lp_data, server.pauschale_bedingungen_data, server.pauschalen_dict,
+                server.leistungskatalog_dict, server.tabellen_dict_by_table,
+                server.pauschale_lp_index, server.pauschale_cond_lkn_index,
+                server.pauschale_cond_table_index, server.lkn_to_tables_index,
+                precise | broad,
+                potential_pauschale_precise_input=precise,
+                potential_pauschale_broad_input=broad - precise,
+                lang=lang,
+                prepared_structures=server.prepared_structures,
+                fast_mode=True,
+                include_explanation_html=False,
+                include_selected_conditions_html=False,
+                include_candidate_sources=False,
+                lkn_candidate_index=server.lkn_candidate_index,
+                selection_index=server.pauschale_selection_index,
+            )
+
+    structured_conditions = [
+        regelpruefer_pauschale.check_pauschale_conditions_structured(
+            case["pauschale"], {"LKN": _pauschale_context_lkns(server, case["pauschale"])},
+            server.pauschale_bedingungen_data, server.tabellen_dict_by_table, lang,
+            pauschalen_dict=server.pauschalen_dict, prepared_structures=server.prepared_structures,
+        )
+        for case in cases
+        if case["pauschale"]
+    ]
+
+    def render_conditions() -> None:
+        for structured in structured_conditions:
+            server.render_condition_groups_html(structured, lang)
+
+    return [
+        Benchmark("rank_leistungskatalog_entries", rank_keywords, repeat=5, description="Keyword-Ranking über den Katalog"),
+        Benchmark("build_context_for_llm", build_context, repeat=5, description="Hybrid-Suche und LLM-Kontext"),
+        Benchmark("search_pauschalen", search_pauschalen),
+        Benchmark("search_icd", search_icd),
+        Benchmark("search_chop", search_chop),
+        Benchmark("pruefe_abrechnungsfaehigkeit", rule_check),
+        Benchmark("determine_applicable_pauschale", determine_pauschale, repeat=10),
+        Benchmark("render_condition_groups_html", render_conditions),
+        Benchmark("load_data", server.load_data, repeat=3, warmup=0, description="Kompletter Daten-Load"),
+    ]
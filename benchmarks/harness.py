@@ -0,0 +1,188 @@
+"""Messlogik der Benchmark-Suite: Zeiten, Perzentile, Allokationen, Verlauf.
+
+Jeder Benchmark wird nach einigen Aufwärmläufen ``repeat``-mal gemessen
+(``time.perf_counter``); ein zusätzlicher Lauf unter ``tracemalloc`` liefert
+Spitzen- und verbleibenden Speicher, ohne die Zeitmessung zu verfälschen.
+Läufe werden als JSON-Verlauf gespeichert; ``compare`` meldet Regressionen
+gegenüber dem letzten Lauf gemäss konfigurierbarer Schwellen.
+"""
+
+from __future__ import annotations
+
+import gc
+import platform
+import time
+import tracemalloc
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence
+
+import json_backend
+from perf_common import Thresholds, git_commit, percentile
+
+PERCENTILES = (50, 90, 95, 99)
+
+
+@dataclass
+class Benchmark:
+    """Ein benannter Messpunkt; ``func`` wird pro Iteration einmal aufgerufen."""
+
+    name: str
+    func: Callable[[], Any]
+    repeat: Optional[int] = None  # überschreibt den globalen Wert (z.B. für load_data)
+    warmup: Optional[int] = None
+    description: str = ""
+
+
+def summarize(samples_s: Sequence[float]) -> Dict[str, float]:
+    """Kennzahlen in Millisekunden."""
+    ms = [s * 1000.0 for s in samples_s]
+    summary = {
+        "n": len(ms),
+        "min_ms": min(ms),
+        "mean_ms": sum(ms) / len(ms),
+        "max_ms": max(ms),
+    }
+    for q in PERCENTILES:
+        summary[f"p{q}_ms"] = percentile(ms, q)
+    return {k: round(v, 4) if isinstance(v, float) else v for k, v in summary.items()}
+
+
+def measure_allocations(func: Callable[[], Any]) -> Dict[str, float]:
+    """Spitzen- und verbleibender Speicher (KiB) sowie Blockzahl eines Aufrufs."""
+    gc.collect()
+    already_tracing = tracemalloc.is_tracing()
+    if not already_tracing:
+        tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        before, _ = tracemalloc.get_traced_memory()
+        snapshot_before = tracemalloc.take_snapshot()
+        result = func()
+        after, peak = tracemalloc.get_traced_memory()
+        snapshot_after = tracemalloc.take_snapshot()
+        del result
+    finally:
+        if not already_tracing:
+            tracemalloc.stop()
+    new_blocks = sum(max(0, stat.count_diff) for stat in snapshot_after.compare_to(snapshot_before, "filename"))
+    return {
+        "peak_kib": round(max(0, peak - before) / 1024.0, 1),
+        "retained_kib": round(max(0, after - before) / 1024.0, 1),
+        "blocks": new_blocks,
+    }
+
+
+def run_benchmark(
+    bench: Benchmark,
+    *,
+    repeat: int = 20,
+    warmup: int = 2,
+    allocations: bool = True,
+) -> Dict[str, Any]:
+    rounds = max(1, bench.repeat if bench.repeat is not None else repeat)
+    for _ in range(max(0, bench.warmup if bench.warmup is not None else warmup)):
+        bench.func()
+    samples: List[float] = []
+    gc_was_enabled = gc.isenabled()
+    gc.collect()
+    gc.disable()  # GC-Pausen sollen nicht zufällig einzelnen Iterationen zufallen
+    try:
+        for _ in range(rounds):
+            started = time.perf_counter()
+            bench.func()
+            samples.append(time.perf_counter() - started)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    result: Dict[str, Any] = summarize(samples)
+    if allocations:
+        result.update(measure_allocations(bench.func))
+    return result
+
+
+def run_suite(
+    benchmarks: Sequence[Benchmark],
+    *,
+    repeat: int = 20,
+    warmup: int = 2,
+    allocations: bool = True,
+    progress: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+) -> Dict[str, Any]:
+    results: Dict[str, Dict[str, Any]] = {}
+    for bench in benchmarks:
+        results[bench.name] = run_benchmark(bench, repeat=repeat, warmup=warmup, allocations=allocations)
+        if progress is not None:
+            progress(bench.name, results[bench.name])
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "git_commit": git_commit(),
+        "python": platform.python_version(),
+        "json_backend": json_backend.active_backend(),
+        "results": results,
+    }
+
+
+def load_history(path: Path) -> List[Dict[str, Any]]:
+    if not path.is_file():
+        return []
+    try:
+        data = json_backend.load_file(path)
+    except (OSError, ValueError):
+        return []
+    return data if isinstance(data, list) else []
+
+
+def append_history(path: Path, run: Dict[str, Any], keep: int = 100) -> None:
+    history = load_history(path)
+    history.append(run)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json_backend.dumps(history[-max(1, keep):], indent=True), encoding="utf-8")
+
+
+def compare(
+    current: Mapping[str, Any],
+    previous: Optional[Mapping[str, Any]],
+    thresholds: Thresholds,
+) -> List[Dict[str, Any]]:
+    """Liefert die Regressionen von ``current`` gegenüber ``previous``."""
+    if not previous:
+        return []
+    regressions: List[Dict[str, Any]] = []
+    time_key = f"{thresholds.metric}_ms"
+    old_results = previous.get("results") or {}
+    for name, new in (current.get("results") or {}).items():
+        old = old_results.get(name)
+        if not old:
+            continue
+        old_ms, new_ms = old.get(time_key), new.get(time_key)
+        if old_ms and new_ms is not None:
+            ratio = thresholds.time_ratio_for(name)
+            if new_ms - old_ms > thresholds.min_delta_ms and new_ms > old_ms * (1 + ratio):
+                regressions.append({
+                    "benchmark": name, "metric": time_key, "previous": old_ms, "current": new_ms, "limit": ratio,
+                })
+        old_kib, new_kib = old.get("peak_kib"), new.get("peak_kib")
+        if old_kib and new_kib is not None:
+            if new_kib - old_kib > thresholds.min_delta_kib and new_kib > old_kib * (1 + thresholds.alloc_ratio):
+                regressions.append({
+                    "benchmark": name, "metric": "peak_kib", "previous": old_kib, "current": new_kib,
+                    "limit": thresholds.alloc_ratio,
+                })
+    return regressions
+
+
+def format_table(run: Mapping[str, Any], previous: Optional[Mapping[str, Any]] = None) -> str:
+    columns = ["n", "p50_ms", "p90_ms", "p95_ms", "p99_ms", "max_ms", "peak_kib", "blocks"]
+    name_width = max([9] + [len(name) for name in run.get("results", {})])
+    lines = [f"{'benchmark':<{name_width}}" + "".join(f"{c:>11}" for c in columns) + f"{'Δ p50':>9}"]
+    old_results = (previous or {}).get("results") or {}
+    for name, values in run.get("results", {}).items():
+        row = f"{name:<{name_width}}"
+        for column in columns:
+            value = values.get(column)
+            row += f"{value:>11.2f}" if isinstance(value, float) else f"{'-' if value is None else value:>11}"
+        old_p50 = (old_results.get(name) or {}).get("p50_ms")
+        row += f"{(values['p50_ms'] / old_p50 - 1) * 100:>+8.0f}%" if old_p50 else f"{'':>9}"
+        lines.append(row)
+    return "\n".join(lines)
@@ -59,6 +59,8 @@ let evaluatedPauschalenList = [];
 let lastBackendResponse = null; // Speichert die letzte Serverantwort für Feedback
 let lastUserInput = "";
 let pauschaleConditionsContext = null; // Kontext, um Pauschalen-Bedingungen on demand neu zu rendern
+let pauschaleRenderToken = null; // Server-Token zum Prüfkontext (render_mode "lazy")
+let billingDetailsToken = null; // Token zur vollständigen Antwort (view "lean")
 let progressTimes = {};
 let elapsedTimer = null;
 let llm1BarInterval = null;
@@ -264,6 +266,7 @@ const DYN_TEXT = {
     de: {
         spinnerWorking: 'Prüfung läuft...',
         loadingData: 'Lade Tarifdaten...',
+        loadingDetails: 'Lade Details...',
         dataLoaded: 'Daten geladen. Bereit zur Prüfung.',
         pleaseEnter: 'Bitte Leistungsbeschreibung eingeben.',
         resultFor: 'Ergebnis für',
@@ -348,6 +351,7 @@ const DYN_TEXT = {
     fr: {
         spinnerWorking: 'Vérification en cours...',
         loadingData: 'Chargement des données tarifaires...',
+        loadingDetails: 'Chargement des détails...',
         dataLoaded: 'Données chargées. Prêt pour l\'analyse.',
         pleaseEnter: 'Veuillez saisir la description de la prestation.',
         resultFor: 'Résultat pour',
@@ -432,6 +436,7 @@ const DYN_TEXT = {
     it: {
         spinnerWorking: 'Verifica in corso...',
         loadingData: 'Caricamento dati tariffari...',
+        loadingDetails: 'Caricamento dei dettagli...',
         dataLoaded: 'Dati caricati. Pronto per l\'analisi.',
         pleaseEnter: 'Inserire la descrizione della prestazione.',
         resultFor: 'Risultato per',
@@ -2397,19 +2402,64 @@ function getChapterInfo(kapitelCode) {
     return info;
 }
 
+// Lädt Abschnitte der vollständigen analyze-billing-Antwort (view "lean", renderMode "lazy") nach.
+async function fetchBillingDetails(sections) {
+    if (!billingDetailsToken) return null;
+    try {
+        const params = new URLSearchParams({ section: sections.join(',') });
+        const res = await fetch(`/api/analyze-billing/details/${encodeURIComponent(billingDetailsToken)}?${params.toString()}`);
+        if (!res.ok) {
+            if (res.status === 410) billingDetailsToken = null;
+            return null;
+        }
+        return await res.json();
+    } catch (err) {
+        console.error('fetchBillingDetails failed', err);
+        return null;
+    }
+}
+
+// Feedback braucht das vollständige Stage-2-Mapping; die schlanke Antwort enthält nur einen Platzhalter.
+async function loadFullStage2ForFeedback() {
+    const stage2 = lastBackendResponse?.llm_ergebnis_stufe2;
+    if (!stage2 || !stage2.deferred) return;
+    const details = await fetchBillingDetails(['llm_ergebnis_stufe2']);
+    // Bei abgelaufenem Token bleibt der Platzhalter; der Server versucht es über details_token erneut.
+    if (details?.llm_ergebnis_stufe2 && lastBackendResponse?.llm_ergebnis_stufe2 === stage2) {
+        lastBackendResponse.llm_ergebnis_stufe2 = details.llm_ergebnis_stufe2;
+    }
+}
+
 async function fetchPauschaleConditionsHtml(code) {
     const normCode = String(code || '').trim();
-    if (!normCode || !pauschaleConditionsContext) return null;
+    if (!normCode || (!pauschaleConditionsContext && !pauschaleRenderToken && !billingDetailsToken)) return null;
     try {
-        const res = await fetch('/api/pauschale-conditions-html', {
-            method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({
-                code: normCode,
-                lang: currentLang,
-                context: pauschaleConditionsContext
-            })
-        });
+        let res = null;
+        if (pauschaleRenderToken) {
+            // GET mit Token: der Browser revalidiert die Antwort per ETag selbst
+            const params = new URLSearchParams({ code: normCode, lang: currentLang, render_token: pauschaleRenderToken });
+            res = await fetch(`/api/pauschale-conditions-html?${params.toString()}`, { cache: 'no-cache' });
+            if (res.status === 410) {
+                pauschaleRenderToken = null;
+                res = null;
+            }
+        }
+        if (!res) {
+            if (!pauschaleConditionsContext) {
+                const details = await fetchBillingDetails(['pauschale_context']);
+                pauschaleConditionsContext = details?.pauschale_context || null;
+            }
+            if (!pauschaleConditionsContext) return null;
+            res = await fetch('/api/pauschale-conditions-html', {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({
+                    code: normCode,
+                    lang: currentLang,
+                    context: pauschaleConditionsContext
+                })
+            });
+        }
         if (!res.ok) {
             console.warn('fetchPauschaleConditionsHtml response not ok', res.status);
             return null;
@@ -2465,7 +2515,7 @@ async function showPauschaleInfoByCode(code) {
     const idx = evaluatedPauschalenList.findIndex(p => String(p.details?.Pauschale || '').toUpperCase() === norm);
     if (idx !== -1) {
         const entry = evaluatedPauschalenList[idx];
-        const needsOnDemand = pauschaleConditionsContext && (!entry.bedingungs_pruef_html || !String(entry.bedingungs_pruef_html).trim());
+        const needsOnDemand = (pauschaleConditionsContext || pauschaleRenderToken) && (!entry.bedingungs_pruef_html || !String(entry.bedingungs_pruef_html).trim());
         if (needsOnDemand) {
             try {
                 showModal('infoModalDetailOverlay', `<p>${escapeHtml(tDyn('loadingData'))}</p>`);
@@ -2483,6 +2533,12 @@ async function showPauschaleInfoByCode(code) {
         }
         html = buildPauschaleInfoHtml(idx);
     } else if (selectedPauschaleDetails && String(selectedPauschaleDetails.Pauschale || '').toUpperCase() === norm) {
+        if (!selectedPauschaleConditionHtml || !selectedPauschaleConditionHtml.trim()) {
+            const fetched = await fetchPauschaleConditionsHtml(norm);
+            if (fetched && typeof fetched.html === 'string') {
+                updateSelectedPauschaleDetails(selectedPauschaleDetails, fetched.html);
+            }
+        }
         const extraSections = [];
         const hasStructuredLogic = Boolean(selectedPauschaleConditionHtml && selectedPauschaleConditionHtml.trim());
         if (hasStructuredLogic) {
@@ -3110,28 +3166,99 @@ async function fetchJSON(path) {
 }
 
 
-async function loadData() {
+// Hängt den Inhalts-Hash aus /api/asset-manifest an die Datenpfade an, damit der
+// Browser die Dateien langfristig cachen kann und nur nach Datenänderungen neu lädt.
+async function applyAssetVersions() {
+    try {
+        const res = await fetch('/api/asset-manifest', { cache: 'no-store' });
+        if (!res.ok) return;
+        const { assets = {} } = await res.json();
+        Object.entries(DATA_PATHS).forEach(([key, path]) => {
+            const digest = assets[path];
+            if (digest) DATA_PATHS[key] = `${path}?v=${digest}`;
+        });
+    } catch (err) {
+        console.warn('Asset-Manifest nicht verfügbar, lade unversioniert', err);
+    }
+}
+
+// Kompakte, sprachspezifische Projektionen aus /api/frontend-data (gleiche Reihenfolge wie DATA_PATHS)
+const FRONTEND_DATASETS = [
+    'leistungskatalog', 'pauschaleLP', 'pauschalen', 'pauschaleBedingungen',
+    'tardocGesamt', 'tabellen', 'interpretationen', 'dignitaeten'
+];
+let frontendDataLang = null; // Sprache der geladenen Projektionen (null = Volldaten)
+
+function expandCompactRows(payload) {
+    if (!payload || !Array.isArray(payload.fields) || !Array.isArray(payload.rows)) return [];
+    const fields = payload.fields;
+    return payload.rows.map(row => {
+        const obj = {};
+        for (let i = 0; i < fields.length; i++) {
+            if (row[i] !== null && row[i] !== undefined) obj[fields[i]] = row[i];
+        }
+        return obj;
+    });
+}
+
+async function fetchCompactDatasets(lang) {
+    const res = await fetch('/api/frontend-data', { cache: 'no-store' });
+    if (!res.ok) throw new Error(`HTTP ${res.status} beim Laden von /api/frontend-data`);
+    const { datasets = {} } = await res.json();
+    return Promise.all(FRONTEND_DATASETS.map(async name => {
+        const meta = datasets[name];
+        if (!meta || !meta.available) return [];
+        const params = new URLSearchParams({ lang, v: meta.version });
+        return expandCompactRows(await fetchJSON(`/api/frontend-data/${name}?${params.toString()}`));
+    }));
+}
+
+async function fetchFullDatasets() {
+    await applyAssetVersions();
+    return Promise.all([
+        fetchJSON(DATA_PATHS.leistungskatalog),
+        fetchJSON(DATA_PATHS.pauschaleLP),
+        fetchJSON(DATA_PATHS.pauschalen),
+        fetchJSON(DATA_PATHS.pauschaleBedingungen),
+        fetchJSON(DATA_PATHS.tardocGesamt),
+        fetchJSON(DATA_PATHS.tabellen),
+        fetchJSON(DATA_PATHS.interpretationen),
+        fetchJSON(DATA_PATHS.dignitaeten) // Fetch dignities
+    ]);
+}
+
+// Projektionen enthalten nur die Texte einer Sprache; bei Sprachwechsel still nachladen.
+function reloadFrontendDataForLanguage(lang) {
+    if (!frontendDataLang || frontendDataLang === lang) return;
+    loadData({ silent: true });
+}
+window.reloadFrontendDataForLanguage = reloadFrontendDataForLanguage;
+
+async function loadData({ silent = false } = {}) {
     console.log("Lade Frontend-Daten vom Server...");
-    const initialSpinnerMsg = tDyn('loadingData');
-    showSpinner(initialSpinnerMsg);
-    const outputDiv = $("output");
-    if (outputDiv) outputDiv.innerHTML = "";
+    if (!silent) {
+        const initialSpinnerMsg = tDyn('loadingData');
+        showSpinner(initialSpinnerMsg);
+        const outputDiv = $("output");
+        if (outputDiv) outputDiv.innerHTML = "";
+    }
 
     let loadedDataArray = [];
     let loadError = null;
 
     try {
-        loadedDataArray = await Promise.all([
-            fetchJSON(DATA_PATHS.leistungskatalog),
-            fetchJSON(DATA_PATHS.pauschaleLP),
-            fetchJSON(DATA_PATHS.pauschalen),
-            fetchJSON(DATA_PATHS.pauschaleBedingungen),
-            fetchJSON(DATA_PATHS.tardocGesamt),
-            fetchJSON(DATA_PATHS.tabellen),
-            fetchJSON(DATA_PATHS.interpretationen),
-            fetchJSON(DATA_PATHS.dignitaeten), // Fetch dignities
-            fetchJSON(DATA_PATHS.tpw)
-        ]);
+        const lang = (typeof currentLang === 'undefined') ? 'de' : currentLang;
+        const tpwPromise = fetchJSON(DATA_PATHS.tpw);
+        let datasets = null;
+        try {
+            datasets = await fetchCompactDatasets(lang);
+            frontendDataLang = lang;
+        } catch (err) {
+            console.warn('Kompakte Frontend-Daten nicht verfügbar, lade Volldaten', err);
+            datasets = await fetchFullDatasets();
+            frontendDataLang = null;
+        }
+        loadedDataArray = [...datasets, await tpwPromise];
 
         [ data_leistungskatalog, data_pauschaleLeistungsposition, data_pauschalen,
           data_pauschaleBedingungen, data_tardocGesamt, data_tabellen,
@@ -3220,6 +3347,11 @@ async function loadData() {
         });
 
         console.log("Frontend-Daten vom Server geladen.");
+        if (frontendDataLang && typeof currentLang !== 'undefined' && frontendDataLang !== currentLang) {
+            // Sprache wurde während des Ladens gewechselt
+            loadData({ silent: true });
+        }
+        if (silent) return;
 
         displayOutput(`<p class='success'>${tDyn('dataLoaded')}</p>`);
         hideSpinner();
@@ -3233,6 +3365,7 @@ async function loadData() {
     } catch (error) {
          loadError = error;
          console.error("Schwerwiegender Fehler beim Laden der Frontend-Daten:", error);
+         if (silent) return;
          displayOutput(`<p class="error">Fehler beim Laden der notwendigen Frontend-Daten: ${escapeHtml(error.message)}. Funktionalität eingeschränkt. Bitte Seite neu laden.</p>`);
          hideSpinner();
     }
@@ -3498,7 +3631,11 @@ async function getBillingAnalysis() {
             medications: medicationInput,
             age: age,
             gender: gender,
-            lang: currentLang
+            lang: currentLang,
+            // Bedingungs-HTML erst beim Aufklappen über /api/pauschale-conditions-html laden
+            renderMode: 'lazy',
+            // Schlanke Antwort; Prüfkontext und Stage-2-Mapping über details_token
+            view: 'lean'
         };
         if (shouldSendUseIcd) {
             requestBody.useIcd = useIcdCheckbox;
@@ -3514,6 +3651,8 @@ async function getBillingAnalysis() {
         lastBackendResponse = backendResponse; // Für spätere Feedback-Übermittlung
         lastUserInput = userInput;
         pauschaleConditionsContext = backendResponse?.pauschale_context || null;
+        pauschaleRenderToken = backendResponse?.render_token || null;
+        billingDetailsToken = backendResponse?.details_token || null;
         console.log("[getBillingAnalysis] Backend-Antwort geparst.");
         console.log("[getBillingAnalysis] Empfangene Backend-Daten (Ausschnitt):", {
             begruendung_llm_stufe1: backendResponse?.llm_ergebnis_stufe1?.begruendung_llm}); // Logge spezifisch die Begründung       
@@ -3562,7 +3701,9 @@ async function getBillingAnalysis() {
                 if (abrechnung.details) {
                     finalResultDetailsHtml = displayPauschale(abrechnung);
                     updateSelectedPauschaleDetails(abrechnung.details, abrechnung.bedingungs_pruef_html || '');
-                    evaluatedPauschalenList = Array.isArray(abrechnung.evaluated_pauschalen) ? abrechnung.evaluated_pauschalen : [];
+                    evaluatedPauschalenList = Array.isArray(abrechnung.evaluated_pauschalen)
+                        ? abrechnung.evaluated_pauschalen
+                        : (Array.isArray(backendResponse.evaluated_pauschalen) ? backendResponse.evaluated_pauschalen : []);
                     // Toggle nur anzeigen, wenn sinnvolle ICD-Liste vorhanden
                     const hasPotential = Array.isArray(selectedPauschaleDetails?.potential_icds) && selectedPauschaleDetails.potential_icds.length > 0;
                     showIcdToggle(!!hasPotential);
@@ -3638,6 +3779,25 @@ async function getBillingAnalysis() {
 }
 
 // ─── 4 · Hilfsfunktionen zur ANZEIGE ────────────────────────────────────────
+// Nachladen verzögerter Abschnitte (view "lean"); toggle-Events bubbeln nicht, daher Capture.
+document.addEventListener('toggle', async (event) => {
+    const el = event.target;
+    if (!(el instanceof HTMLDetailsElement) || !el.open || !el.dataset.lazySection || el.dataset.lazyLoaded) return;
+    el.dataset.lazyLoaded = '1';
+    const section = el.dataset.lazySection;
+    const details = await fetchBillingDetails([section]);
+    if (section === 'llm_ergebnis_stufe2') {
+        const html = details ? generateLlmStage2Details(details.llm_ergebnis_stufe2) : '';
+        const body = el.querySelector('div');
+        if (body) {
+            const tmp = document.createElement('div');
+            tmp.innerHTML = html;
+            const loaded = tmp.querySelector('details > div');
+            body.innerHTML = loaded ? loaded.innerHTML : `<p>${escapeHtml(tDyn('noData'))}</p>`;
+        }
+    }
+}, true);
+
 
 // Funktion zum Speichern/Laden des Checkbox-Status
 function saveIcdCheckboxState() {
@@ -3718,6 +3878,10 @@ function generateLlmStage1Details(llmResult) {
 function generateLlmStage2Details(llmResultStufe2) {
     // console.log("generateLlmStage2Details aufgerufen mit:", llmResultStufe2);
 
+    if (llmResultStufe2 && llmResultStufe2.deferred > 0 && billingDetailsToken) {
+        // view "lean": Mapping wird beim Aufklappen nachgeladen
+        return `<details data-lazy-section="llm_ergebnis_stufe2"><summary>${tDyn('llmDetails2')}</summary><div><p class="info-muted">${escapeHtml(tDyn('loadingDetails'))}</p></div></details>`;
+    }
     // Prüft auf die korrekte Struktur für Mapping-Ergebnisse
     if (!llmResultStufe2 || !llmResultStufe2.mapping_results || !Array.isArray(llmResultStufe2.mapping_results) || llmResultStufe2.mapping_results.length === 0) {
         // console.log("generateLlmStage2Details: Keine gültigen Mapping-Ergebnisse gefunden, gebe leeren String zurück.");
@@ -3838,7 +4002,8 @@ function displayPauschale(abrechnungsObjekt) {
     lastTardocTotalTp = Number.isFinite(parsedTaxpoints) ? parsedTaxpoints : null;
     refreshTpwSummary();
 
-    const hasConditionsHtml = typeof bedingungsHtml === 'string' && bedingungsHtml.trim() !== '';
+    const hasConditionsHtml = (typeof bedingungsHtml === 'string' && bedingungsHtml.trim() !== '')
+        || Boolean(abrechnungsObjekt.render_token && abrechnungsObjekt.conditions_structured);
     const metaItems = [];
     const logicStatusKey = conditions_met_structured ? 'logicOk' : 'logicNotOk';
     const logicStatusText = stripOuterParens(tDyn(logicStatusKey));
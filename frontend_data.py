@@ -0,0 +1,179 @@
+"""Kompakte Projektionen der Tarifdaten für das Frontend (``/api/frontend-data``).
+
+``calculator.js`` lädt die Datendateien vor allem für Lookups per Code. Statt
+der vollständigen JSON-Dateien liefert der Server pro Datensatz nur die Felder,
+die die Oberfläche tatsächlich liest, bereits in der gewählten Sprache
+aufgelöst (Wert unter dem Basisnamen, z.B. ``Beschreibung`` statt
+``Beschreibung_f``) und als Spaltenformat::
+
+    {"dataset": "leistungskatalog", "lang": "fr",
+     "fields": ["LKN", "Beschreibung", ...], "rows": [["AA.00.0010", "...", ...], ...]}
+
+Optional lässt sich ein Datensatz in Chunks abrufen; der Chunk-Schlüssel ist
+der Teil des Schlüsselfeldes vor dem ersten Punkt (Kapitel bzw. Tabellenname).
+Das Modul ist frei von Flask; Caching und HTTP übernimmt ``server.py``.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Dict, FrozenSet, Iterable, List, Mapping, Optional, Tuple
+
+from utils import get_lang_field
+
+SUPPORTED_LANGS: Tuple[str, ...] = ("de", "fr", "it")
+
+
+@dataclass(frozen=True)
+class DatasetSpec:
+    """Beschreibt Quelle und Feldauswahl eines Frontend-Datensatzes."""
+
+    name: str
+    filename: str
+    key_field: str
+    fields: Tuple[str, ...]
+    localized: FrozenSet[str] = frozenset()
+    # Für Dateien mit Abschnitten (dict von Listen) statt einer Liste
+    sections: Tuple[str, ...] = ()
+
+
+# Feldauswahl entspricht den Zugriffen in calculator.js (getLangField & direkte Felder).
+DATASETS: Dict[str, DatasetSpec] = {
+    spec.name: spec
+    for spec in (
+        DatasetSpec(
+            "leistungskatalog",
+            "LKAAT_Leistungskatalog.json",
+            "LKN",
+            ("LKN", "Beschreibung", "MedizinischeInterpretation"),
+            frozenset({"Beschreibung", "MedizinischeInterpretation"}),
+        ),
+        DatasetSpec(
+            "pauschaleLP",
+            "PAUSCHALEN_Leistungspositionen.json",
+            "Leistungsposition",
+            ("Pauschale", "Leistungsposition", "Tabelle"),
+        ),
+        DatasetSpec(
+            "pauschalen",
+            "PAUSCHALEN_Pauschalen.json",
+            "Pauschale",
+            ("Pauschale", "Pauschale_Text", "Taxpunkte", "Dignitaeten", "Implantate_inbegriffen"),
+            frozenset({"Pauschale_Text"}),
+        ),
+        DatasetSpec(
+            "pauschaleBedingungen",
+            "PAUSCHALEN_Bedingungen.json",
+            "Pauschale",
+            ("BedingungsID", "Pauschale"),
+        ),
+        DatasetSpec(
+            "tardocGesamt",
+            "TARDOC_Tarifpositionen.json",
+            "LKN",
+            (
+                "LKN",
+                "Bezeichnung",
+                "AL_(normiert)",
+                "IPL_(normiert)",
+                "KapitelNummer",
+                "Kapitel",
+                "Medizinische Interpretation",
+                "Interpretation",
+                "Qualitative_Dignität",
+                "Leistungsgruppen",
+                "Regeln",
+            ),
+            frozenset({"Bezeichnung", "Medizinische Interpretation", "Interpretation"}),
+        ),
+        DatasetSpec(
+            "tabellen",
+            "PAUSCHALEN_Tabellen.json",
+            "Tabelle",
+            ("Tabelle", "Tabelle_Typ", "Code", "Code_Text"),
+            frozenset({"Code_Text"}),
+        ),
+        DatasetSpec(
+            "interpretationen",
+            "TARDOC_Interpretationen.json",
+            "KNR",
+            ("KNR", "Bezeichnung", "Interpretation"),
+            frozenset({"Bezeichnung", "Interpretation"}),
+            sections=("Kapitelinterpretationen", "GenerelleInterpretationen", "AllgemeineDefinitionen"),
+        ),
+        DatasetSpec(
+            "dignitaeten",
+            "DIGNITAETEN.json",
+            "DignitaetCode",
+            ("DignitaetCode", "DignitaetText"),
+            frozenset({"DignitaetText"}),
+        ),
+    )
+}
+
+
+def normalize_lang(lang: Optional[str]) -> str:
+    value = str(lang or "de").strip().lower()
+    return value if value in SUPPORTED_LANGS else "de"
+
+
+def chunk_key(value: Any) -> str:
+    """Chunk eines Eintrags: Schlüssel bis zum ersten Punkt, in Grossbuchstaben."""
+    text = str(value or "").strip().upper()
+    return text.split(".", 1)[0]
+
+
+def iter_source_rows(spec: DatasetSpec, raw: Any) -> Iterable[Mapping[str, Any]]:
+    if spec.sections and isinstance(raw, Mapping):
+        for section in spec.sections:
+            for row in raw.get(section) or ():
+                if isinstance(row, Mapping):
+                    yield row
+        return
+    if isinstance(raw, list):
+        for row in raw:
+            if isinstance(row, Mapping):
+                yield row
+
+
+def project_dataset(spec: DatasetSpec, raw: Any, lang: str) -> List[List[Any]]:
+    """Projiziert die Quelldaten auf ``spec.fields`` (fehlende Werte als ``None``)."""
+    lang = normalize_lang(lang)
+    rows: List[List[Any]] = []
+    for entry in iter_source_rows(spec, raw):
+        row: List[Any] = []
+        for field_name in spec.fields:
+            if field_name in spec.localized:
+                value = get_lang_field(dict(entry), field_name, lang)
+            else:
+                value = entry.get(field_name)
+            row.append(value if value not in ("", []) else None)
+        rows.append(row)
+    return rows
+
+
+def chunk_keys(spec: DatasetSpec, rows: List[List[Any]]) -> List[str]:
+    idx = spec.fields.index(spec.key_field)
+    return sorted({chunk_key(row[idx]) for row in rows if row[idx] is not None})
+
+
+def build_payload(
+    spec: DatasetSpec,
+    rows: List[List[Any]],
+    lang: str,
+    prefix: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Antwortobjekt im Spaltenformat, optional auf einen Chunk beschränkt."""
+    if prefix:
+        idx = spec.fields.index(spec.key_field)
+        wanted = chunk_key(prefix)
+        rows = [row for row in rows if chunk_key(row[idx]) == wanted]
+    payload: Dict[str, Any] = {
+        "dataset": spec.name,
+        "lang": normalize_lang(lang),
+        "fields": list(spec.fields),
+        "rows": rows,
+    }
+    if prefix:
+        payload["chunk"] = chunk_key(prefix)
+    return payload
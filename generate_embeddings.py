@@ -6,6 +6,8 @@ import numpy as np
 import torch
 from sentence_transformers import SentenceTransformer
 
+import json_backend
+
 try:
     import faiss  # type: ignore[import]
 except ModuleNotFoundError as exc:  # pragma: no cover - runtime guard
@@ -68,9 +70,8 @@ def main() -> None:
     # Lade Leistungskatalog (Einzelleistungen)
     print(f"Lade Leistungskatalog von: {LEISTUNGSKATALOG_PATH}", flush=True)
     try:
-        with open(LEISTUNGSKATALOG_PATH, "r", encoding="utf-8") as f:
-            leistungskatalog = json.load(f)
-            all_entries.extend(leistungskatalog)
+        leistungskatalog = json_backend.load_file(LEISTUNGSKATALOG_PATH)
+        all_entries.extend(leistungskatalog)
         print(f"Leistungskatalog mit {len(leistungskatalog)} Einträgen geladen.", flush=True)
     except FileNotFoundError:
         print(f"FEHLER: Leistungskatalog-Datei nicht gefunden unter {LEISTUNGSKATALOG_PATH}", flush=True)
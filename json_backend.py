@@ -0,0 +1,134 @@
+"""Austauschbares JSON-Backend für Server, Synonym-Tools und Skripte.
+
+Ist ``orjson`` installiert, wird es für Laden und Serialisieren verwendet,
+sonst die Standardbibliothek. Das Verhalten bleibt in beiden Fällen gleich:
+Eingaben, die ``orjson`` ablehnt (z.B. ``NaN`` oder sehr grosse Ganzzahlen),
+werden transparent an ``json`` weitergereicht, Fehler sind immer
+``json.JSONDecodeError`` bzw. ``TypeError``.
+
+``FastJSONProvider`` bindet das Backend als Flask-JSON-Provider ein, sodass
+``jsonify`` und ``request.get_json`` ebenfalls davon profitieren.
+"""
+
+from __future__ import annotations
+
+import codecs
+import json
+from pathlib import Path
+from typing import Any, Callable, Optional, Union
+
+try:
+    import orjson
+except ModuleNotFoundError:  # optionale Abhängigkeit
+    orjson = None
+
+try:
+    from flask.json.provider import DefaultJSONProvider
+except ModuleNotFoundError:
+    DefaultJSONProvider = None
+
+JSONDecodeError = json.JSONDecodeError
+
+_use_orjson = orjson is not None
+
+
+def configure(backend: str = "auto") -> str:
+    """Wählt das Backend (``auto``, ``orjson`` oder ``json``) und liefert das aktive."""
+    global _use_orjson
+    choice = str(backend or "auto").strip().lower()
+    _use_orjson = orjson is not None and choice in ("auto", "orjson")
+    return active_backend()
+
+
+def active_backend() -> str:
+    return "orjson" if _use_orjson else "json"
+
+
+def loads(data: Union[str, bytes, bytearray]) -> Any:
+    if _use_orjson:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            pass  # stdlib akzeptiert NaN/Infinity und liefert die gewohnte Fehlermeldung
+    if isinstance(data, (bytes, bytearray)):
+        data = bytes(data).decode("utf-8")
+    return json.loads(data)
+
+
+def load_file(path: Union[str, Path]) -> Any:
+    """Liest eine UTF-8-JSON-Datei (BOM wird ignoriert)."""
+    raw = Path(path).read_bytes()
+    if raw.startswith(codecs.BOM_UTF8):
+        raw = raw[len(codecs.BOM_UTF8):]
+    return loads(raw)
+
+
+def dumps_bytes(
+    obj: Any,
+    *,
+    indent: bool = False,
+    sort_keys: bool = False,
+    default: Optional[Callable[[Any], Any]] = None,
+) -> bytes:
+    """Serialisiert nach UTF-8 (kompakt bzw. mit 2er-Einrückung)."""
+    if _use_orjson:
+        # datetime/Dataclasses wie bei stdlib über ``default`` abbilden
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        try:
+            return orjson.dumps(obj, default=default, option=option)
+        except TypeError:
+            pass  # z.B. Ganzzahlen > 64 Bit; stdlib übernimmt oder meldet den Fehler
+    text = json.dumps(
+        obj,
+        ensure_ascii=False,
+        indent=2 if indent else None,
+        separators=None if indent else (",", ":"),
+        sort_keys=sort_keys,
+        default=default,
+    )
+    return text.encode("utf-8")
+
+
+def dumps(
+    obj: Any,
+    *,
+    indent: bool = False,
+    sort_keys: bool = False,
+    default: Optional[Callable[[Any], Any]] = None,
+) -> str:
+    return dumps_bytes(obj, indent=indent, sort_keys=sort_keys, default=default).decode("utf-8")
+
+
+if DefaultJSONProvider is not None:
+
+    class FastJSONProvider(DefaultJSONProvider):
+        """Flask-JSON-Provider auf Basis dieses Moduls.
+
+        Respektiert ``sort_keys``, ``compact`` und die ``default``-Funktion des
+        Standard-Providers; Aufrufe mit Zusatzargumenten gehen an die Basisklasse.
+        """
+
+        def dumps(self, obj: Any, **kwargs: Any) -> str:
+            if kwargs:
+                return super().dumps(obj, **kwargs)
+            return dumps(obj, sort_keys=self.sort_keys, default=self.default)
+
+        def loads(self, s: Union[str, bytes], **kwargs: Any) -> Any:
+            if kwargs:
+                return super().loads(s, **kwargs)
+            return loads(s)
+
+        def response(self, *args: Any, **kwargs: Any) -> Any:
+            obj = self._prepare_response_obj(args, kwargs)
+            pretty = self.compact is False or (self.compact is None and self._app.debug)
+            body = dumps_bytes(obj, indent=pretty, sort_keys=self.sort_keys, default=self.default)
+            if pretty:
+                body += b"\n"
+            return self._app.response_class(body, mimetype=self.mimetype)
+
+else:  # pragma: no cover - nur ohne Flask
+    FastJSONProvider = None
@@ -0,0 +1,441 @@
+"""Aufzeichnen und Abspielen von LLM-Anfragen ("Cassette").
+
+Im Modus ``record`` wird jede erfolgreiche LLM-Antwort zusammen mit Anbieter,
+Modell, Stufe und normalisiertem Prompt in einer Cassette-Datei abgelegt
+(``.json`` oder ``.json.gz``). Im Modus ``replay`` werden die Antworten ohne
+Netzwerk, API-Key und Drosselung aus der Datei bedient; so läuft die ganze
+Baseline in Sekunden als Regressionstest für Retrieval, Regeln und
+Pauschalenlogik.
+
+Schlüssel ist der SHA-256 über ``provider``, ``model`` und den normalisierten
+Prompt (Leerraum pro Zeile zusammengefasst, Leerzeilen entfernt). Läuft ein
+Aufruf innerhalb von ``scope("17/de")``, wird zusätzlich die Position
+``<scope>|<provider>/<model>|<stage>#<n>`` gespeichert. Fehlt beim Abspielen
+der Hash, die Position aber nicht, hat sich der Prompt geändert ("Drift"): der
+Unterschied wird protokolliert und je nach ``on_drift`` die alte Antwort
+geliefert (``serve``) oder ``CassetteMiss`` ausgelöst (``error``). Ohne jeden
+Treffer gibt es immer ``CassetteMiss``.
+"""
+
+from __future__ import annotations
+
+import contextvars
+import difflib
+import gzip
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+import json_backend
+from mock_llm.responses import detect_stage
+
+logger = logging.getLogger(__name__)
+
+MODE_OFF = "off"
+MODE_RECORD = "record"
+MODE_REPLAY = "replay"
+MODES = (MODE_OFF, MODE_RECORD, MODE_REPLAY)
+DRIFT_POLICIES = ("serve", "error")
+FORMAT_VERSION = 1
+REPLAY_API_KEY = "cassette-replay"
+MAX_DIFF_LINES = 40
+
+_GEMINI_MODEL_RE = re.compile(r"/models/([^/:?]+):")
+_SPACE_RE = re.compile(r"[ \t\r\f\v]+")
+
+
+class CassetteMiss(ConnectionError):
+    """Keine aufgezeichnete Antwort für den Prompt (oder Drift mit ``on_drift=error``)."""
+
+
+def normalize_prompt(prompt: str) -> str:
+    lines = (_SPACE_RE.sub(" ", line).strip() for line in str(prompt or "").splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+def interaction_key(provider: str, model: str, prompt: str) -> str:
+    material = f"{provider}\n{model}\n{normalize_prompt(prompt)}"
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+def gemini_prompt(payload: Dict[str, Any]) -> str:
+    parts = []
+    for content in payload.get("contents") or []:
+        for part in content.get("parts") or []:
+            if isinstance(part, dict) and isinstance(part.get("text"), str):
+                parts.append(part["text"])
+    return "\n".join(parts)
+
+
+def gemini_model(url: str) -> str:
+    match = _GEMINI_MODEL_RE.search(url or "")
+    return match.group(1) if match else ""
+
+
+def chat_prompt(messages: List[Dict[str, Any]]) -> str:
+    lines = []
+    for message in messages or []:
+        content = message.get("content")
+        if isinstance(content, list):
+            content = "".join(p.get("text", "") for p in content if isinstance(p, dict))
+        lines.append(f"{message.get('role', '')}: {content or ''}")
+    return "\n".join(lines)
+
+
+def chat_response_to_dict(response: Any) -> Dict[str, Any]:
+    """Reduziert eine OpenAI-SDK-Antwort auf die Felder, die der Server liest."""
+    choices = []
+    for choice in getattr(response, "choices", None) or []:
+        message = getattr(choice, "message", None)
+        choices.append({
+            "message": {"role": getattr(message, "role", "assistant"), "content": getattr(message, "content", None)},
+            "finish_reason": getattr(choice, "finish_reason", None),
+        })
+    usage = getattr(response, "usage", None)
+    usage_dict = None
+    if usage is not None:
+        usage_dict = {
+            name: getattr(usage, name, None)
+            for name in ("prompt_tokens", "completion_tokens", "total_tokens")
+        }
+    return {"choices": choices, "usage": usage_dict}
+
+
+def _namespace(value: Any) -> Any:
+    if isinstance(value, dict):
+        return SimpleNamespace(**{k: _namespace(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return [_namespace(v) for v in value]
+    return value
+
+
+def chat_response_from_dict(data: Dict[str, Any]) -> Any:
+    """Baut ein Objekt mit Attributzugriff (``resp.choices[0].message.content``)."""
+    return _namespace(data)
+
+
+class ReplayResponse:
+    """Minimaler Ersatz für ``requests.Response`` einer Gemini-Antwort."""
+
+    status_code = 200
+    headers = {"X-Cassette": "replay"}
+
+    def __init__(self, data: Dict[str, Any]) -> None:
+        self._data = data
+
+    def json(self) -> Dict[str, Any]:
+        return self._data
+
+    @property
+    def text(self) -> str:
+        return json_backend.dumps(self._data)
+
+    def raise_for_status(self) -> None:
+        return None
+
+
+class Cassette:
+    """Aufgezeichnete Interaktionen einer Datei samt Treffer-/Drift-Statistik."""
+
+    def __init__(self, path: Union[str, Path], *, store_prompts: bool = True) -> None:
+        self.path = Path(path)
+        self.store_prompts = store_prompts
+        self.by_key: Dict[str, Dict[str, Any]] = {}
+        self.by_position: Dict[str, str] = {}
+        self.stats = {"hits": 0, "drifts": 0, "misses": 0, "recorded": 0}
+        self.drifts: List[Dict[str, Any]] = []
+        self.misses: List[Dict[str, Any]] = []
+        self._recorded: List[str] = []
+        self._dirty = False
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path: Union[str, Path], *, store_prompts: bool = True) -> "Cassette":
+        cassette = cls(path, store_prompts=store_prompts)
+        if cassette.path.is_file():
+            raw = cassette.path.read_bytes()
+            if cassette.path.suffix == ".gz":
+                raw = gzip.decompress(raw)
+            data = json_backend.loads(raw) if raw else {}
+            for entry in (data or {}).get("interactions") or []:
+                cassette._add(entry)
+        return cassette
+
+    def __len__(self) -> int:
+        return len(self.by_key)
+
+    def _add(self, entry: Dict[str, Any]) -> None:
+        key = entry.get("key")
+        if not key:
+            return
+        self.by_key[key] = entry
+        for position in entry.get("positions") or []:
+            self.by_position[position] = key
+
+    def save(self) -> None:
+        with self._lock:
+            if not self._dirty:
+                return
+            data = {
+                "version": FORMAT_VERSION,
+                "saved_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "interactions": sorted(self.by_key.values(), key=lambda e: (e.get("positions") or [""])[0]),
+            }
+            raw = json_backend.dumps_bytes(data, indent=self.path.suffix != ".gz")
+            if self.path.suffix == ".gz":
+                raw = gzip.compress(raw, mtime=0)
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_name(self.path.name + ".tmp")
+            tmp.write_bytes(raw)
+            os.replace(tmp, self.path)
+            self._dirty = False
+
+    def record(self, provider: str, model: str, prompt: str, response: Dict[str, Any]) -> str:
+        normalized = normalize_prompt(prompt)
+        key = interaction_key(provider, model, prompt)
+        stage = detect_stage(prompt)
+        position = _next_position(provider, model, stage)
+        with self._lock:
+            entry = self.by_key.get(key) or {"key": key, "positions": []}
+            entry.update({
+                "provider": provider,
+                "model": model,
+                "stage": stage,
+                "prompt_chars": len(normalized),
+                "response": response,
+                "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            })
+            if self.store_prompts:
+                entry["prompt"] = normalized
+            if position and position not in entry["positions"]:
+                entry["positions"].append(position)
+            self._add(entry)
+            self.stats["recorded"] += 1
+            self._recorded.append(key)
+            self._dirty = True
+        return key
+
+    def take_recorded(self) -> List[Dict[str, Any]]:
+        """Gibt die in diesem Prozess aufgezeichneten Einträge ab (z.B. aus Worker-Prozessen).
+
+        Danach gilt die Cassette als gespeichert; der Aufrufer übernimmt die
+        Einträge mit ``merge`` in seine eigene Cassette.
+        """
+        with self._lock:
+            entries = [self.by_key[key] for key in dict.fromkeys(self._recorded)]
+            self._recorded = []
+            self._dirty = False
+        return entries
+
+    def merge(self, entries: List[Dict[str, Any]]) -> None:
+        with self._lock:
+            for entry in entries:
+                self._add(entry)
+                self.stats["recorded"] += 1
+            self._dirty = self._dirty or bool(entries)
+
+    def lookup(self, provider: str, model: str, prompt: str, on_drift: str = "serve") -> Dict[str, Any]:
+        """Liefert die aufgezeichnete Antwort oder löst ``CassetteMiss`` aus."""
+        key = interaction_key(provider, model, prompt)
+        stage = detect_stage(prompt)
+        position = _next_position(provider, model, stage)
+        with self._lock:
+            entry = self.by_key.get(key)
+            if entry is not None:
+                self.stats["hits"] += 1
+                return entry["response"]
+            old_key = self.by_position.get(position) if position else None
+            old = self.by_key.get(old_key) if old_key else None
+            if old is None:
+                self.stats["misses"] += 1
+                self.misses.append({"position": position, "provider": provider, "model": model, "stage": stage, "key": key})
+                raise CassetteMiss(f"Cassette {self.path.name}: keine Aufzeichnung für {provider}/{model} ({stage}, {position or 'ohne Scope'})")
+            self.stats["drifts"] += 1
+            drift = {
+                "position": position,
+                "provider": provider,
+                "model": model,
+                "stage": stage,
+                "recorded_key": old_key,
+                "key": key,
+                "diff": prompt_diff(old.get("prompt"), normalize_prompt(prompt)),
+            }
+            self.drifts.append(drift)
+        logger.warning(
+            "Prompt-Drift bei %s (%s/%s, %s):\n%s",
+            position, provider, model, stage, "\n".join(drift["diff"]) or "(aufgezeichneter Prompt nicht gespeichert)",
+        )
+        if on_drift == "error":
+            raise CassetteMiss(f"Cassette {self.path.name}: Prompt-Drift bei {position}")
+        return old["response"]
+
+    def report(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "path": str(self.path),
+                "interactions": len(self.by_key),
+                **self.stats,
+                "drift": list(self.drifts),
+                "missing": list(self.misses),
+            }
+
+
+def prompt_diff(recorded: Optional[str], current: str, limit: int = MAX_DIFF_LINES) -> List[str]:
+    """Zeilen-Diff (unified, ohne Kopfzeilen) zwischen aufgezeichnetem und aktuellem Prompt."""
+    if recorded is None:
+        return []
+    lines = [
+        line for line in difflib.unified_diff(recorded.splitlines(), current.splitlines(), lineterm="", n=0)
+        if not line.startswith(("---", "+++"))
+    ]
+    if len(lines) > limit:
+        lines = lines[:limit] + [f"... ({len(lines) - limit} weitere Zeilen)"]
+    return lines
+
+
+# --- Scope: ordnet Aufrufe einem Testfall zu (Drift-Erkennung) ---------------
+
+_scope: contextvars.ContextVar[Optional[Tuple[str, Dict[str, int]]]] = contextvars.ContextVar("llm_cassette_scope", default=None)
+
+
+@contextmanager
+def scope(label: str) -> Iterator[None]:
+    """Ordnet alle LLM-Aufrufe im Block dem Fall ``label`` zu (z.B. ``"17/de"``)."""
+    token = _scope.set((str(label), {}))
+    try:
+        yield
+    finally:
+        _scope.reset(token)
+
+
+def _next_position(provider: str, model: str, stage: str) -> Optional[str]:
+    current = _scope.get()
+    if current is None:
+        return None
+    label, counters = current
+    slot = f"{provider}/{model}|{stage}"
+    counters[slot] = counters.get(slot, 0) + 1
+    return f"{label}|{slot}#{counters[slot]}"
+
+
+# --- Modulzustand --------------------------------------------------------------
+
+_mode = MODE_OFF
+_on_drift = "serve"
+_cassette: Optional[Cassette] = None
+
+
+def configure(
+    mode: str = MODE_OFF,
+    path: Union[str, Path, None] = None,
+    *,
+    on_drift: str = "serve",
+    store_prompts: bool = True,
+) -> Optional[Cassette]:
+    """Aktiviert Aufnahme/Wiedergabe; bei gleichem Modus und Pfad bleibt die geladene Cassette erhalten."""
+    global _mode, _on_drift, _cassette
+    mode = str(mode or MODE_OFF).strip().lower()
+    if mode not in MODES or not path:
+        mode = MODE_OFF
+    _on_drift = on_drift if on_drift in DRIFT_POLICIES else "serve"
+    if mode == MODE_OFF:
+        if _cassette is not None and _mode == MODE_RECORD:
+            _cassette.save()
+        _mode, _cassette = MODE_OFF, None
+        return None
+    resolved = Path(path).resolve()
+    if _cassette is None or _mode != mode or _cassette.path.resolve() != resolved:
+        if _cassette is not None and _mode == MODE_RECORD:
+            _cassette.save()
+        _cassette = Cassette.load(resolved, store_prompts=store_prompts)
+        logger.info("LLM-Cassette %s (%s, %s Einträge)", resolved, mode, len(_cassette))
+    _mode = mode
+    return _cassette
+
+
+def mode() -> str:
+    return _mode
+
+
+def active() -> Optional[Cassette]:
+    return _cassette
+
+
+def replaying() -> bool:
+    return _mode == MODE_REPLAY and _cassette is not None
+
+
+def recording() -> bool:
+    return _mode == MODE_RECORD and _cassette is not None
+
+
+def replay(provider: str, model: str, prompt: str) -> Dict[str, Any]:
+    assert _cassette is not None
+    return _cassette.lookup(provider, model, prompt, on_drift=_on_drift)
+
+
+def record(provider: str, model: str, prompt: str, response: Dict[str, Any]) -> None:
+    if _cassette is not None:
+        _cassette.record(provider, model, prompt, response)
+
+
+def flush() -> None:
+    """Schreibt neue Aufnahmen auf die Platte (auch per ``atexit`` registriert)."""
+    if _cassette is not None and _mode == MODE_RECORD:
+        _cassette.save()
+
+
+def report() -> Dict[str, Any]:
+    if _cassette is None:
+        return {"mode": _mode}
+    return {"mode": _mode, **_cassette.report()}
+
+
+# --- Kommandozeile (run_quality_tests.py, llm_vergleich.py) -------------------
+
+def add_arguments(parser: Any) -> None:
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--record", nargs="?", const="", metavar="DATEI", help="LLM-Antworten in einer Cassette aufzeichnen.")
+    group.add_argument("--replay", nargs="?", const="", metavar="DATEI", help="LLM-Antworten ohne Netzwerk aus der Cassette abspielen.")
+    parser.add_argument("--strict-drift", action="store_true", help="Prompt-Drift beim Abspielen als Fehler behandeln.")
+
+
+def apply_arguments(args: Any) -> str:
+    """Setzt ``LLM_CASSETTE_*`` (gilt auch für spätere Server-Reloads) und aktiviert die Cassette."""
+    if args.record is not None:
+        selected, value = MODE_RECORD, args.record
+    elif args.replay is not None:
+        selected, value = MODE_REPLAY, args.replay
+    else:
+        return _mode
+    from runtime_config import load_merged_config
+
+    config = load_merged_config()
+    path = value or os.getenv("LLM_CASSETTE_FILE") or config.get("LLM_CASSETTE", "file", fallback="tests/cassettes/llm_cassette.json.gz")
+    on_drift = "error" if args.strict_drift else (os.getenv("LLM_CASSETTE_ON_DRIFT") or config.get("LLM_CASSETTE", "on_drift", fallback="serve"))
+    os.environ["LLM_CASSETTE_MODE"] = selected
+    os.environ["LLM_CASSETTE_FILE"] = str(path)
+    os.environ["LLM_CASSETTE_ON_DRIFT"] = on_drift
+    configure(selected, path, on_drift=on_drift, store_prompts=config.getboolean("LLM_CASSETTE", "store_prompts", fallback=True))
+    return selected
+
+
+def format_report(data: Dict[str, Any]) -> str:
+    if data.get("mode", MODE_OFF) == MODE_OFF:
+        return ""
+    lines = [
+        f"LLM-Cassette ({data['mode']}) {data['path']}: {data['interactions']} Einträge, "
+        f"{data['recorded']} aufgezeichnet, {data['hits']} Treffer, {data['drifts']} Drift, {data['misses']} fehlend"
+    ]
+    for drift in data.get("drift") or []:
+        lines.append(f"  Drift {drift['position']}: {len(drift['diff'])} geänderte Zeilen")
+    for miss in data.get("missing") or []:
+        lines.append(f"  Fehlt {miss['position'] or miss['provider'] + '/' + miss['model'] + ' ' + miss['stage']}")
+    return "\n".join(lines)
@@ -1,22 +1,31 @@
 """Interaktive Vergleichsumgebung für verschiedene LLM-Anbieter-Konfigurationen.
 
 Das Skript liest die Modellmatrix aus ``llm_vergleich_results.json`` sowie die
-Baseline-Fälle unter ``data/baseline_results.json``. Für jeden Eintrag wird der
-Flask-Server mit stufenspezifischen Umgebungsvariablen neu geladen, die Tests
-über die öffentliche API ausgeführt und der Tokenverbrauch samt Erfolgsquote
-protokolliert. Steht ``tkinter`` zur Verfügung, erscheint eine kleine GUI zur
-Fortschrittsanzeige, sonst erfolgt die Ausgabe in der Konsole. Führe dieses
-Modul aus, um neue Modellkandidaten zu prüfen, bevor die Produktkonfiguration
-angepasst wird.
+Baseline-Fälle unter ``data/baseline_results.json``. Jedes Modell läuft in einem
+eigenen Prozess (``--workers`` gleichzeitig), der den Flask-Server mit
+stufenspezifischen Umgebungsvariablen lädt und die Tests über die öffentliche
+API ausführt. Ergebnis, Dauer und Tokens jedes Falls stammen aus der Antwort
+von ``/api/test-example`` (``quality_runner.run_example``) und werden pro
+Modell als JSONL unter ``logs/llm_vergleich/`` abgelegt; ``--resume`` setzt
+einen abgebrochenen Lauf dort fort. Am Ende stehen Erfolgsquote, Kosten und
+Latenz samt Pareto-Markierung in ``llm_vergleich_results.json`` und auf der
+Konsole. Steht ``tkinter`` zur Verfügung, erscheint eine kleine GUI zur
+Fortschrittsanzeige. ``--record``/``--replay`` zeichnen die LLM-Antworten aller
+Modelle in einer Cassette auf bzw. spielen sie ohne Netzwerk ab
+(``llm_cassette.py``).
 """
 
+import argparse
 import json
+import multiprocessing
 import os
+import queue
+import re
 import sys
-import time
 import importlib
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
 try:
     import tkinter as tk
@@ -25,32 +34,17 @@ except Exception:  # pragma: no cover - optional GUI
     tk = None
     ttk = None
 
-from utils import count_tokens
-
-# Logdatei des Servers für Tokenabrechnung
-LOG_PATH = Path(__file__).with_name("_server.log")
-
-
-def _read_new_tokens(log_file) -> tuple[int, int]:
-    """Liest neue Logzeilen und extrahiert Prompt-/Antworttokenzahlen."""
-    in_tokens = 0
-    out_tokens = 0
-    for line in log_file.read().splitlines():
-        if "Prompt Tokens:" in line:
-            try:
-                in_tokens += int(line.rsplit(":", 1)[1].strip())
-            except ValueError:
-                continue
-        elif "Antwort Tokens:" in line:
-            try:
-                out_tokens += int(line.rsplit(":", 1)[1].strip())
-            except ValueError:
-                continue
-    return in_tokens, out_tokens
+import json_backend
+import llm_cassette
+import quality_runner
+from perf_common import percentile
+from runtime_config import load_merged_config
 
 # Ablage der Vergleichsergebnisse im Projektstamm
 MODELS_FILE = Path(__file__).with_name("llm_vergleich_results.json")
 BASELINE_PATH = Path(__file__).resolve().parent / "data" / "baseline_results.json"
+# Einzelergebnisse je Modell (JSONL zum Fortsetzen) und Berichte
+RESULTS_DIR = Path("logs/llm_vergleich")
 
 
 def load_models() -> List[Dict[str, Any]]:
@@ -76,6 +70,8 @@ def load_server(
     os.environ["STAGE1_LLM_MODEL"] = stage1_model
     os.environ["STAGE2_LLM_PROVIDER"] = stage2_provider or stage1_provider
     os.environ["STAGE2_LLM_MODEL"] = stage2_model or stage1_model
+    # Worker liefern keine Datendateien aus; Vorkomprimieren wäre verlorene Startzeit.
+    os.environ.setdefault("STATIC_WARM", "off")
 
     if "server" in sys.modules:
         return importlib.reload(sys.modules["server"])
@@ -86,9 +82,9 @@ def load_server(
 class QCStatus:
     """Einfache Tkinter-Statusanzeige für den LLM-Vergleich."""
 
-    def __init__(self) -> None:
+    def __init__(self, gui: bool = True) -> None:
         self.root: Any | None = None
-        if tk is None:
+        if tk is None or not gui:
             return
         try:  # pragma: no cover - GUI only
             self.root = tk.Tk()
@@ -126,6 +122,8 @@ class QCStatus:
         - n Input Token
         - n Output Token
         - Geschätzte Kosten [CHF]
+        - Median-Latenz pro Fall [s]
+        - Pareto (nicht dominiert in Genauigkeit, Kosten, Latenz)
         """
         if not self.root or tk is None or ttk is None:
             # Fallback: Textuelle Ausgabe in Konsole
@@ -157,7 +155,7 @@ class QCStatus:
             except Exception:
                 pass
         self.root.title("LLM Vergleich – Zusammenfassung")
-        cols = ("Modell", "Zeit", "Korrekt", "Input Tokens", "Output Tokens", "Kosten [CHF]")
+        cols = ("Modell", "Zeit", "Korrekt", "Input Tokens", "Output Tokens", "Kosten [CHF]", "p50 [s]", "Pareto")
         tree = ttk.Treeview(self.root, columns=cols, show="headings", height=max(6, len(models)))
         for c in cols:
             tree.heading(c, text=c)
@@ -167,6 +165,8 @@ class QCStatus:
         tree.column("Input Tokens", width=120, anchor="e")
         tree.column("Output Tokens", width=120, anchor="e")
         tree.column("Kosten [CHF]", width=120, anchor="e")
+        tree.column("p50 [s]", width=80, anchor="e")
+        tree.column("Pareto", width=60, anchor="center")
 
         # Einträge füllen
         for m in models:
@@ -178,7 +178,7 @@ class QCStatus:
             ss = int(secs % 60)
             passed = int(m.get("Passed") or 0)
             total = int(m.get("Total_Tests") or 0)
-            pct = float(m.get("Prozent_Korrekt") or 0.0)
+            pct = f"{float(m.get('Prozent_Korrekt') or 0.0):.2f}%" if is_complete(m) else "unvollständig"
             input_t = int(m.get("InputTokens") or 0)
             output_t = int(m.get("OutputTokens") or 0)
             cost = float(m.get("InputToken_CHF") or 0.0) + float(m.get("OutputToken_CHF") or 0.0)
@@ -188,10 +188,12 @@ class QCStatus:
                 values=(
                     name,
                     f"{mm:02d}:{ss:02d}",
-                    f"{passed}/{total} ({pct:.2f}%)",
+                    f"{passed}/{total} ({pct})",
                     f"{input_t}",
                     f"{output_t}",
                     f"{cost:.6f}",
+                    f"{float(m.get('Latency_p50_Seconds') or 0.0):.2f}",
+                    "*" if m.get("Pareto") else "",
                 ),
             )
         tree.pack(fill="both", expand=True, padx=8, pady=8)
@@ -203,148 +205,292 @@ class QCStatus:
         self.root.mainloop()
 
 
-def _build_examples(baseline: Dict[str, Any]) -> List[Tuple[str, str, str]]:
-    examples: List[Tuple[str, str, str]] = []
-    for ex_id in sorted(baseline, key=lambda x: int(x)):
-        ex_entry = baseline[ex_id]
-        for lang in sorted(ex_entry.get("query", {})):
-            query = ex_entry["query"][lang]
-            examples.append((ex_id, lang, query))
-    return examples
+def _stage_settings(entry: Dict[str, Any]) -> Tuple[str, str, str, str]:
+    return (
+        str(entry.get("Stage1Provider") or entry.get("Provider") or ""),
+        str(entry.get("Stage1Model") or entry.get("Model") or ""),
+        str(entry.get("Stage2Provider") or entry.get("Provider") or ""),
+        str(entry.get("Stage2Model") or entry.get("Model") or ""),
+    )
 
 
-def run_qc(entry: Dict[str, Any], models: List[Dict[str, Any]], status: QCStatus) -> None:
-    s1_provider: str = str(entry.get("Stage1Provider") or entry.get("Provider") or "")
-    s1_model: str = str(entry.get("Stage1Model") or entry.get("Model") or "")
-    s2_provider: str = str(entry.get("Stage2Provider") or entry.get("Provider") or "")
-    s2_model: str = str(entry.get("Stage2Model") or entry.get("Model") or "")
-    srv = load_server(s1_provider, s1_model, s2_provider, s2_model)
-    app = srv.app
+def model_label(entry: Dict[str, Any]) -> str:
+    s1_provider, s1_model, s2_provider, s2_model = _stage_settings(entry)
+    label = f"{s1_provider}/{s1_model}"
+    if (s2_provider, s2_model) != (s1_provider, s1_model):
+        label += f" + {s2_provider}/{s2_model}"
+    return label
 
-    with BASELINE_PATH.open("r", encoding="utf-8") as f:
-        baseline_data = json.load(f)
 
-    examples = _build_examples(baseline_data)
-    total_examples = len(examples)
+def model_slug(entry: Dict[str, Any]) -> str:
+    return re.sub(r"[^A-Za-z0-9_.-]+", "_", model_label(entry).replace(" + ", "__")).strip("_")
+
+
+def select_models(models: List[Dict[str, Any]], only: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+    """Modelle gemäss ``--only`` (Bezeichnung oder Dateiname); ohne Angabe alle."""
+    return [m for m in models if not only or model_label(m) in only or model_slug(m) in only]
 
-    # Immer frischen Lauf starten: Vorhandene Resultate überschreiben
-    progress_index = 0
-    passed = 0
-    input_tokens = 0
-    output_tokens = 0
-    remarks: List[Dict[str, Any]] = []
-    runtime_seconds = 0.0
 
-    # Direkt persistieren, damit ein Neustart saubere Werte zeigt
+def _build_examples(baseline: Dict[str, Any]) -> List[Tuple[str, str]]:
+    examples: List[Tuple[str, str]] = []
+    for ex_id in sorted((k for k in baseline if not k.startswith("_")), key=lambda x: int(x)):
+        for lang in sorted(baseline[ex_id].get("query", {})):
+            examples.append((ex_id, lang))
+    return examples
+
+
+def read_records(path: Path) -> List[Dict[str, Any]]:
+    """Bisherige Ergebnisse eines Modells (JSONL, ein Fall pro Zeile); defekte Zeilen zählen nicht."""
+    records: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    if not path.is_file():
+        return []
+    for line in path.read_text(encoding="utf-8").splitlines():
+        try:
+            record = json_backend.loads(line)
+        except ValueError:
+            continue  # z.B. abgebrochener Schreibvorgang
+        if isinstance(record, dict) and "id" in record and "lang" in record:
+            records[(str(record["id"]), str(record["lang"]))] = record
+    return list(records.values())
+
+
+def _run_model_worker(
+    entry: Dict[str, Any],
+    examples: List[Tuple[str, str]],
+    records_path: str,
+    progress: Any = None,
+) -> Dict[str, Any]:
+    """Läuft in einem eigenen Prozess: Server mit der Stufenkonfiguration des Modells laden und Fälle ausführen.
+
+    Bereits in ``records_path`` vorhandene Fälle werden übersprungen (Fortsetzen).
+    Aufgezeichnete Cassette-Einträge gehen an den Hauptprozess zurück, damit
+    nur dieser die Cassette-Datei schreibt.
+    """
+    srv = load_server(*_stage_settings(entry))
+    path = Path(records_path)
+    done = {(r["id"], r["lang"]) for r in read_records(path)}
+    slug = model_slug(entry)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    truncated = path.is_file() and path.stat().st_size > 0 and not path.read_bytes().endswith(b"\n")
+    with srv.app.test_client() as client, path.open("a", encoding="utf-8") as out:
+        if truncated:
+            out.write("\n")  # abgebrochene letzte Zeile abschliessen
+        for ex_id, lang in examples:
+            if (ex_id, lang) in done:
+                continue
+            with llm_cassette.scope(f"{ex_id}/{lang}"):
+                record = quality_runner.run_example(client, ex_id, lang)
+            out.write(json_backend.dumps(record) + "\n")
+            out.flush()
+            if progress is not None:
+                progress.put((slug, ex_id, lang, bool(record.get("passed"))))
+    cassette = llm_cassette.active()
+    return {
+        "recorded": cassette.take_recorded() if llm_cassette.recording() and cassette is not None else [],
+        "cassette": {k: v for k, v in llm_cassette.report().items() if k not in ("drift", "missing")},
+    }
+
+
+# Nur für vollständige Läufe aussagekräftig; bei Abbruch entfernt statt mit alten Werten gemischt.
+_COMPLETE_RUN_FIELDS = ("Prozent_Korrekt", "InputToken_CHF", "OutputToken_CHF", "Zeit_Stunden")
+
+
+def is_complete(entry: Dict[str, Any]) -> bool:
+    """Wahr, wenn der letzte Lauf des Modells alle Beispiele ausgewertet hat."""
+    total = int(entry.get("Total_Tests") or 0)
+    return total > 0 and int(entry.get("Progress_Index") or 0) >= total and "Prozent_Korrekt" in entry
+
+
+def summarize_model(entry: Dict[str, Any], records: List[Dict[str, Any]], total_examples: int) -> None:
+    """Schreibt Genauigkeit, Tokens, Kosten und Latenz aus den Einzelergebnissen in den Modelleintrag.
+
+    Bei unvollständigem Lauf fehlen Genauigkeit und Kosten (``is_complete`` ist falsch).
+    """
+    passed = sum(1 for r in records if r.get("passed"))
+    input_tokens = sum(c.get("input_tokens", 0) for r in records for c in (r.get("tokens") or {}).values())
+    output_tokens = sum(c.get("output_tokens", 0) for r in records for c in (r.get("tokens") or {}).values())
+    durations = [float(r.get("duration_ms") or 0.0) for r in records]
+    runtime_seconds = sum(durations) / 1000.0
     entry.update(
         {
             "Total_Tests": total_examples,
-            "Progress_Index": progress_index,
+            "Progress_Index": len(records),
             "Passed": passed,
             "InputTokens": input_tokens,
             "OutputTokens": output_tokens,
-            "Bemerkungen": remarks,
+            "Bemerkungen": [
+                {"id": r["id"], "lang": r["lang"], "error": r.get("error") or r.get("diff", "")}
+                for r in records
+                if not r.get("passed")
+            ],
             "Runtime_Seconds": runtime_seconds,
+            "Latency_p50_Seconds": round(percentile(durations, 50) / 1000.0, 3) if durations else 0.0,
+            "Latency_p95_Seconds": round(percentile(durations, 95) / 1000.0, 3) if durations else 0.0,
         }
     )
-    # Zusammenfassungen werden am Ende neu berechnet; hier optional auf 0 setzen
-    entry["Prozent_Korrekt"] = 0.0
-    entry["InputToken_CHF"] = 0.0
-    entry["OutputToken_CHF"] = 0.0
-    entry["Zeit_Stunden"] = 0.0
-    save_models(models)
+    if len(records) >= total_examples:
+        entry["Prozent_Korrekt"] = round((passed / total_examples * 100) if total_examples else 0.0, 2)
+        entry["InputToken_CHF"] = round(float(entry.get("Price_Input_CHF") or 0.0) * (input_tokens / 1_000_000), 6)
+        entry["OutputToken_CHF"] = round(float(entry.get("Price_Output_CHF") or 0.0) * (output_tokens / 1_000_000), 6)
+        entry["Zeit_Stunden"] = round(runtime_seconds / 3600, 4)
+    else:
+        for key in _COMPLETE_RUN_FIELDS:
+            entry.pop(key, None)
 
-    status.set_model(f"S1:{s1_provider}/{s1_model} | S2:{s2_provider}/{s2_model}")
-    start_time = time.time()
 
-    # Token-Erfassung aus Logdatei, falls vorhanden
-    try:
-        log_file = LOG_PATH.open("r", encoding="utf-8")
-        log_file.seek(0, os.SEEK_END)
-    except OSError:
-        log_file = None
-
-    with app.test_client() as client:
-        for idx in range(progress_index, total_examples):
-            ex_id, lang, query = examples[idx]
-
-            resp = client.post("/api/test-example", json={"id": int(ex_id), "lang": lang})
-            if resp.status_code != 200:
-                remarks.append({"id": ex_id, "lang": lang, "error": f"HTTP {resp.status_code}"})
-            else:
-                data = resp.get_json() or {}
-
-                # Tokenzählung: bevorzugt vom Server gemeldete token_usage; sonst Logdatei; sonst Heuristik
-                counted = False
-                tu = data.get("token_usage") or {}
-                try:
-                    if isinstance(tu, dict):
-                        in_sum = 0
-                        out_sum = 0
-                        for stage in (tu.get("llm_stage1"), tu.get("llm_stage2")):
-                            if isinstance(stage, dict):
-                                in_sum += int(stage.get("input_tokens") or 0)
-                                out_sum += int(stage.get("output_tokens") or 0)
-                        if (in_sum + out_sum) > 0:
-                            input_tokens += in_sum
-                            output_tokens += out_sum
-                            counted = True
-                except Exception:
-                    counted = False
-
-                if not counted and log_file is not None:
-                    new_in, new_out = _read_new_tokens(log_file)
-                    input_tokens += new_in
-                    output_tokens += new_out
-                    counted = True
-
-                if not counted:
-                    # Fallback: einfache Schätzung über Query- und Result-Text
-                    input_tokens += count_tokens(query)
-                    result_text = json.dumps(data.get("result", {}), ensure_ascii=False)
-                    output_tokens += count_tokens(result_text)
-
-                if data.get("passed"):
-                    passed += 1
-                else:
-                    diff = data.get("diff", "")
-                    remarks.append({"id": ex_id, "lang": lang, "error": diff})
-
-            progress_index = idx + 1
-            runtime_seconds += time.time() - start_time
-            start_time = time.time()
-            entry.update(
-                {
-                    "Progress_Index": progress_index,
-                    "Passed": passed,
-                    "InputTokens": input_tokens,
-                    "OutputTokens": output_tokens,
-                    "Bemerkungen": remarks,
-                    "Runtime_Seconds": runtime_seconds,
-                }
-            )
-            save_models(models)
-            status.update(progress_index, total_examples)
+def _cost(entry: Dict[str, Any]) -> float:
+    return float(entry.get("InputToken_CHF") or 0.0) + float(entry.get("OutputToken_CHF") or 0.0)
 
-    if log_file is not None:
-        log_file.close()
 
-    if progress_index >= total_examples:
-        entry["Prozent_Korrekt"] = round((passed / total_examples * 100) if total_examples else 0.0, 2)
-        entry["InputToken_CHF"] = round(entry["Price_Input_CHF"] * (input_tokens / 1_000_000), 6)
-        entry["OutputToken_CHF"] = round(entry["Price_Output_CHF"] * (output_tokens / 1_000_000), 6)
-        entry["Zeit_Stunden"] = round(runtime_seconds / 3600, 4)
-        save_models(models)
+def pareto_front(models: List[Dict[str, Any]]) -> List[bool]:
+    """Markiert Modelle, die von keinem anderen in Genauigkeit, Kosten und Latenz (p50) übertroffen werden.
+
+    Nur vollständige Läufe nehmen teil; fehlt die Latenz (ältere Einträge), zählt sie als schlechteste.
+    """
+    points = [
+        (
+            float(m.get("Prozent_Korrekt") or 0.0),
+            _cost(m),
+            float(m["Latency_p50_Seconds"]) if m.get("Latency_p50_Seconds") is not None else float("inf"),
+        )
+        if is_complete(m)
+        else None
+        for m in models
+    ]
+    complete = [point for point in points if point is not None]
+
+    def dominates(a: Tuple[float, float, float], b: Tuple[float, float, float]) -> bool:
+        return a[0] >= b[0] and a[1] <= b[1] and a[2] <= b[2] and a != b
+
+    return [point is not None and not any(dominates(other, point) for other in complete) for point in points]
 
 
-def main() -> None:
+def format_pareto_table(models: List[Dict[str, Any]]) -> str:
+    front = pareto_front(models)
+    rows = sorted(
+        zip(models, front),
+        key=lambda item: (not is_complete(item[0]), -float(item[0].get("Prozent_Korrekt") or 0.0), _cost(item[0])),
+    )
+    lines = [f"{'Modell':<44}{'Korrekt':>9}{'CHF':>11}{'p50 s':>8}{'p95 s':>8}  Pareto"]
+    for model, on_front in rows:
+        if not is_complete(model):
+            progress = f"{int(model.get('Progress_Index') or 0)}/{int(model.get('Total_Tests') or 0)}"
+            lines.append(f"{model_label(model):<44}  unvollständig ({progress}), mit --resume fortsetzen")
+            continue
+        lines.append(
+            f"{model_label(model):<44}{float(model.get('Prozent_Korrekt') or 0.0):>8.2f}%{_cost(model):>11.6f}"
+            f"{float(model.get('Latency_p50_Seconds') or 0.0):>8.2f}{float(model.get('Latency_p95_Seconds') or 0.0):>8.2f}"
+            f"  {'*' if on_front else ''}"
+        )
+    return "\n".join(lines)
+
+
+def run_comparison(
+    models: List[Dict[str, Any]],
+    status: "QCStatus",
+    *,
+    only: Optional[Sequence[str]] = None,
+    workers: int = 1,
+    resume: bool = False,
+    results_dir: Path = RESULTS_DIR,
+) -> List[Dict[str, Any]]:
+    """Führt die Modelle gemäss ``only`` in getrennten Prozessen aus (höchstens ``workers`` gleichzeitig).
+
+    ``models`` ist die ganze Matrix: ausgewählte Einträge werden darin aktualisiert
+    und immer die vollständige Liste gespeichert. Liefert die ausgeführten Modelle.
+    """
+    all_models = models
+    models = select_models(all_models, only)
+    with BASELINE_PATH.open("r", encoding="utf-8") as f:
+        baseline_data = json.load(f)
+    examples = _build_examples(baseline_data)
+    total_examples = len(examples)
+    paths = {id(entry): results_dir / f"{model_slug(entry)}.jsonl" for entry in models}
+    if not resume:
+        for path in paths.values():
+            path.unlink(missing_ok=True)
+
+    finished = {model_slug(entry): len(read_records(paths[id(entry)])) for entry in models}
+    status.set_model(f"{len(models)} Modelle, {max(1, workers)} parallel")
+    status.update(sum(finished.values()), total_examples * len(models))
+
+    # "spawn": jeder Worker importiert den Server frisch mit eigener Anbieterkonfiguration
+    context = multiprocessing.get_context("spawn")
+    with context.Manager() as manager, ProcessPoolExecutor(
+        max_workers=max(1, workers), mp_context=context, max_tasks_per_child=1
+    ) as pool:
+        progress = manager.Queue()
+        futures = {
+            pool.submit(_run_model_worker, entry, examples, str(paths[id(entry)]), progress): entry
+            for entry in models
+        }
+        pending = set(futures)
+        while pending:
+            try:
+                slug, _ex_id, _lang, _passed = progress.get(timeout=0.5)
+                finished[slug] = finished.get(slug, 0) + 1
+                status.update(sum(finished.values()), total_examples * len(models))
+            except queue.Empty:
+                pass
+            for future in [f for f in pending if f.done()]:
+                pending.discard(future)
+                entry = futures[future]
+                try:
+                    outcome = future.result()
+                except Exception as exc:
+                    print(f"{model_label(entry)}: Abbruch ({exc}); mit --resume fortsetzen.", file=sys.stderr)
+                    outcome = {"recorded": [], "cassette": {}}
+                cassette = llm_cassette.active()
+                if cassette is not None and outcome["recorded"]:
+                    cassette.merge(outcome["recorded"])
+                if outcome["cassette"].get("mode", llm_cassette.MODE_OFF) != llm_cassette.MODE_OFF:
+                    entry["Cassette"] = {k: outcome["cassette"].get(k, 0) for k in ("hits", "drifts", "misses", "recorded")}
+                records = read_records(paths[id(entry)])
+                summarize_model(entry, records, total_examples)
+                report = quality_runner.build_report(
+                    records, float(entry.get("Runtime_Seconds") or 0.0), llm={"model": model_label(entry)}
+                )
+                quality_runner.save_report(paths[id(entry)].with_suffix(".report.json"), report)
+                save_models(all_models)
+
+    front = pareto_front(all_models)
+    for entry, on_front in zip(all_models, front):
+        entry["Pareto"] = on_front
+    save_models(all_models)
+    llm_cassette.flush()
+    return models
+
+
+def main(argv: List[str] | None = None) -> None:
+    config = load_merged_config()
+    section = "LLM_VERGLEICH"
+    parser = argparse.ArgumentParser(description="LLM-Anbieter und Modelle gegen die Baseline vergleichen.")
+    llm_cassette.add_arguments(parser)
+    parser.add_argument("--workers", type=int, default=config.getint(section, "workers", fallback=3),
+                        help="Modelle, die gleichzeitig (je in eigenem Prozess) laufen.")
+    parser.add_argument("--resume", action="store_true", help="Abgebrochenen Lauf fortsetzen statt neu zu beginnen.")
+    parser.add_argument("--only", action="append", metavar="PROVIDER/MODELL", help="Nur diese Modelle (mehrfach angebbar).")
+    parser.add_argument("--no-gui", action="store_true", help="Keine Tkinter-Statusanzeige.")
+    args = parser.parse_args(argv)
+    llm_cassette.apply_arguments(args)
     models = load_models()
-    status = QCStatus()
+    status = QCStatus(gui=not args.no_gui)
     try:
-        for entry in models:
-            run_qc(entry, models, status)
+        selected = run_comparison(
+            models,
+            status,
+            only=args.only,
+            workers=args.workers,
+            resume=args.resume,
+            results_dir=Path(config.get(section, "results_dir", fallback=str(RESULTS_DIR))),
+        )
+        cassette_summary = llm_cassette.format_report(llm_cassette.report())
+        if cassette_summary:
+            print(cassette_summary)
+        print(format_pareto_table(models))
         # Nach Abschluss: Zusammenfassung anzeigen und auf Ende warten
-        status.show_summary(models)
+        if not args.no_gui:
+            status.show_summary(selected)
     finally:
         try:
             status.close()
@@ -0,0 +1,36 @@
+"""Lastgenerator mit realistischem Anfragemix gegen einen laufenden Server.
+
+Aufruf aus dem Projektverzeichnis: ``python -m loadtest`` (Optionen siehe
+``--help``, Laststufen und Mix in ``[LOADTEST]`` der ``config.ini``).
+"""
+
+# Package exports should be side-effect free.
+
+from .runner import (
+    Stage,
+    build_report,
+    find_saturation,
+    parse_prometheus,
+    parse_stages,
+    run_stage,
+    server_delta,
+    summarize_stage,
+)
+from .traffic import DEFAULT_MIX, KINDS, RequestSpec, TrafficProfile, parse_mix, vary_query
+
+__all__ = [
+    "DEFAULT_MIX",
+    "KINDS",
+    "RequestSpec",
+    "Stage",
+    "TrafficProfile",
+    "build_report",
+    "find_saturation",
+    "parse_mix",
+    "parse_prometheus",
+    "parse_stages",
+    "run_stage",
+    "server_delta",
+    "summarize_stage",
+    "vary_query",
+]
@@ -0,0 +1,208 @@
+"""Kommandozeile des Lastgenerators.
+
+    python -m loadtest                                   # Stufen und Mix aus [LOADTEST]
+    python -m loadtest --rate 5 --duration 60 --mix analyze:1,icd:3,static:2
+    python -m loadtest --start-server --mock-llm --llm-min-interval 0 --stages 1:30,4:30,16:30
+
+Mit ``--start-server`` wird der Server als eigener Prozess gestartet
+(``[LOADTEST] server_command``, z.B. gunicorn mit ``--workers``/``--threads``),
+mit ``--mock-llm`` zusätzlich der Mock-LLM, auf den der Server zeigt. So lässt
+sich pro Konfiguration messen, wo die Sättigung liegt.
+"""
+
+from __future__ import annotations
+
+import argparse
+import dataclasses
+import os
+import shlex
+import socket
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+if __package__ in {None, ""}:
+    sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+    __package__ = "loadtest"
+
+import requests
+
+import json_backend
+from runtime_config import load_merged_config
+
+from .runner import (
+    Stage,
+    build_report,
+    find_saturation,
+    format_kinds,
+    format_stage_table,
+    parse_stages,
+    run_stage,
+    save_report,
+    scrape_metrics,
+    server_delta,
+    summarize_stage,
+)
+from .traffic import DEFAULT_MIX, TrafficProfile, parse_mix
+
+ROOT = Path(__file__).resolve().parents[1]
+DEFAULT_SERVER_COMMAND = "{python} -c \"import server; server.app.run(host='127.0.0.1', port={port}, threaded=True)\""
+SERVER_START_TIMEOUT = 300.0
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@contextmanager
+def _managed_server(command: str, env: Dict[str, str], log_path: Path) -> Iterator[str]:
+    """Startet den Server als Unterprozess und wartet, bis ``/api/version`` antwortet."""
+    port = _free_port()
+    argv = shlex.split(command.format(python=shlex.quote(sys.executable), port=port))
+    base_url = f"http://127.0.0.1:{port}"
+    log_path.parent.mkdir(parents=True, exist_ok=True)
+    with log_path.open("w", encoding="utf-8") as log:
+        proc = subprocess.Popen(argv, env=env, stdout=log, stderr=subprocess.STDOUT)
+        try:
+            deadline = time.monotonic() + SERVER_START_TIMEOUT
+            while True:
+                if proc.poll() is not None:
+                    raise RuntimeError(f"Server beendet mit Code {proc.returncode}, siehe {log_path}")
+                try:
+                    if requests.get(f"{base_url}/api/version", timeout=2).status_code == 200:
+                        break
+                except requests.RequestException:
+                    pass
+                if time.monotonic() > deadline:
+                    raise RuntimeError(f"Server nicht innerhalb von {SERVER_START_TIMEOUT:.0f} s bereit, siehe {log_path}")
+                time.sleep(0.5)
+            yield base_url
+        finally:
+            proc.terminate()
+            try:
+                proc.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+
+
+def _run(args: argparse.Namespace, base_url: str, stages: List[Stage], profile: TrafficProfile,
+         saturation_limits: Dict[str, float]) -> Dict:
+    session = requests.Session()
+    if args.warmup > 0:
+        print(f"Aufwärmen: {args.warmup:.0f} s bei {stages[0].rate} req/s", file=sys.stderr)
+        run_stage(base_url, profile, Stage(stages[0].rate, args.warmup),
+                  concurrency=args.concurrency, timeout=args.timeout, seed=args.seed - 1)
+
+    summaries = []
+    for index, stage in enumerate(stages):
+        print(f"Stufe {index + 1}/{len(stages)}: {stage.rate} req/s für {stage.duration:.0f} s", file=sys.stderr)
+        before = scrape_metrics(session, base_url)
+        samples, wall, max_inflight = run_stage(
+            base_url, profile, stage, concurrency=args.concurrency, timeout=args.timeout, seed=args.seed + index,
+        )
+        after = scrape_metrics(session, base_url)
+        summary = summarize_stage(stage, samples, wall, max_inflight=max_inflight, server=server_delta(before, after))
+        summaries.append(summary)
+        if not args.json:
+            print(format_kinds(summary), file=sys.stderr)
+    return {"stages": summaries, "saturation": find_saturation(summaries, **saturation_limits)}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    config = load_merged_config()
+    section = "LOADTEST"
+    parser = argparse.ArgumentParser(prog="python -m loadtest", description="Lasttest mit realistischem Anfragemix.")
+    parser.add_argument("--base-url", default=config.get(section, "base_url", fallback="http://127.0.0.1:8000"))
+    parser.add_argument("--stages", default=config.get(section, "stages", fallback="1:30,2:30,4:30,8:30"),
+                        help="Laststufen RATE:SEKUNDEN, kommagetrennt.")
+    parser.add_argument("--rate", type=float, help="Eine einzelne Stufe mit dieser Rate (statt --stages).")
+    parser.add_argument("--duration", type=float, default=60.0, help="Dauer der Stufe bei --rate (Sekunden).")
+    parser.add_argument("--mix", default=config.get(section, "mix", fallback=""),
+                        help="Gewichte je Art: analyze, icd, chop, conditions, static.")
+    parser.add_argument("--concurrency", type=int, default=config.getint(section, "concurrency", fallback=64))
+    parser.add_argument("--variation", type=float, default=config.getfloat(section, "variation", fallback=0.5))
+    parser.add_argument("--lang", default="", help="Sprachen der Analyse-Anfragen, z.B. de,fr (Standard: alle).")
+    parser.add_argument("--timeout", type=float, default=config.getfloat(section, "timeout", fallback=120.0))
+    parser.add_argument("--warmup", type=float, default=config.getfloat(section, "warmup_seconds", fallback=0.0),
+                        help="Sekunden Last vor der ersten Stufe, nicht ausgewertet.")
+    parser.add_argument("--seed", type=int, default=config.getint(section, "seed", fallback=42))
+    parser.add_argument("--start-server", action="store_true", help="Server als Unterprozess starten.")
+    parser.add_argument("--server-command", default=config.get(section, "server_command", fallback=DEFAULT_SERVER_COMMAND))
+    parser.add_argument("--mock-llm", action="store_true", help="Mock-LLM starten und den Server darauf zeigen lassen.")
+    parser.add_argument("--llm-min-interval", type=int, default=None,
+                        help="LLM-Drossel des gestarteten Servers (Sekunden, überschreibt [LLM]).")
+    parser.add_argument("--report", type=Path, help="Pfad des JSON-Berichts.")
+    parser.add_argument("--no-report", action="store_true", help="Keinen Bericht speichern.")
+    parser.add_argument("--json", action="store_true", help="Bericht als JSON ausgeben.")
+    args = parser.parse_args(argv)
+
+    try:
+        stages = [Stage(args.rate, args.duration)] if args.rate else parse_stages(args.stages)
+        mix = parse_mix(args.mix) if args.mix else dict(DEFAULT_MIX)
+    except ValueError as exc:
+        parser.error(str(exc))
+    if (args.mock_llm or args.llm_min_interval is not None) and not args.start_server:
+        parser.error("--mock-llm und --llm-min-interval wirken nur zusammen mit --start-server")
+    langs = [lang.strip() for lang in args.lang.split(",") if lang.strip()] or None
+    profile = TrafficProfile.from_data(langs=langs, mix=mix, variation=args.variation)
+    saturation_limits = {
+        "min_throughput_ratio": config.getfloat(section, "min_throughput_ratio", fallback=0.9),
+        "max_error_rate": config.getfloat(section, "max_error_rate", fallback=0.01),
+        "p95_factor": config.getfloat(section, "p95_factor", fallback=3.0),
+    }
+    report_dir = ROOT / config.get(section, "report_dir", fallback="logs/loadtest")
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+
+    mock = None
+    meta: Dict = {"mix": mix, "concurrency": args.concurrency, "variation": args.variation, "seed": args.seed}
+    try:
+        if args.start_server:
+            env = dict(os.environ)
+            if args.mock_llm:
+                from mock_llm import MockSettings, start_in_thread
+
+                mock = start_in_thread(dataclasses.replace(MockSettings.from_config(config), port=0))
+                env.update(
+                    GEMINI_BASE_URL=f"{mock.base_url}/v1beta",
+                    OPENAI_BASE_URL=f"{mock.base_url}/v1",
+                    GEMINI_API_KEY="mock",
+                    OPENAI_API_KEY="mock",
+                )
+            if args.llm_min_interval is not None:
+                env["LLM_MIN_CALL_INTERVAL_SECONDS"] = str(args.llm_min_interval)
+            meta.update(server_command=args.server_command, mock_llm=bool(mock), llm_min_interval=args.llm_min_interval)
+            print("Starte Server ...", file=sys.stderr)
+            with _managed_server(args.server_command, env, report_dir / f"server-{stamp}.log") as base_url:
+                result = _run(args, base_url, stages, profile, saturation_limits)
+        else:
+            result = _run(args, args.base_url.rstrip("/"), stages, profile, saturation_limits)
+            meta["base_url"] = args.base_url
+        if mock is not None:
+            meta["mock_llm_stats"] = mock.state.snapshot()
+    except RuntimeError as exc:
+        print(f"Fehler: {exc}", file=sys.stderr)
+        return 1
+    finally:
+        if mock is not None:
+            mock.shutdown()
+            mock.server_close()
+
+    report = build_report(result["stages"], result["saturation"], **meta)
+    if args.json:
+        print(json_backend.dumps(report, indent=True))
+    else:
+        print(format_stage_table(report["stages"], report["saturation"]))
+    if not args.no_report:
+        path = args.report or report_dir / f"loadtest-{stamp}.json"
+        save_report(path, report)
+        print(f"Bericht: {path}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
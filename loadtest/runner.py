@@ -0,0 +1,416 @@
+"""Offene Lastschleife gegen einen laufenden Server und Auswertung je Laststufe.
+
+Ankünfte folgen einem Poisson-Prozess mit der Rate der Stufe (offene Last:
+neue Anfragen kommen unabhängig davon, ob frühere schon beantwortet sind).
+Ein Threadpool mit ``concurrency`` Verbindungen schickt sie ab; ist er voll,
+warten die Anfragen. Die Latenz zählt deshalb ab dem geplanten Zeitpunkt und
+enthält die Wartezeit (keine "coordinated omission"), die reine Antwortzeit
+steht zusätzlich unter ``service_ms``.
+
+Vor und nach jeder Stufe wird ``/metrics`` gelesen; die Differenzen zeigen
+Anfragen und mittlere Dauer je Route, mittlere Abschnittsdauern
+(``arzttarif_stage_duration_seconds``), LLM-Aufrufe und die Wartezeit der
+LLM-Drossel. ``find_saturation`` markiert die erste Stufe, ab der Durchsatz,
+Fehlerquote oder p95 kippen.
+
+render_tokens gelten nur im Prozess, der sie ausgegeben hat. Mit mehreren
+gunicorn-Workern landet das Nachladen des Bedingungs-HTML oft bei einem
+anderen Worker und erhält 410; das zählt als ``expired``, nicht als Fehler.
+"""
+
+from __future__ import annotations
+
+import math
+import random
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence, Tuple
+
+import requests
+
+import json_backend
+from perf_common import git_commit, percentile
+from quality_runner import parse_server_timing
+
+from .traffic import RequestSpec, TrafficProfile
+
+REPORT_VERSION = 1
+METRICS_PREFIX = "arzttarif_"
+MIN_KIND_SAMPLES = 5  # Mindestanzahl je Anfrageart für den p95-Vergleich
+
+_SAMPLE_RE = re.compile(r'^([A-Za-z_:][A-Za-z0-9_:]*)(?:\{(.*)\})?\s+(\S+)$')
+_LABEL_RE = re.compile(r'([A-Za-z_][A-Za-z0-9_]*)="((?:[^"\\]|\\.)*)"')
+
+Series = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+
+@dataclass(frozen=True)
+class Stage:
+    rate: float  # Anfragen pro Sekunde
+    duration: float  # Sekunden
+
+
+def parse_stages(value: str) -> List[Stage]:
+    """``"2:30,5:30,10:60"`` (Rate:Sekunden je Stufe) -> Stufenliste."""
+    stages = []
+    for item in (value or "").split(","):
+        rate, sep, duration = item.strip().partition(":")
+        if not rate:
+            continue
+        if not sep:
+            raise ValueError(f"Stufe {item.strip()!r}: erwartet RATE:SEKUNDEN")
+        stage = Stage(float(rate), float(duration))
+        if stage.rate <= 0 or stage.duration <= 0:
+            raise ValueError(f"Stufe {item.strip()!r}: Rate und Dauer müssen positiv sein")
+        stages.append(stage)
+    if not stages:
+        raise ValueError("keine Laststufen angegeben")
+    return stages
+
+
+def arrival_times(stage: Stage, rng: random.Random) -> List[float]:
+    """Poisson-Ankünfte (Sekunden ab Stufenbeginn)."""
+    times, t = [], rng.expovariate(stage.rate)
+    while t < stage.duration:
+        times.append(t)
+        t += rng.expovariate(stage.rate)
+    return times
+
+
+# --- Prometheus ---------------------------------------------------------------
+
+
+def parse_prometheus(text: str) -> Tuple[Dict[Series, float], Dict[str, str]]:
+    """Textformat 0.0.4 -> (Werte je Serie, Typ je Metrikname)."""
+    values: Dict[Series, float] = {}
+    types: Dict[str, str] = {}
+    for line in (text or "").splitlines():
+        line = line.strip()
+        if line.startswith("# TYPE "):
+            parts = line.split()
+            if len(parts) >= 4:
+                types[parts[2]] = parts[3]
+            continue
+        if not line or line.startswith("#"):
+            continue
+        match = _SAMPLE_RE.match(line)
+        if not match:
+            continue
+        labels = tuple(sorted(_LABEL_RE.findall(match.group(2) or "")))
+        try:
+            values[(match.group(1), labels)] = float(match.group(3))
+        except ValueError:
+            continue
+    return values, types
+
+
+def scrape_metrics(session: requests.Session, base_url: str, timeout: float = 10.0) -> Optional[str]:
+    try:
+        resp = session.get(f"{base_url}/metrics", timeout=timeout)
+    except requests.RequestException:
+        return None
+    return resp.text if resp.status_code == 200 else None
+
+
+def server_delta(before: Optional[str], after: Optional[str]) -> Dict[str, Any]:
+    """Serverseitige Kennzahlen einer Stufe aus zwei ``/metrics``-Abzügen."""
+    if after is None:
+        return {}
+    old, _ = parse_prometheus(before or "")
+    new, types = parse_prometheus(after)
+
+    def _delta(series: Series) -> float:
+        return new.get(series, 0.0) - old.get(series, 0.0)
+
+    def _by(name: str, label: str) -> Dict[str, float]:
+        out: Dict[str, float] = {}
+        for series in new:
+            if series[0] == METRICS_PREFIX + name:
+                key = dict(series[1]).get(label, "")
+                out[key] = out.get(key, 0.0) + _delta(series)
+        return out
+
+    def _mean_ms(name: str, label: str) -> Dict[str, float]:
+        sums, counts = _by(f"{name}_sum", label), _by(f"{name}_count", label)
+        return {key: round(sums[key] / counts[key] * 1000.0, 1) for key in sorted(counts) if counts[key] > 0}
+
+    llm: Dict[str, float] = {}
+    for series in new:
+        if series[0] == METRICS_PREFIX + "llm_requests_total":
+            labels = dict(series[1])
+            delta = _delta(series)
+            if delta:
+                key = f"{labels.get('provider', '')}/{labels.get('outcome', '')}"
+                llm[key] = llm.get(key, 0.0) + delta
+    gauges = {
+        f"{name[len(METRICS_PREFIX):]}{{{','.join(f'{k}={v}' for k, v in labels)}}}": value
+        for (name, labels), value in new.items()
+        if types.get(name) == "gauge"
+    }
+    throttle = _by("llm_throttle_wait_seconds_sum", "")
+    return {
+        "http_requests": {route: int(n) for route, n in sorted(_by("http_requests_total", "route").items()) if n},
+        "http_mean_ms": _mean_ms("http_request_duration_seconds", "route"),
+        "stage_mean_ms": _mean_ms("stage_duration_seconds", "stage"),
+        "llm_requests": {key: int(n) for key, n in sorted(llm.items())},
+        "llm_throttle_wait_seconds": round(sum(throttle.values()), 2),
+        "gauges": gauges,
+    }
+
+
+# --- Lauf ---------------------------------------------------------------------
+
+
+def send(session: requests.Session, base_url: str, spec: RequestSpec, timeout: float) -> Tuple[int, Mapping[str, str], Any, Optional[str]]:
+    """Schickt eine Anfrage; liefert (Status, Header, JSON oder None, Fehlertext)."""
+    try:
+        resp = session.request(spec.method, base_url + spec.path, params=spec.params, json=spec.json,
+                               headers=spec.headers or None, timeout=timeout)
+    except requests.RequestException as exc:
+        return 0, {}, None, type(exc).__name__
+    body = None
+    if spec.kind == "analyze" and "json" in resp.headers.get("Content-Type", ""):
+        try:
+            body = resp.json()
+        except ValueError:
+            body = None
+    error = None if resp.status_code < 400 else f"HTTP {resp.status_code}"
+    return resp.status_code, resp.headers, body, error
+
+
+def run_stage(
+    base_url: str,
+    profile: TrafficProfile,
+    stage: Stage,
+    *,
+    concurrency: int = 32,
+    timeout: float = 120.0,
+    seed: int = 42,
+    progress: Optional[Callable[[int, int], None]] = None,
+) -> Tuple[List[Dict[str, Any]], float, int]:
+    """Führt eine Laststufe aus.
+
+    Liefert die Einzelmessungen, die Dauer bis zur letzten Antwort (s) und die
+    höchste Zahl gleichzeitig offener Anfragen.
+    """
+    rng = random.Random(seed)
+    # Anfragen erst beim Abschicken erzeugen, damit Bedingungs-HTML auf frische render_tokens zugreift
+    schedule = arrival_times(stage, rng)
+    local = threading.local()
+    lock = threading.Lock()
+    state = {"inflight": 0, "max_inflight": 0, "done": 0}
+    samples: List[Dict[str, Any]] = []
+
+    def _one(scheduled: float, spec: RequestSpec) -> None:
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+        with lock:
+            state["inflight"] += 1
+            state["max_inflight"] = max(state["max_inflight"], state["inflight"])
+        started = time.perf_counter()
+        status, headers, body, error = send(session, base_url, spec, timeout)
+        finished = time.perf_counter()
+        profile.observe(spec, status, headers, body)
+        expired = status == 410 and "render_token" in (spec.params or {})
+        sample = {
+            "kind": spec.kind,
+            "status": status,
+            "error": None if expired else error,
+            "expired": expired,
+            "latency_ms": (finished - scheduled) * 1000.0,
+            "service_ms": (finished - started) * 1000.0,
+            "server_ms": parse_server_timing(headers.get("Server-Timing")),
+        }
+        with lock:
+            state["inflight"] -= 1
+            state["done"] += 1
+            samples.append(sample)
+            done = state["done"]
+        if progress is not None:
+            progress(done, len(schedule))
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="loadtest") as pool:
+        for offset in schedule:
+            delay = started + offset - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(_one, started + offset, profile.next_request(rng))
+        # offene Last: die Stufe dauert mindestens ihre Sollzeit, auch ohne späte Ankünfte
+        remaining = started + stage.duration - time.perf_counter()
+        if remaining > 0:
+            time.sleep(remaining)
+    return samples, time.perf_counter() - started, state["max_inflight"]
+
+
+def _distribution(values: Sequence[float]) -> Dict[str, float]:
+    if not values:
+        return {}
+    return {
+        "mean": round(sum(values) / len(values), 1),
+        "p50": round(percentile(values, 50), 1),
+        "p90": round(percentile(values, 90), 1),
+        "p95": round(percentile(values, 95), 1),
+        "p99": round(percentile(values, 99), 1),
+        "max": round(max(values), 1),
+    }
+
+
+def summarize_stage(stage: Stage, samples: Sequence[Dict[str, Any]], wall: float, *,
+                    max_inflight: int = 0, server: Optional[Mapping[str, Any]] = None) -> Dict[str, Any]:
+    completed = len(samples)
+    errors = sum(1 for s in samples if s["error"])
+    expired = sum(1 for s in samples if s.get("expired"))
+    latencies = [s["latency_ms"] for s in samples]
+    status: Dict[str, int] = {}
+    for sample in samples:
+        key = str(sample["status"] or sample["error"])
+        status[key] = status.get(key, 0) + 1
+    per_kind: Dict[str, Any] = {}
+    for kind in sorted({s["kind"] for s in samples}):
+        subset = [s for s in samples if s["kind"] == kind]
+        stages = sorted({name for s in subset for name in s["server_ms"]})
+        per_kind[kind] = {
+            "count": len(subset),
+            "errors": sum(1 for s in subset if s["error"]),
+            "expired": sum(1 for s in subset if s.get("expired")),
+            "latency_ms": _distribution([s["latency_ms"] for s in subset]),
+            "server_timing_ms": {
+                name: _distribution([s["server_ms"][name] for s in subset if name in s["server_ms"]])["mean"]
+                for name in stages
+            },
+        }
+    throughput = completed / wall if wall > 0 else 0.0
+    mean_latency_s = (sum(latencies) / completed / 1000.0) if completed else 0.0
+    return {
+        "offered_rps": stage.rate,
+        "duration_s": stage.duration,
+        # tatsächlich angekommene Rate (Poisson streut um offered_rps)
+        "arrival_rps": round(completed / stage.duration, 2),
+        "completed": completed,
+        "wall_seconds": round(wall, 2),
+        "throughput_rps": round(throughput, 2),
+        "errors": errors,
+        "error_rate": round(errors / completed, 4) if completed else 0.0,
+        # 410 auf render_token: Token stammt von einem anderen Worker (keine Sitzungsbindung)
+        "expired": expired,
+        "status": dict(sorted(status.items())),
+        "latency_ms": _distribution(latencies),
+        "service_ms": _distribution([s["service_ms"] for s in samples]),
+        # Little: mittlere Anzahl gleichzeitig offener Anfragen = Durchsatz × mittlere Latenz
+        "concurrency_mean": round(throughput * mean_latency_s, 2),
+        "concurrency_max": max_inflight,
+        "per_kind": per_kind,
+        "server": dict(server or {}),
+    }
+
+
+def _kind_p95(stage: Mapping[str, Any]) -> Dict[str, float]:
+    """p95 je Anfrageart, nur Arten mit genügend Messungen (der Mix streut je Stufe)."""
+    return {
+        kind: values["latency_ms"]["p95"]
+        for kind, values in (stage.get("per_kind") or {}).items()
+        if values.get("count", 0) >= MIN_KIND_SAMPLES and values.get("latency_ms")
+    }
+
+
+def find_saturation(
+    stages: Sequence[Mapping[str, Any]],
+    *,
+    min_throughput_ratio: float = 0.9,
+    max_error_rate: float = 0.01,
+    p95_factor: float = 3.0,
+) -> Dict[str, Any]:
+    """Erste Stufe, in der der Server nicht mehr mithält.
+
+    Kriterien: Durchsatz unter ``min_throughput_ratio`` der Ankunftsrate (der
+    Durchsatz zählt bis zur letzten Antwort; staut sich die Last, dauert die
+    Stufe länger), Fehlerquote über ``max_error_rate`` oder p95 einer
+    Anfrageart über ``p95_factor`` × ihrem ersten ausreichend belegten Wert.
+    ``capacity_rps`` ist der höchste Durchsatz davor, ``concurrency`` die dort
+    gemessene mittlere Parallelität (Richtwert für Worker × Threads).
+    """
+    base_p95: Dict[str, float] = {}
+    saturated_at: Optional[int] = None
+    reason = ""
+    for index, stage in enumerate(stages):
+        kind_p95 = _kind_p95(stage)
+        slower = sorted(kind for kind, p95 in kind_p95.items() if kind in base_p95 and p95 > base_p95[kind] * p95_factor)
+        if stage["throughput_rps"] < stage.get("arrival_rps", stage["offered_rps"]) * min_throughput_ratio:
+            saturated_at, reason = index, "Durchsatz"
+        elif stage["error_rate"] > max_error_rate:
+            saturated_at, reason = index, "Fehlerquote"
+        elif slower:
+            saturated_at, reason = index, f"p95 {', '.join(slower)}"
+        if saturated_at is not None:
+            break
+        for kind, p95 in kind_p95.items():
+            base_p95.setdefault(kind, p95)
+    healthy = stages[:saturated_at] if saturated_at is not None else stages
+    best = max(healthy, key=lambda s: s["throughput_rps"], default=None)
+    return {
+        "saturated_at_rps": stages[saturated_at]["offered_rps"] if saturated_at is not None else None,
+        "reason": reason or None,
+        "capacity_rps": best["throughput_rps"] if best else None,
+        "concurrency": math.ceil(best["concurrency_mean"]) if best else None,
+    }
+
+
+def build_report(stage_summaries: Sequence[Dict[str, Any]], saturation: Mapping[str, Any], **meta: Any) -> Dict[str, Any]:
+    return {
+        "version": REPORT_VERSION,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "git_commit": git_commit(),
+        **meta,
+        "stages": list(stage_summaries),
+        "saturation": dict(saturation),
+    }
+
+
+def save_report(path: Path, report: Mapping[str, Any]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json_backend.dumps(report, indent=True), encoding="utf-8")
+
+
+def format_stage_table(stage_summaries: Sequence[Mapping[str, Any]], saturation: Mapping[str, Any]) -> str:
+    lines = [f"{'Rate':>6}{'Ankunft':>9}{'Durchsatz':>11}{'Fehler':>8}{'p50':>9}{'p95':>9}{'p99':>9}{'Parallel':>10}   (req/s, ms)"]
+    for stage in stage_summaries:
+        latency = stage["latency_ms"] or {}
+        flag = "  <- Sättigung" if stage["offered_rps"] == saturation.get("saturated_at_rps") else ""
+        lines.append(
+            f"{stage['offered_rps']:>6.1f}{stage.get('arrival_rps', stage['offered_rps']):>9.2f}{stage['throughput_rps']:>11.2f}{stage['error_rate'] * 100:>7.1f}%"
+            f"{latency.get('p50', 0):>9.0f}{latency.get('p95', 0):>9.0f}{latency.get('p99', 0):>9.0f}"
+            f"{stage['concurrency_mean']:>10.1f}{flag}"
+        )
+    if saturation.get("saturated_at_rps") is None:
+        lines.append(f"Keine Sättigung erreicht; höchster Durchsatz {saturation.get('capacity_rps')} req/s.")
+    else:
+        lines.append(
+            f"Sättigung ab {saturation['saturated_at_rps']} req/s ({saturation['reason']}); "
+            f"Kapazität davor {saturation['capacity_rps']} req/s bei ~{saturation['concurrency']} gleichzeitigen Anfragen."
+        )
+    return "\n".join(lines)
+
+
+def format_kinds(stage: Mapping[str, Any]) -> str:
+    lines = [f"{'Art':<12}{'Anzahl':>8}{'Fehler':>8}{'p50':>9}{'p95':>9}{'p99':>9}"]
+    for kind, values in stage["per_kind"].items():
+        latency = values["latency_ms"]
+        lines.append(
+            f"{kind:<12}{values['count']:>8}{values['errors']:>8}"
+            f"{latency.get('p50', 0):>9.0f}{latency.get('p95', 0):>9.0f}{latency.get('p99', 0):>9.0f}"
+        )
+    if stage.get("expired"):
+        lines.append(f"render_token abgelaufen/anderer Worker (410, nicht als Fehler gezählt): {stage['expired']}")
+    server = stage.get("server") or {}
+    if server.get("stage_mean_ms"):
+        parts = ", ".join(f"{name} {ms:.0f}" for name, ms in server["stage_mean_ms"].items())
+        lines.append(f"Server-Abschnitte (Mittel, ms): {parts}")
+    if server.get("llm_throttle_wait_seconds"):
+        lines.append(f"LLM-Drossel gesamt: {server['llm_throttle_wait_seconds']} s")
+    return "\n".join(lines)
@@ -0,0 +1,244 @@
+"""Verkehrsprofile für den Lasttest: Anfragemix aus Beispielen und Baseline.
+
+Die Analyse-Anfragen stammen aus ``data/beispiele.json`` (Kurz- und
+Langtexte DE/FR/IT) und den Anfragen aus ``data/baseline_results.json``;
+``vary_query`` erzeugt daraus synthetische Varianten (andere Minutenzahlen,
+vertauschte Satzteile, Gross-/Kleinschreibung). Autocomplete-Anfragen tippen
+Präfixe von ICD-/CHOP-Suchbegriffen, Bedingungs-HTML wird wie im Browser über
+das ``render_token`` einer vorherigen Analyse nachgeladen, statische Dateien
+werden mit ETag revalidiert.
+"""
+
+from __future__ import annotations
+
+import random
+import re
+import threading
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Mapping, Optional, Sequence, Tuple
+
+import json_backend
+
+DATA_DIR = Path(__file__).resolve().parents[1] / "data"
+
+KINDS = ("analyze", "icd", "chop", "conditions", "static")
+DEFAULT_MIX: Dict[str, float] = {"analyze": 0.15, "icd": 0.3, "chop": 0.1, "conditions": 0.15, "static": 0.3}
+
+ICD_TERMS = ("fraktur", "diabetes", "appendizitis", "luxation", "J45", "katarakt", "pneumonie", "hypertonie", "S52", "commotio")
+CHOP_TERMS = ("appendektomie", "reposition", "biopsie", "katheter", "bronchoskopie", "schiel", "arthroskopie", "exzision")
+STATIC_PATHS = (
+    "/",
+    "/calculator.js",
+    "/translations.json",
+    "/api/frontend-data",
+    "/api/asset-manifest",
+    "/api/tpw",
+    "/favicon.ico",
+)
+AUTOCOMPLETE_MIN_PREFIX = 3
+HARVEST_SIZE = 200  # zuletzt gesehene (render_token, code, lang) für Bedingungs-HTML
+
+_NUMBER_RE = re.compile(r"\b(\d{1,3})\b")
+
+
+@dataclass
+class RequestSpec:
+    kind: str
+    method: str
+    path: str
+    params: Optional[Dict[str, Any]] = None
+    json: Optional[Dict[str, Any]] = None
+    headers: Dict[str, str] = field(default_factory=dict)
+
+
+def parse_mix(value: str) -> Dict[str, float]:
+    """``"analyze:1,icd:3"`` -> normierte Gewichte; unbekannte Arten sind ein Fehler."""
+    weights: Dict[str, float] = {}
+    for item in (value or "").split(","):
+        name, sep, weight = item.partition(":")
+        name = name.strip()
+        if not name:
+            continue
+        if name not in KINDS:
+            raise ValueError(f"unbekannte Anfrageart {name!r} (erlaubt: {', '.join(KINDS)})")
+        weights[name] = float(weight) if sep else 1.0
+    total = sum(w for w in weights.values() if w > 0)
+    if total <= 0:
+        raise ValueError("Anfragemix ohne positive Gewichte")
+    return {name: w / total for name, w in weights.items() if w > 0}
+
+
+def vary_query(text: str, rng: random.Random) -> str:
+    """Synthetische Variante einer Anfrage (gleiche Leistung, andere Formulierung)."""
+
+    def _number(match: "re.Match[str]") -> str:
+        value = int(match.group(1))
+        if value <= 1:
+            return match.group(1)
+        return str(rng.randint(max(1, value // 2), value * 2))
+
+    # nur etwa jede zweite Zahl ändern, damit Mengenangaben nicht alle springen
+    varied = _NUMBER_RE.sub(lambda m: _number(m) if rng.random() < 0.5 else m.group(1), text)
+    parts = [p.strip() for p in varied.split(",") if p.strip()]
+    if len(parts) > 2 and rng.random() < 0.5:
+        head, tail = parts[0], parts[1:]
+        rng.shuffle(tail)
+        varied = ", ".join([head, *tail])
+    if rng.random() < 0.3:
+        varied = varied.lower()
+    return varied
+
+
+def load_queries(data_dir: Path = DATA_DIR, langs: Optional[Sequence[str]] = None) -> List[Tuple[str, str]]:
+    """``(Text, Sprache)`` aus Beispielen und Baseline, ohne Duplikate."""
+    wanted = {lang.lower() for lang in langs} if langs else {"de", "fr", "it"}
+    queries: List[Tuple[str, str]] = []
+    seen = set()
+
+    def _add(text: Any, lang: str) -> None:
+        if isinstance(text, str) and text.strip() and lang in wanted and (text, lang) not in seen:
+            seen.add((text, lang))
+            queries.append((text.strip(), lang))
+
+    beispiele_path = data_dir / "beispiele.json"
+    if beispiele_path.is_file():
+        for entry in json_backend.load_file(beispiele_path) or []:
+            if not isinstance(entry, dict):
+                continue
+            for lang in ("de", "fr", "it"):
+                _add(entry.get(f"value_{lang.upper()}"), lang)
+                _add(entry.get(f"extendedValue_{lang.upper()}"), lang)
+    baseline_path = data_dir / "baseline_results.json"
+    if baseline_path.is_file():
+        for case_id, entry in (json_backend.load_file(baseline_path) or {}).items():
+            if case_id.startswith("_") or not isinstance(entry, dict):
+                continue
+            for lang, text in (entry.get("query") or {}).items():
+                _add(text, lang.lower())
+    return queries
+
+
+def load_pauschale_codes(data_dir: Path = DATA_DIR) -> List[str]:
+    """Erwartete Pauschalen der Baseline (Fallback für Bedingungs-HTML ohne Token)."""
+    path = data_dir / "baseline_results.json"
+    if not path.is_file():
+        return []
+    codes = []
+    for case_id, entry in (json_backend.load_file(path) or {}).items():
+        if case_id.startswith("_") or not isinstance(entry, dict):
+            continue
+        code = ((entry.get("baseline") or {}).get("pauschale") or {}).get("code")
+        if code and code not in codes:
+            codes.append(code)
+    return codes
+
+
+class TrafficProfile:
+    """Erzeugt Anfragen gemäss Mix; thread-sicher, Zufall über den übergebenen ``rng``."""
+
+    def __init__(
+        self,
+        queries: Sequence[Tuple[str, str]],
+        *,
+        mix: Optional[Mapping[str, float]] = None,
+        variation: float = 0.5,
+        pauschale_codes: Sequence[str] = (),
+        revalidate: float = 0.5,
+    ) -> None:
+        if not queries:
+            raise ValueError("keine Analyse-Anfragen gefunden")
+        self.queries = list(queries)
+        self.mix = dict(mix or DEFAULT_MIX)
+        self.variation = variation
+        self.pauschale_codes = list(pauschale_codes)
+        self.revalidate = revalidate
+        self._kinds = list(self.mix)
+        self._weights = [self.mix[k] for k in self._kinds]
+        self._lock = threading.Lock()
+        self._harvest: Deque[Tuple[str, str, str]] = deque(maxlen=HARVEST_SIZE)
+        self._etags: Dict[str, str] = {}
+
+    @classmethod
+    def from_data(cls, data_dir: Path = DATA_DIR, langs: Optional[Sequence[str]] = None, **kwargs: Any) -> "TrafficProfile":
+        return cls(load_queries(data_dir, langs), pauschale_codes=load_pauschale_codes(data_dir), **kwargs)
+
+    def next_request(self, rng: random.Random) -> RequestSpec:
+        kind = rng.choices(self._kinds, weights=self._weights)[0]
+        return getattr(self, f"_{kind}")(rng)
+
+    def _analyze(self, rng: random.Random) -> RequestSpec:
+        text, lang = rng.choice(self.queries)
+        if rng.random() < self.variation:
+            text = vary_query(text, rng)
+        payload = {
+            "inputText": text,
+            "icd": [],
+            "medications": [],
+            "age": rng.choice([None, rng.randint(1, 90)]),
+            "gender": rng.choice([None, "m", "w"]),
+            "lang": lang,
+            "useIcd": True,
+            "renderMode": "lazy",
+            "view": "lean",
+        }
+        return RequestSpec("analyze", "POST", "/api/analyze-billing", json=payload)
+
+    def _autocomplete(self, kind: str, terms: Sequence[str], rng: random.Random) -> RequestSpec:
+        term = rng.choice(terms)
+        prefix = term[: rng.randint(min(AUTOCOMPLETE_MIN_PREFIX, len(term)), len(term))]
+        params: Dict[str, Any] = {"q": prefix}
+        if kind == "icd":
+            params.update(lang="de", limit=20)
+        return RequestSpec(kind, "GET", f"/api/{kind}", params=params)
+
+    def _icd(self, rng: random.Random) -> RequestSpec:
+        return self._autocomplete("icd", ICD_TERMS, rng)
+
+    def _chop(self, rng: random.Random) -> RequestSpec:
+        return self._autocomplete("chop", CHOP_TERMS, rng)
+
+    def _conditions(self, rng: random.Random) -> RequestSpec:
+        with self._lock:
+            harvested = rng.choice(self._harvest) if self._harvest else None
+        if harvested is not None:
+            token, code, lang = harvested
+            spec = RequestSpec("conditions", "GET", "/api/pauschale-conditions-html",
+                               params={"code": code, "lang": lang, "render_token": token})
+            return self._conditional(spec, rng)
+        code = rng.choice(self.pauschale_codes) if self.pauschale_codes else "C00.00A"
+        return RequestSpec("conditions", "POST", "/api/pauschale-conditions-html",
+                           json={"code": code, "lang": "de", "context": {"LKN": [], "ICD": []}})
+
+    def _static(self, rng: random.Random) -> RequestSpec:
+        return self._conditional(RequestSpec("static", "GET", rng.choice(STATIC_PATHS)), rng)
+
+    def _conditional(self, spec: RequestSpec, rng: random.Random) -> RequestSpec:
+        with self._lock:
+            etag = self._etags.get(self._etag_key(spec))
+        if etag and rng.random() < self.revalidate:
+            spec.headers["If-None-Match"] = etag
+        return spec
+
+    @staticmethod
+    def _etag_key(spec: RequestSpec) -> str:
+        params = "&".join(f"{k}={v}" for k, v in sorted((spec.params or {}).items()))
+        return f"{spec.path}?{params}"
+
+    def observe(self, spec: RequestSpec, status: int, headers: Mapping[str, str], body: Any) -> None:
+        """Merkt sich ETags und render_tokens für Folgeanfragen (wie der Browser)."""
+        etag = headers.get("ETag")
+        if etag and status == 200 and spec.method == "GET":
+            with self._lock:
+                self._etags[self._etag_key(spec)] = etag
+        if spec.kind != "analyze" or status != 200 or not isinstance(body, dict):
+            return
+        token = body.get("render_token")
+        if not token:
+            return
+        lang = (spec.json or {}).get("lang", "de")
+        codes = [e.get("code") for e in body.get("evaluated_pauschalen") or [] if isinstance(e, dict) and e.get("code")]
+        with self._lock:
+            for code in codes[:3]:
+                self._harvest.append((token, str(code), lang))
@@ -0,0 +1,165 @@
+"""Nicht-blockierende Logging-Pipeline auf Basis von ``QueueHandler``/``QueueListener``.
+
+Die Logger von ``server.py`` schreiben nur noch in eine begrenzte Queue; ein
+eigener Writer-Thread übergibt die Einträge an die bisherigen Handler (Konsole,
+``SafeRotatingFileHandler``). Datei-I/O und Rotation laufen damit nie auf dem
+Request-Thread. Ist die Queue voll, wird der Eintrag verworfen und gezählt;
+der Writer meldet verworfene Einträge beim nächsten Durchlauf als Warnung.
+
+Teure Nutzlasten werden mit ``LazyJSON`` übergeben und erst serialisiert, wenn
+der Eintrag das Level des Loggers und mindestens eines Handlers passiert.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import queue
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, List, Optional
+
+import json_backend
+
+
+class LazyJSON:
+    """Formatiert ``obj`` erst bei ``str()`` als JSON (für ``%s``-Logargumente)."""
+
+    __slots__ = ("obj", "indent")
+
+    def __init__(self, obj: Any, indent: bool = True) -> None:
+        self.obj = obj
+        self.indent = indent
+
+    def __str__(self) -> str:
+        return json_backend.dumps(self.obj, indent=self.indent, default=str)
+
+
+class DroppingQueueHandler(QueueHandler):
+    """Legt Einträge nicht-blockierend in die Queue; bei voller Queue wird gezählt statt gewartet."""
+
+    def __init__(self, pipeline: "LogPipeline", route: str) -> None:
+        super().__init__(pipeline.queue)
+        self.pipeline = pipeline
+        self.route = route
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = super().prepare(record)
+        record.log_route = self.route
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.pipeline.record_drop()
+
+
+class _RoutingListener(QueueListener):
+    def __init__(self, pipeline: "LogPipeline") -> None:
+        super().__init__(pipeline.queue, respect_handler_level=True)
+        self.pipeline = pipeline
+
+    def handle(self, record: logging.LogRecord) -> None:
+        self.pipeline.dispatch(record)
+
+    def enqueue_sentinel(self) -> None:
+        # Beim Stoppen auch bei voller Queue warten, statt ``queue.Full`` zu werfen
+        self.queue.put(self._sentinel)
+
+
+class LogPipeline:
+    """Eine Queue und ein Writer-Thread für mehrere Logger (je Logger eine Route)."""
+
+    def __init__(self, maxsize: int = 10000) -> None:
+        self.maxsize = max(1, int(maxsize))
+        self.queue: "queue.Queue[Any]" = queue.Queue(self.maxsize)
+        self.routes: Dict[str, List[logging.Handler]] = {}
+        self.dropped = 0
+        self._reported_dropped = 0
+        self._lock = threading.Lock()
+        self._listener: Optional[_RoutingListener] = None
+        self._queue_handlers: List[DroppingQueueHandler] = []
+
+    def attach(self, target: logging.Logger) -> DroppingQueueHandler:
+        """Verschiebt die Handler von ``target`` hinter die Queue."""
+        route = target.name
+        handlers = list(target.handlers)
+        for handler in handlers:
+            target.removeHandler(handler)
+        self.routes[route] = handlers
+        queue_handler = DroppingQueueHandler(self, route)
+        # Einträge, die kein Handler schreiben würde, gar nicht erst formatieren
+        if handlers:
+            queue_handler.setLevel(min(handler.level for handler in handlers))
+        target.addHandler(queue_handler)
+        self._queue_handlers.append(queue_handler)
+        return queue_handler
+
+    def record_drop(self) -> None:
+        with self._lock:
+            self.dropped += 1
+
+    def dispatch(self, record: logging.LogRecord) -> None:
+        """Läuft im Writer-Thread: meldet Verluste und schreibt den Eintrag."""
+        with self._lock:
+            lost = self.dropped - self._reported_dropped
+            self._reported_dropped = self.dropped
+        handlers = self.routes.get(getattr(record, "log_route", ""), ())
+        if lost > 0:
+            notice = logging.LogRecord(
+                "log_pipeline", logging.WARNING, __file__, 0,
+                "%d Logeinträge verworfen (Queue voll, Grösse %d)", (lost, self.maxsize), None,
+            )
+            self._emit(notice, handlers)
+        self._emit(record, handlers)
+
+    @staticmethod
+    def _emit(record: logging.LogRecord, handlers: Any) -> None:
+        for handler in handlers:
+            if record.levelno >= handler.level:
+                handler.handle(record)
+
+    def start(self) -> None:
+        if self._listener is None:
+            self._listener = _RoutingListener(self)
+            self._listener.start()
+
+    def stop(self) -> None:
+        """Schreibt die Queue leer und beendet den Writer-Thread."""
+        listener, self._listener = self._listener, None
+        if listener is not None:
+            listener.stop()
+
+    def restart_after_fork(self) -> None:
+        # Threads überleben ``fork`` nicht; Queue-Locks können gesperrt sein.
+        was_running = self._listener is not None
+        self._lock = threading.Lock()
+        self.queue = queue.Queue(self.maxsize)
+        self._listener = None
+        for queue_handler in self._queue_handlers:
+            queue_handler.queue = self.queue
+        if was_running:
+            self.start()
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Wartet, bis alle eingereihten Einträge geschrieben sind."""
+        deadline = time.monotonic() + timeout
+        while self.queue.unfinished_tasks:
+            if self._listener is None or time.monotonic() >= deadline:
+                return False
+            time.sleep(0.005)
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self._listener is not None,
+            "queued": self.queue.qsize(),
+            "maxsize": self.maxsize,
+            "dropped": self.dropped,
+        }
+
+    def install_fork_hook(self) -> None:
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self.restart_after_fork)
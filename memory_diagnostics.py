@@ -0,0 +1,304 @@
+"""Speicherdiagnose: Grösse der geladenen Datenstrukturen und tracemalloc-Snapshots.
+
+``dataset_report`` misst die tiefe Grösse (``sys.getsizeof`` über alle
+erreichbaren Container und Objektattribute) jeder übergebenen Struktur, einmal
+für sich allein (``bytes``) und einmal nur mit den Objekten, die keine vorher
+gemessene Struktur schon enthält (``unique_bytes``). Die Differenz
+(``shared_bytes``) zeigt geteilte Referenzen, etwa zwischen
+``leistungskatalog_data`` und ``leistungskatalog_dict``; die Summe der
+``unique_bytes`` ist der Gesamtbedarf ohne Doppelzählung. FAISS-Index und
+Embedding-Modell liegen grösstenteils ausserhalb des Python-Heaps und werden
+aus Vektoranzahl bzw. Parametern geschätzt (``native``).
+
+Die tracemalloc-Funktionen halten benannte Snapshots im Prozess und
+vergleichen zwei davon (oder einen mit dem aktuellen Stand), um Speicher zu
+finden, der zwischen Anfragen liegen bleibt. Sie werden über die Admin-Routen
+``/api/diagnostics/...`` im Server angesprochen.
+"""
+
+from __future__ import annotations
+
+import itertools
+import linecache
+import sys
+import threading
+import time
+import tracemalloc
+import types
+from collections import OrderedDict, deque
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Set, Tuple
+
+GROUP_BY = ("lineno", "filename", "traceback")
+
+_ATOMIC_TYPES = (str, bytes, bytearray, int, float, complex, bool, type(None), range, memoryview)
+_SKIP_TYPES = (
+    type,
+    types.ModuleType,
+    types.FunctionType,
+    types.BuiltinFunctionType,
+    types.MethodType,
+    types.CodeType,
+    types.FrameType,
+)
+_TRACE_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, linecache.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+_lock = threading.Lock()
+_frames = 10
+_max_snapshots = 10
+_snapshots: "OrderedDict[str, Tuple[tracemalloc.Snapshot, Dict[str, Any]]]" = OrderedDict()
+_counter = itertools.count(1)
+
+
+def configure(*, frames: int = 10, max_snapshots: int = 10) -> None:
+    global _frames, _max_snapshots
+    _frames = max(1, int(frames))
+    _max_snapshots = max(1, int(max_snapshots))
+
+
+# --- Tiefe Grössen -------------------------------------------------------------
+
+
+def _native_size(obj: Any) -> Optional[int]:
+    """Geschätzte Grösse ausserhalb des Python-Heaps (FAISS, torch/SentenceTransformer)."""
+    module = type(obj).__module__ or ""
+    if module.startswith("faiss"):
+        ntotal = int(getattr(obj, "ntotal", 0) or 0)
+        code_size = getattr(obj, "code_size", None)
+        if code_size is None:
+            code_size = int(getattr(obj, "d", 0) or 0) * 4  # Flat-Index: float32 je Dimension
+        return ntotal * int(code_size)
+    if module.startswith(("sentence_transformers", "torch", "transformers")) and hasattr(obj, "parameters"):
+        total = 0
+        for tensor in itertools.chain(obj.parameters(), getattr(obj, "buffers", lambda: [])()):
+            total += tensor.numel() * tensor.element_size()
+        return total
+    return None
+
+
+def _referents(obj: Any) -> Iterable[Any]:
+    if isinstance(obj, dict):
+        return itertools.chain(obj.keys(), obj.values())
+    if isinstance(obj, (list, tuple, set, frozenset, deque)):
+        return obj
+    refs: List[Any] = []
+    attrs = getattr(obj, "__dict__", None)
+    if isinstance(attrs, dict):
+        refs.append(attrs)
+    for cls in type(obj).__mro__:
+        for slot in getattr(cls, "__slots__", ()):
+            if isinstance(slot, str) and slot not in ("__dict__", "__weakref__") and hasattr(obj, slot):
+                refs.append(getattr(obj, slot))
+    return refs
+
+
+def deep_sizeof(obj: Any, seen: Optional[Set[int]] = None) -> Tuple[int, bool]:
+    """Tiefe Grösse in Bytes; Objekte in ``seen`` zählen nicht (und werden ergänzt).
+
+    Liefert ``(bytes, native)``; ``native`` ist wahr, wenn ein Teil geschätzt wurde.
+    """
+    seen = set() if seen is None else seen
+    total = 0
+    native = False
+    stack = [obj]
+    while stack:
+        current = stack.pop()
+        if id(current) in seen or isinstance(current, _SKIP_TYPES):
+            continue
+        seen.add(id(current))
+        try:
+            total += sys.getsizeof(current)
+        except TypeError:
+            continue
+        if isinstance(current, _ATOMIC_TYPES):
+            continue
+        estimate = _native_size(current)
+        if estimate is not None:
+            total += estimate
+            native = True
+            continue
+        stack.extend(_referents(current))
+    return total, native
+
+
+def process_memory() -> Dict[str, Optional[int]]:
+    """Resident Set Size und Spitzenwert des Prozesses in Bytes (Linux: /proc, sonst getrusage)."""
+    rss: Optional[int] = None
+    peak: Optional[int] = None
+    try:
+        with open("/proc/self/status", encoding="ascii") as fh:
+            for line in fh:
+                if line.startswith("VmRSS:"):
+                    rss = int(line.split()[1]) * 1024
+                elif line.startswith("VmHWM:"):
+                    peak = int(line.split()[1]) * 1024
+    except OSError:
+        try:
+            import resource
+
+            maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            peak = maxrss if sys.platform == "darwin" else maxrss * 1024
+        except (ImportError, OSError):
+            pass
+    return {"rss_bytes": rss, "peak_rss_bytes": peak}
+
+
+def _item_count(obj: Any) -> Optional[int]:
+    """Anzahl Einträge; bei Tupeln (zusammengefasste Indizes) die Summe der Teile."""
+    if isinstance(obj, tuple):
+        return sum(len(part) for part in obj if hasattr(part, "__len__"))
+    try:
+        return len(obj)
+    except TypeError:
+        return None
+
+
+def dataset_report(datasets: Mapping[str, Any]) -> Dict[str, Any]:
+    """Grössen je Struktur in Reihenfolge von ``datasets`` (geteilte Objekte zählen beim ersten Auftreten)."""
+    started = time.perf_counter()
+    counted: Set[int] = set()
+    entries = []
+    for name, obj in datasets.items():
+        standalone, native = deep_sizeof(obj)
+        unique, _ = deep_sizeof(obj, counted)
+        items = _item_count(obj)
+        entries.append({
+            "name": name,
+            "type": type(obj).__name__,
+            "items": items,
+            "bytes": standalone,
+            "unique_bytes": unique,
+            "shared_bytes": standalone - unique,
+            "native": native,
+        })
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "datasets": entries,
+        "total_bytes": sum(entry["unique_bytes"] for entry in entries),
+        "process": process_memory(),
+        "duration_seconds": round(time.perf_counter() - started, 2),
+    }
+
+
+def _mib(value: Optional[int]) -> str:
+    return "-" if value is None else f"{value / (1024 * 1024):.1f}"
+
+
+def format_report(report: Mapping[str, Any]) -> str:
+    lines = [f"{'Struktur':<44}{'Einträge':>10}{'MiB':>9}{'eigen':>9}{'geteilt':>9}"]
+    for entry in sorted(report["datasets"], key=lambda e: e["bytes"], reverse=True):
+        items = "-" if entry["items"] is None else str(entry["items"])
+        flag = "  (geschätzt)" if entry["native"] else ""
+        lines.append(
+            f"{entry['name']:<44}{items:>10}{_mib(entry['bytes']):>9}"
+            f"{_mib(entry['unique_bytes']):>9}{_mib(entry['shared_bytes']):>9}{flag}"
+        )
+    process = report.get("process") or {}
+    lines.append(
+        f"Summe ohne Doppelzählung: {_mib(report['total_bytes'])} MiB; Prozess RSS {_mib(process.get('rss_bytes'))} MiB "
+        f"(Spitze {_mib(process.get('peak_rss_bytes'))} MiB)"
+    )
+    return "\n".join(lines)
+
+
+# --- tracemalloc ---------------------------------------------------------------
+
+
+def tracing_status() -> Dict[str, Any]:
+    tracing = tracemalloc.is_tracing()
+    current, peak = tracemalloc.get_traced_memory() if tracing else (0, 0)
+    with _lock:
+        snapshots = [dict(meta) for _, meta in _snapshots.values()]
+    return {
+        "tracing": tracing,
+        "frames": tracemalloc.get_traceback_limit() if tracing else _frames,
+        "traced_bytes": current,
+        "traced_peak_bytes": peak,
+        "snapshots": snapshots,
+    }
+
+
+def start_tracing(frames: Optional[int] = None) -> bool:
+    """Startet tracemalloc (falls nötig); erfasst werden nur Allokationen ab jetzt."""
+    if tracemalloc.is_tracing():
+        return False
+    tracemalloc.start(max(1, int(frames or _frames)))
+    return True
+
+
+def stop_tracing() -> None:
+    """Beendet tracemalloc und verwirft alle Snapshots."""
+    with _lock:
+        _snapshots.clear()
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+def _take() -> tracemalloc.Snapshot:
+    return tracemalloc.take_snapshot().filter_traces(_TRACE_FILTERS)
+
+
+def take_snapshot(label: str = "") -> Dict[str, Any]:
+    """Nimmt einen Snapshot auf (startet tracemalloc bei Bedarf) und behält die letzten ``max_snapshots``."""
+    started = start_tracing()
+    snapshot = _take()
+    current, peak = tracemalloc.get_traced_memory()
+    meta = {
+        "id": f"s{next(_counter)}",
+        "label": str(label or "")[:80],
+        "taken_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "traced_bytes": current,
+        "traced_peak_bytes": peak,
+        "tracing_started": started,
+    }
+    with _lock:
+        _snapshots[meta["id"]] = (snapshot, meta)
+        while len(_snapshots) > _max_snapshots:
+            _snapshots.popitem(last=False)
+    return dict(meta)
+
+
+def _stat_entry(stat: Any, group_by: str) -> Dict[str, Any]:
+    frames = [f"{frame.filename}:{frame.lineno}" for frame in stat.traceback]
+    entry = {
+        "location": frames[0] if frames else "?",
+        "size_diff": stat.size_diff,
+        "count_diff": stat.count_diff,
+        "size": stat.size,
+        "count": stat.count,
+    }
+    if group_by == "traceback":
+        entry["traceback"] = frames
+    return entry
+
+
+def diff_snapshots(base_id: str, other_id: Optional[str] = None, *, group_by: str = "lineno", limit: int = 25) -> Dict[str, Any]:
+    """Vergleicht Snapshot ``base_id`` mit ``other_id`` bzw. dem aktuellen Stand (``None``).
+
+    ``KeyError`` bei unbekannter ID, ``ValueError`` bei ungültiger Gruppierung
+    oder ohne laufendes tracemalloc.
+    """
+    if group_by not in GROUP_BY:
+        raise ValueError(f"group must be one of {', '.join(GROUP_BY)}")
+    with _lock:
+        base, base_meta = _snapshots[base_id]
+        other = _snapshots[other_id][0] if other_id else None
+    if other is None:
+        if not tracemalloc.is_tracing():
+            raise ValueError("tracemalloc is not running")
+        other = _take()
+    stats = other.compare_to(base, group_by)
+    grown = [stat for stat in stats if stat.size_diff > 0]
+    return {
+        "base": dict(base_meta),
+        "compare": other_id or "current",
+        "group_by": group_by,
+        "size_diff": sum(stat.size_diff for stat in stats),
+        "count_diff": sum(stat.count_diff for stat in stats),
+        "top": [_stat_entry(stat, group_by) for stat in grown[: max(1, int(limit))]],
+    }
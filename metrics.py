@@ -0,0 +1,260 @@
+"""Leichtgewichtige Latenz- und Zählermetriken mit Prometheus-Textausgabe.
+
+``span("stage")`` bzw. ``@timed("stage")`` messen Abschnitte einer Anfrage
+(Kontextaufbau, Suche, LLM, Regelprüfung, Pauschalen, HTML, Serialisierung)
+und fliessen in das Histogramm ``arzttarif_stage_duration_seconds``. Spans sind
+verschachtelbar; jeder Abschnitt misst inklusive seiner Unterabschnitte.
+``inc``/``observe`` pflegen beliebige Zähler und Histogramme; Collector-
+Funktionen liefern Momentwerte (z.B. Cache-Statistiken) erst beim Abruf.
+
+Jeder Span erscheint ausserdem im Trace-Baum der Anfrage (``tracing``).
+Innerhalb von ``request_timings()`` werden die Span-Dauern zusätzlich pro
+Anfrage gesammelt (für den ``Server-Timing``-Header). Ausser ``tracing``
+braucht das Modul nur die Standardbibliothek.
+"""
+
+from __future__ import annotations
+
+import contextvars
+import math
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, TypeVar
+
+import tracing
+
+PREFIX = "arzttarif_"
+STAGE_METRIC = "stage_duration_seconds"
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+)
+
+# Beschreibungen bekannter Metriken (Name ohne Präfix -> HELP-Text)
+HELP: Dict[str, str] = {
+    STAGE_METRIC: "Dauer einzelner Verarbeitungsabschnitte (inklusive Unterabschnitte).",
+    "http_requests_total": "Anzahl HTTP-Anfragen nach Route, Methode und Status.",
+    "http_request_duration_seconds": "Dauer der HTTP-Anfragen nach Route.",
+    "llm_tokens_total": "Verbrauchte LLM-Tokens nach Stufe und Richtung.",
+    "llm_requests_total": "LLM-Netzwerkaufrufe nach Anbieter und Ergebnis.",
+    "llm_throttle_wait_seconds": "Wartezeit durch die LLM-Mindestabstand-Drossel.",
+    "cache_requests_total": "Cache-Zugriffe nach Cache und Ergebnis (hit/miss).",
+    "cache_entries": "Aktuelle Anzahl Einträge je Server-Cache.",
+    "html_sanitize_cache_total": "Zugriffe auf den HTML-Sanitize-Cache nach Ergebnis.",
+    "html_sanitize_seconds_total": "Kumulierte Zeit in bleach.clean.",
+    "log_queue_dropped_total": "Wegen voller Log-Queue verworfene Einträge.",
+    "log_queue_depth": "Wartende Einträge in der Log-Queue.",
+    "data_loaded": "1, wenn die Tarifdaten geladen sind.",
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+Sample = Tuple[str, str, Dict[str, Any], float]  # (Name, Typ, Labels, Wert)
+F = TypeVar("F", bound=Callable[..., Any])
+
+_enabled = True
+_lock = threading.Lock()
+_counters: Dict[str, Dict[Labels, float]] = {}
+_histograms: Dict[str, Dict[Labels, List[float]]] = {}  # Bucket-Zähler..., Summe, Anzahl
+_buckets: Dict[str, Tuple[float, ...]] = {}
+_collectors: List[Callable[[], Iterable[Sample]]] = []
+_request_timings: contextvars.ContextVar[Optional[Dict[str, float]]] = contextvars.ContextVar(
+    "request_timings", default=None
+)
+
+
+def configure(enabled: bool = True) -> None:
+    global _enabled
+    _enabled = bool(enabled)
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def _label_key(labels: Dict[str, Any]) -> Labels:
+    return tuple(sorted((str(k), str(v)) for k, v in labels.items()))
+
+
+def inc(name: str, value: float = 1.0, **labels: Any) -> None:
+    """Erhöht einen Zähler (Name ohne Präfix, üblicherweise mit ``_total``)."""
+    if not _enabled:
+        return
+    key = _label_key(labels)
+    with _lock:
+        series = _counters.setdefault(name, {})
+        series[key] = series.get(key, 0.0) + value
+
+
+def observe(name: str, value: float, buckets: Tuple[float, ...] = DEFAULT_BUCKETS, **labels: Any) -> None:
+    """Trägt einen Messwert in ein Histogramm ein."""
+    if not _enabled:
+        return
+    key = _label_key(labels)
+    with _lock:
+        bounds = _buckets.setdefault(name, buckets)
+        series = _histograms.setdefault(name, {})
+        state = series.get(key)
+        if state is None:
+            state = series[key] = [0.0] * (len(bounds) + 2)
+        for i, bound in enumerate(bounds):
+            if value <= bound:
+                state[i] += 1
+        state[-2] += value
+        state[-1] += 1
+
+
+@contextmanager
+def span(stage: str, **labels: Any) -> Iterator[None]:
+    """Misst die Dauer eines Abschnitts (auch bei Ausnahmen); bei aktivem Trace auch als Trace-Span."""
+    if not _enabled:
+        with tracing.span(stage, **labels):
+            yield
+        return
+    started = time.perf_counter()
+    try:
+        with tracing.span(stage, **labels):
+            yield
+    finally:
+        elapsed = time.perf_counter() - started
+        observe(STAGE_METRIC, elapsed, stage=stage, **labels)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings[stage] = timings.get(stage, 0.0) + elapsed
+
+
+def timed(stage: str, **labels: Any) -> Callable[[F], F]:
+    """Dekorator-Variante von ``span``."""
+
+    def decorator(func: F) -> F:
+        @wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with span(stage, **labels):
+                return func(*args, **kwargs)
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
+
+
+def start_request_timings(timings: Optional[Dict[str, float]] = None) -> contextvars.Token:
+    """Beginnt die Sammlung der Span-Dauern für die laufende Anfrage."""
+    return _request_timings.set({} if timings is None else timings)
+
+
+def current_request_timings() -> Dict[str, float]:
+    return dict(_request_timings.get() or {})
+
+
+def stop_request_timings(token: Optional[contextvars.Token]) -> None:
+    if token is None:
+        return
+    try:
+        _request_timings.reset(token)
+    except ValueError:
+        # Token aus anderem Kontext (z.B. Teardown in anderem Thread)
+        _request_timings.set(None)
+
+
+@contextmanager
+def request_timings() -> Iterator[Dict[str, float]]:
+    timings: Dict[str, float] = {}
+    token = start_request_timings(timings)
+    try:
+        yield timings
+    finally:
+        stop_request_timings(token)
+
+
+def server_timing_header(timings: Dict[str, float]) -> str:
+    """Formatiert Abschnittsdauern als ``Server-Timing``-Header (Millisekunden)."""
+    return ", ".join(f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in timings.items())
+
+
+def register_collector(collector: Callable[[], Iterable[Sample]]) -> None:
+    """Registriert eine Funktion, die beim Abruf Momentwerte liefert."""
+    with _lock:
+        if collector not in _collectors:
+            _collectors.append(collector)
+
+
+def reset() -> None:
+    """Setzt alle Zähler und Histogramme zurück (Collectors bleiben registriert)."""
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
+        _buckets.clear()
+
+
+def snapshot() -> Dict[str, Any]:
+    """Kopie der aktuellen Zähler und Histogramme (für Tests und Diagnose)."""
+    with _lock:
+        return {
+            "counters": {name: dict(series) for name, series in _counters.items()},
+            "histograms": {
+                name: {key: {"sum": state[-2], "count": state[-1]} for key, state in series.items()}
+                for name, series in _histograms.items()
+            },
+        }
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Iterable[Tuple[str, str]]) -> str:
+    parts = [f'{key}="{_escape(value)}"' for key, value in labels]
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _header(lines: List[str], name: str, kind: str) -> None:
+    lines.append(f"# HELP {PREFIX}{name} {HELP.get(name, name.replace('_', ' '))}")
+    lines.append(f"# TYPE {PREFIX}{name} {kind}")
+
+
+def render() -> str:
+    """Alle Metriken im Prometheus-Textformat (Version 0.0.4)."""
+    with _lock:
+        counters = {name: dict(series) for name, series in _counters.items()}
+        histograms = {name: {k: list(v) for k, v in series.items()} for name, series in _histograms.items()}
+        buckets = dict(_buckets)
+        collectors = list(_collectors)
+
+    lines: List[str] = []
+    for name in sorted(counters):
+        _header(lines, name, "counter")
+        for key, value in sorted(counters[name].items()):
+            lines.append(f"{PREFIX}{name}{_format_labels(key)} {_format_value(value)}")
+    for name in sorted(histograms):
+        _header(lines, name, "histogram")
+        bounds = buckets[name]
+        for key, state in sorted(histograms[name].items()):
+            for i, bound in enumerate(bounds):
+                labels = key + (("le", _format_value(bound)),)
+                lines.append(f"{PREFIX}{name}_bucket{_format_labels(labels)} {_format_value(state[i])}")
+            lines.append(f"{PREFIX}{name}_bucket{_format_labels(key + (('le', '+Inf'),))} {_format_value(state[-1])}")
+            lines.append(f"{PREFIX}{name}_sum{_format_labels(key)} {_format_value(state[-2])}")
+            lines.append(f"{PREFIX}{name}_count{_format_labels(key)} {_format_value(state[-1])}")
+
+    grouped: Dict[str, Tuple[str, List[Tuple[Labels, float]]]] = {}
+    for collector in collectors:
+        try:
+            samples = list(collector())
+        except Exception:
+            continue
+        for name, kind, labels, value in samples:
+            grouped.setdefault(name, (kind, []))[1].append((_label_key(labels), float(value)))
+    for name in sorted(grouped):
+        kind, samples = grouped[name]
+        _header(lines, name, kind)
+        for key, value in samples:
+            lines.append(f"{PREFIX}{name}{_format_labels(key)} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
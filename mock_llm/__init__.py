@@ -0,0 +1,16 @@
+"""Lokaler Stand-in für Gemini und OpenAI-kompatible LLM-APIs (Last- und Resilienztests)."""
+
+# Package exports should be side-effect free.
+
+from .app import MockLLMServer, MockSettings, parse_latency, start_in_thread
+from .responses import CannedResponses, detect_stage, respond
+
+__all__ = [
+    "CannedResponses",
+    "MockLLMServer",
+    "MockSettings",
+    "detect_stage",
+    "parse_latency",
+    "respond",
+    "start_in_thread",
+]
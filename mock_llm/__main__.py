@@ -0,0 +1,74 @@
+"""Startet den Mock-LLM-Server.
+
+    python -m mock_llm                                   # Werte aus [MOCK_LLM]
+    python -m mock_llm --latency uniform:0.2:1.5 --error-rate-429 0.1
+    python -m mock_llm --fail-sequence 429,503 --latency fixed:0
+
+Danach in ``[API_ENDPOINTS]`` (oder per Umgebung ``GEMINI_BASE_URL`` /
+``OPENAI_BASE_URL``) auf ``http://127.0.0.1:8765/v1beta`` bzw. ``/v1`` zeigen.
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+from pathlib import Path
+
+if __package__ in {None, ""}:
+    sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+    __package__ = "mock_llm"
+
+from runtime_config import load_merged_config
+
+from .app import MockLLMServer, MockSettings, parse_latency, parse_status_list
+
+
+def main(argv: list[str] | None = None) -> int:
+    settings = MockSettings.from_config(load_merged_config())
+    parser = argparse.ArgumentParser(prog="python -m mock_llm", description="Mock-Server für Gemini/OpenAI.")
+    parser.add_argument("--host", default=settings.host)
+    parser.add_argument("--port", type=int, default=settings.port)
+    parser.add_argument("--latency", default=settings.latency, help="fixed:S | uniform:MIN:MAX | normal:M:SD | lognormal:MEDIAN:SIGMA")
+    parser.add_argument("--token-latency-ms", type=float, default=settings.token_latency_ms)
+    for status in (429, 500, 503):
+        parser.add_argument(f"--error-rate-{status}", type=float, default=settings.error_rates.get(status, 0.0))
+    parser.add_argument("--fail-sequence", default=",".join(map(str, settings.fail_sequence)))
+    parser.add_argument("--seed", type=int, default=settings.seed)
+    parser.add_argument("--canned-file", default=settings.canned_file)
+    parser.add_argument("--stage1-max-lkns", type=int, default=settings.stage1_max_lkns)
+    parser.add_argument("--verbose", action="store_true", help="Jede Anfrage protokollieren.")
+    args = parser.parse_args(argv)
+
+    try:
+        parse_latency(args.latency)
+    except ValueError as exc:
+        parser.error(str(exc))
+    error_rates = {
+        status: rate
+        for status, rate in ((429, args.error_rate_429), (500, args.error_rate_500), (503, args.error_rate_503))
+        if rate > 0
+    }
+    settings = MockSettings(
+        host=args.host,
+        port=args.port,
+        latency=args.latency,
+        token_latency_ms=args.token_latency_ms,
+        error_rates=error_rates,
+        fail_sequence=parse_status_list(args.fail_sequence),
+        seed=args.seed,
+        canned_file=args.canned_file,
+        stage1_max_lkns=args.stage1_max_lkns,
+    )
+    server = MockLLMServer(settings, verbose=args.verbose)
+    print(f"Mock-LLM läuft auf {server.base_url} (Gemini: {server.base_url}/v1beta, OpenAI: {server.base_url}/v1)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,316 @@
+"""HTTP-Server des Mock-LLM (Gemini ``generateContent`` und OpenAI Chat Completions).
+
+Latenz, Fehlerinjektion (429/5xx) und Tokenzählung sind über ``MockSettings``
+einstellbar (``[MOCK_LLM]`` in ``config.ini``). Der Server nutzt nur die
+Standardbibliothek (``ThreadingHTTPServer``), bedient Anfragen also parallel
+und lässt sich in Tests mit ``start_in_thread`` im selben Prozess starten.
+
+Endpunkte:
+
+* ``POST /v1beta/models/<modell>:generateContent`` – Gemini
+* ``POST /v1/chat/completions`` – OpenAI-kompatibel
+* ``GET /v1/models``, ``GET /v1beta/models`` – Modelllisten für Verbindungstests
+* ``GET /stats`` – Anfragen, Fehler und Tokens je Anbieter/Modell/Stufe
+* ``POST /reset`` – Zähler und Fehlerfolge zurücksetzen
+"""
+
+from __future__ import annotations
+
+import configparser
+import math
+import random
+import re
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import json_backend
+from utils import count_tokens
+
+from .responses import CannedResponses, respond
+
+LatencySampler = Callable[[random.Random], float]
+_GEMINI_PATH_RE = re.compile(r"^/v1(?:beta)?/models/([^/:]+):generateContent$")
+
+_ERROR_STATUS = {
+    429: ("RESOURCE_EXHAUSTED", "rate_limit_error", "Rate limit exceeded (mock)"),
+    500: ("INTERNAL", "server_error", "Internal error (mock)"),
+    502: ("UNAVAILABLE", "server_error", "Bad gateway (mock)"),
+    503: ("UNAVAILABLE", "server_error", "Service unavailable (mock)"),
+}
+
+
+def parse_latency(spec: str) -> LatencySampler:
+    """``fixed:S``, ``uniform:MIN:MAX``, ``normal:MITTEL:SD`` oder ``lognormal:MEDIAN:SIGMA`` (Sekunden)."""
+    kind, *raw = [part.strip() for part in (spec or "fixed:0").split(":")]
+    try:
+        values = [float(v) for v in raw]
+    except ValueError as exc:
+        raise ValueError(f"Ungültige Latenzangabe: {spec!r}") from exc
+    kind = kind.lower()
+    if kind == "fixed" and len(values) == 1:
+        return lambda rng: max(0.0, values[0])
+    if kind == "uniform" and len(values) == 2:
+        return lambda rng: rng.uniform(values[0], values[1])
+    if kind == "normal" and len(values) == 2:
+        return lambda rng: max(0.0, rng.gauss(values[0], values[1]))
+    if kind == "lognormal" and len(values) == 2 and values[0] > 0:
+        mu = math.log(values[0])
+        return lambda rng: rng.lognormvariate(mu, values[1])
+    raise ValueError(f"Ungültige Latenzangabe: {spec!r}")
+
+
+@dataclass
+class MockSettings:
+    host: str = "127.0.0.1"
+    port: int = 8765
+    latency: str = "fixed:0"
+    token_latency_ms: float = 0.0
+    error_rates: Dict[int, float] = field(default_factory=dict)
+    fail_sequence: List[int] = field(default_factory=list)
+    seed: int = 42
+    canned_file: str = ""
+    stage1_max_lkns: int = 3
+
+    @classmethod
+    def from_config(cls, config: configparser.ConfigParser, section: str = "MOCK_LLM") -> "MockSettings":
+        def _get(key: str, fallback: str) -> str:
+            return (config.get(section, key, fallback=fallback) or fallback).strip()
+
+        error_rates = {}
+        for status in _ERROR_STATUS:
+            rate = float(_get(f"error_rate_{status}", "0") or 0)
+            if rate > 0:
+                error_rates[status] = rate
+        return cls(
+            host=_get("host", "127.0.0.1"),
+            port=int(_get("port", "8765")),
+            latency=_get("latency", "fixed:0"),
+            token_latency_ms=float(_get("token_latency_ms", "0")),
+            error_rates=error_rates,
+            fail_sequence=parse_status_list(_get("fail_sequence", "")),
+            seed=int(_get("seed", "42")),
+            canned_file=_get("canned_file", ""),
+            stage1_max_lkns=int(_get("stage1_max_lkns", "3")),
+        )
+
+
+def parse_status_list(value: str) -> List[int]:
+    return [int(part) for part in re.split(r"[,\s]+", value or "") if part.strip().isdigit()]
+
+
+class MockState:
+    """Gemeinsamer Zustand aller Handler-Threads (Zufall, Fehlerfolge, Zähler)."""
+
+    def __init__(self, settings: MockSettings) -> None:
+        self.settings = settings
+        self.latency = parse_latency(settings.latency)
+        self.canned = CannedResponses.from_file(settings.canned_file)
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._rng = random.Random(self.settings.seed)
+            self._pending_failures = list(self.settings.fail_sequence)
+            self.stats: Dict[str, Any] = {
+                "requests": 0,
+                "injected_errors": defaultdict(int),
+                "by_key": defaultdict(lambda: {"requests": 0, "prompt_tokens": 0, "completion_tokens": 0}),
+            }
+
+    def next_outcome(self) -> Tuple[Optional[int], float]:
+        """Entscheidet pro Anfrage über injizierten Fehler und Grundlatenz."""
+        with self._lock:
+            self.stats["requests"] += 1
+            status: Optional[int] = None
+            if self._pending_failures:
+                status = self._pending_failures.pop(0)
+            else:
+                roll = self._rng.random()
+                for code, rate in sorted(self.settings.error_rates.items()):
+                    if roll < rate:
+                        status = code
+                        break
+                    roll -= rate
+            if status is not None:
+                self.stats["injected_errors"][status] += 1
+            return status, self.latency(self._rng)
+
+    def account(self, provider: str, model: str, stage: str, prompt_tokens: int, completion_tokens: int) -> None:
+        with self._lock:
+            entry = self.stats["by_key"][f"{provider}/{model}/{stage}"]
+            entry["requests"] += 1
+            entry["prompt_tokens"] += prompt_tokens
+            entry["completion_tokens"] += completion_tokens
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            by_key = {k: dict(v) for k, v in self.stats["by_key"].items()}
+            return {
+                "requests": self.stats["requests"],
+                "injected_errors": {str(k): v for k, v in self.stats["injected_errors"].items()},
+                "prompt_tokens": sum(v["prompt_tokens"] for v in by_key.values()),
+                "completion_tokens": sum(v["completion_tokens"] for v in by_key.values()),
+                "by_key": by_key,
+            }
+
+
+def _openai_prompt(body: Dict[str, Any]) -> str:
+    parts: List[str] = []
+    for message in body.get("messages") or []:
+        content = message.get("content") if isinstance(message, dict) else None
+        if isinstance(content, str):
+            parts.append(content)
+        elif isinstance(content, list):
+            parts.extend(str(item.get("text", "")) for item in content if isinstance(item, dict))
+    return "\n".join(parts)
+
+
+def _gemini_prompt(body: Dict[str, Any]) -> str:
+    parts: List[str] = []
+    for content in body.get("contents") or []:
+        for part in (content or {}).get("parts") or []:
+            if isinstance(part, dict) and isinstance(part.get("text"), str):
+                parts.append(part["text"])
+    return "\n".join(parts)
+
+
+class MockLLMHandler(BaseHTTPRequestHandler):
+    server_version = "MockLLM/1.0"
+    protocol_version = "HTTP/1.1"
+
+    @property
+    def state(self) -> MockState:
+        return self.server.state  # type: ignore[attr-defined]
+
+    def log_message(self, format: str, *args: Any) -> None:  # noqa: A002 - Signatur der Basisklasse
+        if getattr(self.server, "verbose", False):
+            super().log_message(format, *args)
+
+    def _send_json(self, status: int, payload: Any, headers: Optional[Dict[str, str]] = None) -> None:
+        body = json_backend.dumps_bytes(payload)
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_body(self) -> Dict[str, Any]:
+        length = int(self.headers.get("Content-Length") or 0)
+        if not length:
+            return {}
+        try:
+            data = json_backend.loads(self.rfile.read(length))
+        except ValueError:
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    def _send_error(self, status: int, provider: str) -> None:
+        gemini_status, openai_type, message = _ERROR_STATUS.get(status, ("UNKNOWN", "server_error", "Error (mock)"))
+        headers = {"Retry-After": "1"} if status == 429 else None
+        if provider == "gemini":
+            payload = {"error": {"code": status, "message": message, "status": gemini_status}}
+        else:
+            payload = {"error": {"message": message, "type": openai_type, "param": None, "code": str(status)}}
+        self._send_json(status, payload, headers)
+
+    def do_GET(self) -> None:  # noqa: N802 - http.server-Konvention
+        path = self.path.split("?", 1)[0]
+        if path == "/stats":
+            self._send_json(200, self.state.snapshot())
+        elif path == "/healthz":
+            self._send_json(200, {"status": "ok"})
+        elif path == "/v1/models":
+            self._send_json(200, {"object": "list", "data": [{"id": "mock-model", "object": "model", "owned_by": "mock"}]})
+        elif path == "/v1beta/models":
+            self._send_json(200, {"models": [{"name": "models/mock-model", "supportedGenerationMethods": ["generateContent"]}]})
+        else:
+            self._send_json(404, {"error": {"message": f"unknown path {path}"}})
+
+    def do_POST(self) -> None:  # noqa: N802 - http.server-Konvention
+        path = self.path.split("?", 1)[0]
+        body = self._read_body()
+        if path == "/reset":
+            self.state.reset()
+            self._send_json(200, {"status": "reset"})
+            return
+        gemini_match = _GEMINI_PATH_RE.match(path)
+        if gemini_match:
+            self._complete("gemini", gemini_match.group(1), _gemini_prompt(body))
+        elif path in ("/v1/chat/completions", "/chat/completions"):
+            self._complete("openai", str(body.get("model") or "mock-model"), _openai_prompt(body))
+        else:
+            self._send_json(404, {"error": {"message": f"unknown path {path}"}})
+
+    def _complete(self, provider: str, model: str, prompt: str) -> None:
+        state = self.state
+        status, latency = state.next_outcome()
+        if status is not None:
+            time.sleep(latency)
+            self._send_error(status, provider)
+            return
+        stage, text = respond(prompt, state.canned, state.settings.stage1_max_lkns)
+        prompt_tokens = count_tokens(prompt)
+        completion_tokens = count_tokens(text)
+        time.sleep(latency + completion_tokens * state.settings.token_latency_ms / 1000.0)
+        state.account(provider, model, stage, prompt_tokens, completion_tokens)
+        if provider == "gemini":
+            payload: Dict[str, Any] = {
+                "candidates": [{
+                    "content": {"parts": [{"text": text}], "role": "model"},
+                    "finishReason": "STOP",
+                    "index": 0,
+                }],
+                "usageMetadata": {
+                    "promptTokenCount": prompt_tokens,
+                    "candidatesTokenCount": completion_tokens,
+                    "totalTokenCount": prompt_tokens + completion_tokens,
+                },
+                "modelVersion": model,
+            }
+        else:
+            payload = {
+                "id": f"chatcmpl-mock-{time.time_ns()}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": text},
+                    "finish_reason": "stop",
+                }],
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": prompt_tokens + completion_tokens,
+                },
+            }
+        self._send_json(200, payload, {"X-Mock-Stage": stage})
+
+
+class MockLLMServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, settings: MockSettings, verbose: bool = False) -> None:
+        super().__init__((settings.host, settings.port), MockLLMHandler)
+        self.state = MockState(settings)
+        self.verbose = verbose
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+def start_in_thread(settings: MockSettings, verbose: bool = False) -> MockLLMServer:
+    """Startet den Server im Hintergrund (``port=0`` wählt einen freien Port)."""
+    server = MockLLMServer(settings, verbose=verbose)
+    thread = threading.Thread(target=server.serve_forever, name="mock-llm", daemon=True)
+    thread.start()
+    return server
@@ -0,0 +1,186 @@
+"""Deterministische Antworten des Mock-LLM, abgeleitet aus dem Prompt.
+
+Die Stufe wird an den Abschnittsmarkern der Prompts aus ``prompts.py``
+erkannt (``--- Leistungskatalog Start ---``, ``--- Kandidaten Start ---``,
+``--- Pauschalen Start ---``). Die Antwort wählt aus dem mitgeschickten Kontext
+die Einträge mit der grössten Wortüberschneidung zum Behandlungstext; gleiche
+Prompts ergeben so immer die gleiche Antwort. Vorbereitete Antworten
+(``CannedResponses``) haben Vorrang.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import re
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import json_backend
+
+STAGE1 = "stage1"
+STAGE2_MAPPING = "stage2_mapping"
+STAGE2_RANKING = "stage2_ranking"
+UNKNOWN = "unknown"
+
+_CATALOG_RE = re.compile(r"--- Leistungskatalog Start ---\n(.*?)\n--- Leistungskatalog Ende ---", re.S)
+_CANDIDATES_RE = re.compile(r"--- Kandidaten Start ---\n(.*?)\n--- Kandidaten Ende ---", re.S)
+_PAUSCHALEN_RE = re.compile(r"--- Pauschalen Start ---\n(.*?)\n--- Pauschalen Ende ---", re.S)
+_MARKER_RE = re.compile(r"^--- .+ ---$", re.M)
+_CATALOG_LINE_RE = re.compile(r"^LKN: ([^,\s]+)(?:, Typ: ([^,]+))?(.*)$")
+_CANDIDATE_LINE_RE = re.compile(r"^- ([^:\s]+): ?(.*)$")
+_PAUSCHALE_LINE_RE = re.compile(r"^([^:\s]+): ?(.*)$")
+_BEHANDLUNGSTEXT_RE = re.compile(r'^Behandlungstext: "(.*)"$', re.M)
+_TARDOC_DESC_RE = re.compile(r"^(?:Beschreibung|Description|Descrizione): ?(.*)$", re.M)
+_MINUTES_RE = re.compile(r"(\d{1,3})\s*(?:min|minuten|minutes|minuti)\b", re.I)
+_WORD_RE = re.compile(r"\w{4,}", re.U)
+
+
+def prompt_hash(prompt: str) -> str:
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+
+
+def detect_stage(prompt: str) -> str:
+    if "--- Leistungskatalog Start ---" in prompt:
+        return STAGE1
+    if "--- Kandidaten Start ---" in prompt:
+        return STAGE2_MAPPING
+    if "--- Pauschalen Start ---" in prompt:
+        return STAGE2_RANKING
+    return UNKNOWN
+
+
+def _words(text: str) -> set:
+    return {w.lower() for w in _WORD_RE.findall(text or "")}
+
+
+def _rank(query: str, entries: List[Tuple[str, str]]) -> List[str]:
+    """Codes nach Wortüberschneidung mit ``query`` (stabil bei Gleichstand)."""
+    query_words = _words(query)
+    scored = [(-len(query_words & _words(text)), idx, code) for idx, (code, text) in enumerate(entries)]
+    return [code for score, _, code in sorted(scored) if score < 0]
+
+
+def _stage1_user_input(prompt: str, catalog_end: int) -> str:
+    markers = list(_MARKER_RE.finditer(prompt, catalog_end))
+    if len(markers) >= 2:
+        return prompt[markers[-2].end():markers[-1].start()].strip()
+    return prompt[catalog_end:].strip()
+
+
+def derive_stage1(prompt: str, max_lkns: int = 3) -> str:
+    match = _CATALOG_RE.search(prompt)
+    if match is None:
+        return json_backend.dumps({"identified_leistungen": [], "extracted_info": {}, "begruendung_llm": "mock: kein Kontext"})
+    user_input = _stage1_user_input(prompt, match.end())
+    entries: List[Tuple[str, str]] = []
+    types: Dict[str, str] = {}
+    for line in match.group(1).splitlines():
+        parsed = _CATALOG_LINE_RE.match(line.strip())
+        if parsed and parsed.group(1) not in types:
+            types[parsed.group(1)] = (parsed.group(2) or "E").strip()
+            entries.append((parsed.group(1), parsed.group(3) or ""))
+    chosen = _rank(user_input, entries)[: max(1, max_lkns)] or [code for code, _ in entries[:1]]
+    minutes = _MINUTES_RE.search(user_input)
+    result = {
+        "identified_leistungen": [{"lkn": code, "typ": types.get(code, "E"), "menge": 1} for code in chosen],
+        "extracted_info": {
+            "dauer_minuten": int(minutes.group(1)) if minutes else None,
+            "menge_allgemein": None,
+            "alter": None,
+            "alter_operator": None,
+            "geschlecht": None,
+            "seitigkeit": "unbekannt",
+            "anzahl_prozeduren": None,
+        },
+        "begruendung_llm": "mock: Auswahl nach Wortüberschneidung mit dem Kontext",
+    }
+    return json_backend.dumps(result)
+
+
+def derive_stage2_mapping(prompt: str) -> str:
+    match = _CANDIDATES_RE.search(prompt)
+    if match is None:
+        return "NONE"
+    entries = []
+    for line in match.group(1).splitlines():
+        parsed = _CANDIDATE_LINE_RE.match(line.strip())
+        if parsed:
+            entries.append((parsed.group(1), parsed.group(2)))
+    desc = _TARDOC_DESC_RE.search(prompt[: match.start()])
+    ranked = _rank(desc.group(1) if desc else "", entries)
+    return ",".join(ranked[:3]) if ranked else "NONE"
+
+
+def derive_stage2_ranking(prompt: str) -> str:
+    match = _PAUSCHALEN_RE.search(prompt)
+    if match is None:
+        return "NONE"
+    entries = []
+    for line in match.group(1).splitlines():
+        parsed = _PAUSCHALE_LINE_RE.match(line.strip())
+        if parsed:
+            entries.append((parsed.group(1), parsed.group(2)))
+    behandlung = _BEHANDLUNGSTEXT_RE.search(prompt)
+    ranked = _rank(behandlung.group(1) if behandlung else "", entries)
+    return ",".join(ranked[:5]) if ranked else "NONE"
+
+
+class CannedResponses:
+    """Vorbereitete Antworten aus einer JSON-Datei.
+
+    Format: ``{"responses": [{"prompt_sha256": "...", "text": "..."},
+    {"stage": "stage1", "match": "Blinddarm", "text": "..."}]}``. Einträge mit
+    Prompt-Hash treffen exakt, ``match`` als Teilstring des Prompts; der erste
+    passende Eintrag gewinnt.
+    """
+
+    def __init__(self, entries: Optional[List[Dict[str, Any]]] = None) -> None:
+        self.by_hash: Dict[str, str] = {}
+        self.by_match: List[Dict[str, Any]] = []
+        for entry in entries or []:
+            text = entry.get("text")
+            if not isinstance(text, str):
+                continue
+            if entry.get("prompt_sha256"):
+                self.by_hash.setdefault(str(entry["prompt_sha256"]), text)
+            elif entry.get("match"):
+                self.by_match.append(entry)
+
+    @classmethod
+    def from_file(cls, path: Union[str, Path, None]) -> "CannedResponses":
+        if not path:
+            return cls()
+        data = json_backend.load_file(path)
+        entries = data.get("responses") if isinstance(data, dict) else data
+        return cls(entries if isinstance(entries, list) else [])
+
+    def __len__(self) -> int:
+        return len(self.by_hash) + len(self.by_match)
+
+    def lookup(self, prompt: str, stage: str) -> Optional[str]:
+        text = self.by_hash.get(prompt_hash(prompt))
+        if text is not None:
+            return text
+        for entry in self.by_match:
+            if entry.get("stage") not in (None, stage):
+                continue
+            if str(entry["match"]) in prompt:
+                return entry["text"]
+        return None
+
+
+def respond(prompt: str, canned: Optional[CannedResponses] = None, stage1_max_lkns: int = 3) -> Tuple[str, str]:
+    """Liefert ``(stage, text)`` für einen Prompt."""
+    stage = detect_stage(prompt)
+    if canned is not None:
+        text = canned.lookup(prompt, stage)
+        if text is not None:
+            return stage, text
+    if stage == STAGE1:
+        return stage, derive_stage1(prompt, stage1_max_lkns)
+    if stage == STAGE2_MAPPING:
+        return stage, derive_stage2_mapping(prompt)
+    if stage == STAGE2_RANKING:
+        return stage, derive_stage2_ranking(prompt)
+    # z.B. Verbindungstests ("Antworte mit OK")
+    return stage, "OK"
@@ -16,6 +16,9 @@ import configparser
 from typing import Any, Dict, List, Optional, TYPE_CHECKING
 import threading
 import time
+import llm_cassette
+import metrics
+import tracing
 from runtime_config import (
     CONFIG_MAIN_PATH,
     load_merged_config,
@@ -76,6 +79,10 @@ _client_singleton: Optional["OpenAI"] = None
 # Globale LLM-Call-Drossel gemäss config.ini
 def _read_llm_min_interval() -> float:
     try:
+        env_val = os.getenv("LLM_MIN_CALL_INTERVAL_SECONDS")
+        if env_val is not None and env_val.strip():
+            # Überschreibt config.ini, z.B. für Lasttests gegen den Mock-LLM
+            return float(max(0, min(1000, int(env_val))))
         if _CONFIG.has_section("LLM"):
             val = int(_CONFIG.get("LLM", "min_call_interval_seconds", fallback="0") or 0)
             # Begrenze auf 0..1000 Sekunden
@@ -91,7 +98,8 @@ _LAST_CALL_TS: float = 0.0
 def enforce_llm_min_interval() -> None:
     """Erzwingt den konfigurierten Mindestabstand zwischen zwei LLM-Aufrufen.
 
-    Liest den Wert aus [LLM] min_call_interval_seconds (0..1000).
+    Liest den Wert aus [LLM] min_call_interval_seconds (0..1000) bzw. aus der
+    Umgebungsvariable ``LLM_MIN_CALL_INTERVAL_SECONDS``.
     Thread-sicher, prozesslokal.
     """
     interval = _read_llm_min_interval()
@@ -107,8 +115,12 @@ def enforce_llm_min_interval() -> None:
                 logging.info("LLM_THROTTLE_WAIT: Warte %.2fs (min %.2fs) bis zum nächsten Aufruf.", wait, interval)
             except Exception:
                 pass
-            time.sleep(wait)
+            with metrics.span("llm_throttle"):
+                time.sleep(wait)
+        else:
+            wait = 0.0
         _LAST_CALL_TS = time.monotonic()
+    metrics.observe("llm_throttle_wait_seconds", wait)
 
 
 def get_client() -> "OpenAI":
@@ -179,7 +191,34 @@ def chat_completion_safe(
     **kwargs: Any,
 ):
     """Wrapper around ``client.chat.completions.create`` with temperature handling."""
+    if llm_cassette.replaying():
+        # Aufgezeichnete Antwort: weder Client noch Drossel nötig
+        with tracing.span("llm_cassette", provider="openai", model=model):
+            data = llm_cassette.replay("openai", model, llm_cassette.chat_prompt(messages))
+        metrics.inc("llm_requests_total", provider="openai", outcome="replay")
+        return llm_cassette.chat_response_from_dict(data)
     client = client or get_client()
+    # Drossel vor dem eigentlichen Request (zählt nicht zur Netzwerkzeit)
+    enforce_llm_min_interval()
+    outcome = "error"
+    try:
+        with metrics.span("llm_network", provider="openai", model=model):
+            response = _create_with_fallbacks(client, model, messages, kwargs)
+        outcome = "ok"
+        if llm_cassette.recording():
+            llm_cassette.record("openai", model, llm_cassette.chat_prompt(messages), llm_cassette.chat_response_to_dict(response))
+        return response
+    finally:
+        metrics.inc("llm_requests_total", provider="openai", outcome=outcome)
+
+
+def _create_with_fallbacks(
+    client: "OpenAI",
+    model: str,
+    messages: List[ChatCompletionMessageParam],
+    kwargs: Dict[str, Any],
+):
+    """Führt den Request aus und wiederholt ihn bei bekannten Parameterfehlern."""
     if model in FIXED_SAMPLING_MODELS and "temperature" in kwargs:
         logging.debug(
             "Model %s erzwingt feste Temperatur – entferne 'temperature' proaktiv.", model
@@ -192,8 +231,6 @@ def chat_completion_safe(
         )
         kwargs.pop("temperature", None)
     try:
-        # Drossel vor dem eigentlichen Request
-        enforce_llm_min_interval()
         return client.chat.completions.create(model=model, messages=messages, **kwargs)
     except Exception as e:
         # 1) Fallback: 'max_tokens' → 'max_completion_tokens' (neue OpenAI-Modelle)
@@ -205,6 +242,7 @@ def chat_completion_safe(
                 "'%s' verlangt 'max_completion_tokens' statt 'max_tokens' – wiederhole mit umbenanntem Parameter.",
                 model,
             )
+            tracing.add_event("llm.retry_with_param_change", param="max_tokens")
             clean_kwargs = dict(kwargs)
             value = clean_kwargs.pop("max_tokens", None)
             if value is not None:
@@ -218,6 +256,7 @@ def chat_completion_safe(
                 "'%s' unterstützt 'temperature' nicht – speichere in config und wiederhole ohne 'temperature'.",
                 model,
             )
+            tracing.add_event("llm.retry_with_param_change", param="temperature")
             _UNSUPPORTED_TEMPERATURE_MODELS.add(model)
             _persist_temperature_flag(model, False)
             clean_kwargs = dict(kwargs)
@@ -237,6 +276,7 @@ def chat_completion_safe(
                 "'%s' unterstützt 'response_format' nicht – entferne und wiederhole.",
                 model,
             )
+            tracing.add_event("llm.retry_with_param_change", param="response_format")
             clean_kwargs = dict(kwargs)
             clean_kwargs.pop("response_format", None)
             if "extra_body" in clean_kwargs:
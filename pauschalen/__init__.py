@@ -6,6 +6,7 @@ Projektstamm liegen.
 """
 
 from .expression_parser import (
+    compile_boolean_function,
     evaluate_boolean_expression_safe,
     evaluate_rpn,
     shunting_yard,
@@ -20,6 +21,7 @@ from .pauschale_renderer import (
 )
 
 __all__ = [
+    "compile_boolean_function",
     "evaluate_boolean_expression_safe",
     "evaluate_rpn",
     "shunting_yard",
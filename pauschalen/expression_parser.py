@@ -3,10 +3,12 @@
 from __future__ import annotations
 
 from functools import lru_cache
-from typing import Dict, List, Sequence, Tuple
+from operator import itemgetter
+from typing import Callable, Dict, List, Mapping, Sequence, Tuple
 
 __all__ = [
     "compile_boolean_expression",
+    "compile_boolean_function",
     "tokenize_boolean_expression",
     "shunting_yard",
     "evaluate_rpn",
@@ -93,3 +95,63 @@ def evaluate_boolean_expression_safe(expression: str, context: Dict[str, bool])
     """Evaluate a boolean expression string with AND/OR/NOT and parentheses."""
     rpn_queue = compile_boolean_expression(expression or "")
     return evaluate_rpn(rpn_queue, context)
+
+
+BooleanFunction = Callable[[Sequence[bool]], bool]
+
+
+def _constant(value: bool) -> BooleanFunction:
+    return lambda values: value
+
+
+def _and(left: BooleanFunction, right: BooleanFunction) -> BooleanFunction:
+    return lambda values: left(values) and right(values)
+
+
+def _or(left: BooleanFunction, right: BooleanFunction) -> BooleanFunction:
+    return lambda values: left(values) or right(values)
+
+
+def _not(operand: BooleanFunction) -> BooleanFunction:
+    return lambda values: not operand(values)
+
+
+def compile_boolean_function(expression: str, variables: Mapping[str, int]) -> BooleanFunction:
+    """Compile an infix boolean expression into a closure tree over indexed slots.
+
+    ``variables`` maps variable names to positions in the value sequence passed
+    to the returned function. Semantics match :func:`evaluate_rpn` (unknown
+    names are ``False``); malformed expressions raise when the function is called.
+    """
+    stack: List[BooleanFunction] = []
+    try:
+        for token in shunting_yard(tokenize_boolean_expression(expression or "")):
+            if token == "and":
+                right = stack.pop()
+                stack.append(_and(stack.pop(), right))
+            elif token == "or":
+                right = stack.pop()
+                stack.append(_or(stack.pop(), right))
+            elif token == "not":
+                stack.append(_not(stack.pop()))
+            else:
+                lowered = token.lower()
+                if lowered == "true":
+                    stack.append(_constant(True))
+                elif lowered == "false":
+                    stack.append(_constant(False))
+                elif token in variables:
+                    stack.append(itemgetter(variables[token]))
+                else:
+                    stack.append(_constant(False))
+    except IndexError as exc:
+        error = exc
+
+        def _malformed(values: Sequence[bool]) -> bool:
+            raise error
+
+        return _malformed
+
+    if not stack:
+        return _constant(False)
+    return stack[0]
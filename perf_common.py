@@ -0,0 +1,55 @@
+"""Gemeinsame Helfer der Mess-Werkzeuge (Benchmarks, Qualitätslauf, Lasttest, LLM-Vergleich).
+
+Bewusst ohne Abhängigkeiten auf ``benchmarks`` oder ``server``, damit jedes
+Werkzeug sie importieren kann, ohne die anderen mitzuladen.
+"""
+
+from __future__ import annotations
+
+import math
+import subprocess
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Optional, Sequence
+
+
+@dataclass
+class Thresholds:
+    """Regressionsschwellen (relativ) und Mindestabstand gegen Messrauschen."""
+
+    time_ratio: float = 0.25
+    alloc_ratio: float = 0.5
+    min_delta_ms: float = 1.0
+    min_delta_kib: float = 64.0
+    metric: str = "p50"
+    per_benchmark: Dict[str, float] = field(default_factory=dict)
+
+    def time_ratio_for(self, name: str) -> float:
+        return self.per_benchmark.get(name, self.time_ratio)
+
+
+def percentile(values: Sequence[float], q: float) -> float:
+    """Perzentil mit linearer Interpolation (wie ``numpy.percentile``)."""
+    if not values:
+        return math.nan
+    ordered = sorted(values)
+    pos = (len(ordered) - 1) * q / 100.0
+    lower = math.floor(pos)
+    upper = math.ceil(pos)
+    if lower == upper:
+        return ordered[int(pos)]
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (pos - lower)
+
+
+def git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=Path(__file__).resolve().parent,
+            capture_output=True,
+            text=True,
+            timeout=5,
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return out.stdout.strip() or None
@@ -0,0 +1,205 @@
+"""Profiling einzelner Produktionsanfragen (cProfile oder Stack-Sampler).
+
+Profiliert wird jede N-te Anfrage (``sample_every``) sowie Anfragen mit dem
+Admin-Header ``X-Profile-Token`` (Wert aus der Umgebungsvariable
+``PROFILING_ADMIN_TOKEN``). Ergebnisse landen unter ``logs/profiles/``:
+
+* ``cprofile``: ``<zeit>_<request-id>.pstats`` (``python -m pstats``, snakeviz)
+* ``sampler``: ``<zeit>_<request-id>.collapsed`` – Stack-Stichproben des
+  Request-Threads im "collapsed"-Format (flamegraph.pl, speedscope)
+
+Ist das Profiling deaktiviert, kostet der Hook nur eine Bool-Abfrage pro
+Anfrage. Auflisten/Abrufen über ``/api/profiles`` oder
+``scripts/profiles.py``.
+"""
+
+from __future__ import annotations
+
+import cProfile
+import hmac
+import itertools
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+MODES = ("cprofile", "sampler")
+SUFFIXES = {"cprofile": ".pstats", "sampler": ".collapsed"}
+PROFILE_NAME_RE = re.compile(r"^[A-Za-z0-9_.-]+\.(pstats|collapsed)$")
+
+_enabled = False
+_sample_every = 0
+_mode = "cprofile"
+_interval = 0.005
+_max_files = 50
+_directory = Path("logs/profiles")
+_admin_token = ""
+_counter = itertools.count(1)
+
+
+def configure(
+    enabled: bool = False,
+    *,
+    sample_every: int = 0,
+    mode: str = "cprofile",
+    directory: Union[str, Path] = "logs/profiles",
+    interval_ms: float = 5.0,
+    max_files: int = 50,
+    admin_token: str = "",
+) -> None:
+    global _enabled, _sample_every, _mode, _interval, _max_files, _directory, _admin_token, _counter
+    _enabled = bool(enabled)
+    _sample_every = max(0, int(sample_every))
+    _mode = mode if mode in MODES else "cprofile"
+    _directory = Path(directory)
+    _interval = max(0.001, float(interval_ms) / 1000.0)
+    _max_files = max(1, int(max_files))
+    _admin_token = admin_token or ""
+    _counter = itertools.count(1)
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def profile_directory() -> Path:
+    return _directory
+
+
+def token_matches(candidate: Optional[str]) -> bool:
+    """Prüft den Admin-Header; ohne konfiguriertes Token immer ``False``."""
+    if not _admin_token or not candidate:
+        return False
+    return hmac.compare_digest(str(candidate), _admin_token)
+
+
+def should_profile(admin_header: Optional[str] = None) -> bool:
+    """Entscheidet pro Anfrage, ob profiliert wird (Admin-Header oder jede N-te)."""
+    if not _enabled:
+        return False
+    if token_matches(admin_header):
+        return True
+    return _sample_every > 0 and next(_counter) % _sample_every == 0
+
+
+def _safe_name(value: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_.-]+", "-", value).strip("-")[:80] or "request"
+
+
+class _StackSampler:
+    """Nimmt in festen Abständen den Stack eines Threads auf (statistisches Profil)."""
+
+    def __init__(self, thread_id: int, interval: float) -> None:
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples: Counter[str] = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def _run(self) -> None:
+        own_file = __file__
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            frames: List[str] = []
+            while frame is not None:
+                code = frame.f_code
+                if code.co_filename != own_file:
+                    frames.append(f"{Path(code.co_filename).stem}:{code.co_name}:{code.co_firstlineno}".replace(";", ":"))
+                frame = frame.f_back
+            if frames:
+                self.samples[";".join(reversed(frames))] += 1
+
+    def stop(self) -> Counter[str]:
+        self._stop.set()
+        self._thread.join()
+        return self.samples
+
+
+class ProfileSession:
+    """Laufendes Profil einer Anfrage; ``stop`` schreibt die Datei."""
+
+    def __init__(self, request_id: str, mode: Optional[str] = None) -> None:
+        self.mode = mode if mode in MODES else _mode
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime())
+        self.path = _directory / f"{stamp}_{_safe_name(request_id)}{SUFFIXES[self.mode]}"
+        self._profiler: Optional[cProfile.Profile] = None
+        self._sampler: Optional[_StackSampler] = None
+        if self.mode == "sampler":
+            self._sampler = _StackSampler(threading.get_ident(), _interval)
+            self._sampler.start()
+        else:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+
+    def stop(self) -> Optional[Path]:
+        if self._profiler is not None:
+            self._profiler.disable()
+        samples = self._sampler.stop() if self._sampler is not None else None
+        target = self.path
+        try:
+            _directory.mkdir(parents=True, exist_ok=True)
+            if self._profiler is not None:
+                self._profiler.dump_stats(str(target))
+            else:
+                lines = [f"{stack} {count}" for stack, count in (samples or Counter()).most_common()]
+                target.write_text("\n".join(lines) + "\n", encoding="utf-8")
+        except OSError:
+            return None
+        prune()
+        return target
+
+
+def start(request_id: str, mode: Optional[str] = None) -> ProfileSession:
+    return ProfileSession(request_id, mode)
+
+
+def list_profiles(limit: int = 50) -> List[Dict[str, Any]]:
+    """Neueste Profile zuerst."""
+    if not _directory.is_dir():
+        return []
+    entries = []
+    for path in _directory.iterdir():
+        if not PROFILE_NAME_RE.match(path.name):
+            continue
+        stat = path.stat()
+        entries.append({
+            "name": path.name,
+            "format": path.suffix.lstrip("."),
+            "size": stat.st_size,
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(stat.st_mtime)),
+            "_mtime": stat.st_mtime,
+        })
+    entries.sort(key=lambda e: e["_mtime"], reverse=True)
+    for entry in entries:
+        entry.pop("_mtime")
+    return entries[: max(0, limit)]
+
+
+def resolve_profile(name: str) -> Optional[Path]:
+    """Pfad eines Profils; nur Dateinamen aus dem Profilverzeichnis sind erlaubt."""
+    if not PROFILE_NAME_RE.match(name or ""):
+        return None
+    path = _directory / name
+    return path if path.is_file() else None
+
+
+def prune() -> None:
+    """Behält nur die neuesten ``max_files`` Profile."""
+    if not _directory.is_dir():
+        return
+    files = sorted(
+        (p for p in _directory.iterdir() if PROFILE_NAME_RE.match(p.name)),
+        key=lambda p: p.stat().st_mtime,
+        reverse=True,
+    )
+    for old in files[_max_files:]:
+        try:
+            old.unlink()
+        except OSError:
+            pass
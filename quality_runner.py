@@ -0,0 +1,274 @@
+"""Paralleler Lauf der Qualitäts-Baseline mit Zeit- und Token-Aufschlüsselung.
+
+``run_examples`` schickt die Baseline-Fälle mit ``workers`` Threads (je ein
+Flask-Test-Client) an ``/api/test-example``. Die LLM-Drossel
+(``[LLM] min_call_interval_seconds``) ist prozessweit und gilt damit auch über
+alle Worker; Wartezeiten erscheinen als Abschnitt ``llm_throttle``.
+
+Pro Fall werden die Abschnittsdauern aus dem ``Server-Timing``-Header
+(``metrics.span``: Kontextaufbau, Suche, LLM-Stufen, Netzwerk, Regelprüfung,
+Pauschalen, Serialisierung) und die Tokenzahlen aus ``token_usage`` der
+Antwort übernommen. ``build_report`` fasst alles als JSON-Bericht zusammen,
+``diff_reports`` vergleicht zwei Berichte auf Genauigkeits- und
+Latenzregressionen.
+"""
+
+from __future__ import annotations
+
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+import json_backend
+from perf_common import Thresholds, git_commit, percentile
+
+REPORT_VERSION = 1
+TOKEN_STAGES = ("llm_stage1", "llm_stage2")
+
+_TIMING_RE = re.compile(r"\s*([^;,\s]+)\s*;\s*dur=([0-9.]+)")
+
+
+def parse_server_timing(header: Optional[str]) -> Dict[str, float]:
+    """``"context_build;dur=12.5, total;dur=80.1"`` -> ``{"context_build": 12.5, "total": 80.1}`` (ms)."""
+    timings: Dict[str, float] = {}
+    for part in (header or "").split(","):
+        match = _TIMING_RE.match(part)
+        if match:
+            timings[match.group(1)] = float(match.group(2))
+    return timings
+
+
+def baseline_examples(baseline: Mapping[str, Any], langs: Optional[Iterable[str]] = None) -> List[Tuple[str, str]]:
+    """``(id, lang)``-Paare in Dateireihenfolge; ``_``-Schlüssel (Gruppen) werden übersprungen."""
+    wanted = set(langs) if langs else None
+    examples = []
+    for ex_id, entry in baseline.items():
+        if ex_id.startswith("_") or not isinstance(entry, dict):
+            continue
+        for lang in (entry.get("query") or {}):
+            if wanted is None or lang in wanted:
+                examples.append((ex_id, lang))
+    return examples
+
+
+def _tokens(token_usage: Any) -> Dict[str, Dict[str, int]]:
+    tokens = {}
+    for stage in TOKEN_STAGES:
+        src = token_usage.get(stage) if isinstance(token_usage, dict) else None
+        src = src if isinstance(src, dict) else {}
+        tokens[stage] = {
+            "input_tokens": int(src.get("input_tokens", 0) or 0),
+            "output_tokens": int(src.get("output_tokens", 0) or 0),
+        }
+    return tokens
+
+
+def run_example(client: Any, ex_id: str, lang: str) -> Dict[str, Any]:
+    started = time.perf_counter()
+    resp = client.post("/api/test-example", json={"id": int(ex_id), "lang": lang})
+    duration = time.perf_counter() - started
+    record: Dict[str, Any] = {
+        "id": ex_id,
+        "lang": lang,
+        "status": resp.status_code,
+        "duration_ms": round(duration * 1000.0, 1),
+        "timings_ms": parse_server_timing(resp.headers.get("Server-Timing")),
+        "trace_id": resp.headers.get("X-Trace-Id"),
+    }
+    data = resp.get_json(silent=True) or {}
+    if resp.status_code != 200:
+        record.update(passed=False, diff="", error=data.get("error") or f"HTTP {resp.status_code}", tokens=_tokens({}))
+        return record
+    record.update(
+        passed=bool(data.get("passed")),
+        diff=data.get("diff", ""),
+        result=data.get("result"),
+        tokens=_tokens(data.get("token_usage")),
+    )
+    return record
+
+
+def run_examples(
+    app: Any,
+    examples: Sequence[Tuple[str, str]],
+    *,
+    workers: int = 1,
+    wrap: Optional[Callable[[str, str], Any]] = None,
+    progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> Tuple[List[Dict[str, Any]], float]:
+    """Führt alle Fälle aus; liefert die Einträge in Eingabereihenfolge und die Gesamtdauer (s).
+
+    ``wrap(id, lang)`` kann einen Kontextmanager pro Fall liefern (z.B.
+    ``llm_cassette.scope``).
+    """
+    local = threading.local()
+
+    def _one(example: Tuple[str, str]) -> Dict[str, Any]:
+        client = getattr(local, "client", None)
+        if client is None:
+            client = local.client = app.test_client()
+        ex_id, lang = example
+        if wrap is not None:
+            with wrap(ex_id, lang):
+                record = run_example(client, ex_id, lang)
+        else:
+            record = run_example(client, ex_id, lang)
+        if progress is not None:
+            progress(record)
+        return record
+
+    started = time.perf_counter()
+    if workers <= 1:
+        records = [_one(example) for example in examples]
+    else:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="quality") as pool:
+            records = list(pool.map(_one, examples))
+    return records, time.perf_counter() - started
+
+
+def _distribution(values: Sequence[float]) -> Dict[str, float]:
+    if not values:
+        return {}
+    return {
+        "mean": round(sum(values) / len(values), 1),
+        "p50": round(percentile(values, 50), 1),
+        "p95": round(percentile(values, 95), 1),
+        "max": round(max(values), 1),
+    }
+
+
+def build_report(records: Sequence[Dict[str, Any]], wall_seconds: float, **meta: Any) -> Dict[str, Any]:
+    total = len(records)
+    passed = sum(1 for r in records if r.get("passed"))
+    stages = sorted({stage for r in records for stage in r.get("timings_ms", {})})
+    tokens = {stage: {"input_tokens": 0, "output_tokens": 0} for stage in TOKEN_STAGES}
+    for record in records:
+        for stage, counts in (record.get("tokens") or {}).items():
+            for direction, value in counts.items():
+                tokens.setdefault(stage, {}).setdefault(direction, 0)
+                tokens[stage][direction] += value
+    return {
+        "version": REPORT_VERSION,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "git_commit": git_commit(),
+        **meta,
+        "summary": {
+            "total": total,
+            "passed": passed,
+            "pass_rate": round(passed / total * 100, 2) if total else 0.0,
+            "errors": sum(1 for r in records if r.get("status") != 200),
+            "wall_seconds": round(wall_seconds, 2),
+            "duration_ms": _distribution([r["duration_ms"] for r in records]),
+            "stages_ms": {
+                stage: _distribution([r["timings_ms"][stage] for r in records if stage in r.get("timings_ms", {})])
+                for stage in stages
+            },
+            "tokens": tokens,
+        },
+        "examples": list(records),
+    }
+
+
+def save_report(path: Path, report: Mapping[str, Any]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json_backend.dumps(report, indent=True), encoding="utf-8")
+
+
+def load_report(path: Path) -> Dict[str, Any]:
+    data = json_backend.load_file(path)
+    if not isinstance(data, dict) or "examples" not in data:
+        raise ValueError(f"{path}: kein Qualitätsbericht")
+    return data
+
+
+def _slower(old: Optional[float], new: Optional[float], thresholds: Thresholds) -> bool:
+    if old is None or new is None:
+        return False
+    return new - old > thresholds.min_delta_ms and new > old * (1 + thresholds.time_ratio)
+
+
+def diff_reports(old: Mapping[str, Any], new: Mapping[str, Any], thresholds: Thresholds) -> Dict[str, Any]:
+    """Vergleicht zwei Berichte: Genauigkeit pro Fall, Latenz pro Fall und Abschnitt, Tokens."""
+    old_examples = {(r["id"], r["lang"]): r for r in old.get("examples") or []}
+    new_examples = {(r["id"], r["lang"]): r for r in new.get("examples") or []}
+    newly_failing, newly_passing, changed, slower = [], [], [], []
+    for key, current in new_examples.items():
+        previous = old_examples.get(key)
+        if previous is None:
+            continue
+        label = f"{key[0]}/{key[1]}"
+        if previous.get("passed") and not current.get("passed"):
+            newly_failing.append({"example": label, "diff": current.get("diff") or current.get("error", "")})
+        elif current.get("passed") and not previous.get("passed"):
+            newly_passing.append({"example": label})
+        elif previous.get("result") != current.get("result"):
+            changed.append({"example": label, "previous": previous.get("result"), "current": current.get("result")})
+        if _slower(previous.get("duration_ms"), current.get("duration_ms"), thresholds):
+            slower.append({"example": label, "previous": previous["duration_ms"], "current": current["duration_ms"]})
+
+    metric = thresholds.metric if thresholds.metric in ("mean", "p50", "p95", "max") else "p50"
+    old_stages = (old.get("summary") or {}).get("stages_ms") or {}
+    stages = []
+    for stage, values in ((new.get("summary") or {}).get("stages_ms") or {}).items():
+        before = (old_stages.get(stage) or {}).get(metric)
+        after = values.get(metric)
+        stages.append({
+            "stage": stage,
+            "previous": before,
+            "current": after,
+            "regression": _slower(before, after, thresholds),
+        })
+
+    def _token_sum(report: Mapping[str, Any]) -> int:
+        tokens = (report.get("summary") or {}).get("tokens") or {}
+        return sum(int(v) for counts in tokens.values() for v in counts.values())
+
+    old_summary, new_summary = old.get("summary") or {}, new.get("summary") or {}
+    return {
+        "previous": {"timestamp": old.get("timestamp"), "git_commit": old.get("git_commit")},
+        "current": {"timestamp": new.get("timestamp"), "git_commit": new.get("git_commit")},
+        "compared": len(set(old_examples) & set(new_examples)),
+        "pass_rate": {"previous": old_summary.get("pass_rate"), "current": new_summary.get("pass_rate")},
+        "newly_failing": newly_failing,
+        "newly_passing": newly_passing,
+        "changed_results": changed,
+        "slower_examples": slower,
+        "stage_metric": metric,
+        "stages": stages,
+        "tokens": {"previous": _token_sum(old), "current": _token_sum(new)},
+    }
+
+
+def has_regressions(diff: Mapping[str, Any]) -> bool:
+    return bool(diff["newly_failing"] or diff["slower_examples"] or any(s["regression"] for s in diff["stages"]))
+
+
+def format_diff(diff: Mapping[str, Any]) -> str:
+    pass_rate = diff["pass_rate"]
+    lines = [
+        f"Vergleich {diff['previous']['timestamp']} ({diff['previous']['git_commit'] or '-'}) -> "
+        f"{diff['current']['timestamp']} ({diff['current']['git_commit'] or '-'}), {diff['compared']} Fälle",
+        f"Erfolgsquote: {pass_rate['previous']} % -> {pass_rate['current']} %",
+        f"Tokens gesamt: {diff['tokens']['previous']} -> {diff['tokens']['current']}",
+    ]
+    for item in diff["newly_failing"]:
+        lines.append(f"NEU FEHLERHAFT {item['example']}: {item['diff']}")
+    for item in diff["newly_passing"]:
+        lines.append(f"neu bestanden  {item['example']}")
+    for item in diff["changed_results"]:
+        lines.append(f"Ergebnis geändert {item['example']}")
+    for item in diff["slower_examples"]:
+        lines.append(f"LANGSAMER {item['example']}: {item['previous']:.0f} -> {item['current']:.0f} ms")
+    lines.append(f"\n{'abschnitt':<22}{'vorher':>10}{'jetzt':>10}{'Δ':>8}   ({diff['stage_metric']}, ms)")
+    for stage in diff["stages"]:
+        before, after = stage["previous"], stage["current"]
+        delta = f"{(after / before - 1) * 100:>+7.0f}%" if before and after is not None else f"{'':>8}"
+        flag = "  REGRESSION" if stage["regression"] else ""
+        lines.append(
+            f"{stage['stage']:<22}{'-' if before is None else f'{before:.1f}':>10}"
+            f"{'-' if after is None else f'{after:.1f}':>10}{delta}{flag}"
+        )
+    return "\n".join(lines)
@@ -9,15 +9,20 @@ optionale Zuschläge, Patientendaten, ICD-Vorgaben u.v.m. Der öffentliche Einst
 ``pruefe_abrechnungsfaehigkeit`` wird von ``server.py`` nach den LLM-Vorschlägen
 aufgerufen und liefert strukturierte Fehler zurück, damit die Oberfläche
 verletzte Regeln hervorheben kann.
+
+Für den Serverbetrieb wird das Regelwerk beim Laden mit ``compile_regelwerk``
+in typisierte Regelobjekte übersetzt (frozensets, Kapitel-Präfixe, aufgelöste
+Leistungsgruppen); ``pruefe_leistungen`` prüft damit alle LKNs eines Falls in
+einem Durchgang.
 """
 import configparser
 import logging
 import re
 from collections.abc import Iterable
 from dataclasses import dataclass, field
-from typing import Any, Callable, Dict, List, Mapping, MutableMapping, Optional, Sequence, Set, TypedDict, cast
+from typing import Any, Dict, FrozenSet, List, Mapping, MutableMapping, Optional, Sequence, Set, Tuple, TypedDict, cast
 
-from utils import get_lang_field
+from utils import get_lang_field, translate
 
 logger = logging.getLogger(__name__)
 
@@ -34,6 +39,10 @@ REGEL_MOEG_ZUSATZPOSITIONEN = "Mögliche Zusatzpositionen"
 REGEL_PAT_BEDINGUNG = "Patientenbedingung"  # Neuer, generischer Typ
 REGEL_DIAGNOSE = "Diagnosepflicht"
 REGEL_PAUSCHAL_AUSSCHLUSS = "Pauschalenausschluss"
+
+# Schweregrad eines RuleOutcome: "error" sperrt die Leistung, "adjusted" passt nur die Menge an.
+SEVERITY_ERROR = "error"
+SEVERITY_ADJUSTED = "adjusted"
 # Regex-Pattern zur Erkennung von Varianten
 REGEX_NICHT_KUMULIERBAR_VARIANT = re.compile(
     r"^Nicht kumulierbar(?:\s*\(([^)]*)\))?\s*mit$"
@@ -86,26 +95,81 @@ class RuleEvaluationContext:
     lkn: str
     menge: int
     begleit: List[str]
+    begleit_set: FrozenSet[str]
     begleit_typen: Dict[str, str]
-    leistungsgruppen_map: Dict[str, Set[str]]
-    medications: List[str]
+    medications: FrozenSet[str]
+    icds: FrozenSet[str]
+    pauschalen: FrozenSet[str]
+
+
+@dataclass(frozen=True)
+class RuleOutcome:
+    """Strukturiertes Ergebnis einer verletzten Regel.
+
+    ``code`` ist ein Übersetzungsschlüssel aus ``utils._TRANSLATIONS``; der Text
+    entsteht erst mit ``render`` in der gewünschten Sprache. ``adjusted_menge``
+    ist gesetzt, wenn die Leistung mit reduzierter Menge abrechenbar bleibt;
+    solche Ergebnisse haben ``severity`` ``SEVERITY_ADJUSTED``.
+    """
+
+    code: str
+    params: Mapping[str, Any] = field(default_factory=dict)
+    severity: str = SEVERITY_ERROR
+    adjusted_menge: Optional[int] = None
+
+    def render(self, lang: str = "de") -> str:
+        params = dict(self.params)
+        if self.code == "rule_patient_age":
+            params["detail"] = _render_age_bounds(params, lang)
+        return translate(self.code, lang, **params)
+
+
+def _render_age_bounds(params: Mapping[str, Any], lang: str) -> str:
+    """Verletzte Altersgrenzen (``min``/``max``/``exact``) in der Zielsprache."""
+    return " ".join(
+        translate(f"rule_patient_age_{bound}", lang, value=params[bound])
+        for bound in ("min", "max", "exact")
+        if params.get(bound) is not None
+    )
+
+
+@dataclass
+class RuleCheckResult:
+    abrechnungsfaehig: bool = True
+    outcomes: List[RuleOutcome] = field(default_factory=list)
+
+    @property
+    def adjusted_menge(self) -> Optional[int]:
+        """Erste von einer Regel vorgeschlagene Ersatzmenge (z.B. Mengenbeschränkung)."""
+        return next(
+            (o.adjusted_menge for o in self.outcomes if o.adjusted_menge is not None),
+            None,
+        )
+
+    def fehler(self, lang: str = "de") -> List[str]:
+        return [outcome.render(lang) for outcome in self.outcomes]
+
+    def as_dict(self, lang: str = "de") -> dict:
+        return {"abrechnungsfaehig": self.abrechnungsfaehig, "fehler": self.fehler(lang)}
 
 
 @dataclass
 class RuleEvaluationState:
-    errors: List[str] = field(default_factory=list)
+    outcomes: List[RuleOutcome] = field(default_factory=list)
     allowed: bool = True
-    moegliche_zusatzpositionen: List[str] = field(default_factory=list)
-    hat_kumulierbar_regel: bool = False
 
-    def add_error(self, message: str) -> None:
-        self.errors.append(message)
+    def add(
+        self,
+        code: str,
+        /,
+        adjusted_menge: Optional[int] = None,
+        severity: str = SEVERITY_ERROR,
+        **params: Any,
+    ) -> None:
+        self.outcomes.append(RuleOutcome(code, params, severity, adjusted_menge))
         self.allowed = False
 
 
-RuleHandler = Callable[[RegelDefinition, RuleEvaluationContext, RuleEvaluationState], None]
-
-
 # --- Hauptfunktion zur Regelprüfung für LKNs ---
 def _normalize_rule_codes(
     entries: object,
@@ -159,10 +223,7 @@ def _extract_medications(fall_data: Mapping[str, Any]) -> List[str]:
     return _normalize_fall_codes(medications)
 
 
-def _build_rule_context(
-    fall_data: FallKontext,
-    leistungsgruppen_map: Mapping[str, Sequence[str]] | None,
-) -> RuleEvaluationContext:
+def _build_rule_context(fall_data: FallKontext) -> RuleEvaluationContext:
     lkn = str(fall_data.get("LKN") or "").upper()
     menge = int(fall_data.get("Menge", 0) or 0)
     begleit = _normalize_fall_codes(fall_data.get("Begleit_LKNs") or [])
@@ -177,253 +238,380 @@ def _build_rule_context(
         lkn=lkn,
         menge=menge,
         begleit=begleit,
+        begleit_set=frozenset(begleit),
         begleit_typen=begleit_typen,
-        leistungsgruppen_map=_normalize_leistungsgruppen_map(leistungsgruppen_map),
-        medications=_extract_medications(fall_data),
+        medications=frozenset(_extract_medications(fall_data)),
+        icds=frozenset(_normalize_fall_codes(fall_data.get("ICD", []))),
+        pauschalen=frozenset(_normalize_fall_codes(fall_data.get("Pauschalen", []))),
     )
 
 
-def _check_rule_menge(
-    rule: RegelDefinition,
-    ctx: RuleEvaluationContext,
-    state: RuleEvaluationState,
-) -> None:
-    max_menge = rule.get("MaxMenge")
-    if isinstance(max_menge, (int, float)) and ctx.menge > max_menge:
-        state.add_error(
-            f"Mengenbeschränkung überschritten (max. {max_menge}, angefragt {ctx.menge})"
-        )
+# --- Kompilierte Regeln ---
+@dataclass(frozen=True)
+class LknSelector:
+    """Vorkompilierte LKN-Liste einer Kumulationsregel.
 
+    Einzelcodes liegen als frozenset vor, ``Kapitel``-Einträge als Präfix-Tupel
+    und Leistungsgruppen sind bereits in ihre LKNs aufgelöst. Eine unbekannte
+    Leistungsgruppe erlaubt jede LKN (``allows_all``).
+    """
 
-def _check_rule_zuschlag(
-    rule: RegelDefinition,
-    ctx: RuleEvaluationContext,
-    state: RuleEvaluationState,
-) -> None:
-    parents = _normalize_rule_codes(rule.get("LKNs") or rule.get("LKN"))
-    if not parents:
-        logger.info(
-            "Regel 'Nur als Zuschlag zu' ohne Basisangabe bei LKN %s ignoriert.",
-            ctx.lkn,
-        )
-        return
-    if not any(parent in ctx.begleit for parent in parents):
-        state.add_error(
-            "Nur als Zuschlag zu " + ", ".join(parents) + " zulässig (Basis fehlt)"
+    entries: Tuple[str, ...]
+    codes: FrozenSet[str] = frozenset()
+    kapitel_prefixes: Tuple[str, ...] = ()
+    allows_all: bool = False
+
+    def allows(self, code: str) -> bool:
+        return self.allows_all or code in self.codes or code.startswith(self.kapitel_prefixes)
+
+    def allows_any(self, codes: Sequence[str], code_set: FrozenSet[str]) -> bool:
+        if self.allows_all or not self.codes.isdisjoint(code_set):
+            return True
+        return bool(self.kapitel_prefixes) and any(
+            code.startswith(self.kapitel_prefixes) for code in codes
         )
 
 
-def _collect_possible_additions(
-    rule: RegelDefinition,
-    ctx: RuleEvaluationContext,
-    state: RuleEvaluationState,
-) -> None:
-    zusatz = _normalize_rule_codes(rule.get("LKNs") or rule.get("LKN"))
-    state.moegliche_zusatzpositionen.extend(zusatz)
+def _compile_lkn_selector(
+    entries: Sequence[str],
+    leistungsgruppen_map: Mapping[str, Set[str]],
+) -> LknSelector:
+    codes: Set[str] = set()
+    prefixes: List[str] = []
+    allows_all = False
+    for entry in entries:
+        entry_upper = entry.strip().upper()
+        if entry_upper.startswith("KAPITEL"):
+            prefixes.append(entry_upper.replace("KAPITEL", "").strip())
+        elif entry_upper.startswith("LEISTUNGSGRUPPE"):
+            gruppe = entry_upper.replace("LEISTUNGSGRUPPE", "").strip()
+            group_lkns = leistungsgruppen_map.get(gruppe)
+            if group_lkns is None:
+                allows_all = True
+            else:
+                codes.update(group_lkns)
+        else:
+            codes.add(entry_upper)
+    return LknSelector(
+        entries=tuple(entries),
+        codes=frozenset(codes),
+        kapitel_prefixes=tuple(dict.fromkeys(prefixes)),
+        allows_all=allows_all,
+    )
 
 
-def _check_rule_patient_condition(
-    rule: RegelDefinition,
-    ctx: RuleEvaluationContext,
-    state: RuleEvaluationState,
-) -> None:
-    field = rule.get("Feld")
-    if not field:
-        return
-    wert_regel = rule.get("Wert")
-    min_val = rule.get("MinWert")
-    max_val = rule.get("MaxWert")
-    wert_fall = ctx.fall.get(field)
-
-    bedingung_text = f"Patientenbedingung ({field})"
-    field_normalized = str(field).upper()
-
-    if wert_fall is None:
-        state.add_error(f"{bedingung_text} nicht erfüllt: Kontextwert fehlt")
-        return
-
-    if field == "Alter":
-        try:
-            alter_patient = int(wert_fall)
-        except (TypeError, ValueError):
-            state.add_error(
-                f"{bedingung_text}: Ungültiger Alterswert im Fall ({wert_fall})"
+@dataclass(frozen=True)
+class MengenRegel:
+    max_menge: int | float
+
+    def check(self, ctx: RuleEvaluationContext, state: RuleEvaluationState) -> None:
+        if ctx.menge > self.max_menge:
+            state.add(
+                "rule_qty_exceeded",
+                adjusted_menge=int(self.max_menge),
+                severity=SEVERITY_ADJUSTED,
+                max=self.max_menge,
+                req=ctx.menge,
             )
+
+
+@dataclass(frozen=True)
+class ZuschlagRegel:
+    parents: Tuple[str, ...]
+    parent_set: FrozenSet[str]
+
+    def check(self, ctx: RuleEvaluationContext, state: RuleEvaluationState) -> None:
+        if self.parent_set.isdisjoint(ctx.begleit_set):
+            state.add("rule_only_supplement", code=", ".join(self.parents))
+
+
+_MEDIKAMENT_FELDER = frozenset({"GTIN", "MEDIKAMENTE", "MEDIKAMENT", "ATC"})
+
+
+@dataclass(frozen=True)
+class PatientenRegel:
+    feld: str
+    wert: Any = None
+    min_wert: Any = None
+    max_wert: Any = None
+    required_medications: Tuple[str, ...] = ()
+
+    def check(self, ctx: RuleEvaluationContext, state: RuleEvaluationState) -> None:
+        field_name = self.feld
+        wert_fall = ctx.fall.get(field_name)
+
+        if wert_fall is None:
+            state.add("rule_patient_field_missing", field=field_name)
+            return
+
+        if field_name == "Alter":
+            try:
+                alter_patient = int(wert_fall)
+            except (TypeError, ValueError):
+                state.add("rule_patient_age_invalid", value=wert_fall)
+                return
+            bounds = {
+                "min": self.min_wert if self.min_wert is not None and alter_patient < int(self.min_wert) else None,
+                "max": self.max_wert if self.max_wert is not None and alter_patient > int(self.max_wert) else None,
+                "exact": self.wert if self.wert is not None and alter_patient != int(self.wert) else None,
+            }
+            if any(bound is not None for bound in bounds.values()):
+                state.add("rule_patient_age", field=field_name, value=alter_patient, **bounds)
             return
-        range_parts: List[str] = []
-        if min_val is not None and alter_patient < int(min_val):
-            range_parts.append(f"min. {min_val}")
-        if max_val is not None and alter_patient > int(max_val):
-            range_parts.append(f"max. {max_val}")
-        if wert_regel is not None and alter_patient != int(wert_regel):
-            range_parts.append(f"exakt {wert_regel}")
-        if range_parts:
-            state.add_error(
-                f"{bedingung_text} ({' '.join(range_parts)}) nicht erfüllt (Patient: {alter_patient})"
-            )
-        return
 
-    if field == "Geschlecht":
-        if isinstance(wert_regel, str) and isinstance(wert_fall, str):
-            if wert_fall.lower() != wert_regel.lower():
-                state.add_error(
-                    f"{bedingung_text}: erwartet '{wert_regel}', gefunden '{wert_fall}'"
+        if field_name == "Geschlecht":
+            if isinstance(self.wert, str) and isinstance(wert_fall, str):
+                if wert_fall.lower() != self.wert.lower():
+                    state.add("rule_patient_gender_mismatch", exp=self.wert, found=wert_fall)
+            else:
+                state.add("rule_patient_gender_invalid")
+            return
+
+        if str(field_name).upper() in _MEDIKAMENT_FELDER:
+            if not any(req.upper() in ctx.medications for req in self.required_medications):
+                state.add(
+                    "rule_patient_medication_missing",
+                    field=field_name,
+                    required=list(self.required_medications),
                 )
-        else:
-            state.add_error(
-                f"{bedingung_text}: Ungültige Werte für Geschlechtsprüfung"
-            )
-        return
+            return
 
-    if field_normalized in {"GTIN", "MEDIKAMENTE", "MEDIKAMENT", "ATC"}:
-        required_medications = (
-            [str(wert_regel)]
-            if isinstance(wert_regel, (str, int))
-            else [str(w) for w in (wert_regel or [])]
+        logger.info(
+            "Unbekanntes Feld '%s' für Patientenbedingung bei LKN %s.",
+            field_name,
+            ctx.lkn,
         )
-        provided_medications_upper = ctx.medications
-        if not any(
-            str(req).upper() in provided_medications_upper for req in required_medications
-        ):
-            state.add_error(
-                f"{bedingung_text}: Erwartet einen von {required_medications}, nicht gefunden"
-            )
-        return
 
-    logger.info(
-        "Unbekanntes Feld '%s' für Patientenbedingung bei LKN %s.",
-        field,
-        ctx.lkn,
-    )
 
+@dataclass(frozen=True)
+class DiagnoseRegel:
+    required_icds: Tuple[str, ...]
+    required_set: FrozenSet[str]
 
-def _check_rule_diagnose(
-    rule: RegelDefinition,
-    ctx: RuleEvaluationContext,
-    state: RuleEvaluationState,
-) -> None:
-    required_icds = rule.get("ICD") or rule.get("ICDs") or []
-    required_icds = _normalize_rule_codes(required_icds)
-    provided_upper = set(_normalize_fall_codes(ctx.fall.get("ICD", [])))
-    if required_icds and not any(req in provided_upper for req in required_icds):
-        state.add_error(
-            f"Erforderliche Diagnose(n) nicht vorhanden (Benötigt: {', '.join(required_icds)})"
-        )
+    def check(self, ctx: RuleEvaluationContext, state: RuleEvaluationState) -> None:
+        if self.required_icds and self.required_set.isdisjoint(ctx.icds):
+            state.add("rule_diagnosis_missing", codes=", ".join(self.required_icds))
 
 
-def _check_rule_pauschal_ausschluss(
-    rule: RegelDefinition,
-    ctx: RuleEvaluationContext,
-    state: RuleEvaluationState,
-) -> None:
-    verbotene = rule.get("Pauschale") or rule.get("Pauschalen") or []
-    verbotene = _normalize_rule_codes(verbotene)
-    abgerechnete_upper = set(_normalize_fall_codes(ctx.fall.get("Pauschalen", [])))
-    if any(verb in abgerechnete_upper for verb in verbotene):
-        state.add_error(
-            f"Leistung nicht zulässig bei gleichzeitiger Abrechnung der Pauschale(n): {', '.join(verbotene)}"
-        )
+@dataclass(frozen=True)
+class PauschalAusschlussRegel:
+    verbotene: Tuple[str, ...]
+    verbotene_set: FrozenSet[str]
 
+    def check(self, ctx: RuleEvaluationContext, state: RuleEvaluationState) -> None:
+        if not self.verbotene_set.isdisjoint(ctx.pauschalen):
+            state.add("rule_pauschale_exclusion", codes=", ".join(self.verbotene))
 
-def _entry_allows_any_code(
-    entry: str,
-    codes: Sequence[str],
-    leistungsgruppen_map: Mapping[str, Set[str]],
-) -> bool:
-    entry_upper = entry.strip().upper()
-    if entry_upper.startswith("KAPITEL"):
-        prefix = entry_upper.replace("KAPITEL", "").strip()
-        return any(code.startswith(prefix) for code in codes)
-    if entry_upper.startswith("LEISTUNGSGRUPPE"):
-        gruppe = entry_upper.replace("LEISTUNGSGRUPPE", "").strip()
-        group_lkns = leistungsgruppen_map.get(gruppe)
-        if group_lkns is None:
-            return True
-        return any(code in group_lkns for code in codes)
-    return any(entry_upper == code for code in codes)
 
+@dataclass(frozen=True)
+class NichtKumulierbarRegel:
+    not_with: FrozenSet[str]
+    typen_filter: FrozenSet[str] = frozenset()
 
-def _entry_allows_code(
-    entry: str,
-    code: str,
-    leistungsgruppen_map: Mapping[str, Set[str]],
-) -> bool:
-    entry_upper = entry.strip().upper()
-    if entry_upper.startswith("KAPITEL"):
-        prefix = entry_upper.replace("KAPITEL", "").strip()
-        return code.startswith(prefix)
-    if entry_upper.startswith("LEISTUNGSGRUPPE"):
-        gruppe = entry_upper.replace("LEISTUNGSGRUPPE", "").strip()
-        group_lkns = leistungsgruppen_map.get(gruppe)
-        return group_lkns is None or code in group_lkns
-    return entry_upper == code
-
-
-def _check_rule_kumulation(
-    typ: str,
-    rule: RegelDefinition,
-    ctx: RuleEvaluationContext,
-    state: RuleEvaluationState,
-) -> bool:
-    if REGEX_NICHT_KUMULIERBAR_VARIANT.match(typ):
-        not_with = _normalize_rule_codes(rule.get("LKNs") or rule.get("LKN"))
-        type_match = REGEX_NICHT_KUMULIERBAR_VARIANT.match(typ)
-        if type_match and type_match.group(1):
-            typen_filter = [
-                t.strip().upper() for t in type_match.group(1).split(",") if t.strip()
-            ]
-        else:
-            typen_filter = []
+    def check(self, ctx: RuleEvaluationContext, state: RuleEvaluationState) -> None:
+        if self.not_with.isdisjoint(ctx.begleit_set):
+            return
         konflikt: List[str] = []
         for code in ctx.begleit:
-            if code not in not_with:
+            if code not in self.not_with:
                 continue
-            if not typen_filter:
+            if not self.typen_filter:
                 konflikt.append(code)
                 continue
             code_typ = ctx.begleit_typen.get(code)
-            if code_typ and code_typ in typen_filter:
-                konflikt.append(code)
-            elif not code_typ:
+            if not code_typ or code_typ in self.typen_filter:
                 konflikt.append(code)
         if konflikt:
-            state.add_error("Nicht kumulierbar mit: " + ", ".join(konflikt))
-        return True
+            state.add("rule_not_cumulable", codes=", ".join(konflikt))
+
+
+@dataclass(frozen=True)
+class NurKumulierbarRegel:
+    selector: LknSelector
+
+    def check(self, ctx: RuleEvaluationContext, state: RuleEvaluationState) -> None:
+        if not self.selector.allows_any(ctx.begleit, ctx.begleit_set):
+            state.add("rule_only_cumulable", codes=", ".join(self.selector.entries))
+
+
+CompiledRule = (
+    MengenRegel
+    | ZuschlagRegel
+    | PatientenRegel
+    | DiagnoseRegel
+    | PauschalAusschlussRegel
+    | NichtKumulierbarRegel
+    | NurKumulierbarRegel
+)
+
+
+@dataclass(frozen=True)
+class CompiledRuleSet:
+    """Alle Regeln einer LKN, einmalig aus ``regelwerk`` übersetzt.
 
+    ``Kumulierbar`` und ``Mögliche Zusatzpositionen`` erzeugen keine eigene
+    Prüfung, sondern füllen ``zusatzpositionen`` für die explizite
+    Kumulationsprüfung.
+    """
+
+    lkn: str
+    rules: Tuple[CompiledRule, ...]
+    zusatzpositionen: Tuple[str, ...] = ()
+    zusatz_selector: LknSelector = field(default_factory=lambda: LknSelector(entries=()))
+    hat_kumulierbar_regel: bool = False
+
+
+def _compile_rule(
+    lkn: str,
+    typ: str,
+    rule: RegelDefinition,
+    leistungsgruppen_map: Mapping[str, Set[str]],
+) -> Optional[CompiledRule]:
+    if typ == REGEL_MENGE:
+        max_menge = rule.get("MaxMenge")
+        return MengenRegel(max_menge) if isinstance(max_menge, (int, float)) else None
+    if typ == REGEL_ZUSCHLAG_ZU:
+        parents = _normalize_rule_codes(rule.get("LKNs") or rule.get("LKN"))
+        if not parents:
+            logger.info(
+                "Regel 'Nur als Zuschlag zu' ohne Basisangabe bei LKN %s ignoriert.",
+                lkn,
+            )
+            return None
+        return ZuschlagRegel(tuple(parents), frozenset(parents))
+    if typ == REGEL_PAT_BEDINGUNG:
+        feld = rule.get("Feld")
+        if not feld:
+            return None
+        wert_regel = rule.get("Wert")
+        required_medications: Tuple[str, ...] = ()
+        if str(feld).upper() in _MEDIKAMENT_FELDER:
+            required_medications = (
+                (str(wert_regel),)
+                if isinstance(wert_regel, (str, int))
+                else tuple(str(w) for w in (wert_regel or []))
+            )
+        return PatientenRegel(
+            feld=feld,
+            wert=wert_regel,
+            min_wert=rule.get("MinWert"),
+            max_wert=rule.get("MaxWert"),
+            required_medications=required_medications,
+        )
+    if typ == REGEL_DIAGNOSE:
+        icds = _normalize_rule_codes(rule.get("ICD") or rule.get("ICDs") or [])
+        return DiagnoseRegel(tuple(icds), frozenset(icds)) if icds else None
+    if typ == REGEL_PAUSCHAL_AUSSCHLUSS:
+        verbotene = _normalize_rule_codes(rule.get("Pauschale") or rule.get("Pauschalen") or [])
+        return PauschalAusschlussRegel(tuple(verbotene), frozenset(verbotene)) if verbotene else None
+
+    type_match = REGEX_NICHT_KUMULIERBAR_VARIANT.match(typ)
+    if type_match:
+        not_with = frozenset(_normalize_rule_codes(rule.get("LKNs") or rule.get("LKN")))
+        typen_filter = frozenset(
+            t.strip().upper() for t in (type_match.group(1) or "").split(",") if t.strip()
+        )
+        return NichtKumulierbarRegel(not_with, typen_filter) if not_with else None
     if typ.startswith("Nur kumulierbar"):
         allowed_entries = _normalize_rule_codes(
             rule.get("LKNs") or rule.get("LKN"),
             uppercase=False,
         )
-        if not any(
-            _entry_allows_any_code(entry, ctx.begleit, ctx.leistungsgruppen_map)
-            for entry in allowed_entries
-        ):
-            state.add_error("Nur kumulierbar mit: " + ", ".join(allowed_entries))
-        return True
+        return NurKumulierbarRegel(_compile_lkn_selector(allowed_entries, leistungsgruppen_map))
+
+    logger.info("Unbekannter Regeltyp '%s' für LKN %s ignoriert.", typ, lkn)
+    return None
+
+
+def compile_rule_set(
+    lkn: str,
+    rules_raw: Sequence[RegelDefinition | Mapping[str, Any]],
+    leistungsgruppen_map: Mapping[str, Set[str]] | None = None,
+) -> CompiledRuleSet:
+    """Übersetzt die Regel-Dicts einer LKN in ein ``CompiledRuleSet``.
+
+    ``leistungsgruppen_map`` muss bereits normalisiert sein
+    (siehe ``_normalize_leistungsgruppen_map``).
+    """
+    gruppen = leistungsgruppen_map or {}
+    rules: List[CompiledRule] = []
+    zusatz: List[str] = []
+    hat_kumulierbar_regel = False
+    for rule_input in rules_raw:
+        rule = _coerce_rule(rule_input)
+        typ = str(rule.get("Typ") or "").strip()
+        if not typ:
+            continue
+        if typ == REGEL_MOEG_ZUSATZPOSITIONEN:
+            zusatz.extend(_normalize_rule_codes(rule.get("LKNs") or rule.get("LKN")))
+            continue
+        if typ.startswith("Kumulierbar"):
+            zusatz.extend(_normalize_rule_codes(rule.get("LKNs") or rule.get("LKN")))
+            hat_kumulierbar_regel = True
+            continue
+        compiled = _compile_rule(lkn, typ, rule, gruppen)
+        if compiled is not None:
+            rules.append(compiled)
+    zusatzpositionen = tuple(dict.fromkeys(zusatz))
+    return CompiledRuleSet(
+        lkn=lkn,
+        rules=tuple(rules),
+        zusatzpositionen=zusatzpositionen,
+        zusatz_selector=_compile_lkn_selector(zusatzpositionen, gruppen),
+        hat_kumulierbar_regel=hat_kumulierbar_regel,
+    )
+
+
+def compile_regelwerk(
+    regelwerk: Mapping[str, Sequence[RegelDefinition | Mapping[str, Any]]],
+    leistungsgruppen_map: Mapping[str, Sequence[str]] | None = None,
+) -> Dict[str, CompiledRuleSet]:
+    """Kompiliert das komplette Regelwerk (LKN → ``CompiledRuleSet``).
+
+    Das Ergebnis kann anstelle des Roh-Regelwerks an
+    ``pruefe_abrechnungsfaehigkeit`` und ``pruefe_leistungen`` übergeben werden.
+    """
+    gruppen = _normalize_leistungsgruppen_map(leistungsgruppen_map)
+    return {
+        lkn: compile_rule_set(str(lkn).upper(), rules, gruppen)
+        for lkn, rules in regelwerk.items()
+        if rules
+    }
 
-    if typ.startswith("Kumulierbar"):
-        entries = _normalize_rule_codes(rule.get("LKNs") or rule.get("LKN"))
-        state.moegliche_zusatzpositionen.extend(entries)
-        state.hat_kumulierbar_regel = True
-        return True
 
-    return False
+def _resolve_rule_set(
+    regelwerk: Mapping[str, Any],
+    lkn: str,
+    leistungsgruppen_map: Mapping[str, Set[str]],
+) -> Optional[CompiledRuleSet]:
+    entry = regelwerk.get(lkn)
+    if isinstance(entry, CompiledRuleSet):
+        return entry
+    if not entry:
+        return None
+    return compile_rule_set(lkn, list(entry), leistungsgruppen_map)
 
 
-HANDLER_DISPATCH: Dict[str, RuleHandler] = {
-    REGEL_MENGE: _check_rule_menge,
-    REGEL_ZUSCHLAG_ZU: _check_rule_zuschlag,
-    REGEL_MOEG_ZUSATZPOSITIONEN: _collect_possible_additions,
-    REGEL_PAT_BEDINGUNG: _check_rule_patient_condition,
-    REGEL_DIAGNOSE: _check_rule_diagnose,
-    REGEL_PAUSCHAL_AUSSCHLUSS: _check_rule_pauschal_ausschluss,
-}
+def _apply_rule_set(
+    rule_set: CompiledRuleSet,
+    ctx: RuleEvaluationContext,
+    kumulation_explizit: int,
+) -> RuleCheckResult:
+    state = RuleEvaluationState()
+    for rule in rule_set.rules:
+        rule.check(ctx, state)
+
+    if kumulation_explizit and rule_set.hat_kumulierbar_regel and rule_set.zusatzpositionen:
+        selector = rule_set.zusatz_selector
+        if not all(selector.allows(code) for code in ctx.begleit):
+            state.add("rule_only_cumulable", codes=", ".join(rule_set.zusatzpositionen))
+
+    return RuleCheckResult(state.allowed, state.outcomes)
 
 
 def pruefe_abrechnungsfaehigkeit(
     fall: FallKontext | Mapping[str, Any],
-    regelwerk: Mapping[str, Sequence[RegelDefinition | Mapping[str, Any]]],
+    regelwerk: Mapping[str, Any],
     leistungsgruppen_map: Mapping[str, Sequence[str]] | None = None,
     *,
     kumulation_explizit: Optional[int] = None,
@@ -434,51 +622,95 @@ def pruefe_abrechnungsfaehigkeit(
     Args:
         fall: Kontext zur Leistung (LKN, Menge, ICD, Begleit-LKNs, Pauschalen,
               optional Alter, Geschlecht, GTIN).
-        regelwerk: Mapping von LKN zu Regel-Definitionen aus lade_regelwerk.
-        leistungsgruppen_map: Optionales Mapping für Gruppenkumulationen.
+        regelwerk: Mapping von LKN zu Regel-Definitionen aus lade_regelwerk
+                   oder das Ergebnis von ``compile_regelwerk``.
+        leistungsgruppen_map: Optionales Mapping für Gruppenkumulationen
+                              (nur für nicht kompilierte Regelwerke relevant).
         kumulation_explizit: Override für die explizite Kumulationsprüfung.
     """
     kumulation_explizit = KUMULATION_EXPLIZIT if kumulation_explizit is None else kumulation_explizit
 
-    fall_data = _coerce_fall(fall)
-
-    ctx = _build_rule_context(fall_data, leistungsgruppen_map)
-    state = RuleEvaluationState()
-
-    rules_raw = list(regelwerk.get(ctx.lkn) or [])
-    if not rules_raw:
+    ctx = _build_rule_context(_coerce_fall(fall))
+    rule_set = _resolve_rule_set(
+        regelwerk, ctx.lkn, _normalize_leistungsgruppen_map(leistungsgruppen_map)
+    )
+    if rule_set is None:
         return {"abrechnungsfaehig": True, "fehler": []}
+    return _apply_rule_set(rule_set, ctx, kumulation_explizit).as_dict()
 
-    rules = [_coerce_rule(rule) for rule in rules_raw]
 
-    for rule in rules:
-        typ = str(rule.get("Typ") or "").strip()
-        if not typ:
-            continue
-        handler = HANDLER_DISPATCH.get(typ)
-        if handler:
-            handler(rule, ctx, state)
-            continue
-        if _check_rule_kumulation(typ, rule, ctx, state):
-            continue
-        logger.info("Unbekannter Regeltyp '%s' für LKN %s ignoriert.", typ, ctx.lkn)
-
-    if kumulation_explizit and state.hat_kumulierbar_regel and state.moegliche_zusatzpositionen:
-        state.moegliche_zusatzpositionen = list(dict.fromkeys(state.moegliche_zusatzpositionen))
-
-        def code_erlaubt(code: str) -> bool:
-            return any(
-                _entry_allows_code(entry, code, ctx.leistungsgruppen_map)
-                for entry in state.moegliche_zusatzpositionen
-            )
+def pruefe_leistungen(
+    leistungen: Sequence[Mapping[str, Any]],
+    regelwerk: Mapping[str, Any],
+    fall: FallKontext | Mapping[str, Any] | None = None,
+    leistungsgruppen_map: Mapping[str, Sequence[str]] | None = None,
+    *,
+    kumulation_explizit: Optional[int] = None,
+) -> List[RuleCheckResult]:
+    """
+    Prüft alle Leistungen eines Falls in einem Durchgang.
 
-        ungueltig = [code for code in ctx.begleit if not code_erlaubt(code)]
-        if ungueltig:
-            state.add_error(
-                "Nur kumulierbar mit: " + ", ".join(state.moegliche_zusatzpositionen)
-            )
+    Jede Leistung (``lkn``, ``menge``, ``typ``) wird mit den übrigen Leistungen
+    als Begleit-LKNs geprüft, genau wie bei einzelnen Aufrufen von
+    ``pruefe_abrechnungsfaehigkeit``. ICD-, Pauschalen- und Medikamentenlisten
+    aus ``fall`` werden dabei nur einmal normalisiert.
 
-    return {"abrechnungsfaehig": state.allowed, "fehler": state.errors}
+    Returns:
+        Ein ``RuleCheckResult`` pro Eintrag in ``leistungen``, in derselben
+        Reihenfolge. Die Meldungstexte entstehen erst über
+        ``RuleCheckResult.fehler(lang)``.
+    """
+    kumulation_explizit = KUMULATION_EXPLIZIT if kumulation_explizit is None else kumulation_explizit
+    basis: Mapping[str, Any] = fall or {}
+    gruppen = _normalize_leistungsgruppen_map(leistungsgruppen_map)
+
+    codes = [str(l.get("lkn") or "").upper() for l in leistungen]
+    begleit_codes = [code for code in codes if code]
+    typen = {
+        code: str(l.get("typ") or "").upper()
+        for code, l in zip(codes, leistungen)
+        if code
+    }
+    begleit_typen = {code: typ for code, typ in typen.items() if typ}
+    medications = frozenset(_extract_medications(basis))
+    icds = frozenset(_normalize_fall_codes(basis.get("ICD", [])))
+    pauschalen = frozenset(_normalize_fall_codes(basis.get("Pauschalen", [])))
+
+    rule_sets: Dict[str, Optional[CompiledRuleSet]] = {}
+    ergebnisse: List[RuleCheckResult] = []
+    for lkn, leistung in zip(codes, leistungen):
+        if lkn not in rule_sets:
+            rule_sets[lkn] = _resolve_rule_set(regelwerk, lkn, gruppen)
+        rule_set = rule_sets[lkn]
+        if rule_set is None:
+            ergebnisse.append(RuleCheckResult())
+            continue
+        menge = leistung.get("menge", 1)
+        begleit = [code for code in begleit_codes if code != lkn]
+        fall_data = cast(
+            FallKontext,
+            {
+                **basis,
+                "LKN": lkn,
+                "Menge": menge,
+                "Typ": typen.get(lkn, ""),
+                "Begleit_LKNs": begleit,
+                "Begleit_Typen": {c: t for c, t in typen.items() if c != lkn},
+            },
+        )
+        ctx = RuleEvaluationContext(
+            fall=fall_data,
+            lkn=lkn,
+            menge=int(menge or 0),
+            begleit=begleit,
+            begleit_set=frozenset(begleit),
+            begleit_typen=begleit_typen,
+            medications=medications,
+            icds=icds,
+            pauschalen=pauschalen,
+        )
+        ergebnisse.append(_apply_rule_set(rule_set, ctx, kumulation_explizit))
+    return ergebnisse
 
 
 def prepare_tardoc_abrechnung(
@@ -18,7 +18,9 @@ import ast
 from dataclasses import dataclass, field
 from functools import lru_cache
 from typing import (
+    Callable,
     Dict,
+    Iterable,
     List,
     Any,
     Set,
@@ -33,6 +35,7 @@ from typing import (
 from collections import defaultdict
 from utils import (
     escape,
+    get_table_codes,
     get_table_content,
     get_lang_field,
     translate,
@@ -40,8 +43,10 @@ from utils import (
     create_html_info_link,
 )
 from runtime_config import load_base_config
+import metrics
+import tracing
 from pauschalen import (
-    evaluate_boolean_expression_safe,
+    compile_boolean_function,
     get_beschreibung_fuer_icd_im_backend,
     get_beschreibung_fuer_lkn_im_backend,
     with_table_content_cache,
@@ -58,6 +63,12 @@ __all__ = [
     "check_single_condition",               # Added
     "DEFAULT_GROUP_OPERATOR",               # Added
     "build_pauschale_condition_structure_index",
+    "compile_prueflogik",
+    "precompile_prueflogik",
+    "build_lkn_candidate_index",
+    "build_pauschale_selection_index",
+    "LknPauschaleCandidates",
+    "PauschaleSelectionIndex",
     # _evaluate_boolean_tokens and evaluate_single_condition_group are internal
 ]
 
@@ -290,6 +301,217 @@ def build_pauschale_condition_structure_index(
     }
 
 
+@dataclass(frozen=True)
+class LknPauschaleCandidates:
+    """Precomputed Pauschalen-Kandidaten for one LKN.
+
+    ``precise``/``broad`` follow the precise/broad table split used for the
+    two-stage evaluation, ``linked`` is the unsplit union of all Pauschalen the
+    LKN is connected to. ``direct`` and ``via_tables`` keep the provenance
+    (direkte LKN-Zuordnung bzw. Tabelle -> Pauschalen) for match sources.
+    """
+
+    precise: frozenset[str]
+    broad: frozenset[str]
+    linked: frozenset[str]
+    direct: frozenset[str]
+    via_tables: Tuple[Tuple[str, frozenset[str]], ...]
+
+    def sources_for(self, lkn_code: str, pauschale_codes: Set[str]) -> List[Tuple[str, Dict[str, Any]]]:
+        """Return ``(pauschale, source_record)`` pairs limited to ``pauschale_codes``."""
+        records: List[Tuple[str, Dict[str, Any]]] = []
+        for pc in self.direct.intersection(pauschale_codes):
+            records.append((pc, {"lkn": lkn_code, "source": "direct", "table": None}))
+        for table_name, table_pcs in self.via_tables:
+            for pc in table_pcs.intersection(pauschale_codes):
+                records.append((pc, {"lkn": lkn_code, "source": "table", "table": table_name}))
+        return records
+
+
+def build_lkn_candidate_index(
+    pauschale_lp_index: Mapping[str, Set[str]],
+    pauschale_cond_lkn_index: Mapping[str, Set[str]],
+    pauschale_cond_table_index: Mapping[str, Set[str]],
+    lkn_to_tables_index: Mapping[str, Sequence[str]],
+    *,
+    pauschale_cond_table_index_precise: Optional[Mapping[str, Set[str]]] = None,
+    pauschale_cond_table_index_broad: Optional[Mapping[str, Set[str]]] = None,
+    lkn_to_tables_index_precise: Optional[Mapping[str, Sequence[str]]] = None,
+    lkn_to_tables_index_broad: Optional[Mapping[str, Sequence[str]]] = None,
+    pauschalen_dict: Optional[Mapping[str, Any]] = None,
+    lkn_codes: Optional[Iterable[str]] = None,
+) -> Dict[str, LknPauschaleCandidates]:
+    """Create a map ``LKN -> LknPauschaleCandidates`` once.
+
+    Replaces the per-request union over the LP-, LKN- and Tabellen-Indizes by
+    a single lookup per context LKN. Without precise/broad splits every table
+    counts as precise. ``lkn_codes`` restricts the build to the given LKNs
+    (on-the-fly use for a single request). Identical code sets are shared.
+    """
+
+    interned: Dict[frozenset[str], frozenset[str]] = {}
+
+    def _freeze(values: Iterable[str]) -> frozenset[str]:
+        frozen = frozenset(values)
+        return interned.setdefault(frozen, frozen)
+
+    def _reverse(src: Optional[Mapping[str, Set[str]]], upper: bool) -> Dict[str, frozenset[str]]:
+        reverse: DefaultDict[str, Set[str]] = defaultdict(set)
+        for pc, values in (src or {}).items():
+            for value in values or ():
+                key = str(value).strip()
+                key = key.upper() if upper else key.lower()
+                if key:
+                    reverse[key].add(str(pc))
+        return {key: _freeze(pcs) for key, pcs in reverse.items()}
+
+    def _tables(src: Optional[Mapping[str, Sequence[str]]], lkn: str) -> List[str]:
+        return [str(t).strip().lower() for t in (src or {}).get(lkn, []) if str(t).strip()]
+
+    lp_by_lkn = _reverse(pauschale_lp_index, upper=True)
+    cond_by_lkn = _reverse(pauschale_cond_lkn_index, upper=True)
+    by_table = _reverse(pauschale_cond_table_index, upper=False)
+    by_table_precise = _reverse(pauschale_cond_table_index_precise, upper=False)
+    by_table_broad = _reverse(pauschale_cond_table_index_broad, upper=False)
+    empty: frozenset[str] = frozenset()
+
+    if lkn_codes is None:
+        all_lkns: Set[str] = set(lp_by_lkn) | set(cond_by_lkn)
+        for src in (lkn_to_tables_index, lkn_to_tables_index_precise, lkn_to_tables_index_broad):
+            all_lkns.update(str(k).strip().upper() for k in (src or {}))
+    else:
+        all_lkns = {str(k).strip().upper() for k in lkn_codes}
+    all_lkns.discard("")
+
+    def _existing(codes: Set[str]) -> frozenset[str]:
+        if pauschalen_dict is not None:
+            codes = {pc for pc in codes if pc in pauschalen_dict}
+        return _freeze(codes)
+
+    index: Dict[str, LknPauschaleCandidates] = {}
+    for lkn in all_lkns:
+        direct = _freeze(lp_by_lkn.get(lkn, empty) | cond_by_lkn.get(lkn, empty))
+        via_tables = tuple(
+            (table, by_table[table])
+            for table in dict.fromkeys(_tables(lkn_to_tables_index, lkn))
+            if table in by_table
+        )
+
+        precise: Set[str] = set(direct)
+        broad: Set[str] = set()
+        tables_precise = _tables(lkn_to_tables_index_precise, lkn)
+        tables_broad = _tables(lkn_to_tables_index_broad, lkn)
+        for table in tables_precise:
+            precise.update(by_table_precise.get(table, empty))
+        for table in tables_broad:
+            broad.update(by_table_broad.get(table, empty))
+        if not (tables_precise or tables_broad):
+            for _, table_pcs in via_tables:
+                precise.update(table_pcs)
+
+        linked: Set[str] = set(direct)
+        for _, table_pcs in via_tables:
+            linked.update(table_pcs)
+
+        if not (direct or via_tables or precise or broad):
+            continue
+        index[lkn] = LknPauschaleCandidates(
+            precise=_existing(precise),
+            broad=_existing(broad),
+            linked=_existing(linked),
+            direct=direct,
+            via_tables=via_tables,
+        )
+    return index
+
+
+_PAUSCHALE_STEM_RE = re.compile(r"([A-Z0-9.]+)([A-Z])$")
+
+
+def _pauschale_stem(code: str) -> Optional[str]:
+    """Return the stem of a Pauschale code without its letter suffix (``C08.50A`` -> ``C08.50``)."""
+    match = _PAUSCHALE_STEM_RE.match(str(code or "").strip().upper())
+    return match.group(1) if match else None
+
+
+@dataclass
+class PauschaleSelectionIndex:
+    """Precomputed lookups for the result of the selected Pauschale.
+
+    ``icd_tables_by_code`` keeps the ``HAUPTDIAGNOSE IN TABELLE`` references per
+    Pauschale, ``siblings_by_stem`` all codes of a stem (sorted) and
+    ``fallback_codes`` the C9x fallback Pauschalen. ICD suggestion lists are
+    materialized once per table set and language and shared afterwards.
+    """
+
+    tabellen_dict_by_table: Mapping[str, Sequence[Mapping[str, Any]]]
+    icd_tables_by_code: Dict[str, Tuple[str, ...]] = field(default_factory=dict)
+    siblings_by_stem: Dict[str, Tuple[str, ...]] = field(default_factory=dict)
+    fallback_codes: frozenset[str] = frozenset()
+    icd_suggestions_cache: Dict[Tuple[Tuple[str, ...], str], List[Dict[str, Any]]] = field(default_factory=dict)
+
+    def siblings(self, pauschale_code: str) -> Tuple[str, ...]:
+        """Return all codes sharing the stem of ``pauschale_code``."""
+        stem = _pauschale_stem(pauschale_code)
+        return self.siblings_by_stem.get(stem, ()) if stem else ()
+
+    def icd_suggestions(self, pauschale_code: str, lang: str = "de") -> List[Dict[str, Any]]:
+        """Return the sorted, de-duplicated ICD suggestions of a Pauschale."""
+        table_refs = self.icd_tables_by_code.get(str(pauschale_code), ())
+        if not table_refs:
+            return []
+        cache_key = (table_refs, str(lang or "de").lower())
+        cached = self.icd_suggestions_cache.get(cache_key)
+        if cached is None:
+            unique_icds: Dict[str, Dict[str, Any]] = {}
+            for table_ref in table_refs:
+                for entry_icd in get_table_content(table_ref, "icd", self.tabellen_dict_by_table, lang):
+                    code_icd = entry_icd.get("Code")
+                    if code_icd:
+                        unique_icds[code_icd] = {"Code": code_icd, "Code_Text": entry_icd.get("Code_Text") or "N/A"}
+            cached = sorted(unique_icds.values(), key=lambda x: x["Code"])
+            self.icd_suggestions_cache[cache_key] = cached
+        return list(cached)
+
+
+def build_pauschale_selection_index(
+    pauschale_bedingungen_data: Sequence[Mapping[str, Any]],
+    pauschalen_dict: Mapping[str, Any],
+    tabellen_dict_by_table: Mapping[str, Sequence[Mapping[str, Any]]],
+) -> PauschaleSelectionIndex:
+    """Create the :class:`PauschaleSelectionIndex` once."""
+
+    icd_tables: DefaultDict[str, List[str]] = defaultdict(list)
+    for cond in pauschale_bedingungen_data:
+        pauschale_code = cond.get("Pauschale")
+        if pauschale_code is None:
+            continue
+        if str(cond.get("Bedingungstyp", "")).upper() != "HAUPTDIAGNOSE IN TABELLE":
+            continue
+        table_ref = cond.get("Werte")
+        if table_ref:
+            icd_tables[str(pauschale_code)].append(table_ref)
+
+    siblings: DefaultDict[str, Set[str]] = defaultdict(set)
+    fallback_codes: Set[str] = set()
+    for code in pauschalen_dict.keys():
+        if not isinstance(code, str):
+            continue
+        code_upper = code.strip().upper()
+        stem = _pauschale_stem(code_upper)
+        if stem:
+            siblings[stem].add(code_upper)
+        if is_pauschale_code_ge_c90(code_upper):
+            fallback_codes.add(code_upper)
+
+    return PauschaleSelectionIndex(
+        tabellen_dict_by_table=tabellen_dict_by_table,
+        icd_tables_by_code={code: tuple(refs) for code, refs in icd_tables.items()},
+        siblings_by_stem={stem: tuple(sorted(codes)) for stem, codes in siblings.items()},
+        fallback_codes=frozenset(fallback_codes),
+    )
+
+
 def _prepare_single_pauschale_structure(
     pauschale_code: str,
     conditions: Sequence[Mapping[str, Any]],
@@ -569,40 +791,74 @@ def _compare_numeric_with_operator(
     return False
 
 
-def _evaluate_simple_condition(
-    condition_text: str,
+ConditionEvaluator = Callable[[NormalizedContext, Dict[str, List[Dict]], bool], bool]
+
+_SIMPLE_COMPARISON_TYPES = (
+    ('anzahl', 'ANZAHL'),
+    ('seitigkeit', 'SEITIGKEIT'),
+    ('alter in jahren bei eintritt', 'ALTER IN JAHREN BEI EINTRITT'),
+)
+
+_CONDITION_TEXT_TYPES = {
+    'hauptdiagnose in tabelle': 'HAUPTDIAGNOSE IN TABELLE',
+    'hauptdiagnose in liste': 'HAUPTDIAGNOSE IN LISTE',
+    'icd in tabelle': 'ICD IN TABELLE',
+    'icd in liste': 'ICD IN LISTE',
+    'leistungspositionen in tabelle': 'LEISTUNGSPOSITIONEN IN TABELLE',
+    'leistungspositionen in liste': 'LEISTUNGSPOSITIONEN IN LISTE',
+    'medikamente in liste': 'MEDIKAMENTE IN LISTE',
+    'tarifpositionen in tabelle': 'TARIFPOSITIONEN IN TABELLE',
+    'geschlecht in liste': 'GESCHLECHT IN LISTE',
+}
+
+_WHERE_SIMPLE_PATTERN = re.compile(
+    r"(Anzahl\s*[<>!=]=?\s*-?\d+|Seitigkeit\s*=\s*'?[A-Za-z]+'?|Alter in Jahren bei Eintritt\s*[<>!=]=?\s*-?\d+|Geschlecht in Liste\s*\([^()]+\))",
+    flags=re.IGNORECASE,
+)
+
+
+def _always_true(
     normalized_context: NormalizedContext,
     tabellen_dict_by_table: Dict[str, List[Dict]],
     tolerant: bool = False,
 ) -> bool:
-    text_lower = condition_text.strip().lower()
-    if text_lower.startswith('anzahl'):
-        operator, value = _parse_comparison(condition_text[len('Anzahl'):])
-        cond = {'Bedingungstyp': 'ANZAHL', 'Vergleichsoperator': operator, 'Werte': value}
-        return bool(
-            check_single_condition(
-                cond,
-                normalized_context.raw,
-                tabellen_dict_by_table,
-                normalized_context,
-                tolerant=tolerant,
-            )
-        )
-    if text_lower.startswith('seitigkeit'):
-        operator, value = _parse_comparison(condition_text[len('Seitigkeit'):])
-        cond = {'Bedingungstyp': 'SEITIGKEIT', 'Vergleichsoperator': operator, 'Werte': value}
-        return bool(
-            check_single_condition(
-                cond,
-                normalized_context.raw,
-                tabellen_dict_by_table,
-                normalized_context,
-                tolerant=tolerant,
-            )
-        )
-    if text_lower.startswith('alter in jahren bei eintritt'):
-        operator, value = _parse_comparison(condition_text[len('Alter in Jahren bei Eintritt'):])
-        cond = {'Bedingungstyp': 'ALTER IN JAHREN BEI EINTRITT', 'Vergleichsoperator': operator, 'Werte': value}
+    return True
+
+
+def _compile_deferred(compile_fn: Callable[[str], ConditionEvaluator], text: str) -> ConditionEvaluator:
+    """Compile ``text``; parse errors are raised only when the fragment is evaluated."""
+    try:
+        return compile_fn(text)
+    except Exception as exc:
+        error = exc
+
+        def _raise_on_call(
+            normalized_context: NormalizedContext,
+            tabellen_dict_by_table: Dict[str, List[Dict]],
+            tolerant: bool = False,
+        ) -> bool:
+            raise error
+
+        return _raise_on_call
+
+
+def _compile_check(cond_template: Mapping[str, Any]) -> ConditionEvaluator:
+    """Bind a condition definition to :func:`check_single_condition`.
+
+    The condition dict (and with it its ``__parsed_cache__``) is reused as long
+    as the same Tabellen-Dict is passed in.
+    """
+    state: List[Tuple[Any, MutableMapping[str, Any]]] = [(None, dict(cond_template))]
+
+    def _evaluate(
+        normalized_context: NormalizedContext,
+        tabellen_dict_by_table: Dict[str, List[Dict]],
+        tolerant: bool = False,
+    ) -> bool:
+        tables_ref, cond = state[0]
+        if tables_ref is not tabellen_dict_by_table:
+            cond = dict(cond_template)
+            state[0] = (tabellen_dict_by_table, cond)
         return bool(
             check_single_condition(
                 cond,
@@ -612,163 +868,104 @@ def _evaluate_simple_condition(
                 tolerant=tolerant,
             )
         )
+
+    return _evaluate
+
+
+def _compile_simple_condition(condition_text: str) -> ConditionEvaluator:
+    text_lower = condition_text.strip().lower()
+    for prefix_lower, cond_type in _SIMPLE_COMPARISON_TYPES:
+        if text_lower.startswith(prefix_lower):
+            operator, value = _parse_comparison(condition_text[len(prefix_lower):])
+            return _compile_check({'Bedingungstyp': cond_type, 'Vergleichsoperator': operator, 'Werte': value})
     if text_lower.startswith('geschlecht in liste'):
-        return bool(
-            _evaluate_condition_text(
-                condition_text,
-                normalized_context,
-                tabellen_dict_by_table,
-                tolerant=tolerant,
-            )
-        )
+        return _compile_condition_text(condition_text)
     raise ValueError(f"Unsupported WHERE condition fragment '{condition_text}'.")
 
 
-def _evaluate_where_clause(
-    where_text: str,
-    normalized_context: NormalizedContext,
-    tabellen_dict_by_table: Dict[str, List[Dict]],
-    tolerant: bool = False,
-) -> bool:
+def _compile_where_clause(where_text: str) -> ConditionEvaluator:
     clause = _strip_surrounding_parentheses(where_text.strip())
     if not clause:
-        return True
+        return _always_true
 
-    simple_results: List[bool] = []
+    fragments: List[ConditionEvaluator] = []
 
     def _replace(match: re.Match) -> str:
-        idx = len(simple_results)
-        fragment = match.group(0)
-        simple_results.append(
-            _evaluate_simple_condition(
-                fragment,
-                normalized_context,
-                tabellen_dict_by_table,
-                tolerant=tolerant,
-            )
-        )
+        idx = len(fragments)
+        fragments.append(_compile_deferred(_compile_simple_condition, match.group(0)))
         return f'__WHERE{idx}__'
 
-    simple_pattern = re.compile(
-        r"(Anzahl\s*[<>!=]=?\s*-?\d+|Seitigkeit\s*=\s*'?[A-Za-z]+'?|Alter in Jahren bei Eintritt\s*[<>!=]=?\s*-?\d+|Geschlecht in Liste\s*\([^()]+\))",
-        flags=re.IGNORECASE,
-    )
-    token_expr = simple_pattern.sub(
+    token_expr = _WHERE_SIMPLE_PATTERN.sub(
         _replace,
         clause.replace('> =', '>=').replace('< =', '<=').replace('! =', '!=').replace('= =', '='),
     )
+    if not fragments:
+        return _always_true
 
-    if not simple_results:
-        return True
+    names = tuple(f'__WHERE{i}__' for i in range(len(fragments)))
+    code: Any = None
+    compile_error: Optional[Exception] = None
+    try:
+        code = compile(_normalize_logical_operators(token_expr), '<where>', 'eval')
+    except SyntaxError as exc:
+        compile_error = exc
+
+    def _evaluate(
+        normalized_context: NormalizedContext,
+        tabellen_dict_by_table: Dict[str, List[Dict]],
+        tolerant: bool = False,
+    ) -> bool:
+        values = [
+            fragment(normalized_context, tabellen_dict_by_table, tolerant)
+            for fragment in fragments
+        ]
+        if compile_error is not None:
+            raise compile_error
+        return bool(eval(code, {'__builtins__': None}, dict(zip(names, values))))
 
-    expr_python = _normalize_logical_operators(token_expr)
-    env = {f'__WHERE{i}__': value for i, value in enumerate(simple_results)}
-    return bool(eval(expr_python, {'__builtins__': None}, env))
+    return _evaluate
 
 
-def _evaluate_condition_text(
-    condition_text: str,
-    normalized_context: NormalizedContext,
-    tabellen_dict_by_table: Dict[str, List[Dict]],
-    tolerant: bool = False,
-) -> bool:
+def _compile_condition_text(condition_text: str) -> ConditionEvaluator:
     text = _strip_surrounding_parentheses(condition_text.strip())
     where_match = re.search(r'\swhere\s', text, flags=re.IGNORECASE)
     if where_match:
-        base_text = text[:where_match.start()].strip()
-        where_clause = text[where_match.end():].strip()
-        return _evaluate_condition_text(
-            base_text,
-            normalized_context,
-            tabellen_dict_by_table,
-            tolerant=tolerant,
-        ) and _evaluate_where_clause(
-            where_clause,
-            normalized_context,
-            tabellen_dict_by_table,
-            tolerant=tolerant,
-        )
+        base = _compile_deferred(_compile_condition_text, text[:where_match.start()].strip())
+        where = _compile_deferred(_compile_where_clause, text[where_match.end():].strip())
+
+        def _evaluate(
+            normalized_context: NormalizedContext,
+            tabellen_dict_by_table: Dict[str, List[Dict]],
+            tolerant: bool = False,
+        ) -> bool:
+            return base(normalized_context, tabellen_dict_by_table, tolerant) and where(
+                normalized_context, tabellen_dict_by_table, tolerant
+            )
+
+        return _evaluate
 
     if '(' not in text or not text.endswith(')'):
         raise ValueError(f"Unexpected condition fragment '{condition_text}'.")
 
     prefix, values = text.split('(', 1)
-    prefix_lower = prefix.strip().lower()
-    values_str = values[:-1].strip()
-
-    type_map = {
-        'hauptdiagnose in tabelle': 'HAUPTDIAGNOSE IN TABELLE',
-        'hauptdiagnose in liste': 'HAUPTDIAGNOSE IN LISTE',
-        'icd in tabelle': 'ICD IN TABELLE',
-        'icd in liste': 'ICD IN LISTE',
-        'leistungspositionen in tabelle': 'LEISTUNGSPOSITIONEN IN TABELLE',
-        'leistungspositionen in liste': 'LEISTUNGSPOSITIONEN IN LISTE',
-        'medikamente in liste': 'MEDIKAMENTE IN LISTE',
-        'tarifpositionen in tabelle': 'TARIFPOSITIONEN IN TABELLE',
-        'geschlecht in liste': 'GESCHLECHT IN LISTE',
-    }
-
-    cond_type = type_map.get(prefix_lower)
+    cond_type = _CONDITION_TEXT_TYPES.get(prefix.strip().lower())
     if not cond_type:
         raise ValueError(f"Unsupported condition type '{prefix}'.")
+    return _compile_check({'Bedingungstyp': cond_type, 'Werte': values[:-1].strip()})
 
-    cond = {'Bedingungstyp': cond_type, 'Werte': values_str}
-    return bool(
-        check_single_condition(
-            cond,
-            normalized_context.raw,
-            tabellen_dict_by_table,
-            normalized_context,
-            tolerant=tolerant,
-        )
-    )
-
-
-def _evaluate_prueflogik_expression(
-    prueflogik_expr: str,
-    normalized_context: NormalizedContext,
-    tabellen_dict_by_table: Dict[str, List[Dict]],
-    pauschale_code: str,
-    debug: bool = False,
-    tolerant: bool = False,
-) -> bool:
-    expr_normalized, fragments = _compile_prueflogik_expression_template(prueflogik_expr)
-    values: List[bool] = []
-
-    # Evaluate all compiled fragments in order (no regex re-scan of the whole expression).
-    for fragment in fragments:
-        fragment_clean = fragment.strip()
-        fragment_lower = fragment_clean.lower()
-        if (
-            fragment_lower.startswith('anzahl')
-            or fragment_lower.startswith('seitigkeit')
-            or fragment_lower.startswith('alter in jahren bei eintritt')
-            or fragment_lower.startswith('geschlecht in liste')
-        ):
-            result = _evaluate_simple_condition(
-                fragment_clean,
-                normalized_context,
-                tabellen_dict_by_table,
-                tolerant=tolerant,
-            )
-        elif fragment_lower.replace(' ', '') == '1=1':
-            result = True
-        else:
-            result = _evaluate_condition_text(
-                fragment_clean,
-                normalized_context,
-                tabellen_dict_by_table,
-                tolerant=tolerant,
-            )
-        values.append(bool(result))
 
-    context_map = {f'__COND{i}__': val for i, val in enumerate(values)}
-    return evaluate_boolean_expression_safe(expr_normalized, context_map)
+def _compile_prueflogik_fragment(fragment: str) -> ConditionEvaluator:
+    fragment_clean = fragment.strip()
+    fragment_lower = fragment_clean.lower()
+    if fragment_lower.startswith(('anzahl', 'seitigkeit', 'alter in jahren bei eintritt', 'geschlecht in liste')):
+        return _compile_simple_condition(fragment_clean)
+    if fragment_lower.replace(' ', '') == '1=1':
+        return _always_true
+    return _compile_condition_text(fragment_clean)
 
 
-@lru_cache(maxsize=2048)
-def _compile_prueflogik_expression_template(expr: str) -> Tuple[str, Tuple[str, ...]]:
-    """Compile Prüflogik into a reusable template + ordered condition fragments.
+def _split_prueflogik_template(expr: str) -> Tuple[str, Tuple[str, ...]]:
+    """Split Prüflogik into a template + ordered condition fragments.
 
     Returns
     -------
@@ -791,6 +988,81 @@ def _compile_prueflogik_expression_template(expr: str) -> Tuple[str, Tuple[str,
     return normalized, tuple(fragments)
 
 
+@dataclass(frozen=True)
+class CompiledPrueflogik:
+    """Prüflogik compiled into one evaluator per condition slot and a boolean closure."""
+
+    template: str
+    slots: Tuple[ConditionEvaluator, ...]
+    combine: Callable[[Sequence[bool]], bool]
+
+    def __call__(
+        self,
+        normalized_context: NormalizedContext,
+        tabellen_dict_by_table: Dict[str, List[Dict]],
+        tolerant: bool = False,
+    ) -> bool:
+        # All slots are evaluated in order, so parse errors surface like before.
+        values = [slot(normalized_context, tabellen_dict_by_table, tolerant) for slot in self.slots]
+        return bool(self.combine(values))
+
+
+def compile_prueflogik(expr: str) -> CompiledPrueflogik:
+    """Compile a Prüflogik string; raises ``ValueError`` if it contains no conditions."""
+    template, fragments = _split_prueflogik_template(expr)
+    return CompiledPrueflogik(
+        template=template,
+        slots=tuple(_compile_deferred(_compile_prueflogik_fragment, fragment) for fragment in fragments),
+        combine=compile_boolean_function(
+            template,
+            {f'__COND{i}__': i for i in range(len(fragments))},
+        ),
+    )
+
+
+# Compiled Prüflogik per expression string. Filled at load time by
+# :func:`precompile_prueflogik`; expressions seen later are compiled on first use.
+_COMPILED_PRUEFLOGIK: Dict[str, CompiledPrueflogik] = {}
+
+
+def get_compiled_prueflogik(expr: str) -> CompiledPrueflogik:
+    compiled = _COMPILED_PRUEFLOGIK.get(expr)
+    if compiled is None:
+        compiled = compile_prueflogik(expr)
+        _COMPILED_PRUEFLOGIK[expr] = compiled
+    return compiled
+
+
+def precompile_prueflogik(pauschalen_dict: Mapping[str, Mapping[str, Any]]) -> int:
+    """Compile all Prüflogik expressions of ``pauschalen_dict`` (replaces earlier compilations)."""
+    _COMPILED_PRUEFLOGIK.clear()
+    failed = 0
+    for pauschale_code, details in pauschalen_dict.items():
+        expr = details.get('Prüflogik') if isinstance(details, Mapping) else None
+        if not (isinstance(expr, str) and expr.strip()):
+            continue
+        try:
+            get_compiled_prueflogik(expr)
+        except ValueError as exc:
+            failed += 1
+            logger.debug("Prüflogik von %s nicht kompilierbar: %s", pauschale_code, exc)
+    if failed:
+        logger.info("%s Prüflogik-Ausdrücke ohne Bedingungen (AST-Fallback).", failed)
+    return len(_COMPILED_PRUEFLOGIK)
+
+
+def _evaluate_prueflogik_expression(
+    prueflogik_expr: str,
+    normalized_context: NormalizedContext,
+    tabellen_dict_by_table: Dict[str, List[Dict]],
+    pauschale_code: str,
+    debug: bool = False,
+    tolerant: bool = False,
+) -> bool:
+    compiled = get_compiled_prueflogik(prueflogik_expr)
+    return compiled(normalized_context, tabellen_dict_by_table, tolerant)
+
+
 @lru_cache(maxsize=512)
 def _format_prueflogik_for_display(prueflogik_expr: str, lang: str = "de") -> str:
     """Return a pretty-printed version of the Prüflogik expression."""
@@ -1160,19 +1432,23 @@ def _get_or_create_table_codes(
     cached = cache.get(cache_key)
     if cached is not None:
         return cached
-    table_entries = get_table_content(table_ref, table_type, tabellen_dict_by_table)
-    if not table_entries:
-        table_codes = frozenset()
-    else:
-        table_codes = frozenset(
-            str(entry.get("Code", "")).upper()
-            for entry in table_entries
-            if entry.get("Code")
-        )
+    table_codes = get_table_codes(table_ref, table_type, tabellen_dict_by_table)
     cache[cache_key] = table_codes
     return table_codes
 
 
+def _get_icd_table_codes(
+    table_ref: str,
+    tabellen_dict_by_table: Dict[str, List[Dict]],
+) -> frozenset[str]:
+    """ICD-Codes einer Tabellenreferenz inkl. :data:`DIAGNOSIS_TABLE_EXTRA_CODES`."""
+    table_codes = get_table_codes(table_ref, "icd", tabellen_dict_by_table)
+    extra_codes = DIAGNOSIS_TABLE_EXTRA_CODES.get(table_ref.upper())
+    if extra_codes:
+        table_codes = table_codes.union(code.upper() for code in extra_codes)
+    return table_codes
+
+
 def _extract_table_names(
     raw_value: Any,
     table_index: Mapping[str, Any],
@@ -1218,15 +1494,7 @@ def _check_icd_condition(
     cache_key = f"icd_table_codes::{table_ref.upper()}"
     table_codes = cache.get(cache_key)
     if table_codes is None:
-        icd_codes_in_rule_table = {
-            entry.get("Code", "").upper()
-            for entry in get_table_content(table_ref, "icd", tabellen_dict_by_table)
-            if entry.get("Code")
-        }
-        extra_codes = DIAGNOSIS_TABLE_EXTRA_CODES.get(table_ref.upper())
-        if extra_codes:
-            icd_codes_in_rule_table.update(code.upper() for code in extra_codes)
-        table_codes = frozenset(icd_codes_in_rule_table)
+        table_codes = _get_icd_table_codes(table_ref, tabellen_dict_by_table)
         cache[cache_key] = table_codes
 
     if not table_codes:
@@ -1991,6 +2259,7 @@ def evaluate_pauschale_logic_orchestrator(
 
 # === PRUEFUNG DER BEDINGUNGEN (STRUKTURIERTES RESULTAT) ===
 @with_table_content_cache
+@metrics.timed("html_render")
 def check_pauschale_conditions(
     pauschale_code: str,
     context: Mapping[str, Any],
@@ -2003,6 +2272,7 @@ def check_pauschale_conditions(
     tolerant: bool = False,
 ) -> Dict[str, Any]:
     """Render ein HTML-Fragment für die Bedingungen einer Pauschale."""
+    tracing.set_attributes(pauschale=pauschale_code, lang=lang)
 
     BED_TYP_KEY = "Bedingungstyp"
     BED_WERTE_KEY = "Werte"
@@ -2340,9 +2610,9 @@ def check_pauschale_conditions(
                     if "TABELLE" in cond_type_upper:
                         table_ref = cond_data.get(BED_WERTE_KEY)
                         if table_ref and isinstance(table_ref, str):
-                            for entry in _get_table_entries(table_ref, "icd"):
-                                if entry.get("Code"):
-                                    required_codes_in_rule.add(entry["Code"].upper())
+                            required_codes_in_rule = set(
+                                get_table_codes(table_ref, "icd", tabellen_dict_by_table)
+                            )
                     else:
                         required_codes_in_rule = {
                             w.strip().upper()
@@ -2390,9 +2660,9 @@ def check_pauschale_conditions(
                     if "TABELLE" in cond_type_upper:
                         table_ref = cond_data.get(BED_WERTE_KEY)
                         if table_ref and isinstance(table_ref, str):
-                            for entry in _get_table_entries(table_ref, "service_catalog"):
-                                if entry.get("Code"):
-                                    required_lkn_codes.add(entry["Code"].upper())
+                            required_lkn_codes = set(
+                                get_table_codes(table_ref, "service_catalog", tabellen_dict_by_table)
+                            )
                     else:
                         required_lkn_codes = {
                             w.strip().upper()
@@ -2600,23 +2870,10 @@ def check_pauschale_conditions_structured(
                             cache_key = f"icd_table_codes::{table_ref.upper()}"
                             table_codes = cond_cache.get(cache_key)
                             if table_codes is None:
-                                icd_codes_in_rule_table = {
-                                    entry.get("Code", "").upper()
-                                    for entry in get_table_content(
-                                        table_ref,
-                                        "icd",
-                                        tabellen_dict_by_table,
-                                    )
-                                    if entry.get("Code")
-                                }
-                                extra_codes = DIAGNOSIS_TABLE_EXTRA_CODES.get(
-                                    table_ref.upper()
+                                table_codes = _get_icd_table_codes(
+                                    table_ref,
+                                    tabellen_dict_by_table,
                                 )
-                                if extra_codes:
-                                    icd_codes_in_rule_table.update(
-                                        code.upper() for code in extra_codes
-                                    )
-                                table_codes = frozenset(icd_codes_in_rule_table)
                                 cond_cache[cache_key] = table_codes
                             if table_codes:
                                 matched_icds = sorted(
@@ -2681,6 +2938,7 @@ def check_pauschale_conditions_structured(
 
 # --- Ausgelagerte Pauschalen-Ermittlung ---
 @with_table_content_cache
+@metrics.timed("pauschale_evaluation")
 def determine_applicable_pauschale(
     user_input: str, # Bleibt für potenzielles LLM-Ranking, aktuell nicht primär genutzt
     rule_checked_leistungen: list[dict], # Für die initiale Findung potenzieller Pauschalen (derzeit ungenutzt)
@@ -2704,6 +2962,8 @@ def determine_applicable_pauschale(
     include_selected_conditions_html: bool = True,
     include_candidate_sources: bool = True,
     include_potential_icds: bool = True,
+    lkn_candidate_index: Mapping[str, LknPauschaleCandidates] | None = None,
+    selection_index: PauschaleSelectionIndex | None = None,
     ) -> dict:
     """Finde die bestmögliche Pauschale anhand der Regeln.
 
@@ -2738,6 +2998,12 @@ def determine_applicable_pauschale(
         Funktion mögliche Codes aus den Kontext-LKN.
     lang : str, optional
         Sprache der Ausgaben, Standard ``"de"``.
+    lkn_candidate_index : Mapping[str, LknPauschaleCandidates], optional
+        Vorberechnete Kandidaten je LKN (siehe :func:`build_lkn_candidate_index`).
+        Fehlt der Index, wird er für die Kontext-LKN on-the-fly erstellt.
+    selection_index : PauschaleSelectionIndex, optional
+        Vorberechnete ICD-Vorschläge und Geschwister-/C9x-Gruppen für die
+        ausgewählte Pauschale (siehe :func:`build_pauschale_selection_index`).
 
     Returns
     -------
@@ -2775,8 +3041,6 @@ def determine_applicable_pauschale(
     logger.info("INFO: Starte Pauschalenermittlung mit strukturierter Bedingungsprüfung...")
     PAUSCHALE_ERKLAERUNG_KEY = 'pauschale_erklaerung_html'; POTENTIAL_ICDS_KEY = 'potential_icds'
     PAUSCHALE_TEXT_KEY_IN_PAUSCHALEN = 'Pauschale_Text'
-    BED_PAUSCHALE_KEY = 'Pauschale'; BED_TYP_KEY = 'Bedingungstyp' # In PAUSCHALEN_Bedingungen
-    BED_WERTE_KEY = 'Werte'
 
     # Keep signature compatibility: rule_checked_leistungen wird aktuell nicht ausgewertet.
     _ = rule_checked_leistungen
@@ -2836,13 +3100,20 @@ def determine_applicable_pauschale(
 
     potential_pauschale_codes: Set[str] = set()
     context_lkns_for_search = {str(lkn).upper() for lkn in context.get("LKN", []) if lkn}
-
-    def _build_reverse_index(src: Mapping[str, Set[str]]) -> Dict[str, Set[str]]:
-        reverse: Dict[str, Set[str]] = defaultdict(set)
-        for key, values in src.items():
-            for value in values:
-                reverse[value].add(key)
-        return reverse
+    lkn_candidates_by_code: Optional[Mapping[str, LknPauschaleCandidates]] = lkn_candidate_index
+
+    def _get_lkn_candidates(lkn_code: str) -> Optional[LknPauschaleCandidates]:
+        """Lookup in the precomputed LKN index (built for the context LKN if missing)."""
+        nonlocal lkn_candidates_by_code
+        if lkn_candidates_by_code is None:
+            lkn_candidates_by_code = build_lkn_candidate_index(
+                pauschale_lp_index,
+                pauschale_cond_lkn_index,
+                pauschale_cond_table_index,
+                lkn_to_tables_index,
+                lkn_codes=context_lkns_for_search,
+            )
+        return lkn_candidates_by_code.get(lkn_code)
 
     def _same_subchapter(code_a: str, code_b: str) -> bool:
         """Heuristik: Zwei Pauschalen gehören zusammen, wenn ihr Stamm (Kapitel/Unterkapitel) übereinstimmt."""
@@ -2902,15 +3173,10 @@ def determine_applicable_pauschale(
         )
     else:
         logger.info("DEBUG: Suche potenzielle Pauschalen (da nicht übergeben)...")
-        lp_index_by_lkn = _build_reverse_index(pauschale_lp_index)
-        cond_index_by_lkn = _build_reverse_index(pauschale_cond_lkn_index)
-        cond_index_by_table = _build_reverse_index(pauschale_cond_table_index)
-
         for lkn_ctx in context_lkns_for_search:
-            potential_pauschale_codes.update(lp_index_by_lkn.get(lkn_ctx, set()))
-            potential_pauschale_codes.update(cond_index_by_lkn.get(lkn_ctx, set()))
-            for table_name in _get_tables_for_context_lkn(lkn_ctx):
-                potential_pauschale_codes.update(cond_index_by_table.get(str(table_name).lower(), set()))
+            candidates_for_lkn = _get_lkn_candidates(lkn_ctx)
+            if candidates_for_lkn is not None:
+                potential_pauschale_codes.update(candidates_for_lkn.linked)
 
         # Nur Pauschalen berücksichtigen, die tatsächlich existieren
         potential_pauschale_codes = {pc for pc in potential_pauschale_codes if pc in pauschalen_dict}
@@ -2921,25 +3187,13 @@ def determine_applicable_pauschale(
 
     # LKN-Quellen für alle Kandidaten ermitteln, egal woher sie stammen.
     # Dies ist entscheidend für die Filterlogik in der Erklärungs-HTML.
-    if sources_required:
-        for pc in potential_pauschale_codes:
-            for lkn_direct in pauschale_lp_index.get(pc, set()):
-                if lkn_direct in context_lkns_for_search:
-                    candidate_lkn_sources[pc].append({
-                        "lkn": str(lkn_direct).upper(), "source": "direct", "table": None
-                    })
-            for lkn_cond in pauschale_cond_lkn_index.get(pc, set()):
-                if lkn_cond in context_lkns_for_search:
-                    candidate_lkn_sources[pc].append({
-                        "lkn": lkn_cond, "source": "direct", "table": None
-                    })
-            for table_name in pauschale_cond_table_index.get(pc, set()):
-                table_norm = str(table_name).lower()
-                for lkn_ctx in context_lkns_for_search:
-                    if table_norm in _get_tables_for_context_lkn(lkn_ctx):
-                        candidate_lkn_sources[pc].append({
-                            "lkn": lkn_ctx, "source": "table", "table": table_norm
-                        })
+    if sources_required and potential_pauschale_codes:
+        for lkn_ctx in context_lkns_for_search:
+            candidates_for_lkn = _get_lkn_candidates(lkn_ctx)
+            if candidates_for_lkn is None:
+                continue
+            for pc, source_record in candidates_for_lkn.sources_for(lkn_ctx, potential_pauschale_codes):
+                candidate_lkn_sources[pc].append(source_record)
 
 
     if not potential_pauschale_codes:
@@ -2949,18 +3203,21 @@ def determine_applicable_pauschale(
     selection_context: Mapping[str, Any] = context
     tolerant_mode_used = False
 
+    @tracing.traced("pauschale_candidate")
     def _evaluate_candidate(
         code: str,
         ctx: Mapping[str, Any],
         tolerant_flag: bool,
         normalized_ctx: Optional[NormalizedContext] = None,
     ) -> bool:
+        tracing.set_attributes(pauschale=code, tolerant=tolerant_flag)
         try:
             normalized_to_use = normalized_ctx or build_normalized_context(ctx)
             if request_eval_cache is not None:
                 key = _eval_cache_key(code, tolerant_flag, normalized_to_use)
                 cached = request_eval_cache.get(key)
                 if isinstance(cached, bool):
+                    tracing.set_attributes(cached=True, valid=cached)
                     return cached
             result = bool(
                 evaluate_pauschale_logic_orchestrator(
@@ -2977,6 +3234,7 @@ def determine_applicable_pauschale(
             )
             if request_eval_cache is not None:
                 request_eval_cache[_eval_cache_key(code, tolerant_flag, normalized_to_use)] = result
+            tracing.set_attributes(valid=result)
             return result
         except Exception as e_eval:
             logger.error(
@@ -3456,23 +3714,15 @@ def determine_applicable_pauschale(
     else:
         best_pauschale_details.pop(PAUSCHALE_ERKLAERUNG_KEY, None)
 
-    if include_potential_icds:
-        # Potenzielle ICDs für die ausgewählte Pauschale sammeln
-        potential_icds_list = []
-        pauschale_conditions_for_selected = [
-            cond for cond in pauschale_bedingungen_data if cond.get(BED_PAUSCHALE_KEY) == best_pauschale_code
-        ]
-        for cond_item_icd in pauschale_conditions_for_selected:
-            if cond_item_icd.get(BED_TYP_KEY, "").upper() == "HAUPTDIAGNOSE IN TABELLE":
-                tabelle_ref_icd = cond_item_icd.get(BED_WERTE_KEY)
-                if tabelle_ref_icd:
-                    icd_entries_list = get_table_content(tabelle_ref_icd, "icd", tabellen_dict_by_table, lang)
-                    for entry_icd in icd_entries_list:
-                        code_icd = entry_icd.get('Code'); text_icd = entry_icd.get('Code_Text')
-                        if code_icd: potential_icds_list.append({"Code": code_icd, "Code_Text": text_icd or "N/A"})
-        
-        unique_icds_dict_result = {icd_item['Code']: icd_item for icd_item in potential_icds_list if icd_item.get('Code')}
-        best_pauschale_details[POTENTIAL_ICDS_KEY] = sorted(unique_icds_dict_result.values(), key=lambda x: x['Code'])
+    if (include_potential_icds or not include_explanation_html) and selection_index is None:
+        logger.info("INFO: selection_index nicht übergeben, erstelle Index on-the-fly (langsam).")
+        selection_index = build_pauschale_selection_index(
+            pauschale_bedingungen_data, pauschalen_dict, tabellen_dict_by_table
+        )
+
+    if include_potential_icds and selection_index is not None:
+        # Potenzielle ICDs für die ausgewählte Pauschale (vorberechnet je Tabelle/Sprache)
+        best_pauschale_details[POTENTIAL_ICDS_KEY] = selection_index.icd_suggestions(best_pauschale_code, lang)
     else:
         best_pauschale_details.pop(POTENTIAL_ICDS_KEY, None)
 
@@ -3480,26 +3730,13 @@ def determine_applicable_pauschale(
     # - all siblings within the same stem (e.g. C08.50A-Z)
     # - plus any C90+ fallback candidates from the original candidate pool
     # and evaluate all of them so the UI never shows "Bedingungen nicht geprüft".
-    if not include_explanation_html:
+    if not include_explanation_html and selection_index is not None:
         selected_code_upper = str(best_pauschale_code or "").strip().upper()
-        match_stamm = re.match(r"([A-Z0-9.]+)([A-Z])$", selected_code_upper)
-        stamm = match_stamm.group(1).upper() if match_stamm else None
-
-        sibling_codes: list[str] = []
-        if stamm:
-            sibling_re = re.compile(rf"^{re.escape(stamm)}[A-Z]$", re.IGNORECASE)
-            sibling_codes = sorted(
-                code.strip().upper()
-                for code in pauschalen_dict.keys()
-                if isinstance(code, str) and sibling_re.match(code.strip())
-            )
-
+        sibling_codes = list(selection_index.siblings(selected_code_upper))
         c90_codes = sorted(
-            {
-                str(code).strip().upper()
-                for code in potential_pauschale_codes
-                if is_pauschale_code_ge_c90(str(code))
-            }
+            selection_index.fallback_codes.intersection(
+                str(code).strip().upper() for code in potential_pauschale_codes
+            )
         )
         explanation_codes = set(sibling_codes).union(c90_codes)
         explanation_codes.add(selected_code_upper)
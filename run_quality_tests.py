@@ -6,17 +6,27 @@ fasst die Erfolgsquote zusammen. Eine zusätzliche Funktion stößt eine Auswahl
 an ``pytest``-Tests an, die sich auf die Abrechnungsregeln konzentrieren. Vor
 Änderungen an Prompts oder Regeln lokal mit ``python run_quality_tests.py``
 ausführen.
+
+Mit ``--record [DATEI]`` werden die LLM-Antworten in einer Cassette
+aufgezeichnet, mit ``--replay [DATEI]`` ohne Netzwerk wieder abgespielt
+(siehe ``llm_cassette.py``); so prüft ein Lauf in Sekunden Retrieval, Regeln
+und Pauschalenlogik und meldet geänderte Prompts als Drift.
 """
 
+import argparse
 import json
 import logging
-import math
-import statistics
+import sys
 import time
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 from dotenv import load_dotenv
 
+import llm_cassette
+import quality_runner
+from perf_common import Thresholds
+from runtime_config import load_merged_config
+
 logger = logging.getLogger(__name__)
 
 # Load environment variables from .env file at the very beginning
@@ -27,152 +37,116 @@ from server import app
 BASELINE_PATH = Path(__file__).resolve().parent / "data" / "baseline_results.json"
 
 
-def run_tests() -> None:
-    """Run /api/test-example for all examples, print summary and performance stats."""
+def run_tests(
+    workers: int = 1,
+    report_path: Optional[Path] = None,
+    langs: Optional[List[str]] = None,
+) -> Optional[Dict[str, Any]]:
+    """Run /api/test-example for all examples, print summary and performance stats.
+
+    Mit ``workers`` > 1 laufen die Fälle parallel (die LLM-Drossel gilt
+    prozessweit weiter). Liefert den Bericht aus ``quality_runner.build_report``
+    und schreibt ihn nach ``report_path``, falls angegeben.
+    """
     # Load baseline data directly from file
     with BASELINE_PATH.open("r", encoding="utf-8") as f:
         baseline_data = json.load(f)
 
     # Daten sollten durch den Import von server (und damit create_app) bereits geladen sein.
     # Überprüfe hier den Status von daten_geladen aus dem server Modul.
+    from server import STAGE1_MODEL, STAGE1_PROVIDER, STAGE2_MODEL, STAGE2_PROVIDER
     from server import daten_geladen as server_daten_geladen
     if not server_daten_geladen:
         logger.error(
             "Fehler: Server-Daten wurden nicht korrekt initialisiert. Tests können nicht ausgeführt werden."
         )
-        return
-
-    results: List[bool] = []
-    test_records: List[Dict[str, object]] = []
-    perf_metrics = {
-        "durations": [],  # Sekunden pro Testfall
-        "token_usage": {
-            "llm_stage1": {"input_tokens": 0, "output_tokens": 0},
-            "llm_stage2": {"input_tokens": 0, "output_tokens": 0},
+        return None
+
+    def _log_example(record: Dict[str, Any]) -> None:
+        if record["status"] != 200:
+            logger.error(
+                "Beispiel %s [%s] Fehler: %s (%.2fs)",
+                record["id"],
+                record["lang"],
+                record.get("error"),
+                record["duration_ms"] / 1000.0,
+            )
+            return
+        diff = record.get("diff", "")
+        logger.info(
+            "Beispiel %s [%s]: %s%s (%.2fs)",
+            record["id"],
+            record["lang"],
+            "PASS" if record["passed"] else "FAIL",
+            f" - {diff}" if diff else "",
+            record["duration_ms"] / 1000.0,
+        )
+
+    # Nutzt bewusst die öffentliche API, wie es auch das Web-Frontend tun würde.
+    records, suite_elapsed = quality_runner.run_examples(
+        app,
+        quality_runner.baseline_examples(baseline_data, langs),
+        workers=workers,
+        wrap=lambda ex_id, lang: llm_cassette.scope(f"{ex_id}/{lang}"),
+        progress=_log_example,
+    )
+    report = quality_runner.build_report(
+        records,
+        suite_elapsed,
+        workers=workers,
+        llm={
+            "stage1": f"{STAGE1_PROVIDER}/{STAGE1_MODEL}",
+            "stage2": f"{STAGE2_PROVIDER}/{STAGE2_MODEL}",
+            "cassette": llm_cassette.mode(),
         },
-    }
-
-    def _accumulate_tokens(target: Dict[str, Dict[str, int]], source: Dict[str, object]) -> None:
-        """Summiert Tokenzahlen aus einer Antwort in die Gesamtstatistik."""
-        for stage in ("llm_stage1", "llm_stage2"):
-            tgt = target.setdefault(stage, {"input_tokens": 0, "output_tokens": 0})
-            src = source.get(stage) if isinstance(source, dict) else {}
-            if not isinstance(src, dict):
-                continue
-            tgt["input_tokens"] = int(tgt.get("input_tokens", 0) or 0) + int(src.get("input_tokens", 0) or 0)
-            tgt["output_tokens"] = int(tgt.get("output_tokens", 0) or 0) + int(src.get("output_tokens", 0) or 0)
-
-    def _percentile(values: List[float], pct: float) -> float:
-        """Einfaches Quantil (0..1) für kleine Samples ohne externes Paket."""
-        if not values:
-            return 0.0
-        sorted_vals = sorted(values)
-        k = (len(sorted_vals) - 1) * pct
-        f = math.floor(k)
-        c = math.ceil(k)
-        if f == c:
-            return sorted_vals[int(k)]
-        return sorted_vals[f] + (sorted_vals[c] - sorted_vals[f]) * (k - f)
-
-    suite_started = time.perf_counter()
-    with app.test_client() as client:
-        # Nutzt bewusst die öffentliche API, wie es auch das Web-Frontend tun würde.
-        for ex_id, entry in baseline_data.items():
-            langs = list(entry.get("query", {}).keys())
-            for lang in langs:
-                test_started = time.perf_counter()
-                resp = client.post(
-                    "/api/test-example",
-                    json={"id": int(ex_id), "lang": lang},
-                )
-                duration = time.perf_counter() - test_started
-                perf_metrics["durations"].append(duration)
-
-                if resp.status_code != 200:
-                    logger.error(
-                        "Beispiel %s [%s] Fehler: HTTP %s (%.2fs)",
-                        ex_id,
-                        lang,
-                        resp.status_code,
-                        duration,
-                    )
-                    results.append(False)
-                    test_records.append(
-                        {"id": ex_id, "lang": lang, "passed": False, "duration": duration}
-                    )
-                    continue
-
-                data = resp.get_json() or {}
-                token_usage = data.get("token_usage") if isinstance(data, dict) else {}
-                _accumulate_tokens(perf_metrics["token_usage"], token_usage if isinstance(token_usage, dict) else {})
-
-                passed = bool(data.get("passed"))
-                diff = data.get("diff", "")
-                status = "PASS" if passed else "FAIL"
-                logger.info(
-                    "Beispiel %s [%s]: %s%s (%.2fs)",
-                    ex_id,
-                    lang,
-                    status,
-                    f" - {diff}" if diff else "",
-                    duration,
-                )
-                results.append(passed)
-                test_records.append(
-                    {"id": ex_id, "lang": lang, "passed": passed, "duration": duration}
-                )
-
-    total = len(results)
-    passed_count = sum(1 for r in results if r)
-    suite_elapsed = time.perf_counter() - suite_started
-
-    durations = perf_metrics["durations"]
-    avg_duration = sum(durations) / len(durations) if durations else 0.0
-    median_duration = statistics.median(durations) if durations else 0.0
-    p95_duration = _percentile(durations, 0.95)
+    )
+    summary = report["summary"]
+    durations = summary["duration_ms"]
 
     logger.info(
-        "\n%s/%s Tests bestanden (%.1f%%). Gesamtzeit: %.2fs | Ø %.2fs | Median %.2fs | p95 %.2fs",
-        passed_count,
-        total,
-        (passed_count / total * 100) if total else 0,
+        "\n%s/%s Tests bestanden (%.1f%%). Gesamtzeit: %.2fs (%s Worker) | Ø %.2fs | Median %.2fs | p95 %.2fs",
+        summary["passed"],
+        summary["total"],
+        summary["pass_rate"],
         suite_elapsed,
-        avg_duration,
-        median_duration,
-        p95_duration,
+        workers,
+        durations.get("mean", 0.0) / 1000.0,
+        durations.get("p50", 0.0) / 1000.0,
+        durations.get("p95", 0.0) / 1000.0,
     )
 
-    def _duration_key(record: Dict[str, object]) -> float:
-        """Return duration as float for sorting, fallback 0.0."""
-        value: Any = record.get("duration")
-        try:
-            return float(value)
-        except Exception:
-            return 0.0
-
-    slowest = sorted(test_records, key=_duration_key, reverse=True)[:3]
+    slowest = sorted(records, key=lambda rec: rec["duration_ms"], reverse=True)[:3]
     for rec in slowest:
         logger.info(
             "Langsam: Beispiel %s [%s] %.2fs (%s)",
             rec.get("id"),
             rec.get("lang"),
-            rec.get("duration", 0.0),
+            rec["duration_ms"] / 1000.0,
             "PASS" if rec.get("passed") else "FAIL",
         )
+    for stage, dist in summary["stages_ms"].items():
+        logger.info("Abschnitt %-20s Median %8.1f ms | p95 %8.1f ms", stage, dist["p50"], dist["p95"])
 
-    tok = perf_metrics["token_usage"]
-    s1_in = tok.get("llm_stage1", {}).get("input_tokens", 0)
-    s1_out = tok.get("llm_stage1", {}).get("output_tokens", 0)
-    s2_in = tok.get("llm_stage2", {}).get("input_tokens", 0)
-    s2_out = tok.get("llm_stage2", {}).get("output_tokens", 0)
+    tok = summary["tokens"]
     logger.info(
         "Tokenverbrauch gesamt: Stage1 %s in / %s out | Stage2 %s in / %s out",
-        s1_in,
-        s1_out,
-        s2_in,
-        s2_out,
+        tok["llm_stage1"]["input_tokens"],
+        tok["llm_stage1"]["output_tokens"],
+        tok["llm_stage2"]["input_tokens"],
+        tok["llm_stage2"]["output_tokens"],
     )
 
+    llm_cassette.flush()
+    cassette_summary = llm_cassette.format_report(llm_cassette.report())
+    if cassette_summary:
+        logger.info("%s", cassette_summary)
+        report["cassette"] = {k: v for k, v in llm_cassette.report().items() if k not in ("drift", "missing")}
+
+    if report_path is not None:
+        quality_runner.save_report(report_path, report)
+        logger.info("Bericht geschrieben: %s", report_path)
+    return report
+
 
 import pytest
 
@@ -190,6 +164,48 @@ def run_pytest_tests():
         else:
             logger.warning(f"Test file not found: {test_file}")
 
+def main(argv: Optional[List[str]] = None) -> int:
+    config = load_merged_config()
+    section = "QUALITY"
+    parser = argparse.ArgumentParser(description="Qualitäts-Baseline gegen /api/test-example prüfen.")
+    llm_cassette.add_arguments(parser)
+    parser.add_argument("--workers", type=int, default=config.getint(section, "workers", fallback=4),
+                        help="Parallele Fälle (die LLM-Drossel gilt weiterhin prozessweit).")
+    parser.add_argument("--lang", action="append", help="Nur diese Sprache(n), mehrfach angebbar.")
+    parser.add_argument("--report", type=Path, help="Pfad des JSON-Berichts (Standard: [QUALITY] report_dir/<Zeit>.json).")
+    parser.add_argument("--no-report", action="store_true", help="Keinen Bericht schreiben.")
+    parser.add_argument("--diff", nargs=2, type=Path, metavar=("ALT", "NEU"), help="Nur zwei Berichte vergleichen.")
+    parser.add_argument("--compare-with", type=Path, metavar="BERICHT", help="Nach dem Lauf mit diesem Bericht vergleichen.")
+    parser.add_argument("--fail-on-regression", action="store_true", help="Exit-Code 1 bei neuen Fehlern oder Latenzregressionen.")
+    parser.add_argument("--no-pytest", action="store_true", help="Nur die Baseline, keine pytest-Auswahl.")
+    args = parser.parse_args(argv)
+    thresholds = Thresholds(
+        time_ratio=config.getfloat(section, "latency_threshold", fallback=0.25),
+        min_delta_ms=config.getfloat(section, "min_delta_ms", fallback=250.0),
+        metric=config.get(section, "stage_metric", fallback="p50"),
+    )
+
+    if args.diff:
+        old_report, new_report = (quality_runner.load_report(path) for path in args.diff)
+    else:
+        llm_cassette.apply_arguments(args)
+        report_path = None
+        if not args.no_report:
+            report_dir = Path(config.get(section, "report_dir", fallback="logs/quality"))
+            report_path = args.report or report_dir / f"quality_{time.strftime('%Y%m%d-%H%M%S')}.json"
+        new_report = run_tests(workers=max(1, args.workers), report_path=report_path, langs=args.lang)
+        if not args.no_pytest:
+            run_pytest_tests()
+        if new_report is None:
+            return 1
+        if not args.compare_with:
+            return 0
+        old_report = quality_runner.load_report(args.compare_with)
+
+    diff = quality_runner.diff_reports(old_report, new_report, thresholds)
+    print(quality_runner.format_diff(diff))
+    return 1 if args.fail_on_regression and quality_runner.has_regressions(diff) else 0
+
+
 if __name__ == "__main__":
-    run_tests()
-    run_pytest_tests()
+    sys.exit(main())
@@ -0,0 +1,87 @@
+"""
+Benchmark: load and serialize times of the JSON backends.
+
+Times ``json_backend.load_file`` for every ``data/*.json`` and
+``json_backend.dumps_bytes`` for the loaded data, once with the stdlib
+backend ("before") and once with ``orjson`` ("after", if installed), and
+prints a table with the best of ``--repeat`` runs in milliseconds.
+
+Run from the project root:
+
+    python scripts/bench_json.py [--repeat 5] [--pattern "*.json"]
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import json_backend  # noqa: E402
+
+
+def best_of(func: Callable[[], object], repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings) * 1000.0
+
+
+def measure(backend: str, files: List[Path], repeat: int) -> Dict[str, Tuple[float, float]]:
+    json_backend.configure(backend)
+    results: Dict[str, Tuple[float, float]] = {}
+    for path in files:
+        data = json_backend.load_file(path)
+        load_ms = best_of(lambda: json_backend.load_file(path), repeat)
+        dump_ms = best_of(lambda: json_backend.dumps_bytes(data), repeat)
+        results[path.name] = (load_ms, dump_ms)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare stdlib json and orjson on the data files.")
+    parser.add_argument("--root", type=Path, default=Path("."), help="Project root (defaults to current directory).")
+    parser.add_argument("--pattern", default="*.json", help="Glob pattern inside data/.")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per measurement (best is reported).")
+    args = parser.parse_args()
+
+    files = sorted((args.root / "data").glob(args.pattern))
+    if not files:
+        print("No data files found.")
+        return
+
+    backends = ["json"]
+    if json_backend.orjson is not None:
+        backends.append("orjson")
+    else:
+        print("orjson not installed; measuring stdlib json only.")
+    runs = {name: measure(name, files, max(1, args.repeat)) for name in backends}
+    json_backend.configure("auto")
+
+    header = f"{'file':<42}" + "".join(f"{name + ' load':>14}{name + ' dump':>14}" for name in backends)
+    print(header)
+    print("-" * len(header))
+    totals = {name: [0.0, 0.0] for name in backends}
+    for path in files:
+        line = f"{path.name:<42}"
+        for name in backends:
+            load_ms, dump_ms = runs[name][path.name]
+            totals[name][0] += load_ms
+            totals[name][1] += dump_ms
+            line += f"{load_ms:>14.1f}{dump_ms:>14.1f}"
+        print(line)
+    print("-" * len(header))
+    print(f"{'total (ms)':<42}" + "".join(f"{load:>14.1f}{dump:>14.1f}" for load, dump in totals.values()))
+    if len(backends) == 2:
+        (base_load, base_dump), (fast_load, fast_dump) = totals["json"], totals["orjson"]
+        print(f"speedup load x{base_load / max(fast_load, 1e-9):.1f}, dump x{base_dump / max(fast_dump, 1e-9):.1f}")
+
+
+if __name__ == "__main__":
+    main()
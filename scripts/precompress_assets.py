@@ -0,0 +1,59 @@
+"""
+Build step: write precompressed variants of the static data files.
+
+For every ``data/*.json`` above the size threshold the script writes
+``<name>.json.br`` (maximum brotli quality, if the ``brotli`` package is
+installed) and ``<name>.json.gz`` next to the source. ``server.py`` serves these
+sidecar files instead of compressing at start, as long as they are not older
+than the source file.
+
+Run from the project root:
+
+    python scripts/precompress_assets.py
+"""
+
+from __future__ import annotations
+
+import argparse
+import gzip
+from pathlib import Path
+
+try:
+    import brotli
+except ModuleNotFoundError:  # optional dependency
+    brotli = None
+
+
+def compress_file(path: Path, min_bytes: int) -> list[Path]:
+    raw = path.read_bytes()
+    if len(raw) < min_bytes:
+        return []
+    variants = {".gz": gzip.compress(raw, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants[".br"] = brotli.compress(raw, quality=11)
+    written: list[Path] = []
+    for suffix, data in variants.items():
+        target = path.with_name(path.name + suffix)
+        if len(data) >= len(raw):
+            target.unlink(missing_ok=True)
+            continue
+        target.write_bytes(data)
+        written.append(target)
+    return written
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Precompress static data files (gzip/brotli).")
+    parser.add_argument("--root", type=Path, default=Path("."), help="Project root (defaults to current directory).")
+    parser.add_argument("--min-bytes", type=int, default=4096, help="Skip files smaller than this.")
+    args = parser.parse_args()
+
+    if brotli is None:
+        print("brotli not installed; writing gzip variants only.")
+    for source in sorted((args.root / "data").glob("*.json")):
+        for target in compress_file(source, args.min_bytes):
+            print(f"{target} ({target.stat().st_size} bytes)")
+
+
+if __name__ == "__main__":
+    main()
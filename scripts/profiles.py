@@ -0,0 +1,124 @@
+"""
+List and inspect request profiles written by the server (``[PROFILING]`` in config.ini).
+
+Profiles are named ``<time>_<request-id>.pstats`` (cProfile) or
+``<time>_<request-id>.collapsed`` (stack sampler). ``list`` shows the most
+recent files, ``show`` prints the hottest functions of one profile; a request
+id (``req_...`` from the server log or the ``X-Profile-Id`` header) is enough
+to find it.
+
+Run from the project root:
+
+    python scripts/profiles.py list [--dir logs/profiles] [--limit 20]
+    python scripts/profiles.py show req_1734... [--sort cumulative] [--top 25]
+
+``.collapsed`` files can be fed directly to flamegraph.pl or speedscope.
+"""
+
+from __future__ import annotations
+
+import argparse
+import pstats
+import time
+from collections import Counter
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+SUFFIXES = (".pstats", ".collapsed")
+
+
+def find_profiles(directory: Path) -> List[Path]:
+    if not directory.is_dir():
+        return []
+    files = [p for p in directory.iterdir() if p.suffix in SUFFIXES and p.is_file()]
+    return sorted(files, key=lambda p: p.stat().st_mtime, reverse=True)
+
+
+def resolve(directory: Path, ref: str) -> Optional[Path]:
+    """Dateiname, Pfad oder Request-ID; bei mehreren Treffern das neueste Profil."""
+    candidate = Path(ref)
+    if candidate.is_file():
+        return candidate
+    for path in find_profiles(directory):
+        if path.name == ref or ref in path.stem:
+            return path
+    return None
+
+
+def read_collapsed(path: Path) -> Counter:
+    stacks: Counter = Counter()
+    with path.open("r", encoding="utf-8") as fh:
+        for line in fh:
+            stack, _, count = line.rstrip("\n").rpartition(" ")
+            if stack and count.isdigit():
+                stacks[stack] += int(count)
+    return stacks
+
+
+def collapsed_summary(stacks: Counter) -> Tuple[int, List[Tuple[str, int, int]]]:
+    """Gesamtzahl Stichproben und je Funktion (self, total)."""
+    own: Counter = Counter()
+    total: Counter = Counter()
+    for stack, count in stacks.items():
+        frames = stack.split(";")
+        own[frames[-1]] += count
+        for frame in set(frames):
+            total[frame] += count
+    rows = [(frame, own[frame], total[frame]) for frame in total]
+    return sum(stacks.values()), rows
+
+
+def print_list(directory: Path, limit: int) -> None:
+    files = find_profiles(directory)
+    if not files:
+        print(f"No profiles found in {directory}.")
+        return
+    print(f"{'created':<21}{'size':>10}  name")
+    for path in files[:limit]:
+        stat = path.stat()
+        created = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(stat.st_mtime))
+        print(f"{created:<21}{stat.st_size:>10}  {path.name}")
+
+
+def print_profile(path: Path, sort: str, top: int) -> None:
+    print(f"profile {path}")
+    print()
+    if path.suffix == ".pstats":
+        stats = pstats.Stats(str(path))
+        stats.strip_dirs().sort_stats(sort).print_stats(top)
+        return
+    samples, rows = collapsed_summary(read_collapsed(path))
+    if not samples:
+        print("No samples recorded (request shorter than the sampling interval?).")
+        return
+    key = 2 if sort == "cumulative" else 1
+    print(f"{samples} samples")
+    print(f"{'self %':>8}{'total %':>9}  function")
+    for frame, own, total in sorted(rows, key=lambda r: r[key], reverse=True)[:top]:
+        print(f"{own * 100 / samples:>8.1f}{total * 100 / samples:>9.1f}  {frame}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="List and inspect request profiles.")
+    parser.add_argument("--dir", type=Path, default=Path("logs/profiles"), help="Profile directory.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    list_cmd = sub.add_parser("list", help="Show the most recent profiles.")
+    list_cmd.add_argument("--limit", type=int, default=20)
+    show_cmd = sub.add_parser("show", help="Print the hottest functions of one profile.")
+    show_cmd.add_argument("profile", help="File name, path or request id (req_...).")
+    show_cmd.add_argument("--sort", choices=("cumulative", "tottime"), default="cumulative")
+    show_cmd.add_argument("--top", type=int, default=25)
+    args = parser.parse_args()
+
+    if args.command == "list":
+        print_list(args.dir, args.limit)
+        return
+    path = resolve(args.dir, args.profile)
+    if path is None:
+        print("Profile not found.")
+        return
+    print_profile(path, args.sort, args.top)
+
+
+if __name__ == "__main__":
+    main()
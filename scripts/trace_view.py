@@ -0,0 +1,160 @@
+"""
+Show request traces written by the server (``[TRACING]`` in config.ini).
+
+The trace file contains one JSON span per line (OpenTelemetry data model).
+Without an id the script lists the most recent traces; with ``--request-id``
+(e.g. ``req_1734...`` from the server log) or ``--trace-id`` (response header
+``X-Trace-Id``) it prints the slowest spans of that request with their self
+time and, with ``--tree``, the full span tree.
+
+Run from the project root:
+
+    python scripts/trace_view.py [--file logs/traces.jsonl] [--request-id ID | --trace-id ID] [--top 15] [--tree]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+
+def read_spans(path: Path, include_rotated: bool = True) -> List[Dict[str, Any]]:
+    files = [path]
+    if include_rotated:
+        files += sorted(path.parent.glob(path.name + ".*"), reverse=True)
+    spans: List[Dict[str, Any]] = []
+    for file in files:
+        if not file.is_file():
+            continue
+        with file.open("r", encoding="utf-8") as fh:
+            for line in fh:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    spans.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue
+    return spans
+
+
+def group_traces(spans: Iterable[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+    traces: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    for span in spans:
+        traces[span.get("trace_id", "")].append(span)
+    return traces
+
+
+def root_of(spans: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    return next((s for s in spans if not s.get("parent_span_id")), None)
+
+
+def find_trace(traces: Dict[str, List[Dict[str, Any]]], trace_id: str = "", request_id: str = "") -> Optional[str]:
+    if trace_id:
+        return trace_id if trace_id in traces else None
+    for tid, spans in traces.items():
+        root = root_of(spans)
+        if root and root.get("attributes", {}).get("request.id") == request_id:
+            return tid
+    return None
+
+
+def self_times(spans: List[Dict[str, Any]]) -> Dict[str, float]:
+    """Dauer abzüglich der direkten Kinder (Millisekunden)."""
+    child_ms: Dict[str, float] = defaultdict(float)
+    for span in spans:
+        parent = span.get("parent_span_id")
+        if parent:
+            child_ms[parent] += float(span.get("duration_ms") or 0)
+    return {s["span_id"]: max(0.0, float(s.get("duration_ms") or 0) - child_ms[s["span_id"]]) for s in spans}
+
+
+def _label(span: Dict[str, Any]) -> str:
+    attrs = span.get("attributes") or {}
+    shown = ", ".join(f"{k}={v}" for k, v in list(attrs.items())[:4])
+    status = (span.get("status") or {}).get("code")
+    flag = " ERROR" if status == "ERROR" else ""
+    return f"{span.get('name')}{flag}" + (f" [{shown}]" if shown else "")
+
+
+def print_list(traces: Dict[str, List[Dict[str, Any]]], limit: int) -> None:
+    roots = [r for r in (root_of(spans) for spans in traces.values()) if r]
+    roots.sort(key=lambda r: r.get("start_time_unix_nano") or 0, reverse=True)
+    print(f"{'trace_id':<34}{'request.id':<26}{'ms':>10}  {'spans':>5}  name")
+    for root in roots[:limit]:
+        attrs = root.get("attributes") or {}
+        print(
+            f"{root['trace_id']:<34}{str(attrs.get('request.id', '-')):<26}"
+            f"{float(root.get('duration_ms') or 0):>10.1f}  {len(traces[root['trace_id']]):>5}  {root.get('name')}"
+        )
+
+
+def print_slowest(spans: List[Dict[str, Any]], top: int) -> None:
+    selfs = self_times(spans)
+    print(f"{'total ms':>10}{'self ms':>10}  span")
+    for span in sorted(spans, key=lambda s: float(s.get("duration_ms") or 0), reverse=True)[:top]:
+        print(f"{float(span.get('duration_ms') or 0):>10.1f}{selfs[span['span_id']]:>10.1f}  {_label(span)}")
+
+    by_name: Dict[str, List[float]] = defaultdict(list)
+    for span in spans:
+        by_name[span.get("name", "")].append(selfs[span["span_id"]])
+    print()
+    print(f"{'self ms':>10}{'count':>7}  span name (aggregated)")
+    for name, values in sorted(by_name.items(), key=lambda kv: sum(kv[1]), reverse=True)[:top]:
+        print(f"{sum(values):>10.1f}{len(values):>7}  {name}")
+
+
+def print_tree(spans: List[Dict[str, Any]]) -> None:
+    children: Dict[Optional[str], List[Dict[str, Any]]] = defaultdict(list)
+    for span in spans:
+        children[span.get("parent_span_id")].append(span)
+    for siblings in children.values():
+        siblings.sort(key=lambda s: s.get("start_time_unix_nano") or 0)
+
+    def walk(span: Dict[str, Any], depth: int) -> None:
+        print(f"{float(span.get('duration_ms') or 0):>10.1f} ms  {'  ' * depth}{_label(span)}")
+        for event in span.get("events") or ():
+            print(f"{'':>13}  {'  ' * (depth + 1)}* {event.get('name')} {event.get('attributes') or ''}")
+        for child in children.get(span["span_id"], ()):
+            walk(child, depth + 1)
+
+    for root in children.get(None, ()):
+        walk(root, 0)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Summarize request traces (JSONL spans).")
+    parser.add_argument("--file", type=Path, default=Path("logs/traces.jsonl"), help="Trace file (rotated files are included).")
+    parser.add_argument("--request-id", default="", help="Request id from the server log (req_...).")
+    parser.add_argument("--trace-id", default="", help="Trace id (response header X-Trace-Id).")
+    parser.add_argument("--top", type=int, default=15, help="Number of spans/traces to show.")
+    parser.add_argument("--tree", action="store_true", help="Print the full span tree.")
+    args = parser.parse_args()
+
+    traces = group_traces(read_spans(args.file))
+    if not traces:
+        print(f"No spans found in {args.file}.")
+        return
+    if not (args.request_id or args.trace_id):
+        print_list(traces, args.top)
+        return
+    trace_id = find_trace(traces, args.trace_id, args.request_id)
+    if trace_id is None:
+        print("Trace not found.")
+        return
+    spans = traces[trace_id]
+    root = root_of(spans)
+    if root:
+        print(f"trace {trace_id}: {_label(root)} – {float(root.get('duration_ms') or 0):.1f} ms, {len(spans)} spans")
+        print()
+    print_slowest(spans, args.top)
+    if args.tree:
+        print()
+        print_tree(spans)
+
+
+if __name__ == "__main__":
+    main()
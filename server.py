@@ -16,17 +16,23 @@ import re
 import json
 import math
 import time # für Zeitmessung
+import atexit
+import gzip
+import hashlib
+import threading
+import uuid
 import traceback # für detaillierte Fehlermeldungen
 from pathlib import Path
 # Use explicit module alias to avoid any name shadowing or analysis confusion
 import datetime as dt
 from functools import lru_cache, wraps
 from importlib import import_module
-from typing import Any, TYPE_CHECKING, Optional, Dict, List, Set, Union, cast, TypedDict, Tuple, Mapping, Protocol, Callable, DefaultDict, Sequence
+from typing import Any, TYPE_CHECKING, Optional, Dict, Iterable, List, Set, Union, cast, TypedDict, Tuple, Mapping, Protocol, Callable, DefaultDict, Sequence
 
 # Always initialize optional third-party helpers to a known value so static analyzers
 # see a bound name even if the optional dependency is missing.
 Compress: Optional[Any] = None
+brotli: Optional[Any] = None
 USING_FLASK_STUB = False
 
 
@@ -76,6 +82,11 @@ try:
 except ModuleNotFoundError:
     Compress = None
 
+try:
+    import brotli
+except ModuleNotFoundError:
+    brotli = None
+
 Request = FlaskRequest
 
 # Ensure a module-like ``flask`` object is always defined so that static analyzers
@@ -117,8 +128,11 @@ except ModuleNotFoundError:
         """Fallback für python-dotenv: tut nichts und liefert False."""
         return False
 from utils import (
+    build_table_catalog,
+    discard_table_catalog,
+    get_table_catalog,
+    get_table_codes,
     get_table_content,
-    translate_rule_error_message,
     expand_compound_words,
     extract_keywords,
     extract_lkn_codes_from_text,
@@ -166,11 +180,19 @@ from synonyms.expander import expand_query, set_synonyms_enabled
 from synonyms import storage
 from synonyms.models import SynonymCatalog
 from runtime_config import load_merged_config
+import frontend_data
+import json_backend
+import llm_cassette
+import memory_diagnostics
+import metrics
+import profiling
+import tracing
+from log_pipeline import LazyJSON, LogPipeline
 from openai_wrapper import chat_completion_safe, enforce_llm_min_interval, ChatCompletionMessageParam
 import configparser
 
 import logging
-from collections import defaultdict
+from collections import OrderedDict, defaultdict
 from logging.handlers import RotatingFileHandler
 import sys
 import shutil
@@ -285,12 +307,32 @@ def _get_api_key(provider: str) -> Optional[str]:
             if candidate:
                 return candidate
 
+    if llm_cassette.replaying():
+        # Antworten kommen aus der Cassette; ein echter Key wird nicht benötigt
+        return llm_cassette.REPLAY_API_KEY
     return None
 
 
 def _get_base_url(provider: str) -> Optional[str]:
-    """Liest eine optionale Basis-URL für OpenAI-kompatible Provider."""
-    return os.getenv(f"{_env_name(provider)}_BASE_URL")
+    """Liest eine optionale Basis-URL (Umgebung ``<PROVIDER>_BASE_URL``, sonst ``[API_ENDPOINTS]``)."""
+    env_url = os.getenv(f"{_env_name(provider)}_BASE_URL")
+    if env_url and env_url.strip():
+        return env_url.strip()
+    cfg = globals().get("config")
+    if isinstance(cfg, configparser.ConfigParser):
+        candidate = (cfg.get("API_ENDPOINTS", f"{provider.lower()}_base_url", fallback="") or "").strip()
+        if candidate:
+            return candidate
+    return None
+
+
+GEMINI_DEFAULT_BASE_URL = "https://generativelanguage.googleapis.com/v1beta"
+
+
+def _gemini_generate_url(model: str, api_key: str) -> str:
+    """URL für ``generateContent``; die Basis lässt sich z.B. auf den Mock-Server umbiegen."""
+    base_url = (_get_base_url("gemini") or GEMINI_DEFAULT_BASE_URL).rstrip("/")
+    return f"{base_url}/models/{model}:generateContent?key={api_key}"
 
 
 # Lese optionale Einstellungen aus config.ini (ggf. mit Laufzeit-Overrides)
@@ -493,6 +535,129 @@ if file_handler is not None:
     except Exception:
         pass
 
+# Request-Tracing: Span-Bäume je Anfrage als JSONL (eine Zeile pro Span)
+TRACING_ENABLED = config.getboolean('TRACING', 'enabled', fallback=False)
+try:
+    TRACING_SAMPLE_RATE = config.getfloat('TRACING', 'sample_rate', fallback=0.1)
+except Exception:
+    TRACING_SAMPLE_RATE = 0.1
+TRACING_FILE_PATH = config.get('TRACING', 'file_path', fallback='logs/traces.jsonl')
+try:
+    TRACING_FILE_MAX_BYTES = max(0, config.getint('TRACING', 'file_max_bytes', fallback=10000000))
+except Exception:
+    TRACING_FILE_MAX_BYTES = 10000000
+try:
+    TRACING_FILE_BACKUP_COUNT = max(0, config.getint('TRACING', 'file_backup_count', fallback=3))
+except Exception:
+    TRACING_FILE_BACKUP_COUNT = 3
+TRACING_ROUTE_PREFIX = config.get('TRACING', 'route_prefix', fallback='/api/')
+
+trace_logger = logging.getLogger("trace")
+trace_logger.propagate = False
+trace_logger.setLevel(logging.INFO)
+for handler in trace_logger.handlers[:]:
+    trace_logger.removeHandler(handler)
+    try:
+        handler.close()
+    except Exception:
+        pass
+if TRACING_ENABLED and TRACING_FILE_PATH:
+    try:
+        trace_path = Path(TRACING_FILE_PATH)
+        if trace_path.parent and not trace_path.parent.exists():
+            trace_path.parent.mkdir(parents=True, exist_ok=True)
+        trace_handler = SafeRotatingFileHandler(
+            TRACING_FILE_PATH,
+            maxBytes=TRACING_FILE_MAX_BYTES,
+            backupCount=TRACING_FILE_BACKUP_COUNT,
+            encoding='utf-8',
+            delay=True,
+        )
+        trace_handler.setFormatter(logging.Formatter('%(message)s'))
+        trace_logger.addHandler(trace_handler)
+    except Exception as _trace_exc:
+        logger.warning("Trace-Datei konnte nicht initialisiert werden: %s", _trace_exc)
+tracing.configure(
+    TRACING_ENABLED and bool(trace_logger.handlers),
+    exporter=tracing.logger_exporter(trace_logger),
+    sample_rate=TRACING_SAMPLE_RATE,
+)
+
+# Nicht-blockierende Pipeline: Request-Threads schreiben nur in eine begrenzte
+# Queue, ein Writer-Thread bedient Konsole und Logdatei (inkl. Rotation).
+LOG_QUEUE_ENABLED = config.getint('LOGGING', 'queue_enabled', fallback=1) == 1
+try:
+    LOG_QUEUE_SIZE = max(1, config.getint('LOGGING', 'queue_size', fallback=10000))
+except Exception:
+    LOG_QUEUE_SIZE = 10000
+
+log_pipeline: Optional[LogPipeline] = None
+if LOG_QUEUE_ENABLED:
+    log_pipeline = LogPipeline(LOG_QUEUE_SIZE)
+    for _queued_logger in (root_logger, detail_logger, werkzeug_logger, trace_logger):
+        log_pipeline.attach(_queued_logger)
+    log_pipeline.start()
+    log_pipeline.install_fork_hook()
+    atexit.register(log_pipeline.stop)
+
+# Latenz-/Zählermetriken (Prometheus-Textformat unter /metrics)
+METRICS_ENABLED = config.getboolean('METRICS', 'enabled', fallback=True)
+METRICS_SERVER_TIMING = config.getboolean('METRICS', 'server_timing', fallback=True)
+metrics.configure(METRICS_ENABLED)
+
+# Profiler-Hook: jede N-te Anfrage oder Anfragen mit Admin-Header X-Profile-Token
+PROFILING_ENABLED = config.getboolean('PROFILING', 'enabled', fallback=False)
+try:
+    PROFILING_SAMPLE_EVERY = max(0, config.getint('PROFILING', 'sample_every', fallback=0))
+except Exception:
+    PROFILING_SAMPLE_EVERY = 0
+PROFILING_MODE = config.get('PROFILING', 'mode', fallback='cprofile').strip().lower()
+try:
+    PROFILING_SAMPLER_INTERVAL_MS = config.getfloat('PROFILING', 'sampler_interval_ms', fallback=5.0)
+except Exception:
+    PROFILING_SAMPLER_INTERVAL_MS = 5.0
+PROFILING_DIRECTORY = config.get('PROFILING', 'directory', fallback='logs/profiles')
+try:
+    PROFILING_MAX_FILES = max(1, config.getint('PROFILING', 'max_files', fallback=50))
+except Exception:
+    PROFILING_MAX_FILES = 50
+PROFILING_ROUTE_PREFIX = config.get('PROFILING', 'route_prefix', fallback='/api/')
+PROFILING_ADMIN_TOKEN = os.getenv('PROFILING_ADMIN_TOKEN', '')
+profiling.configure(
+    PROFILING_ENABLED,
+    sample_every=PROFILING_SAMPLE_EVERY,
+    mode=PROFILING_MODE,
+    directory=PROFILING_DIRECTORY,
+    interval_ms=PROFILING_SAMPLER_INTERVAL_MS,
+    max_files=PROFILING_MAX_FILES,
+    admin_token=PROFILING_ADMIN_TOKEN,
+)
+
+# Speicherdiagnose: Grössen der Datenstrukturen und tracemalloc-Snapshots (Admin-Routen wie /api/profiles)
+try:
+    DIAGNOSTICS_TRACEMALLOC_FRAMES = max(1, config.getint('DIAGNOSTICS', 'tracemalloc_frames', fallback=10))
+except Exception:
+    DIAGNOSTICS_TRACEMALLOC_FRAMES = 10
+try:
+    DIAGNOSTICS_MAX_SNAPSHOTS = max(1, config.getint('DIAGNOSTICS', 'max_snapshots', fallback=10))
+except Exception:
+    DIAGNOSTICS_MAX_SNAPSHOTS = 10
+DIAGNOSTICS_MEMORY_REPORT_ON_LOAD = config.getboolean('DIAGNOSTICS', 'memory_report_on_load', fallback=False)
+memory_diagnostics.configure(frames=DIAGNOSTICS_TRACEMALLOC_FRAMES, max_snapshots=DIAGNOSTICS_MAX_SNAPSHOTS)
+
+# LLM-Cassette: Antworten aufzeichnen (record) oder ohne Netzwerk abspielen (replay)
+LLM_CASSETTE_MODE = (os.getenv('LLM_CASSETTE_MODE') or config.get('LLM_CASSETTE', 'mode', fallback='off')).strip().lower()
+LLM_CASSETTE_FILE = os.getenv('LLM_CASSETTE_FILE') or config.get('LLM_CASSETTE', 'file', fallback='tests/cassettes/llm_cassette.json.gz')
+LLM_CASSETTE_ON_DRIFT = (os.getenv('LLM_CASSETTE_ON_DRIFT') or config.get('LLM_CASSETTE', 'on_drift', fallback='serve')).strip().lower()
+LLM_CASSETTE_STORE_PROMPTS = config.getboolean('LLM_CASSETTE', 'store_prompts', fallback=True)
+llm_cassette.configure(
+    LLM_CASSETTE_MODE,
+    LLM_CASSETTE_FILE,
+    on_drift=LLM_CASSETTE_ON_DRIFT,
+    store_prompts=LLM_CASSETTE_STORE_PROMPTS,
+)
+atexit.register(llm_cassette.flush)
+
 # --- HTML Sanitization (server-side) ---
 ALLOWED_HTML_TAGS: list[str] = [
     # text / structure
@@ -514,9 +679,36 @@ ALLOWED_HTML_ATTRS: dict[str, list[str]] = {
     'summary': ['class'],
 }
 
+# Prozessweiter Cache Inhalts-Hash → bereinigtes HTML. Die Fragmente stammen aus
+# wenigen Pauschalen und Kontexten und wiederholen sich stark; bleach ist reines Python.
+_sanitize_cache: "OrderedDict[bytes, str]" = OrderedDict()
+_sanitize_cache_lock = threading.Lock()
+_sanitize_stats: Dict[str, float] = {"hits": 0, "misses": 0, "clean_seconds": 0.0}
+
+
+def _sanitize_cache_key(html_text: str) -> bytes:
+    return hashlib.blake2b(html_text.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+
+
+def get_sanitize_stats() -> Dict[str, float]:
+    """Liefert Trefferzahlen, Cachegrösse und kumulierte bleach-Zeit des HTML-Sanitizers."""
+    with _sanitize_cache_lock:
+        stats = dict(_sanitize_stats)
+        stats["size"] = len(_sanitize_cache)
+    return stats
+
+
+def clear_sanitize_cache() -> None:
+    with _sanitize_cache_lock:
+        _sanitize_cache.clear()
+        _sanitize_stats.update(hits=0, misses=0, clean_seconds=0.0)
+
+
 def sanitize_html_fragment(html_text: str) -> str:
     """Sanitize an HTML fragment while preserving required data-* attributes and links.
 
+    Ergebnisse werden über einen begrenzten LRU-Cache (``SANITIZE_CACHE_SIZE``,
+    Schlüssel = Inhalts-Hash) prozessweit wiederverwendet.
     Falls bleach nicht installiert ist, wird der Text unverändert zurückgegeben.
     """
     if not isinstance(html_text, str):
@@ -524,6 +716,14 @@ def sanitize_html_fragment(html_text: str) -> str:
     if bleach is None:
         # Best-effort: return as-is to avoid breaking output in test environments
         return html_text
+    key = _sanitize_cache_key(html_text)
+    with _sanitize_cache_lock:
+        cached = _sanitize_cache.get(key)
+        if cached is not None:
+            _sanitize_cache.move_to_end(key)
+            _sanitize_stats["hits"] += 1
+            return cached
+    started = time.perf_counter()
     try:
         cleaned = bleach.clean(
             html_text,
@@ -534,40 +734,211 @@ def sanitize_html_fragment(html_text: str) -> str:
         )
         # Ensure external links are safe
         cleaned = cleaned.replace('target="_blank"', 'target="_blank" rel="noopener noreferrer"')
-        return cleaned
     except Exception as _san_exc:  # pragma: no cover - robust fallback
         try:
             logger.warning("Sanitize failed, returning original HTML: %s", _san_exc)
         except Exception:
             pass
         return html_text
-
+    elapsed = time.perf_counter() - started
+    with _sanitize_cache_lock:
+        _sanitize_stats["misses"] += 1
+        _sanitize_stats["clean_seconds"] += elapsed
+        if SANITIZE_CACHE_SIZE > 0:
+            _sanitize_cache[key] = cleaned
+            while len(_sanitize_cache) > SANITIZE_CACHE_SIZE:
+                _sanitize_cache.popitem(last=False)
+    return cleaned
+
+@metrics.timed("html_sanitize")
 def _sanitize_abrechnung_payload(abrechnung: dict[str, Any] | None) -> dict[str, Any] | None:
     """Sanitize known HTML fields within the 'abrechnung' object returned to clients.
 
     - abrechnung['bedingungs_pruef_html']
     - abrechnung['details']['pauschale_erklaerung_html']
     - abrechnung['evaluated_pauschalen'][i]['bedingungs_pruef_html']
+
+    Dies ist der einzige Sanitizing-Durchlauf pro Antwort; Aufrufer setzen vorher
+    nur rohes HTML.
     """
     if not isinstance(abrechnung, dict):
         return abrechnung
+    started = time.perf_counter()
+    fragments = 0
     try:
         if 'bedingungs_pruef_html' in abrechnung:
             abrechnung['bedingungs_pruef_html'] = sanitize_html_fragment(abrechnung.get('bedingungs_pruef_html') or '')
+            fragments += 1
         details = abrechnung.get('details')
         if isinstance(details, dict) and 'pauschale_erklaerung_html' in details:
             details['pauschale_erklaerung_html'] = sanitize_html_fragment(details.get('pauschale_erklaerung_html') or '')
+            fragments += 1
         eval_list = abrechnung.get('evaluated_pauschalen')
         if isinstance(eval_list, list):
             for item in eval_list:
                 if isinstance(item, dict) and 'bedingungs_pruef_html' in item:
                     item['bedingungs_pruef_html'] = sanitize_html_fragment(item.get('bedingungs_pruef_html') or '')
+                    fragments += 1
     except Exception as _:
         # Keep payload intact even if sanitization fails for some element
         pass
+    logger.debug(
+        "HTML-Sanitizing: %s Fragmente in %.1f ms",
+        fragments,
+        (time.perf_counter() - started) * 1000,
+    )
     return abrechnung
 
 
+# --- Lazy-Rendering der Bedingungs-HTML (render_mode "lazy") ---
+# analyze-billing liefert dann nur strukturierte Daten plus render_token; das HTML
+# entsteht erst über /api/pauschale-conditions-html und wird dort zwischengespeichert.
+_render_contexts: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+_conditions_html_cache: "OrderedDict[Tuple[str, str, str], Dict[str, Any]]" = OrderedDict()
+_render_cache_lock = threading.Lock()
+# Wird bei jedem (Neu-)Laden der Tarifdaten erhöht und fliesst in die ETags ein.
+_render_data_generation = 0
+
+
+def _canonical_render_context(context: Mapping[str, Any]) -> str:
+    """Serialisiert den Prüfkontext stabil (ohne interne ``__``-Schlüssel)."""
+    public = {str(k): v for k, v in context.items() if not str(k).startswith("__")}
+    return json_backend.dumps(public, sort_keys=True, default=str)
+
+
+def _render_context_token(canonical: str) -> str:
+    return hashlib.blake2b(canonical.encode("utf-8"), digest_size=12).hexdigest()
+
+
+def register_render_context(context: Mapping[str, Any]) -> str:
+    """Hinterlegt den Prüfkontext einer Antwort und liefert das zugehörige render_token."""
+    canonical = _canonical_render_context(context)
+    token = _render_context_token(canonical)
+    with _render_cache_lock:
+        _render_contexts[token] = json_backend.loads(canonical)
+        _render_contexts.move_to_end(token)
+        while len(_render_contexts) > RENDER_CONTEXT_CACHE_SIZE:
+            _render_contexts.popitem(last=False)
+    return token
+
+
+def resolve_render_context(token: str) -> Optional[Dict[str, Any]]:
+    with _render_cache_lock:
+        context = _render_contexts.get(token)
+        if context is not None:
+            _render_contexts.move_to_end(token)
+        return context
+
+
+def _get_cached_conditions_html(key: Tuple[str, str, str]) -> Optional[Dict[str, Any]]:
+    with _render_cache_lock:
+        payload = _conditions_html_cache.get(key)
+        if payload is not None:
+            _conditions_html_cache.move_to_end(key)
+    metrics.inc("cache_requests_total", cache="conditions_html", result="miss" if payload is None else "hit")
+    return payload
+
+
+def _conditions_html_etag(key: Tuple[str, str, str]) -> str:
+    """ETag für (Kontext-Hash, Code, Sprache) unter dem aktuellen Datenstand."""
+    version = f"{APP_VERSION}|{TARIF_VERSION}|{_render_data_generation}"
+    raw = "|".join((version,) + key)
+    return hashlib.blake2b(raw.encode("utf-8"), digest_size=12).hexdigest()
+
+
+def _store_conditions_html(key: Tuple[str, str, str], payload: Dict[str, Any]) -> None:
+    with _render_cache_lock:
+        _conditions_html_cache[key] = payload
+        _conditions_html_cache.move_to_end(key)
+        while len(_conditions_html_cache) > CONDITIONS_HTML_CACHE_SIZE:
+            _conditions_html_cache.popitem(last=False)
+
+
+def clear_render_caches() -> None:
+    """Verwirft Render-Kontexte und HTML-Cache; bestehende ETags werden ungültig."""
+    global _render_data_generation
+    with _render_cache_lock:
+        _render_contexts.clear()
+        _conditions_html_cache.clear()
+        _billing_details.clear()
+        _render_data_generation += 1
+
+
+# --- Schlanke analyze-billing-Antwort (view "lean") ---
+# Die zurückgehaltenen Abschnitte bleiben unter einem details_token im Speicher; die UI
+# holt sie bei Bedarf über /api/analyze-billing/details/<token>.
+_billing_details: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+_LEAN_EVALUATED_OMIT = frozenset({"bedingungs_pruef_html", "conditions_structured", "lkn_match_sources"})
+_BILLING_DETAIL_SECTIONS = ("pauschale_context", "llm_ergebnis_stufe2")
+
+
+def register_billing_details(payload: Mapping[str, Any]) -> str:
+    """Merkt sich nur die Abschnitte, die in der schlanken Antwort fehlen."""
+    token = uuid.uuid4().hex
+    deferred = {name: payload[name] for name in _BILLING_DETAIL_SECTIONS if name in payload}
+    with _render_cache_lock:
+        _billing_details[token] = deferred
+        while len(_billing_details) > BILLING_DETAILS_CACHE_SIZE:
+            _billing_details.popitem(last=False)
+    return token
+
+
+def resolve_billing_details(token: str) -> Optional[Dict[str, Any]]:
+    with _render_cache_lock:
+        payload = _billing_details.get(token)
+        if payload is not None:
+            _billing_details.move_to_end(token)
+        return payload
+
+
+def _build_lean_billing_payload(payload: Mapping[str, Any], details_token: str) -> Dict[str, Any]:
+    """Reduziert die Antwort auf Abrechnungszeilen, gewählte Pauschale und Diagnostik.
+
+    ``evaluated_pauschalen`` erscheint nur einmal (top-level, ohne HTML und
+    Strukturdaten); Prüfkontext und Stage-2-Mapping bleiben hinter dem
+    ``details_token``.
+    """
+    abrechnung = dict(payload.get("abrechnung") or {})
+    abrechnung.pop("evaluated_pauschalen", None)
+    abrechnung.pop("bedingungs_pruef_html", None)
+    evaluated = [
+        {k: v for k, v in entry.items() if k not in _LEAN_EVALUATED_OMIT}
+        for entry in payload.get("evaluated_pauschalen") or []
+        if isinstance(entry, dict)
+    ]
+    stage2 = payload.get("llm_ergebnis_stufe2") or {}
+    mapping_results = stage2.get("mapping_results") if isinstance(stage2, dict) else None
+    lean: Dict[str, Any] = {
+        "view": "lean",
+        "llm_ergebnis_stufe1": payload.get("llm_ergebnis_stufe1"),
+        "regel_ergebnisse_details": payload.get("regel_ergebnisse_details"),
+        "abrechnung": abrechnung,
+        "llm_ergebnis_stufe2": {"mapping_results": [], "deferred": len(mapping_results or [])},
+        "evaluated_pauschalen": evaluated,
+        "diagnostics": {
+            "token_usage": payload.get("token_usage"),
+            "fallback_pauschale_search": payload.get("fallback_pauschale_search"),
+            "evaluated_count": len(evaluated),
+        },
+        "details_token": details_token,
+    }
+    if payload.get("render_token"):
+        lean["render_token"] = payload["render_token"]
+    return lean
+
+
+def _defer_pauschale_context(payload: Mapping[str, Any]) -> Dict[str, Any]:
+    """Lazy-Antwort ohne Prüfkontext; er liegt hinter einem ``details_token``.
+
+    Das Bedingungs-HTML kommt über das ``render_token``; den Kontext braucht die
+    UI nur, wenn dieses abgelaufen ist.
+    """
+    deferred = dict(payload)
+    context = deferred.pop("pauschale_context", None)
+    deferred["details_token"] = register_billing_details({"pauschale_context": context})
+    return deferred
+
+
 def _normalize_gender(value: Any) -> str:
     """Normalize various gender inputs to 'm' or 'w' used by rule engine.
 
@@ -592,6 +963,12 @@ def _normalize_gender(value: Any) -> str:
     return s  # passt ggf. schon ('w'/'m') oder bleibt als freier Wert
 
 
+class PauschaleMappingLkns(TypedDict):
+    lkns: Dict[str, str]
+    tables_precise: Tuple[str, ...]
+    tables_broad: Tuple[str, ...]
+
+
 class CombinedDemographics(TypedDict, total=False):
     age_value: Optional[int]
     age_operator: Optional[str]
@@ -1413,6 +1790,7 @@ def render_pauschale_explanation_html(selected: dict[str, Any] | None,
 USE_RAG = config.getint('RAG', 'enabled', fallback=0) == 1
 APP_VERSION = config.get('APP', 'version', fallback='unknown')
 TARIF_VERSION = config.get('APP', 'tarif_version', fallback='')
+JSON_BACKEND = json_backend.configure(config.get('APP', 'json_backend', fallback='auto'))
 BRICK_QUIZ_ENABLED = config.getint('FEATURES', 'brick_quiz_enabled', fallback=1) == 1
 # Base data directory
 DATA_DIR = Path("data")
@@ -1422,6 +1800,20 @@ try:
     RENDER_SERVER_SIDE_CONDITIONS = config.getint('RENDER', 'server_side_conditions', fallback=0) == 1
 except Exception:
     RENDER_SERVER_SIDE_CONDITIONS = False
+# Anzahl bereinigter HTML-Fragmente im prozessweiten Sanitizer-Cache (0 = aus)
+SANITIZE_CACHE_SIZE = config.getint('RENDER', 'sanitize_cache_size', fallback=2048)
+# Standard-Modus für Bedingungs-HTML in analyze-billing: "eager" rendert sofort,
+# "lazy" liefert nur conditions_structured + render_token (Client kann pro Anfrage überschreiben).
+CONDITIONS_HTML_MODE = config.get('RENDER', 'conditions_html_mode', fallback='eager').strip().lower()
+if CONDITIONS_HTML_MODE not in ('eager', 'lazy'):
+    CONDITIONS_HTML_MODE = 'eager'
+RENDER_CONTEXT_CACHE_SIZE = config.getint('RENDER', 'render_context_cache_size', fallback=256)
+CONDITIONS_HTML_CACHE_SIZE = config.getint('RENDER', 'conditions_html_cache_size', fallback=1024)
+# Standard-Antwortform von /api/analyze-billing ("full" oder "lean")
+ANALYZE_VIEW_DEFAULT = config.get('RENDER', 'analyze_view', fallback='full').strip().lower()
+if ANALYZE_VIEW_DEFAULT not in ('full', 'lean'):
+    ANALYZE_VIEW_DEFAULT = 'full'
+BILLING_DETAILS_CACHE_SIZE = config.getint('RENDER', 'billing_details_cache_size', fallback=128)
 # Configure synonym support
 SYNONYMS_ENABLED = config.getint('SYNONYMS', 'enabled', fallback=0) == 1
 
@@ -1468,8 +1860,7 @@ embedding_codes: List[str] = []
 if USE_RAG and SentenceTransformer and faiss:
     try:
         faiss_index = faiss.read_index(str(FAISS_INDEX_FILE))
-        with FAISS_CODES_FILE.open("r", encoding="utf-8") as f:
-            embedding_codes = json.load(f)
+        embedding_codes = json_backend.load_file(FAISS_CODES_FILE)
         embedding_model = SentenceTransformer(EMBEDDING_MODEL_NAME)
         logger.info(" ✓ FAISS index, embedding model and codes geladen.")
     except Exception as e:  # pragma: no cover - ignore on missing file
@@ -1661,6 +2052,8 @@ class DetermineApplicablePauschaleType(Protocol):
         include_selected_conditions_html: bool = ...,
         include_candidate_sources: bool = ...,
         include_potential_icds: bool = ...,
+        lkn_candidate_index: Optional[Mapping[str, Any]] = ...,
+        selection_index: Optional[Any] = ...,
     ) -> Dict[str, Any]:
         """Signatur für Pauschalen-Auswahlfunktionen."""
         ...
@@ -1712,6 +2105,8 @@ def default_determine_applicable_pauschale_fallback(
     include_selected_conditions_html: bool = True,
     include_candidate_sources: bool = True,
     include_potential_icds: bool = True,
+    lkn_candidate_index: Optional[Mapping[str, Any]] = None,
+    selection_index: Optional[Any] = None,
 ) -> Dict[str, Any]:
     """Fallback für Hauptprüfung der Pauschalen-Logik."""
     logger.warning("Fallback für 'determine_applicable_pauschale' aktiv.")
@@ -1815,6 +2210,7 @@ except Exception as e_gen: # Fängt auch andere Fehler während des Imports
 leistungskatalog_data: list[dict] = []
 leistungskatalog_dict: dict[str, dict] = {}
 regelwerk_dict: dict[str, list] = {} # Annahme: lade_regelwerk gibt List[RegelDict] pro LKN
+regelwerk_kompiliert: dict[str, Any] = {} # LKN -> CompiledRuleSet (regelpruefer_einzelleistungen.compile_regelwerk)
 tardoc_tarif_dict: dict[str, dict] = {}
 tardoc_interp_dict: dict[str, dict] = {}
 tardoc_demographic_cache: dict[str, Dict[str, Any]] = {}
@@ -1847,6 +2243,11 @@ lkn_to_tables_index_broad: DefaultDict[str, List[str]] = defaultdict(list)
 medication_entries: list[dict[str, Any]] = []
 medication_lookup_by_token: dict[str, Set[str]] = {}
 pauschale_bedingungen_indexed: Dict[str, List[Dict[str, Any]]] = {}
+lkn_candidate_index: Dict[str, Any] = {}  # LKN -> LknPauschaleCandidates (präzise/breit + Herkunft)
+pauschale_mapping_lkns: Dict[str, PauschaleMappingLkns] = {}  # Pauschale -> Bedingungs-LKNs (Stage-2-Mapping)
+mapping_table_lkn_desc: Dict[Tuple[str, str], Dict[str, str]] = {}  # (Tabelle, Sprache) -> {LKN: Beschreibung}
+anast_mapping_lkn_desc: Dict[str, str] = {}  # ANAST-Codes für WA.20-Mappings
+pauschale_selection_index: Any = None  # PauschaleSelectionIndex (ICD-Vorschläge, Geschwister/C9x)
 daten_geladen: bool = False
 baseline_results: dict[str, dict] = {}
 examples_data: list[dict] = []
@@ -1859,6 +2260,16 @@ prepared_structures: Dict[str, Any] = {}
 pauschalen_search_tokens_by_code: Dict[str, Set[str]] = {}
 pauschalen_search_blob_by_code: Dict[str, str] = {}
 
+def _current_request_id() -> str:
+    """Request-ID der laufenden Anfrage (einmal vergeben, für Logs, Trace und Profil)."""
+    environ = getattr(request, "environ", None)
+    if not isinstance(environ, dict):
+        return f"req_{time.time_ns()}"
+    request_id = environ.get('_request_id')
+    if not request_id:
+        request_id = environ['_request_id'] = f"req_{time.time_ns()}"
+    return request_id
+
 def create_app() -> FlaskType:
     """
     Erstellt die Flask-Instanz.  
@@ -1875,6 +2286,9 @@ def create_app() -> FlaskType:
         JSON_AS_ASCII=False,
         JSONIFY_MIMETYPE="application/json; charset=utf-8",
     )
+    if json_backend.FastJSONProvider is not None and not USING_FLASK_STUB:
+        app.json = json_backend.FastJSONProvider(app)
+        logger.info("JSON-Backend für Antworten: %s", JSON_BACKEND)
 
     @app.before_request
     def _activate_table_cache_per_request() -> None:
@@ -1887,6 +2301,69 @@ def create_app() -> FlaskType:
             else:
                 request.environ = {'_table_cache_token': token}  # type: ignore[attr-defined]
 
+    @app.before_request
+    def _start_request_metrics() -> None:
+        """Merkt die Startzeit und sammelt Abschnittsdauern für ``Server-Timing``."""
+        environ = getattr(request, "environ", None)
+        if not metrics.is_enabled() or not isinstance(environ, dict):
+            return
+        environ['_metrics_started'] = time.perf_counter()
+        environ['_metrics_token'] = metrics.start_request_timings()
+
+    @app.teardown_request
+    def _stop_request_metrics(_exc: Optional[BaseException]) -> None:
+        environ = getattr(request, "environ", None)
+        if isinstance(environ, dict):
+            metrics.stop_request_timings(environ.pop('_metrics_token', None))
+
+    @app.before_request
+    def _start_request_trace() -> None:
+        """Öffnet den Wurzel-Span für API-Anfragen (Export beim Teardown)."""
+        environ = getattr(request, "environ", None)
+        if not tracing.is_enabled() or not isinstance(environ, dict):
+            return
+        if not request.path.startswith(TRACING_ROUTE_PREFIX):
+            return
+        rule = getattr(request, "url_rule", None)
+        route = rule.rule if rule is not None else request.path
+        root, token = tracing.begin_trace(
+            f"{request.method} {route}",
+            **{"http.method": request.method, "http.route": route, "http.target": request.full_path.rstrip("?")},
+        )
+        if root is not None:
+            environ['_trace_root'] = (root, token)
+
+    @app.teardown_request
+    def _end_request_trace(exc: Optional[BaseException]) -> None:
+        environ = getattr(request, "environ", None)
+        if isinstance(environ, dict) and '_trace_root' in environ:
+            root, token = environ.pop('_trace_root')
+            tracing.end_trace(root, token, exc)
+
+    @app.before_request
+    def _start_request_profile() -> None:
+        """Startet den Profiler für gesampelte Anfragen oder mit Admin-Header."""
+        if not profiling.is_enabled():
+            return
+        environ = getattr(request, "environ", None)
+        if not isinstance(environ, dict) or not request.path.startswith(PROFILING_ROUTE_PREFIX):
+            return
+        admin_header = request.headers.get("X-Profile-Token")
+        if not profiling.should_profile(admin_header):
+            return
+        # Den Modus darf nur wählen, wer das Admin-Token kennt.
+        mode = request.headers.get("X-Profile-Mode") if profiling.token_matches(admin_header) else None
+        environ['_profile_session'] = profiling.start(_current_request_id(), mode)
+
+    @app.teardown_request
+    def _stop_request_profile(_exc: Optional[BaseException]) -> None:
+        environ = getattr(request, "environ", None)
+        session = environ.pop('_profile_session', None) if isinstance(environ, dict) else None
+        if session is not None:
+            path = session.stop()
+            if path is not None:
+                logger.info("Profil gespeichert: %s", path)
+
     @app.teardown_request
     def _cleanup_table_cache_per_request(_exc: Optional[BaseException]) -> None:
         """Deaktiviert den Tabellencache nach jedem Request, falls Token gesetzt."""
@@ -1910,6 +2387,42 @@ def create_app() -> FlaskType:
         except Exception as exc:
             logger.error("Failed to register synonyms API: %s", exc)
 
+    @app.after_request
+    def _annotate_request_trace(response):
+        """Hält den Status im Wurzel-Span fest und gibt die Trace-ID zurück."""
+        environ = getattr(request, "environ", None)
+        trace_state = environ.get('_trace_root') if isinstance(environ, dict) else None
+        if trace_state is not None:
+            trace_state[0].set_attribute("http.status_code", response.status_code)
+            response.headers["X-Trace-Id"] = trace_state[0].trace_id
+        return response
+
+    @app.after_request
+    def _annotate_request_profile(response):
+        environ = getattr(request, "environ", None)
+        session = environ.get('_profile_session') if isinstance(environ, dict) else None
+        if session is not None:
+            response.headers["X-Profile-Id"] = session.path.name
+        return response
+
+    @app.after_request
+    def _record_request_metrics(response):
+        """Zählt Anfragen pro Route/Status und setzt den ``Server-Timing``-Header."""
+        environ = getattr(request, "environ", None)
+        started = environ.get('_metrics_started') if isinstance(environ, dict) else None
+        if started is None:
+            return response
+        elapsed = time.perf_counter() - started
+        rule = getattr(request, "url_rule", None)
+        route = rule.rule if rule is not None else "unmatched"
+        metrics.observe("http_request_duration_seconds", elapsed, route=route)
+        metrics.inc("http_requests_total", route=route, method=request.method, status=response.status_code)
+        if METRICS_SERVER_TIMING:
+            timings = metrics.current_request_timings()
+            timings["total"] = elapsed
+            response.headers["Server-Timing"] = metrics.server_timing_header(timings)
+        return response
+
     @app.after_request
     def _ensure_utf8_charset(response):
         """Stelle sicher, dass textbasierte Antworten explizit UTF-8 senden."""
@@ -2295,9 +2808,12 @@ def _select_pauschale_hint_lkns(
 
 # --- Daten laden Hilfsfunktionen ---
 def _reset_data_containers() -> None:
-    leistungskatalog_data.clear(); leistungskatalog_dict.clear(); regelwerk_dict.clear(); tardoc_tarif_dict.clear(); tardoc_interp_dict.clear()
+    global pauschale_selection_index
+    leistungskatalog_data.clear(); leistungskatalog_dict.clear(); regelwerk_dict.clear(); regelwerk_kompiliert.clear(); tardoc_tarif_dict.clear(); tardoc_interp_dict.clear()
     pauschale_lp_data.clear(); pauschalen_data.clear(); pauschalen_dict.clear(); pauschale_bedingungen_data.clear(); pauschale_bedingungen_indexed.clear(); tabellen_data.clear()
     tabellen_dict_by_table.clear()
+    discard_table_catalog(tabellen_dict_by_table)
+    clear_render_caches()
     pauschalen_search_tokens_by_code.clear(); pauschalen_search_blob_by_code.clear()
     lkn_to_tables_index.clear()
     lkn_to_tables_index_precise.clear(); lkn_to_tables_index_broad.clear()
@@ -2313,6 +2829,9 @@ def _reset_data_containers() -> None:
     pauschale_cond_table_index_by_table.clear()
     pauschale_cond_table_index_precise.clear(); pauschale_cond_table_index_broad.clear()
     pauschale_cond_table_index_by_table_precise.clear(); pauschale_cond_table_index_by_table_broad.clear()
+    lkn_candidate_index.clear()
+    pauschale_selection_index = None
+    pauschale_mapping_lkns.clear(); mapping_table_lkn_desc.clear(); anast_mapping_lkn_desc.clear()
     token_doc_freq.clear()
     chop_data.clear()
     tpw_data.clear()
@@ -2340,6 +2859,149 @@ def _build_pauschalen_search_cache() -> None:
         }
 
 
+def _build_lkn_candidate_index() -> None:
+    """Berechnet LKN -> Pauschalen-Kandidaten (präzise/breit + Herkunft) einmalig vor."""
+    lkn_candidate_index.clear()
+    if not pauschalen_dict:
+        return
+    try:
+        from regelpruefer_pauschale import build_lkn_candidate_index
+        lkn_candidate_index.update(
+            build_lkn_candidate_index(
+                pauschale_lp_index,
+                pauschale_cond_lkn_index,
+                pauschale_cond_table_index,
+                lkn_to_tables_index,
+                pauschale_cond_table_index_precise=pauschale_cond_table_index_precise,
+                pauschale_cond_table_index_broad=pauschale_cond_table_index_broad,
+                lkn_to_tables_index_precise=lkn_to_tables_index_precise,
+                lkn_to_tables_index_broad=lkn_to_tables_index_broad,
+                pauschalen_dict=pauschalen_dict,
+            )
+        )
+        logger.info("  LKN->Pauschalen-Kandidaten vorberechnet (%s LKNs).", len(lkn_candidate_index))
+    except Exception as e_idx:
+        logger.error("  FEHLER bei der Vorberechnung der LKN->Pauschalen-Kandidaten: %s", e_idx)
+        traceback.print_exc()
+
+
+_MAPPING_LKN_LIST_TYPES = {"LEISTUNGSPOSITIONEN IN LISTE", "LKN", "LKN IN LISTE"}
+_MAPPING_LKN_TABLE_TYPES = {"LEISTUNGSPOSITIONEN IN TABELLE", "LKN IN TABELLE"}
+_MAPPING_LANGS = ("de", "fr", "it")
+
+
+def _collect_pauschale_mapping_lkns(
+    conditions: Iterable[Mapping[str, Any]],
+    leistungskatalog: Mapping[str, Dict[str, Any]],
+) -> PauschaleMappingLkns:
+    """Fasst die LKN-Bedingungen einer Pauschale zusammen (direkte LKNs + Tabellen präzise/breit)."""
+    lkns: Dict[str, str] = {}
+    tables_precise: List[str] = []
+    tables_broad: List[str] = []
+    for cond in conditions:
+        typ = str(cond.get("Bedingungstyp", "")).upper()
+        wert = cond.get("Werte", "")
+        if not wert:
+            continue
+        if typ in _MAPPING_LKN_LIST_TYPES:
+            for lkn in str(wert).split(","):
+                lkn_upper = lkn.strip().upper()
+                if lkn_upper and lkn_upper not in lkns:
+                    lkns[lkn_upper] = leistungskatalog.get(lkn_upper, {}).get("Beschreibung", "N/A")
+        elif typ in _MAPPING_LKN_TABLE_TYPES:
+            for table_name in str(wert).split(","):
+                table_norm = table_name.strip().lower()
+                if not table_norm:
+                    continue
+                target = tables_broad if table_norm in broad_table_names else tables_precise
+                if table_norm not in target:
+                    target.append(table_norm)
+    return {"lkns": lkns, "tables_precise": tuple(tables_precise), "tables_broad": tuple(tables_broad)}
+
+
+def _mapping_table_lkn_descriptions(
+    table_name: str,
+    lang: str,
+    tabellen_dict: Dict[str, List[Dict[str, Any]]],
+    leistungskatalog: Mapping[str, Dict[str, Any]],
+) -> Dict[str, str]:
+    """LKN -> Beschreibung einer Service-Catalog-Tabelle (für globale Daten vorberechnet)."""
+    use_cache = tabellen_dict is tabellen_dict_by_table
+    if use_cache:
+        cached = mapping_table_lkn_desc.get((table_name, lang))
+        if cached is not None:
+            return cached
+    descriptions: Dict[str, str] = {}
+    for item in get_table_content(table_name, "service_catalog", tabellen_dict, lang=lang):
+        lkn_code = item.get("Code")
+        if not lkn_code:
+            continue
+        lkn_upper = str(lkn_code).upper()
+        if lkn_upper not in descriptions:
+            descriptions[lkn_upper] = item.get("Code_Text") or leistungskatalog.get(lkn_upper, {}).get("Beschreibung", "N/A")
+    if use_cache:
+        mapping_table_lkn_desc[(table_name, lang)] = descriptions
+    return descriptions
+
+
+def _build_pauschale_selection_index() -> None:
+    """Berechnet ICD-Vorschläge und Geschwister-/C9x-Gruppen der Pauschalen einmalig vor."""
+    global pauschale_selection_index
+    pauschale_selection_index = None
+    if not pauschalen_dict:
+        return
+    try:
+        from regelpruefer_pauschale import build_pauschale_selection_index
+        pauschale_selection_index = build_pauschale_selection_index(
+            pauschale_bedingungen_data, pauschalen_dict, tabellen_dict_by_table
+        )
+        logger.info(
+            "  Auswahl-Index vorberechnet (%s Pauschalen mit ICD-Tabellen, %s Stämme).",
+            len(pauschale_selection_index.icd_tables_by_code),
+            len(pauschale_selection_index.siblings_by_stem),
+        )
+    except Exception as e_idx:
+        logger.error("  FEHLER bei der Vorberechnung des Pauschalen-Auswahl-Index: %s", e_idx)
+        traceback.print_exc()
+
+
+def _precompile_prueflogik() -> None:
+    """Kompiliert alle Prüflogik-Ausdrücke der Pauschalen beim Laden."""
+    if not pauschalen_dict:
+        return
+    try:
+        from regelpruefer_pauschale import precompile_prueflogik
+        compiled_count = precompile_prueflogik(pauschalen_dict)
+        logger.info("  Prüflogik-Ausdrücke vorkompiliert (%s Ausdrücke).", compiled_count)
+    except Exception as e_comp:
+        logger.error("  FEHLER beim Vorkompilieren der Prüflogik: %s", e_comp)
+        traceback.print_exc()
+
+
+def _build_pauschale_mapping_lkn_index() -> None:
+    """Berechnet pro Pauschale die Bedingungs-LKNs samt Beschreibungen (Stage-2-Mapping) einmalig vor."""
+    pauschale_mapping_lkns.clear()
+    mapping_table_lkn_desc.clear()
+    anast_mapping_lkn_desc.clear()
+    for pauschale_code, conditions in pauschale_bedingungen_indexed.items():
+        entry = _collect_pauschale_mapping_lkns(conditions, leistungskatalog_dict)
+        if entry["lkns"] or entry["tables_precise"] or entry["tables_broad"]:
+            pauschale_mapping_lkns[pauschale_code] = entry
+    for entry in pauschale_mapping_lkns.values():
+        for table_norm in entry["tables_precise"] + entry["tables_broad"]:
+            for lang_code in _MAPPING_LANGS:
+                _mapping_table_lkn_descriptions(table_norm, lang_code, tabellen_dict_by_table, leistungskatalog_dict)
+    for item in tabellen_dict_by_table.get("anast", []) + tabellen_dict_by_table.get("ANAST", []):
+        lkn_code = str(item.get("Code", "")).upper()
+        if lkn_code and lkn_code not in anast_mapping_lkn_desc:
+            anast_mapping_lkn_desc[lkn_code] = item.get("Code_Text") or leistungskatalog_dict.get(lkn_code, {}).get("Beschreibung", "N/A")
+    logger.info(
+        "  Stage-2-Mapping-LKNs je Pauschale vorberechnet (%s Pauschalen, %s Tabellen/Sprachen).",
+        len(pauschale_mapping_lkns),
+        len(mapping_table_lkn_desc),
+    )
+
+
 def _load_precomputed_pauschalen_indices() -> None:
     """Lädt optionale, vorab berechnete Pauschalen-Indizes (Broad/Precise-Splits)."""
 
@@ -2347,8 +3009,7 @@ def _load_precomputed_pauschalen_indices() -> None:
         if not path.is_file():
             return {}
         try:
-            with open(path, "r", encoding="utf-8") as f:
-                data = json.load(f)
+            data = json_backend.load_file(path)
             if isinstance(data, dict):
                 logger.info("  ✓ Vorberechnete %s geladen (%s Einträge).", description, len(data))
                 return data
@@ -2360,8 +3021,7 @@ def _load_precomputed_pauschalen_indices() -> None:
     global broad_table_names
     if PAUSCHALEN_INDICES_META_PATH.is_file():
         try:
-            with open(PAUSCHALEN_INDICES_META_PATH, "r", encoding="utf-8") as f:
-                meta = json.load(f)
+            meta = json_backend.load_file(PAUSCHALEN_INDICES_META_PATH)
             meta_broad = meta.get("broad_tables")
             if isinstance(meta_broad, list):
                 normalized = {str(t).strip().lower() for t in meta_broad if str(t).strip()}
@@ -2496,8 +3156,7 @@ def _load_catalogs() -> bool:
         try:
             logger.info("  Versuche %s von %s zu laden...", name, path)
             if path.is_file():
-                with open(path, 'r', encoding='utf-8') as f:
-                    data_from_file = json.load(f)
+                data_from_file = json_backend.load_file(path)
 
                 if name == "TARDOC_INTERP" and isinstance(data_from_file, dict):
                     logger.info("  Spezialbehandlung für TARDOC_INTERP: Extrahiere Listen aus dem Wörterbuch.")
@@ -2543,6 +3202,8 @@ def _load_catalogs() -> bool:
                                     lkn_to_tables_index[code_key].append(table_key)
 
                     logger.info("  Tabellen-Daten gruppiert nach Tabelle (%s Tabellen).", len(tabellen_dict_by_table))
+                    build_table_catalog(tabellen_dict_by_table)
+                    logger.info("  Tabellen-Katalog (Codes je Tabelle/Typ) vorberechnet.")
                     _build_medication_lookup(data_from_file)
                     logger.info("  Medikamenten-Lookup aufgebaut (%s Eintraege).", len(medication_entries))
                     missing_keys_check = ['cap13', 'cap14', 'or', 'nonor', 'nonelt', 'ambp.pz', 'anast', 'c08.50']
@@ -2584,24 +3245,21 @@ def _load_optional_datasets() -> None:
     """Lädt optionale Dateien (Baseline, Beispiele) ohne die Erfolgslage zu beeinflussen."""
     try:
         global baseline_results
-        with open(BASELINE_RESULTS_PATH, 'r', encoding='utf-8') as f:
-            baseline_results = json.load(f)
+        baseline_results = json_backend.load_file(BASELINE_RESULTS_PATH)
         logger.info("  Baseline-Ergebnisse geladen (%s Beispiele.)", len(baseline_results))
     except Exception as e:
         logger.warning("  WARNUNG: Baseline-Resultate konnten nicht geladen werden: %s", e)
         baseline_results = {}
     try:
         global examples_data
-        with open(BEISPIELE_PATH, 'r', encoding='utf-8') as f:
-            examples_data = json.load(f)
+        examples_data = json_backend.load_file(BEISPIELE_PATH)
         logger.info("  Beispiel-Daten geladen (%s Einträge.)", len(examples_data))
     except Exception as e:
         logger.warning("  WARNUNG: Beispiel-Daten konnten nicht geladen werden: %s", e)
         examples_data = []
     try:
         global tpw_data
-        with open(TPW_PATH, 'r', encoding='utf-8') as f:
-            tpw_data = json.load(f)
+        tpw_data = json_backend.load_file(TPW_PATH)
         # Für Transparenz: wie viele Kantone pro Scope
         kantone_counts = {}
         if isinstance(tpw_data, dict):
@@ -2623,11 +3281,16 @@ def _load_rules() -> bool:
             if rules:
                 regelwerk_dict[lkn] = rules
         logger.info("  Regelwerk aus TARDOC geladen (%s LKNs mit Regeln).", len(regelwerk_dict))
+        regelwerk_kompiliert.clear()
+        if rp_lkn_module and hasattr(rp_lkn_module, 'compile_regelwerk'):
+            regelwerk_kompiliert.update(rp_lkn_module.compile_regelwerk(regelwerk_dict))
+            logger.info("  Regelwerk kompiliert (%s Regelsätze).", len(regelwerk_kompiliert))
         return True
     except Exception as e:
         logger.error("  FEHLER beim Extrahieren des Regelwerks aus TARDOC: %s", e)
         traceback.print_exc()
         regelwerk_dict.clear()
+        regelwerk_kompiliert.clear()
         return False
 
 
@@ -2773,6 +3436,10 @@ def _build_indices(all_loaded_successfully: bool) -> bool:
             len(pauschale_cond_table_index),
         )
     _populate_pauschale_table_splits()
+    _build_lkn_candidate_index()
+    _build_pauschale_selection_index()
+    _precompile_prueflogik()
+    _build_pauschale_mapping_lkn_index()
     _build_pauschalen_search_cache()
 
     return all_loaded_successfully
@@ -2995,7 +3662,7 @@ def parse_llm_json_response(raw_text_response: str) -> Union[Dict[str, Any], Lis
             for variant in (base, _repair_object_separators(base)):
                 candidate = _clean_trailing_commas(variant)
                 try:
-                    return json.loads(candidate)
+                    return json_backend.loads(candidate)
                 except Exception:
                     continue
         return None
@@ -3242,19 +3909,35 @@ def _post_with_retries(
     logger_prefix: str,
     before_request: Optional[Callable[[], None]] = None,
     on_retry: Optional[Callable[[int, RequestException], Optional[Dict[str, Any]]]] = None,
+    provider: str = "gemini",
 ) -> Any:
     """Führt POST-Anfrage mit Retry-Logik (429/5xx) und optionalem Hook vor Request aus."""
+    if llm_cassette.replaying():
+        with tracing.span("llm_cassette", provider=provider, **{"llm.call": logger_prefix}):
+            data = llm_cassette.replay(provider, llm_cassette.gemini_model(url), llm_cassette.gemini_prompt(payload))
+        metrics.inc("llm_requests_total", provider=provider, outcome="replay")
+        return llm_cassette.ReplayResponse(data)
     last_error: RequestException | None = None
     current_payload = payload
     for attempt in range(max_retries):
         try:
             if before_request:
                 before_request()
-            response = requests.post(url, json=current_payload, timeout=timeout)
+            outcome = "error"
+            try:
+                with metrics.span("llm_network", provider=provider):
+                    tracing.set_attributes(attempt=attempt + 1, **{"llm.call": logger_prefix})
+                    response = requests.post(url, json=current_payload, timeout=timeout)
+                    tracing.set_attributes(**{"http.status_code": response.status_code})
+                outcome = "ok" if response.status_code < 400 else str(response.status_code)
+            finally:
+                metrics.inc("llm_requests_total", provider=provider, outcome=outcome)
             logger.info("%s Antwort Status Code: %s", logger_prefix, response.status_code)
             if response.status_code == 429:
                 raise HTTPError(response=response)
             response.raise_for_status()
+            if llm_cassette.recording():
+                llm_cassette.record(provider, llm_cassette.gemini_model(url), llm_cassette.gemini_prompt(current_payload), response.json())
             return response
         except RequestException as exc:
             last_error = exc
@@ -3270,11 +3953,23 @@ def _post_with_retries(
                 status = getattr(resp_obj, "status_code", None)
                 wait_time = backoff_seconds * (2 ** attempt)
                 logger.warning("%s Fehler %s. Neuer Versuch in %s Sekunden.", logger_prefix, status or str(exc), wait_time)
-                time.sleep(wait_time)
+                tracing.add_event("llm.retry_backoff", attempt=attempt + 1, wait_seconds=wait_time, error=str(status or exc))
+                with tracing.span("llm_backoff", wait_seconds=wait_time):
+                    time.sleep(wait_time)
                 continue
             raise
     raise last_error if last_error else ConnectionError(f"{logger_prefix}: Keine Antwort erhalten")
 
+def _openai_client(api_key: str, base_url: str) -> Any:
+    """OpenAI-Client ohne SDK-Retries; im Cassette-Replay wird kein Client benötigt."""
+    if llm_cassette.replaying():
+        return None
+    try:
+        from openai import OpenAI  # type: ignore
+    except Exception as e:  # pragma: no cover - optional dependency
+        raise RuntimeError("openai package not available") from e
+    return OpenAI(api_key=api_key, base_url=base_url, max_retries=0)  # type: ignore[reportGeneralTypeIssues]
+
 # --- LLM Stufe 1: LKN Identifikation ---
 def call_gemini_stage1(
     user_input: str,
@@ -3319,9 +4014,7 @@ def call_gemini_stage1(
     if LOG_LLM_PROMPT:
         detail_logger.info("LLM Stufe 1 Prompt: %s", prompt)
 
-    gemini_url = (
-        f"https://generativelanguage.googleapis.com/v1beta/models/{model}:generateContent?key={api_key}"
-    )
+    gemini_url = _gemini_generate_url(model, api_key)
     generation_config: Dict[str, Any] = {
         # Beides setzen: snake_case (historisch) + camelCase (offizielle REST-API).
         "response_mime_type": "application/json",
@@ -3338,7 +4031,7 @@ def call_gemini_stage1(
     }
     logger.info("Sende Anfrage Stufe 1 an Gemini Model: %s...", model)
     if LOG_LLM_INPUT:
-        detail_logger.debug(f"LLM_S1_REQUEST_PAYLOAD: {json.dumps(payload, ensure_ascii=False)}")
+        detail_logger.debug("LLM_S1_REQUEST_PAYLOAD: %s", LazyJSON(payload, indent=False))
 
     def _stage1_retry_hook(attempt: int, exc: RequestException) -> Optional[Dict[str, Any]]:
         nonlocal katalog_context_local, prompt, prompt_tokens, payload
@@ -3384,12 +4077,8 @@ def call_gemini_stage1(
         )
         gemini_data = response.json()
         if LOG_LLM_OUTPUT:
-            detail_logger.debug(
-                f"LLM_S1_RAW_GEMINI_RESPONSE: {json.dumps(gemini_data, ensure_ascii=False)}"
-            )
-            detail_logger.info(
-                f"LLM_S1_RAW_GEMINI_DATA: {json.dumps(gemini_data, ensure_ascii=False)}"
-            )
+            detail_logger.debug("LLM_S1_RAW_GEMINI_RESPONSE: %s", LazyJSON(gemini_data, indent=False))
+            detail_logger.info("LLM_S1_RAW_GEMINI_DATA: %s", LazyJSON(gemini_data, indent=False))
 
 
         candidate: Dict[str, Any] | None = None
@@ -3481,7 +4170,7 @@ def call_gemini_stage1(
 
         llm_response_json = validate_stage1_result(llm_response_json, provider_label="LLM_S1")
         if LOG_S1_PARSED_JSON:
-            detail_logger.info(f"LLM_S1_PARSED_JSON: {json.dumps(llm_response_json, indent=2, ensure_ascii=False)}")
+            detail_logger.info("LLM_S1_PARSED_JSON: %s", LazyJSON(llm_response_json))
         return llm_response_json, {"input_tokens": prompt_tokens, "output_tokens": response_tokens}
 
     except RequestException as req_err:
@@ -3547,12 +4236,8 @@ def call_openai_stage1(
         detail_logger.info("LLM Stufe 1 Anfrage (Input-Text): %s", user_input)
     if LOG_LLM_PROMPT:
         detail_logger.info("LLM Stufe 1 Prompt: %s", prompt)
-    try:
-        from openai import OpenAI  # type: ignore
-    except Exception as e:  # pragma: no cover - optional dependency
-        raise RuntimeError("openai package not available") from e
     # Deaktiviert SDK-interne Retries, damit unsere eigene Drossel/Retry greift
-    client = OpenAI(api_key=api_key, base_url=base_url, max_retries=0)  # type: ignore[reportGeneralTypeIssues]
+    client = _openai_client(api_key, base_url)
     # Einfache Retry-Logik bei 5xx/Serverfehlern
     last_exc: Exception | None = None
     resp = None  # ensure defined for static analyzers
@@ -3692,7 +4377,7 @@ def call_openai_stage1(
         detail_logger.info(
             "LLM_S1_%s_PARSED_JSON: %s",
             provider.upper(),
-            json.dumps(data, indent=2, ensure_ascii=False),
+            LazyJSON(data),
         )
     return data, {"input_tokens": prompt_tokens, "output_tokens": response_tokens}
 
@@ -3894,9 +4579,7 @@ def call_gemini_stage2_mapping(
     if LOG_LLM_PROMPT:
         detail_logger.info("LLM Stufe 2 (Mapping) Prompt: %s", prompt)
 
-    gemini_url = (
-        f"https://generativelanguage.googleapis.com/v1beta/models/{model}:generateContent?key={api_key}"
-    )
+    gemini_url = _gemini_generate_url(model, api_key)
     generation_config: Dict[str, Any] = {
         # Beides setzen: snake_case (historisch) + camelCase (offizielle REST-API).
         "response_mime_type": "application/json", # Beibehalten, da Gemini manchmal JSON sendet
@@ -4072,15 +4755,11 @@ def call_openai_stage2_mapping(
         detail_logger.info("LLM Stufe 2 (Mapping) Prompt Tokens: %s", prompt_tokens)
     if LOG_LLM_PROMPT:
         detail_logger.info("LLM Stufe 2 (Mapping) Prompt: %s", prompt)
-    try:
-        from openai import OpenAI  # type: ignore
-    except Exception as e:  # pragma: no cover - optional dependency
-        raise RuntimeError("openai package not available") from e
     base_url = base_url or "https://api.openai.com/v1"
     if not base_url.rstrip("/").endswith("/v1"):
         base_url = f"{base_url.rstrip('/')}/v1"
     # Deaktiviert SDK-interne Retries, damit unsere eigene Drossel/Retry greift
-    client = OpenAI(api_key=api_key, base_url=base_url, max_retries=0)  # type: ignore[reportGeneralTypeIssues]
+    client = _openai_client(api_key, base_url)
     # Retry-Logik bei 5xx analog Stufe 1
     last_exc: Exception | None = None
     resp = None
@@ -4202,9 +4881,7 @@ def call_gemini_stage2_ranking(
     if LOG_LLM_PROMPT:
         detail_logger.info("LLM Stufe 2 (Ranking) Prompt: %s", prompt)
 
-    gemini_url = (
-        f"https://generativelanguage.googleapis.com/v1beta/models/{model}:generateContent?key={api_key}"
-    )
+    gemini_url = _gemini_generate_url(model, api_key)
     generation_config: Dict[str, Any] = {
         "response_mime_type": "application/json",
         "responseMimeType": "application/json",
@@ -4353,15 +5030,11 @@ def call_openai_stage2_ranking(
         detail_logger.info("LLM Stufe 2 (Ranking) Prompt Tokens: %s", prompt_tokens)
     if LOG_LLM_PROMPT:
         detail_logger.info("LLM Stufe 2 (Ranking) Prompt: %s", prompt)
-    try:
-        from openai import OpenAI  # type: ignore
-    except Exception as e:  # pragma: no cover - optional dependency
-        raise RuntimeError("openai package not available") from e
     base_url = base_url or "https://api.openai.com/v1"
     if not base_url.rstrip("/").endswith("/v1"):
         base_url = f"{base_url.rstrip('/')}/v1"
     # Deaktiviert SDK-interne Retries, damit unsere eigene Drossel/Retry greift
-    client = OpenAI(api_key=api_key, base_url=base_url, max_retries=0)  # type: ignore[reportGeneralTypeIssues]
+    client = _openai_client(api_key, base_url)
     # Retry-Logik bei 5xx analog Stufe 1
     last_exc: Exception | None = None
     resp = None
@@ -4453,6 +5126,7 @@ def call_openai_stage2_ranking(
 
 
 
+@metrics.timed("llm_stage1")
 def call_llm_stage1(
     user_input: str,
     katalog_context: str,
@@ -4491,6 +5165,7 @@ def call_llm_stage1(
 
 
 
+@metrics.timed("llm_stage2_mapping")
 def call_llm_stage2_mapping(
     tardoc_lkn: str,
     tardoc_desc: str,
@@ -4527,6 +5202,7 @@ def call_llm_stage2_mapping(
 
 
 
+@metrics.timed("llm_stage2_ranking")
 def call_llm_stage2_ranking(
     user_input: str,
     potential_pauschalen_text: str,
@@ -4579,83 +5255,67 @@ def get_LKNs_from_pauschalen_conditions(
     bedingungen_indexed: Optional[Mapping[str, Sequence[Mapping[str, Any]]]] = None,
     skip_table_names: Optional[Set[str]] = None,
 ) -> Dict[str, str]:
-    """Aggregiert alle LKN-Codes, die in den Bedingungen der übergebenen Pauschalen referenziert werden."""
-    # print(f"--- DEBUG: Start get_LKNs_from_pauschalen_conditions für {potential_pauschale_codes} ---")
+    """Aggregiert alle LKN-Codes, die in den Bedingungen der übergebenen Pauschalen referenziert werden.
+
+    Für die geladenen Daten werden die vorberechneten Einträge aus
+    ``pauschale_mapping_lkns``/``mapping_table_lkn_desc`` zusammengeführt; bei
+    abweichenden Daten wird pro Pauschale on-the-fly gesammelt. Die erste
+    Beschreibung einer LKN gewinnt (Tabellen vor direkten LKNs).
+    """
     if not potential_pauschale_codes:
         return {}
-    condition_lkns_with_desc: Dict[str, str] = {}
-    processed_lkn_codes: Set[str] = set()
-    processed_table_names: Set[str] = set()
-    BED_PAUSCHALE_KEY = 'Pauschale'; BED_TYP_KEY = 'Bedingungstyp'; BED_WERTE_KEY = 'Werte'
-
-    allowed_types = {
-        "LEISTUNGSPOSITIONEN IN LISTE",
-        "LKN",
-        "LKN IN LISTE",
-        "LEISTUNGSPOSITIONEN IN TABELLE",
-        "LKN IN TABELLE",
-    }
+    lang_code = str(lang or "de").lower()
+    if lang_code not in _MAPPING_LANGS:
+        lang_code = "de"
     # Default: broad tables (OR/NONELT/ELT) can explode candidate sets massively; keep ANAST because relevant for mapping.
     if skip_table_names is None:
         skip_table_names = {t for t in broad_table_names if t != "anast"}
 
-    relevant_conditions: List[Mapping[str, Any]] = []
-    if bedingungen_indexed:
-        for pauschale_code in potential_pauschale_codes:
-            conditions_for_code = bedingungen_indexed.get(str(pauschale_code))
-            if not conditions_for_code:
+    use_precomputed = (
+        bool(pauschale_mapping_lkns)
+        and tabellen_dict is tabellen_dict_by_table
+        and leistungskatalog is leistungskatalog_dict
+    )
+    conditions_by_code: Optional[Dict[str, List[Mapping[str, Any]]]] = None
+    if not use_precomputed and not bedingungen_indexed:
+        conditions_by_code = defaultdict(list)
+        for cond in pauschale_bedingungen_data_list:
+            pc_val = cond.get("Pauschale")
+            if pc_val in potential_pauschale_codes:
+                conditions_by_code[str(pc_val)].append(cond)
+
+    condition_lkns_with_desc: Dict[str, str] = {}
+    processed_table_names: Set[str] = set()
+    for pauschale_code in sorted(str(pc) for pc in potential_pauschale_codes):
+        if use_precomputed:
+            entry = pauschale_mapping_lkns.get(pauschale_code)
+        elif conditions_by_code is not None:
+            entry = _collect_pauschale_mapping_lkns(conditions_by_code.get(pauschale_code, []), leistungskatalog)
+        else:
+            entry = _collect_pauschale_mapping_lkns((bedingungen_indexed or {}).get(pauschale_code, []), leistungskatalog)
+        if not entry:
+            continue
+        for table_norm in entry["tables_precise"] + entry["tables_broad"]:
+            if table_norm in processed_table_names or table_norm in skip_table_names:
                 continue
-            for cond in conditions_for_code:
-                if str(cond.get(BED_TYP_KEY, "")).upper() in allowed_types:
-                    relevant_conditions.append(cond)
-    else:
-        relevant_conditions = [
-            cond for cond in pauschale_bedingungen_data_list # Verwende umbenannt
-            if cond.get(BED_PAUSCHALE_KEY) in potential_pauschale_codes and
-               str(cond.get(BED_TYP_KEY, "")).upper() in allowed_types
-        ]
-    # print(f"  Anzahl LKN-relevanter Bedingungen: {len(relevant_conditions)}")
-    for cond in relevant_conditions:
-        typ = str(cond.get(BED_TYP_KEY, "")).upper(); wert = cond.get(BED_WERTE_KEY, "")
-        if not wert: continue
-        current_lkns_to_add: Set[str] = set()
-        if typ in ["LEISTUNGSPOSITIONEN IN LISTE", "LKN", "LKN IN LISTE"]:
-            current_lkns_to_add.update(lkn.strip().upper() for lkn in str(wert).split(',') if lkn.strip()) # str(wert)
-        elif typ in ["LEISTUNGSPOSITIONEN IN TABELLE", "LKN IN TABELLE"]:
-            for table_name in (t.strip() for t in str(wert).split(',') if t.strip()): # str(wert)
-                normalized_table_name = str(table_name).strip().lower()
-                if not normalized_table_name:
-                    continue
-                if skip_table_names and normalized_table_name in skip_table_names:
-                    continue
-                if normalized_table_name in processed_table_names:
-                    continue
-                processed_table_names.add(normalized_table_name)
-                content = get_table_content(table_name, "service_catalog", tabellen_dict, lang=lang) # Verwende umbenannt
-                for item in content:
-                    lkn_code = item.get('Code')
-                    if lkn_code:
-                        lkn_upper = str(lkn_code).upper() # str(lkn_code)
-                        if lkn_upper not in processed_lkn_codes:
-                            desc = item.get('Code_Text') or leistungskatalog.get(lkn_upper, {}).get('Beschreibung', 'N/A') # Verwende umbenannt
-                            condition_lkns_with_desc[lkn_upper] = desc
-                            processed_lkn_codes.add(lkn_upper)
-        for lkn_upper in current_lkns_to_add:
-            if lkn_upper not in processed_lkn_codes:
-                desc = leistungskatalog.get(lkn_upper, {}).get('Beschreibung', 'N/A') # Verwende umbenannt
-                condition_lkns_with_desc[lkn_upper] = desc
-                processed_lkn_codes.add(lkn_upper)
+            processed_table_names.add(table_norm)
+            for lkn_upper, desc in _mapping_table_lkn_descriptions(table_norm, lang_code, tabellen_dict, leistungskatalog).items():
+                condition_lkns_with_desc.setdefault(lkn_upper, desc)
+        for lkn_upper, desc in entry["lkns"].items():
+            condition_lkns_with_desc.setdefault(lkn_upper, desc)
 
     # Wenn WA.20-Leistungen enthalten sind, füge alle Codes aus der ANAST-Tabelle hinzu
     if any(code.startswith('WA.20.') for code in condition_lkns_with_desc):
-        anast_entries = tabellen_dict.get('anast', []) + tabellen_dict.get('ANAST', [])
-        for item in anast_entries:
-            lkn_code = str(item.get('Code', '')).upper()
-            if lkn_code and lkn_code not in processed_lkn_codes:
-                desc = item.get('Code_Text') or leistungskatalog.get(lkn_code, {}).get('Beschreibung', 'N/A')
-                condition_lkns_with_desc[lkn_code] = desc
-                processed_lkn_codes.add(lkn_code)
-    # print(f"  DEBUG (get_LKNs_from_pauschalen): {len(condition_lkns_with_desc)} einzigartige Bedingungs-LKNs gefunden.")
+        if use_precomputed:
+            anast_desc: Mapping[str, str] = anast_mapping_lkn_desc
+        else:
+            anast_desc = {}
+            for item in tabellen_dict.get('anast', []) + tabellen_dict.get('ANAST', []):
+                lkn_code = str(item.get('Code', '')).upper()
+                if lkn_code and lkn_code not in anast_desc:
+                    anast_desc[lkn_code] = item.get('Code_Text') or leistungskatalog.get(lkn_code, {}).get('Beschreibung', 'N/A')
+        for lkn_code, desc in anast_desc.items():
+            condition_lkns_with_desc.setdefault(lkn_code, desc)
     return condition_lkns_with_desc
 
 # get_pauschale_lkn_candidates: Diese Funktion war sehr ähnlich zu get_relevant_p_pz_condition_lkns.
@@ -4738,10 +5398,7 @@ def search_pauschalen(
                 lkns.update(pauschale_lp_index.get(code, set()))
                 lkns.update(pauschale_cond_lkn_index.get(code, set()))
                 for table_name in pauschale_cond_table_index.get(code, set()):
-                    for item in get_table_content(table_name, "service_catalog", tabellen_dict_by_table):
-                        code_item = item.get('Code')
-                        if code_item:
-                            lkns.add(str(code_item).upper())
+                    lkns.update(get_table_codes(table_name, "service_catalog", tabellen_dict_by_table))
             except Exception:
                 lkns = set()
             entry["lkns"] = sorted(lkns)
@@ -4839,8 +5496,6 @@ def search_icd(term: str, lang: str = 'de', offset: int = 0, limit: int = 20) ->
     return results
 
 
-import threading
-
 # Lock for sequential processing
 processing_lock = threading.Lock()
 
@@ -4941,9 +5596,20 @@ def _parse_billing_request(request: "Request") -> Dict[str, Any]:
             logger.warning(f"Ungueltiger Geschlechtswert '{gender_input}'.")
         geschlecht_user = None
 
+    render_mode_raw = data.get('renderMode', data.get('render_mode'))
+    render_mode = str(render_mode_raw).strip().lower() if render_mode_raw else CONDITIONS_HTML_MODE
+    if render_mode not in ('eager', 'lazy'):
+        render_mode = CONDITIONS_HTML_MODE
+    view_raw = data.get('view') or request.args.get('view')
+    view = str(view_raw).strip().lower() if view_raw else ANALYZE_VIEW_DEFAULT
+    if view not in ('full', 'lean'):
+        view = ANALYZE_VIEW_DEFAULT
+
     return {
         "user_input": user_input,
         "lang": lang,
+        "render_mode": render_mode,
+        "view": view,
         "icd_input": icd_input,
         "medication_inputs": medication_inputs,
         "medication_atcs": medication_atcs,
@@ -4954,6 +5620,7 @@ def _parse_billing_request(request: "Request") -> Dict[str, Any]:
     }
 
 
+@metrics.timed("context_build")
 def _build_context_for_llm(user_input: str, lang: str) -> tuple[str, list[tuple[float, str]], list[str]]:
     """
     Performs hybrid search to find relevant LKNs and builds the context for the LLM.
@@ -5332,17 +5999,18 @@ def _build_context_for_llm(user_input: str, lang: str) -> tuple[str, list[tuple[
 
     # 1. Keyword-based search (reliable for synonyms and direct matches)
     # We limit this to a reasonable number to get high-quality candidates.
-    keyword_results = cast(
-        List[Tuple[float, str]],
-        rank_leistungskatalog_entries(
-            keyword_token_set,
-            leistungskatalog_dict,
-            token_doc_freq,
-            limit=100,
-            return_scores=True,
-            include_medical_interpretation=False,
-        ),
-    )
+    with metrics.span("keyword_search"):
+        keyword_results = cast(
+            List[Tuple[float, str]],
+            rank_leistungskatalog_entries(
+                keyword_token_set,
+                leistungskatalog_dict,
+                token_doc_freq,
+                limit=100,
+                return_scores=True,
+                include_medical_interpretation=False,
+            ),
+        )
     keyword_codes = [code for _, code in keyword_results]
     logger.info(f"Keyword-Suche fand {len(keyword_codes)} Kandidaten.")
     keyword_focus_limit = max(KEYWORD_PRIORITY_LIMIT, KEYWORD_VARIANT_DESCRIPTION_LIMIT)
@@ -5375,16 +6043,17 @@ def _build_context_for_llm(user_input: str, lang: str) -> tuple[str, list[tuple[
             embedding_query = embedding_model.tokenizer.decode(
                 embedding_token_ids[:limit]
             ).strip()
-        q_vec = embedding_model.encode(
-            [embedding_query], convert_to_numpy=True
-        )[0]
-
-        embedding_results = rank_embeddings_entries(
-            q_vec,
-            faiss_index,
-            embedding_codes,
-            limit=100,
-        )
+        with metrics.span("embedding_search"):
+            q_vec = embedding_model.encode(
+                [embedding_query], convert_to_numpy=True
+            )[0]
+
+            embedding_results = rank_embeddings_entries(
+                q_vec,
+                faiss_index,
+                embedding_codes,
+                limit=100,
+            )
         embedding_codes_ranked = [code for _, code in embedding_results]
         logger.info(
             f"Embedding-Suche (RAG) fand {len(embedding_codes_ranked)} Kandidaten."
@@ -5667,9 +6336,17 @@ def _build_context_for_llm(user_input: str, lang: str) -> tuple[str, list[tuple[
     elif prompt_base:
         prompt_variants = [prompt_base]
 
+    tracing.set_attributes(
+        keyword_results=len(keyword_results),
+        embedding_results=len(embedding_results),
+        top_ranking_results=len(top_ranking_results),
+        prompt_variants=len(prompt_variants),
+        context_chars=len(katalog_context_str),
+    )
     return katalog_context_str, top_ranking_results, prompt_variants
 
 
+@metrics.timed("rule_check")
 def _validate_and_apply_rules(
     llm_stage1_result: Dict[str, Any],
     lang: str,
@@ -5714,102 +6391,77 @@ def _validate_and_apply_rules(
     regel_ergebnisse_details_list: List[Dict[str, Any]] = []
     rule_checked_leistungen_list: List[Dict[str, Any]] = []
     if not final_validated_llm_leistungen:
-        msg_none = translate_rule_error_message("Keine LKN vom LLM identifiziert/validiert.", lang)
+        msg_none = translate("llm_no_lkn", lang)
         regel_ergebnisse_details_list.append({"lkn": None, "initiale_menge": 0, "regelpruefung": {"abrechnungsfaehig": False, "fehler": [msg_none]}, "finale_menge": 0})
     else:
-        alle_lkn_codes_fuer_regelpruefung = [str(l.get("lkn")) for l in final_validated_llm_leistungen if l.get("lkn")]
-        typen_map_fuer_regeln = {
-            str(l.get("lkn")).upper(): str(l.get("typ") or "").upper()
-            for l in final_validated_llm_leistungen
-            if l.get("lkn")
-        }
-        for leistung_data in final_validated_llm_leistungen:
+        # Alle LKNs des Falls in einem Durchgang gegen das kompilierte Regelwerk prüfen;
+        # jede Leistung sieht die übrigen als Begleit-LKNs. Der Regelprüfer liefert
+        # strukturierte Ergebnisse (RuleOutcome), Texte werden erst hier in `lang` gerendert.
+        regelpruefung_verfuegbar = bool(
+            rp_lkn_module and hasattr(rp_lkn_module, 'pruefe_leistungen') and regelwerk_dict
+        )
+        regel_ergebnisse_batch: List[Any] = []
+        regel_batch_fehler: Optional[str] = None
+        if regelpruefung_verfuegbar:
+            fall_basis = {
+                "ICD": icd_input,
+                "Geschlecht": geschlecht_user or "unbekannt",
+                "Alter": alter_user,
+                "AlterOperator": alter_operator,
+                "Pauschalen": [], "Medikamente": medication_atcs, "GTIN": medication_atcs
+            }
+            try:
+                regel_ergebnisse_batch = rp_lkn_module.pruefe_leistungen(
+                    final_validated_llm_leistungen,
+                    regelwerk_kompiliert or regelwerk_dict,
+                    fall_basis,
+                )
+            except Exception as e_rule:
+                logger.error("Fehler bei Regelprüfung der LKNs: %s", e_rule)
+                traceback.print_exc()
+                regel_batch_fehler = translate("rule_internal_error", lang, error=e_rule)
+        for idx_leistung, leistung_data in enumerate(final_validated_llm_leistungen):
             lkn_code_val = leistung_data.get("lkn")
             if not isinstance(lkn_code_val, str): continue
             lkn_code = lkn_code_val
 
             menge_initial_val = leistung_data.get("menge", 1)
-            regel_ergebnis_dict: Dict[str, Any] = {"abrechnungsfaehig": False, "fehler": ["Regelprüfung nicht durchgeführt."]}
+            abrechnungsfaehig = False
+            fehler_texte: List[str] = []
             finale_menge_nach_regeln = 0
-            if rp_lkn_module and hasattr(rp_lkn_module, 'pruefe_abrechnungsfaehigkeit') and regelwerk_dict:
-                lkn_code_upper = lkn_code.upper()
-                leistung_typ = typen_map_fuer_regeln.get(lkn_code_upper, "")
-                begleit_lkns_upper = [b_lkn.upper() for b_lkn in alle_lkn_codes_fuer_regelpruefung if b_lkn and b_lkn.upper() != lkn_code_upper]
-                begleit_typen_context = {
-                    code: typ
-                    for code, typ in typen_map_fuer_regeln.items()
-                    if code != lkn_code_upper
-                }
-                abrechnungsfall_kontext = {
-                    "LKN": lkn_code_upper, "Menge": menge_initial_val,
-                    "Typ": leistung_typ,
-                    "Begleit_LKNs": begleit_lkns_upper,
-                    "Begleit_Typen": begleit_typen_context,
-                    "ICD": icd_input,
-                    "Geschlecht": geschlecht_user or "unbekannt",
-                    "Alter": alter_user,
-                    "AlterOperator": alter_operator,
-                    "Pauschalen": [], "Medikamente": medication_atcs, "GTIN": medication_atcs
-                }
-                try:
-                    regel_ergebnis_dict = rp_lkn_module.pruefe_abrechnungsfaehigkeit(abrechnungsfall_kontext, regelwerk_dict)
-                    if regel_ergebnis_dict.get("abrechnungsfaehig"):
-                        finale_menge_nach_regeln = menge_initial_val
-                    else:
-                        fehler_liste_regel = regel_ergebnis_dict.get("fehler", [])
-                        # Manche Regeln reduzieren nur die Menge statt die Position komplett zu sperren.
-                        mengen_reduktions_fehler = next((f for f in fehler_liste_regel if "Menge auf" in f and "reduziert" in f), None)
-                        if mengen_reduktions_fehler:
-                            match_menge = re.search(r"Menge auf (\d+)", str(mengen_reduktions_fehler))
-                            if match_menge:
-                                try:
-                                    finale_menge_nach_regeln = int(match_menge.group(1))
-                                    regel_ergebnis_dict["abrechnungsfaehig"] = True
-                                    logger.info(
-                                        "Menge für LKN %s durch Regelprüfer auf %s angepasst.",
-                                        lkn_code,
-                                        finale_menge_nach_regeln,
-                                    )
-                                except ValueError:
-                                    finale_menge_nach_regeln = 0
-                        else:
-                            # Alternativ meldet der Regelprüfer die zulässige Maximalmenge über eine Soft-Fehlermeldung.
-                            mengenbesch_fehler = next((f for f in fehler_liste_regel if "Mengenbeschränkung überschritten" in f and "max." in f), None)
-                            if mengenbesch_fehler:
-                                match_max = re.search(r"max\.\s*(\d+)", str(mengenbesch_fehler))
-                                if match_max:
-                                    try:
-                                        finale_menge_nach_regeln = int(match_max.group(1))
-                                        regel_ergebnis_dict["abrechnungsfaehig"] = True
-                                        regel_ergebnis_dict.setdefault("fehler", []).append(
-                                            f"Menge auf {finale_menge_nach_regeln} reduziert (Mengenbeschränkung)"
-                                        )
-                                        logger.info(
-                                            "Menge für LKN %s automatisch auf %s reduziert wegen Mengenbeschränkung.",
-                                            lkn_code,
-                                            finale_menge_nach_regeln,
-                                        )
-                                    except ValueError:
-                                        finale_menge_nach_regeln = 0
-                        if finale_menge_nach_regeln == 0:
-                            logger.info(
-                                "LKN %s nicht abrechnungsfähig wegen Regel(n): %s",
-                                lkn_code,
-                                regel_ergebnis_dict.get('fehler', []),
-                            )
-                except Exception as e_rule:
-                    logger.error("Fehler bei Regelprüfung für LKN %s: %s", lkn_code, e_rule)
-                    traceback.print_exc()
-                    regel_ergebnis_dict = {"abrechnungsfaehig": False, "fehler": [f"Interner Fehler bei Regelprüfung: {e_rule}"]}
-            else:
+            if not regelpruefung_verfuegbar:
                 logger.warning("Keine Regelprüfung für LKN %s durchgeführt (Regelprüfer oder Regelwerk fehlt).", lkn_code)
-                regel_ergebnis_dict = {"abrechnungsfaehig": False, "fehler": ["Regelprüfung nicht verfügbar."]}
-            
-            if lang in ["fr", "it"]:
-                regel_ergebnis_dict["fehler"] = [translate_rule_error_message(m, lang) for m in regel_ergebnis_dict.get("fehler", [])]
+                fehler_texte = [translate("rule_check_not_available", lang)]
+            elif regel_batch_fehler is not None:
+                fehler_texte = [regel_batch_fehler]
+            else:
+                regel_ergebnis = regel_ergebnisse_batch[idx_leistung]
+                abrechnungsfaehig = regel_ergebnis.abrechnungsfaehig
+                fehler_texte = regel_ergebnis.fehler(lang)
+                if abrechnungsfaehig:
+                    finale_menge_nach_regeln = menge_initial_val
+                else:
+                    # Mengenbeschränkungen sperren die Position nicht, sondern reduzieren die Menge.
+                    reduzierte_menge = regel_ergebnis.adjusted_menge
+                    if reduzierte_menge is not None:
+                        finale_menge_nach_regeln = reduzierte_menge
+                        abrechnungsfaehig = True
+                        fehler_texte.append(translate("rule_qty_reduced", lang, value=reduzierte_menge))
+                        logger.info(
+                            "Menge für LKN %s automatisch auf %s reduziert wegen Mengenbeschränkung.",
+                            lkn_code,
+                            finale_menge_nach_regeln,
+                        )
+                    if finale_menge_nach_regeln == 0:
+                        logger.info(
+                            "LKN %s nicht abrechnungsfähig wegen Regel(n): %s",
+                            lkn_code,
+                            [outcome.code for outcome in regel_ergebnis.outcomes],
+                        )
+            regel_ergebnis_dict = {"abrechnungsfaehig": abrechnungsfaehig, "fehler": fehler_texte}
 
             regel_ergebnisse_details_list.append({"lkn": lkn_code, "initiale_menge": menge_initial_val, "regelpruefung": regel_ergebnis_dict, "finale_menge": finale_menge_nach_regeln})
-            if regel_ergebnis_dict.get("abrechnungsfaehig") and finale_menge_nach_regeln > 0:
+            if abrechnungsfaehig and finale_menge_nach_regeln > 0:
                 rule_checked_leistungen_list.append({**leistung_data, "menge": finale_menge_nach_regeln})
 
     logger.info(
@@ -5820,13 +6472,8 @@ def _validate_and_apply_rules(
 
 
 
-def _get_tables_for_context_lkn(lkn: str) -> List[str]:
-    """Return list of table names that contain the given LKN."""
-    normalized = str(lkn or "").strip().upper()
-    return lkn_to_tables_index.get(normalized, [])
-
 def find_potential_pauschalen_split(lkn_codes: Set[str]) -> tuple[Set[str], Set[str]]:
-    """Liefert (präzise, breit) Pauschalen-Kandidaten basierend auf LKN- und Tabellen-Indizes."""
+    """Liefert (präzise, breit) Pauschalen-Kandidaten über den vorberechneten LKN-Kandidaten-Index."""
     precise_candidates: Set[str] = set()
     broad_candidates: Set[str] = set()
     for raw_code in lkn_codes:
@@ -5835,34 +6482,12 @@ def find_potential_pauschalen_split(lkn_codes: Set[str]) -> tuple[Set[str], Set[
         lkn_code = raw_code.strip().upper()
         if not lkn_code:
             continue
-        if lkn_code in pauschale_lp_index_by_lkn:
-            precise_candidates.update(pauschale_lp_index_by_lkn[lkn_code])
-        if lkn_code in pauschale_cond_lkn_index_by_lkn:
-            precise_candidates.update(pauschale_cond_lkn_index_by_lkn[lkn_code])
-        tables_precise = lkn_to_tables_index_precise.get(lkn_code, [])
-        tables_broad = lkn_to_tables_index_broad.get(lkn_code, [])
-        used_split_tables = False
-        if tables_precise:
-            used_split_tables = True
-            for table_name in tables_precise:
-                table_norm = str(table_name).lower()
-                if table_norm in pauschale_cond_table_index_by_table_precise:
-                    precise_candidates.update(pauschale_cond_table_index_by_table_precise[table_norm])
-        if tables_broad:
-            used_split_tables = True
-            for table_name in tables_broad:
-                table_norm = str(table_name).lower()
-                if table_norm in pauschale_cond_table_index_by_table_broad:
-                    broad_candidates.update(pauschale_cond_table_index_by_table_broad[table_norm])
-        if not used_split_tables:
-            for table_name in _get_tables_for_context_lkn(lkn_code):
-                table_norm = str(table_name).lower()
-                if table_norm in pauschale_cond_table_index_by_table:
-                    precise_candidates.update(pauschale_cond_table_index_by_table[table_norm])
-    return (
-        {pc for pc in precise_candidates if pc in pauschalen_dict},
-        {pc for pc in broad_candidates if pc in pauschalen_dict},
-    )
+        candidates = lkn_candidate_index.get(lkn_code)
+        if candidates is None:
+            continue
+        precise_candidates.update(candidates.precise)
+        broad_candidates.update(candidates.broad)
+    return precise_candidates, broad_candidates
 
 
 def _build_pauschale_pruef_kontext(
@@ -5899,6 +6524,7 @@ def _build_pauschale_pruef_kontext(
 
 
 @_with_table_content_cache
+@metrics.timed("billing_decision")
 def _determine_final_billing(
     rule_checked_leistungen_list: List[Dict[str, Any]],
     regel_ergebnisse_details_list: List[Dict[str, Any]],
@@ -6036,9 +6662,11 @@ def _determine_final_billing(
                     prepared_structures=prepared_structures,
                     fast_mode=True,
                     include_explanation_html=False,
-                    include_selected_conditions_html=not RENDER_SERVER_SIDE_CONDITIONS,
+                    include_selected_conditions_html=not (RENDER_SERVER_SIDE_CONDITIONS or context.get("render_lazy")),
                     include_candidate_sources=False,
                     include_potential_icds=True,
+                    lkn_candidate_index=lkn_candidate_index,
+                    selection_index=pauschale_selection_index,
                 )
             if (not finale_abrechnung_obj or finale_abrechnung_obj.get("type") != "Pauschale") and eval_broad_additional:
                 logger.info(
@@ -6057,9 +6685,11 @@ def _determine_final_billing(
                     prepared_structures=prepared_structures,
                     fast_mode=True,
                     include_explanation_html=False,
-                    include_selected_conditions_html=not RENDER_SERVER_SIDE_CONDITIONS,
+                    include_selected_conditions_html=not (RENDER_SERVER_SIDE_CONDITIONS or context.get("render_lazy")),
                     include_candidate_sources=False,
                     include_potential_icds=True,
+                    lkn_candidate_index=lkn_candidate_index,
+                    selection_index=pauschale_selection_index,
                 )
             if finale_abrechnung_obj and finale_abrechnung_obj.get("type") == "Pauschale":
                 logger.info(
@@ -6157,11 +6787,9 @@ def _determine_final_billing(
     )
     anast_table_content_codes: Set[str] = set()
     if any_ag_code:
-        anast_table_content_codes = {
-            str(item['Code']).upper()
-            for item in get_table_content("ANAST", "service_catalog", tabellen_dict_by_table, lang=lang)
-            if item.get('Code')
-        }
+        anast_table_content_codes = set(
+            get_table_codes("ANAST", "service_catalog", tabellen_dict_by_table)
+        )
 
     def _mapping_priority(entry: Dict[str, Any]) -> Tuple[int, str]:
         code = entry.get("lkn")
@@ -6389,10 +7017,14 @@ def analyze_billing():
     alter_user = req_data["alter_user"]
     geschlecht_user = req_data["geschlecht_user"]
     heuristic_demo = cast(PatientDemographics, req_data.get("demographics_heuristic", {}))
+    lean_view = req_data.get("view") == "lean"
+    # Die schlanke Antwort enthält nie Bedingungs-HTML; es kommt über das render_token.
+    render_lazy = req_data.get("render_mode") == "lazy" or lean_view
 
     start_time = time.time()
-    request_id = f"req_{time.time_ns()}"
+    request_id = _current_request_id()
     logger.info(f"[{request_id}] --- Start /api/analyze-billing ---")
+    tracing.set_root_attributes(**{"request.id": request_id, "request.lang": lang, "request.view": req_data.get("view") or "full"})
     normalized_input: Optional[str] = None
     if LOG_INPUT_TEXT or LOG_LLM_INPUT:
         normalized_input = user_input.replace('\r', '\\r').replace('\n', '\\n')
@@ -6702,9 +7334,11 @@ def analyze_billing():
                     prepared_structures=prepared_structures,
                     fast_mode=True,
                     include_explanation_html=False,
-                    include_selected_conditions_html=not RENDER_SERVER_SIDE_CONDITIONS,
+                    include_selected_conditions_html=not (RENDER_SERVER_SIDE_CONDITIONS or render_lazy),
                     include_candidate_sources=False,
                     include_potential_icds=True,
+                    lkn_candidate_index=lkn_candidate_index,
+                    selection_index=pauschale_selection_index,
                 )
             except Exception as e:
                 logger.error(f"Fehler bei Pauschalen-Fallback-Prüfung (lokal) [{request_id}]: {e}", exc_info=True)
@@ -6758,9 +7392,11 @@ def analyze_billing():
                         prepared_structures=prepared_structures,
                         fast_mode=True,
                         include_explanation_html=False,
-                        include_selected_conditions_html=not RENDER_SERVER_SIDE_CONDITIONS,
+                        include_selected_conditions_html=not (RENDER_SERVER_SIDE_CONDITIONS or render_lazy),
                         include_candidate_sources=False,
                         include_potential_icds=True,
+                        lkn_candidate_index=lkn_candidate_index,
+                        selection_index=pauschale_selection_index,
                     )
                 except Exception as e:
                     logger.error(f"Fehler bei Pauschalen-Fallback-Prüfung (Ranking) [{request_id}]: {e}", exc_info=True)
@@ -6784,6 +7420,7 @@ def analyze_billing():
             "llm_validated_lkns": stage1_validated_code_list,
             "llm_validated_lkns_strict": strict_stage1_code_list,
             "demographics_heuristic": heuristic_demo,
+            "render_lazy": render_lazy,
             "__pauschale_eval_cache": pauschale_eval_cache,
         }
         finale_abrechnung_obj, llm_stage2_mapping_results = _determine_final_billing(rule_checked_leistungen_list, regel_ergebnisse_details_list, user_input, lang, billing_context, token_usage)
@@ -6793,20 +7430,25 @@ def analyze_billing():
     logger.info(f"[{request_id}] Zeit nach Regelprüfung: {rule_time - llm1_time:.2f}s")
 
     safe_abrechnung_obj = finale_abrechnung_obj or {}
-    # Optionally rerender conditions HTML using structured data and sanitize
+    render_token: Optional[str] = None
+    if render_lazy and isinstance(safe_abrechnung_obj, dict) and safe_abrechnung_obj.get("type") == "Pauschale":
+        # Kein Bedingungs-HTML: die UI lädt es bei Bedarf über das render_token nach.
+        if isinstance(pauschale_context_used, dict):
+            render_token = register_render_context(pauschale_context_used)
+        safe_abrechnung_obj["render_mode"] = "lazy"
+        safe_abrechnung_obj["render_token"] = render_token
+    # Optionally rerender conditions HTML using structured data (sanitized below)
     try:
         if RENDER_SERVER_SIDE_CONDITIONS and isinstance(safe_abrechnung_obj, dict):
             # Top-level selected Pauschale
-            if 'conditions_structured' in safe_abrechnung_obj and safe_abrechnung_obj.get('conditions_structured'):
-                _html = render_condition_groups_html(safe_abrechnung_obj['conditions_structured'], lang)
-                safe_abrechnung_obj['bedingungs_pruef_html'] = sanitize_html_fragment(_html)
+            if not render_lazy and safe_abrechnung_obj.get('conditions_structured'):
+                safe_abrechnung_obj['bedingungs_pruef_html'] = render_condition_groups_html(safe_abrechnung_obj['conditions_structured'], lang)
             # Evaluated candidates
             eval_list = safe_abrechnung_obj.get('evaluated_pauschalen')
-            if isinstance(eval_list, list):
+            if isinstance(eval_list, list) and not render_lazy:
                 for item in eval_list:
                     if isinstance(item, dict) and item.get('conditions_structured'):
-                        _html = render_condition_groups_html(item['conditions_structured'], lang)
-                        item['bedingungs_pruef_html'] = sanitize_html_fragment(_html)
+                        item['bedingungs_pruef_html'] = render_condition_groups_html(item['conditions_structured'], lang)
             # Explanation rendering
             details = safe_abrechnung_obj.get('details') if isinstance(safe_abrechnung_obj, dict) else None
             if isinstance(details, dict):
@@ -6819,27 +7461,17 @@ def analyze_billing():
                             break
                 exp_html = render_pauschale_explanation_html(selected_entry, eval_list if isinstance(eval_list, list) else [], lang)
                 if exp_html:
-                    details['pauschale_erklaerung_html'] = sanitize_html_fragment(exp_html)
+                    details['pauschale_erklaerung_html'] = exp_html
     except Exception:
         pass
-    # Sanitize HTML fragments in abrechnung payload before responding
+    # Sanitize HTML fragments in abrechnung payload before responding (single pass)
     try:
         _sanitize_abrechnung_payload(safe_abrechnung_obj)
     except Exception:
         pass
 
-    # Also provide sanitized copy of evaluated_pauschalen at top-level for convenience
-    sanitized_evaluated_list = []
-    try:
-        for _it in safe_abrechnung_obj.get('evaluated_pauschalen', []) or []:
-            if isinstance(_it, dict) and 'bedingungs_pruef_html' in _it:
-                _clone = dict(_it)
-                _clone['bedingungs_pruef_html'] = sanitize_html_fragment(_clone.get('bedingungs_pruef_html') or '')
-                sanitized_evaluated_list.append(_clone)
-            else:
-                sanitized_evaluated_list.append(_it)
-    except Exception:
-        sanitized_evaluated_list = safe_abrechnung_obj.get('evaluated_pauschalen', []) or []
+    # Top-level evaluated_pauschalen teilt die bereits bereinigten Einträge.
+    sanitized_evaluated_list = safe_abrechnung_obj.get('evaluated_pauschalen', []) or []
 
     # Interne Request-Caches dürfen nicht im JSON-Response landen (nicht serialisierbar, nur intern).
     pauschale_context_response = pauschale_context_used
@@ -6860,23 +7492,66 @@ def analyze_billing():
         "fallback_pauschale_search": fallback_pauschale_search,
         "pauschale_context": pauschale_context_response,
     }
+    if render_token:
+        final_response_payload["render_token"] = render_token
+    if lean_view:
+        final_response_payload = _build_lean_billing_payload(
+            final_response_payload, register_billing_details(final_response_payload)
+        )
+    elif render_lazy:
+        final_response_payload = _defer_pauschale_context(final_response_payload)
 
     total_time = time.time() - start_time
     logger.info(f"[{request_id}] Gesamtverarbeitungszeit: {total_time:.2f}s")
     logger.info(f"[{request_id}] Sende finale Antwort Typ '{safe_abrechnung_obj.get('type', 'None')}'")
     if LOG_HTML_OUTPUT:
-        detail_logger.info(f"[{request_id}] Final response payload (contains HTML): {json.dumps(final_response_payload, ensure_ascii=False, indent=2)}")
+        detail_logger.info("[%s] Final response payload (contains HTML): %s", request_id, LazyJSON(final_response_payload))
+    for stage_name, usage in token_usage.items():
+        for direction in ("input", "output"):
+            tokens = usage.get(f"{direction}_tokens") or 0
+            if tokens:
+                metrics.inc("llm_tokens_total", tokens, stage=stage_name, direction=direction)
+
+    with metrics.span("serialization"):
+        return jsonify(final_response_payload)
 
-    return jsonify(final_response_payload)
 
+@app.route('/api/analyze-billing/details/<token>')
+def analyze_billing_details(token: str) -> Any:
+    """Liefert die zurückgehaltenen Abschnitte zu einer schlanken Antwort.
 
-@app.route('/api/pauschale-conditions-html', methods=['POST'])
+    ``?section=pauschale_context,llm_ergebnis_stufe2`` wählt Abschnitte aus;
+    ohne Angabe werden alle geliefert. Unbekannte Tokens: 410.
+    """
+    payload = resolve_billing_details(token)
+    if payload is None:
+        return jsonify({"error": "details token expired"}), 410
+    sections_raw = request.args.get("section") or ""
+    sections = [part.strip() for part in sections_raw.split(",") if part.strip()]
+    unknown = [name for name in sections if name not in payload]
+    if unknown:
+        return jsonify({"error": f"unknown section(s): {', '.join(unknown)}"}), 400
+    return jsonify({name: payload[name] for name in sections} if sections else payload)
+
+
+@app.route('/api/pauschale-conditions-html', methods=['GET', 'POST'])
 def pauschale_conditions_html() -> Any:
-    """Erzeuge Bedingungs-HTML on demand, z.B. wenn die UI Details nachlädt."""
+    """Erzeuge Bedingungs-HTML on demand, z.B. wenn die UI Details nachlädt.
+
+    Antworten werden pro (Kontext-Hash, Code, Sprache) zwischengespeichert und
+    tragen ein ETag, das vom Datenstand abhängt; ``If-None-Match`` liefert 304.
+    Mit ``render_token`` (aus einer analyze-billing-Antwort im Modus "lazy") wird
+    der hinterlegte Prüfkontext verwendet; als GET-Anfrage kann der Browser die
+    Antwort dann selbst revalidieren. Ist das Token abgelaufen und kein
+    ``context`` mitgeschickt, antwortet der Endpunkt mit 410.
+    """
     if not daten_geladen:
         return jsonify({"error": "Server data not loaded."}), 503
 
-    payload = request.get_json(silent=True) or {}
+    if request.method == 'GET':
+        payload = request.args.to_dict()
+    else:
+        payload = request.get_json(silent=True) or {}
     code_raw = payload.get("code") or ""
     lang = (payload.get("lang") or "de").lower()
     if not code_raw:
@@ -6886,6 +7561,37 @@ def pauschale_conditions_html() -> Any:
     if not isinstance(context, dict):
         context = {}
 
+    context_hash: Optional[str] = None
+    render_token = payload.get("render_token")
+    if isinstance(render_token, str) and render_token:
+        stored_context = resolve_render_context(render_token)
+        if stored_context is not None:
+            context = stored_context
+            context_hash = render_token
+        elif not context:
+            return jsonify({"error": "render token expired"}), 410
+    if context_hash is None:
+        context_hash = _render_context_token(_canonical_render_context(context))
+
+    cache_key = (context_hash, pauschale_code.upper(), lang)
+    etag = _conditions_html_etag(cache_key)
+    if request.if_none_match.contains(etag):
+        metrics.inc("cache_requests_total", cache="conditions_html", result="not_modified")
+        not_modified = app.response_class(status=304)
+        not_modified.set_etag(etag)
+        not_modified.headers["Cache-Control"] = "private, no-cache"
+        return not_modified
+
+    def _respond(body: Dict[str, Any]) -> Any:
+        resp = jsonify(body)
+        resp.set_etag(etag)
+        resp.headers["Cache-Control"] = "private, no-cache"
+        return resp
+
+    cached_payload = _get_cached_conditions_html(cache_key)
+    if cached_payload is not None:
+        return _respond(cached_payload)
+
     try:
         # Also compute overall validity on demand so the UI can display LOGIK ERFÜLLT/NICHT ERFÜLLT
         is_valid_structured = None
@@ -6932,7 +7638,8 @@ def pauschale_conditions_html() -> Any:
             "group_logic_terms": result.get("group_logic_terms"),
             "is_valid_structured": is_valid_structured,
         }
-        return jsonify(response_payload)
+        _store_conditions_html(cache_key, response_payload)
+        return _respond(response_payload)
     except Exception as exc:
         logger.error("Failed to render pauschale conditions on demand for %s: %s", pauschale_code, exc, exc_info=True)
         return jsonify({"error": "could not render conditions"}), 500
@@ -7029,6 +7736,27 @@ def quality_endpoint():
     match = result == baseline
     return jsonify({"result": result, "baseline": baseline, "match": match})
 
+_baseline_file_cache: Dict[str, Any] = {"stamp": None, "data": None}
+
+
+def _current_baseline_results() -> Any:
+    """Baseline-Resultate; nur neu gelesen, wenn sich mtime/Grösse der Datei ändern."""
+    try:
+        stat = BASELINE_RESULTS_PATH.stat()
+    except OSError:
+        return baseline_results
+    stamp = (stat.st_mtime_ns, stat.st_size)
+    if _baseline_file_cache["stamp"] != stamp:
+        try:
+            loaded = json_backend.load_file(BASELINE_RESULTS_PATH)
+        except Exception:
+            return baseline_results
+        if not isinstance(loaded, dict):
+            return baseline_results
+        _baseline_file_cache.update(stamp=stamp, data=loaded)
+    return _baseline_file_cache["data"]
+
+
 @app.route('/api/test-example', methods=['POST'])
 def test_example():
     """Vergleicht das Ergebnis einer Beispielanalyse mit dem Baseline-Resultat."""
@@ -7038,16 +7766,9 @@ def test_example():
     if not daten_geladen:
         logger.error("Daten nicht geladen im /api/test-example Endpunkt. Dies sollte nicht passieren, da create_app() die Daten laden sollte.")
         return jsonify({'error': 'Server data not loaded. Please try again later or contact an administrator.'}), 503
-    # Baseline on-demand laden, damit Frontend (statische Datei) und Backend-Checks
-    # auch nach Dateiänderungen konsistent bleiben (Debug/Reload ist nicht immer zuverlässig).
-    baseline_source = baseline_results
-    try:
-        with open(BASELINE_RESULTS_PATH, 'r', encoding='utf-8') as f:
-            loaded = json.load(f)
-            if isinstance(loaded, dict):
-                baseline_source = loaded
-    except Exception:
-        baseline_source = baseline_results
+    # Baseline bei Dateiänderungen neu laden, damit Frontend (statische Datei) und
+    # Backend-Checks konsistent bleiben; unverändert wird die gecachte Version genutzt.
+    baseline_source = _current_baseline_results()
 
     baseline_entry = baseline_source.get(example_id) if isinstance(baseline_source, dict) else None
     if not baseline_entry:
@@ -7113,8 +7834,6 @@ def test_example():
 
     result = simplify(analysis_full)
 
-    baseline_entry.setdefault('current', {})[lang] = result
-
     def diff_results(expected: dict, actual: dict) -> str:
         """Gibt kompakte Beschreibung der Differenzen zwischen erwarteten und aktuellen Ergebnissen zurück."""
         parts = []
@@ -7169,6 +7888,22 @@ def frontend_log() -> Any:
     logger.info("Frontend log (%s): %s", event_type, payload)
     return jsonify({"status": "ok"})
 
+def _resolve_feedback_stage2(begruendung2: Any, details_token: str) -> Any:
+    """Ersetzt den Stage-2-Platzhalter der schlanken Antwort durch das gemerkte Mapping."""
+    stub = begruendung2
+    if isinstance(stub, str):
+        try:
+            stub = json.loads(stub) if stub else {}
+        except ValueError:
+            return begruendung2
+    if not isinstance(stub, dict) or not stub.get("deferred") or stub.get("mapping_results"):
+        return begruendung2
+    stage2 = (resolve_billing_details(details_token) or {}).get("llm_ergebnis_stufe2")
+    if stage2 is None:
+        return begruendung2
+    return json.dumps(stage2, ensure_ascii=False)
+
+
 @app.route('/api/submit-feedback', methods=['POST'])
 def submit_feedback() -> Any:
     """Create a GitHub issue from user feedback."""
@@ -7184,6 +7919,8 @@ def submit_feedback() -> Any:
     einzelleistungen = data.get("einzelleistungen", [])
     begruendung1 = data.get("begruendung_llm1", "")
     begruendung2 = data.get("begruendung_llm2", "")
+    if data.get("details_token"):
+        begruendung2 = _resolve_feedback_stage2(begruendung2, str(data["details_token"]))
     context = data.get("context")
 
     if not token or not repo:
@@ -7299,6 +8036,221 @@ def api_version() -> Any:
         "brick_quiz_enabled": BRICK_QUIZ_ENABLED,
     })
 
+def _collect_runtime_metrics() -> Iterable[Tuple[str, str, Dict[str, Any], float]]:
+    """Momentwerte für /metrics: Cache-Füllstände, Sanitize-Cache, Log-Queue."""
+    sanitize = get_sanitize_stats()
+    yield ("html_sanitize_cache_total", "counter", {"result": "hit"}, sanitize.get("hits", 0))
+    yield ("html_sanitize_cache_total", "counter", {"result": "miss"}, sanitize.get("misses", 0))
+    yield ("html_sanitize_seconds_total", "counter", {}, sanitize.get("clean_seconds", 0.0))
+    for name, cache in (
+        ("html_sanitize", _sanitize_cache),
+        ("render_contexts", _render_contexts),
+        ("conditions_html", _conditions_html_cache),
+        ("billing_details", _billing_details),
+        ("frontend_payloads", _frontend_payloads),
+    ):
+        yield ("cache_entries", "gauge", {"cache": name}, len(cache))
+    if log_pipeline is not None:
+        log_stats = log_pipeline.stats()
+        yield ("log_queue_dropped_total", "counter", {}, log_stats["dropped"])
+        yield ("log_queue_depth", "gauge", {}, log_stats["queued"])
+    yield ("data_loaded", "gauge", {}, 1 if daten_geladen else 0)
+    rss = memory_diagnostics.process_memory()["rss_bytes"]
+    if rss is not None:
+        yield ("process_resident_memory_bytes", "gauge", {}, rss)
+
+
+metrics.register_collector(_collect_runtime_metrics)
+
+
+@app.route('/metrics')
+def metrics_endpoint() -> Any:
+    """Prometheus-Metriken (Textformat 0.0.4)."""
+    if not METRICS_ENABLED:
+        return jsonify({"error": "metrics disabled"}), 404
+    resp = app.response_class(metrics.render(), status=200)
+    resp.headers["Content-Type"] = "text/plain; version=0.0.4; charset=utf-8"
+    resp.headers["Cache-Control"] = "no-store"
+    return resp
+
+
+def _profiles_access_allowed() -> bool:
+    """Nur mit Admin-Token; ohne ``PROFILING_ADMIN_TOKEN`` sind die Profil-Routen gesperrt.
+
+    Die Absenderadresse taugt nicht als Ersatz: hinter einem lokalen Reverse
+    Proxy wäre jeder Aufruf "lokal".
+    """
+    if not PROFILING_ADMIN_TOKEN:
+        return False
+    return profiling.token_matches(request.headers.get("X-Profile-Token"))
+
+
+@app.route('/api/profiles')
+def list_request_profiles() -> Any:
+    """Listet die neuesten Request-Profile (``?limit=``)."""
+    if not _profiles_access_allowed():
+        return jsonify({"error": "forbidden"}), 403
+    try:
+        limit = max(1, min(500, int(request.args.get("limit", 50))))
+    except ValueError:
+        limit = 50
+    resp = jsonify({
+        "enabled": profiling.is_enabled(),
+        "mode": PROFILING_MODE,
+        "sample_every": PROFILING_SAMPLE_EVERY,
+        "profiles": profiling.list_profiles(limit),
+    })
+    resp.headers["Cache-Control"] = "no-store"
+    return resp
+
+
+@app.route('/api/profiles/<name>')
+def fetch_request_profile(name: str) -> Any:
+    """Liefert eine Profildatei (``.pstats`` oder ``.collapsed``) zum Download."""
+    if not _profiles_access_allowed():
+        return jsonify({"error": "forbidden"}), 403
+    path = profiling.resolve_profile(name)
+    if path is None:
+        return jsonify({"error": "profile not found"}), 404
+    resp = send_from_directory(
+        str(path.parent.resolve()),
+        path.name,
+        mimetype="text/plain" if path.suffix == ".collapsed" else "application/octet-stream",
+        as_attachment=True,
+        max_age=0,
+    )
+    resp.headers["Cache-Control"] = "no-store"
+    return resp
+
+
+def _memory_datasets() -> Dict[str, Any]:
+    """Globale Datenstrukturen für den Speicherbericht.
+
+    Die Reihenfolge bestimmt, welcher Struktur geteilte Objekte zugerechnet
+    werden: Rohdaten vor den daraus abgeleiteten Dicts und Indizes.
+    """
+    return {
+        "leistungskatalog_data": leistungskatalog_data,
+        "leistungskatalog_dict": leistungskatalog_dict,
+        "regelwerk_dict": regelwerk_dict,
+        "regelwerk_kompiliert": regelwerk_kompiliert,
+        "tardoc_tarif_dict": tardoc_tarif_dict,
+        "tardoc_interp_dict": tardoc_interp_dict,
+        "pauschale_lp_data": pauschale_lp_data,
+        "pauschalen_data": pauschalen_data,
+        "pauschalen_dict": pauschalen_dict,
+        "pauschale_bedingungen_data": pauschale_bedingungen_data,
+        "pauschale_bedingungen_indexed": pauschale_bedingungen_indexed,
+        "prepared_structures": prepared_structures,
+        "tabellen_data": tabellen_data,
+        "tabellen_dict_by_table": tabellen_dict_by_table,
+        "table_catalog": get_table_catalog(tabellen_dict_by_table) if tabellen_dict_by_table else None,
+        "pauschale_lp_index": (pauschale_lp_index, pauschale_lp_index_by_lkn),
+        "pauschale_cond_indices": (
+            pauschale_cond_lkn_index, pauschale_cond_lkn_index_by_lkn,
+            pauschale_cond_table_index, pauschale_cond_table_index_by_table,
+            pauschale_cond_table_index_precise, pauschale_cond_table_index_broad,
+            pauschale_cond_table_index_by_table_precise, pauschale_cond_table_index_by_table_broad,
+        ),
+        "lkn_to_tables_index": (lkn_to_tables_index, lkn_to_tables_index_precise, lkn_to_tables_index_broad),
+        "precomputed_table_maps": (
+            precomputed_table_map_precise, precomputed_table_map_broad,
+            precomputed_pauschale_cond_table_precise, precomputed_pauschale_cond_table_broad,
+            precomputed_lkn_tables_precise, precomputed_lkn_tables_broad,
+        ),
+        "lkn_candidate_index": lkn_candidate_index,
+        "pauschale_selection_index": pauschale_selection_index,
+        "pauschale_mapping_lkns": (pauschale_mapping_lkns, mapping_table_lkn_desc, anast_mapping_lkn_desc),
+        "pauschalen_search_cache": (pauschalen_search_tokens_by_code, pauschalen_search_blob_by_code),
+        "synonym_catalog.entries": synonym_catalog.entries,
+        "synonym_catalog.index": synonym_catalog.index,
+        "synonym_catalog.lkn_index": synonym_catalog.lkn_index,
+        "token_doc_freq": token_doc_freq,
+        "medications": (medication_entries, medication_lookup_by_token),
+        "chop_data": chop_data,
+        "tpw_data": tpw_data,
+        "baseline_results": baseline_results,
+        "examples_data": examples_data,
+        "embedding_codes": embedding_codes,
+        "faiss_index": faiss_index,
+        "embedding_model": embedding_model,
+        "cache.html_sanitize": _sanitize_cache,
+        "cache.render_contexts": _render_contexts,
+        "cache.conditions_html": _conditions_html_cache,
+        "cache.billing_details": _billing_details,
+        "cache.frontend_payloads": _frontend_payloads,
+    }
+
+
+def _diagnostics_access_allowed() -> bool:
+    """Nur mit Admin-Token; ohne ``PROFILING_ADMIN_TOKEN`` sind die Routen gesperrt.
+
+    Die Absenderadresse taugt nicht als Ersatz: hinter einem lokalen Reverse
+    Proxy wäre jeder Aufruf "lokal", und tracemalloc bremst jede Anfrage.
+    """
+    if not PROFILING_ADMIN_TOKEN:
+        return False
+    return profiling.token_matches(request.headers.get("X-Profile-Token"))
+
+
+@app.route('/api/diagnostics/memory')
+def memory_report_endpoint() -> Any:
+    """Tiefe Grössen der geladenen Datenstrukturen und RSS des Prozesses (Admin)."""
+    if not _diagnostics_access_allowed():
+        return jsonify({"error": "forbidden"}), 403
+    resp = jsonify(memory_diagnostics.dataset_report(_memory_datasets()))
+    resp.headers["Cache-Control"] = "no-store"
+    return resp
+
+
+@app.route('/api/diagnostics/tracemalloc', methods=['GET', 'POST', 'DELETE'])
+def tracemalloc_endpoint() -> Any:
+    """Status (GET), Snapshot aufnehmen (POST, ``label``) oder tracemalloc beenden (DELETE).
+
+    Der erste Snapshot startet tracemalloc; erfasst werden nur Allokationen ab
+    diesem Zeitpunkt. Vergleich über ``/api/diagnostics/tracemalloc/diff``.
+    """
+    if not _diagnostics_access_allowed():
+        return jsonify({"error": "forbidden"}), 403
+    if request.method == 'POST':
+        payload = request.get_json(silent=True) or {}
+        label = payload.get("label") if isinstance(payload, dict) else None
+        result: Dict[str, Any] = memory_diagnostics.take_snapshot(label or request.args.get("label", ""))
+    elif request.method == 'DELETE':
+        memory_diagnostics.stop_tracing()
+        result = memory_diagnostics.tracing_status()
+    else:
+        result = memory_diagnostics.tracing_status()
+    resp = jsonify(result)
+    resp.headers["Cache-Control"] = "no-store"
+    return resp
+
+
+@app.route('/api/diagnostics/tracemalloc/diff')
+def tracemalloc_diff_endpoint() -> Any:
+    """Wachstum seit Snapshot ``base`` bis ``compare`` (Snapshot-ID, Standard: aktueller Stand)."""
+    if not _diagnostics_access_allowed():
+        return jsonify({"error": "forbidden"}), 403
+    base_id = request.args.get("base", "")
+    try:
+        limit = max(1, min(200, int(request.args.get("limit", 25))))
+    except ValueError:
+        limit = 25
+    try:
+        result = memory_diagnostics.diff_snapshots(
+            base_id,
+            request.args.get("compare") or None,
+            group_by=request.args.get("group", "lineno"),
+            limit=limit,
+        )
+    except KeyError as exc:
+        return jsonify({"error": f"unknown snapshot {exc.args[0]}"}), 404
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    resp = jsonify(result)
+    resp.headers["Cache-Control"] = "no-store"
+    return resp
+
 # --- Static‑Routes & Start ---
 _CUSTOM_MIME_TYPES: Dict[str, str] = {
     "index.html": "text/html; charset=utf-8",
@@ -7319,7 +8271,9 @@ _STATIC_ALLOWED_FILES: Set[str] = {
 }
 _STATIC_ALLOWED_DIRS: Set[str] = {"data"}
 _STATIC_ALLOWED_TEXT_FILES: Set[str] = {"robots.txt"}
-_STATIC_BLOCKED_SUFFIXES: Set[str] = {".py", ".env"}
+_STATIC_BLOCKED_SUFFIXES: Set[str] = {".py", ".env", ".gz", ".br"}
+# LLM-Cassetten enthalten Prompts mit Freitext und werden nie ausgeliefert, auch nicht als .json.
+_STATIC_BLOCKED_NAME_MARKERS: Tuple[str, ...] = ("cassette",)
 _STATIC_SUFFIX_MIME_TYPES: Dict[str, str] = {
     ".html": "text/html; charset=utf-8",
     ".js": "application/javascript; charset=utf-8",
@@ -7335,6 +8289,8 @@ def _is_static_request_blocked(filename: str, file_path: Path) -> bool:
         return True
     if suffix in _STATIC_BLOCKED_SUFFIXES:
         return True
+    if any(marker in file_path.name.lower() for marker in _STATIC_BLOCKED_NAME_MARKERS):
+        return True
     if suffix == ".txt" and filename not in _STATIC_ALLOWED_TEXT_FILES:
         return True
     return False
@@ -7378,12 +8334,285 @@ def _apply_no_cache_headers(response: Any) -> Any:
     return response
 
 
+# --- Datendateien: Inhalts-Hash als Version, ETag und vorkomprimierte Varianten ---
+# calculator.js hängt den Hash aus /api/asset-manifest als ``?v=`` an; solche URLs
+# sind unveränderlich und dürfen ein Jahr gecacht werden. Ohne passende Version
+# wird per ETag revalidiert (304 statt erneuter Übertragung).
+STATIC_PRECOMPRESS = config.getboolean('STATIC', 'precompress', fallback=True)
+STATIC_PRECOMPRESS_MIN_BYTES = config.getint('STATIC', 'precompress_min_bytes', fallback=4096)
+STATIC_BROTLI_QUALITY = min(11, max(0, config.getint('STATIC', 'brotli_quality', fallback=9)))
+# "background": nach dem Import in einem Hintergrund-Thread vorbereiten; "off": erst bei der ersten Anfrage.
+STATIC_WARM = (os.getenv('STATIC_WARM') or config.get('STATIC', 'warm', fallback='background')).strip().lower()
+STATIC_IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+_STATIC_ROOT = Path(__file__).resolve().parent
+_STATIC_COMPRESSIBLE_SUFFIXES: Set[str] = {".json", ".js", ".html"}
+# Reihenfolge = Präferenz bei der Aushandlung über Accept-Encoding
+_STATIC_ENCODINGS: Tuple[Tuple[str, str], ...] = (("br", ".br"), ("gzip", ".gz"))
+
+
+class _StaticAsset(TypedDict):
+    mtime_ns: int
+    size: int
+    digest: str
+    encoded: Dict[str, bytes]
+
+
+_static_assets: Dict[str, _StaticAsset] = {}
+_static_assets_lock = threading.Lock()
+
+
+def _compress_static_bytes(raw: bytes, encoding: str) -> Optional[bytes]:
+    if encoding == "gzip":
+        return gzip.compress(raw, compresslevel=9, mtime=0)
+    if encoding == "br" and brotli is not None:
+        return brotli.compress(raw, quality=STATIC_BROTLI_QUALITY)
+    return None
+
+
+def _load_static_asset(filename: str) -> Optional[_StaticAsset]:
+    """Liefert Hash und komprimierte Varianten einer Datei; neu berechnet bei Änderung.
+
+    Vorab erzeugte Nachbardateien (``.br``/``.gz``, siehe
+    ``scripts/precompress_assets.py``) werden bevorzugt, sofern sie nicht älter
+    als die Quelldatei sind.
+    """
+    path = _STATIC_ROOT / filename
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    with _static_assets_lock:
+        cached = _static_assets.get(filename)
+    if cached and cached["mtime_ns"] == stat.st_mtime_ns and cached["size"] == stat.st_size:
+        return cached
+
+    raw = path.read_bytes()
+    encoded: Dict[str, bytes] = {}
+    if (
+        STATIC_PRECOMPRESS
+        and stat.st_size >= STATIC_PRECOMPRESS_MIN_BYTES
+        and path.suffix.lower() in _STATIC_COMPRESSIBLE_SUFFIXES
+    ):
+        for encoding, suffix in _STATIC_ENCODINGS:
+            sidecar = path.with_name(path.name + suffix)
+            try:
+                if sidecar.stat().st_mtime_ns >= stat.st_mtime_ns:
+                    encoded[encoding] = sidecar.read_bytes()
+                    continue
+            except OSError:
+                pass
+            data = _compress_static_bytes(raw, encoding)
+            if data is not None and len(data) < len(raw):
+                encoded[encoding] = data
+    asset: _StaticAsset = {
+        "mtime_ns": stat.st_mtime_ns,
+        "size": stat.st_size,
+        "digest": hashlib.blake2b(raw, digest_size=8).hexdigest(),
+        "encoded": encoded,
+    }
+    with _static_assets_lock:
+        _static_assets[filename] = asset
+    return asset
+
+
+def _versioned_static_files() -> List[str]:
+    files: List[str] = []
+    for directory in sorted(_STATIC_ALLOWED_DIRS):
+        base = _STATIC_ROOT / directory
+        if base.is_dir():
+            files.extend(
+                f"{directory}/{p.name}"
+                for p in sorted(base.glob("*.json"))
+                if p.is_file() and not _is_static_request_blocked(f"{directory}/{p.name}", Path(directory, p.name))
+            )
+    return files
+
+
+def static_asset_manifest() -> Dict[str, str]:
+    """Ordnet jeder Datendatei ihren aktuellen Inhalts-Hash zu."""
+    manifest: Dict[str, str] = {}
+    for filename in _versioned_static_files():
+        asset = _load_static_asset(filename)
+        if asset is not None:
+            manifest[filename] = asset["digest"]
+    return manifest
+
+
+def warm_static_assets() -> None:
+    """Berechnet Hashes und komprimierte Varianten aller Datendateien vorab."""
+    started = time.perf_counter()
+    manifest = static_asset_manifest()
+    logger.info(
+        "Statische Datendateien vorbereitet: %s Dateien in %.0f ms (brotli %s)",
+        len(manifest),
+        (time.perf_counter() - started) * 1000,
+        "aktiv" if brotli is not None else "nicht installiert",
+    )
+
+
+def _apply_asset_cache_headers(response: Any, immutable: bool) -> Any:
+    cache_control = response.cache_control
+    if immutable:
+        cache_control.no_cache = None
+        cache_control.public = True
+        cache_control.max_age = STATIC_IMMUTABLE_MAX_AGE
+        cache_control.immutable = True
+    else:
+        cache_control.no_cache = True
+    response.vary.add("Accept-Encoding")
+    return response
+
+
+def _negotiate_static_encoding(encoded: Mapping[str, bytes]) -> Optional[str]:
+    for encoding, _suffix in _STATIC_ENCODINGS:
+        if encoding in encoded and request.accept_encodings[encoding] > 0:
+            return encoding
+    return None
+
+
+def _bytes_response(body: bytes, etag: str, mimetype: str | None, encoding: Optional[str] = None) -> Any:
+    resp = app.response_class(body, mimetype=mimetype)
+    if encoding:
+        resp.headers["Content-Encoding"] = encoding
+    resp.set_etag(etag)
+    resp.make_conditional(request)
+    return resp
+
+
+def _send_versioned_asset(filename: str, mimetype: str | None = None) -> Any:
+    """Liefert eine Datendatei mit ETag, passender Kompression und Cache-Headern."""
+    asset = _load_static_asset(filename)
+    if asset is None:
+        abort(404)
+    immutable = request.args.get("v") == asset["digest"]
+    encoding = _negotiate_static_encoding(asset["encoded"])
+    if encoding is None:
+        options: Dict[str, Any] = {"mimetype": mimetype} if mimetype else {}
+        resp = send_from_directory(".", filename, etag=asset["digest"], **options)
+    else:
+        resp = _bytes_response(asset["encoded"][encoding], f"{asset['digest']}-{encoding}", mimetype, encoding)
+    return _apply_asset_cache_headers(resp, immutable)
+
+
 def _send_static(filename: str, mimetype: str | None = None) -> Any:
     """Wrapper around send_from_directory with disabled caching."""
     options: Dict[str, Any] = {"mimetype": mimetype} if mimetype else {}
     resp = send_from_directory(".", filename, **options)
     return _apply_no_cache_headers(resp)
 
+
+# --- Kompakte Frontend-Datensätze (/api/frontend-data, siehe frontend_data.py) ---
+# Projektionen werden pro (Datensatz, Sprache) aus der Quelldatei abgeleitet und
+# neu berechnet, sobald sich deren Inhalts-Hash ändert. Die serialisierten
+# Antworten (ganz oder pro Chunk) liegen samt gzip/brotli-Varianten im Speicher.
+class _FrontendPayload(TypedDict):
+    source: str
+    digest: str
+    body: bytes
+    encoded: Dict[str, bytes]
+
+
+_frontend_projections: Dict[Tuple[str, str], Dict[str, Any]] = {}
+_frontend_payloads: Dict[Tuple[str, str, str], _FrontendPayload] = {}
+_frontend_data_lock = threading.Lock()
+
+
+def _frontend_dataset_version(spec: frontend_data.DatasetSpec) -> Optional[str]:
+    """Version = Hash der Quelldatei plus Feldauswahl (ändert sich mit beiden)."""
+    asset = _load_static_asset(f"data/{spec.filename}")
+    if asset is None:
+        return None
+    raw = f"{asset['digest']}|{','.join(spec.fields)}|{','.join(sorted(spec.localized))}"
+    return hashlib.blake2b(raw.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def _frontend_projection(spec: frontend_data.DatasetSpec, lang: str) -> Optional[Dict[str, Any]]:
+    version = _frontend_dataset_version(spec)
+    if version is None:
+        return None
+    key = (spec.name, lang)
+    with _frontend_data_lock:
+        cached = _frontend_projections.get(key)
+    if cached is not None and cached["version"] == version:
+        return cached
+    raw = json_backend.load_file(_STATIC_ROOT / "data" / spec.filename)
+    rows = frontend_data.project_dataset(spec, raw, lang)
+    projection = {"version": version, "rows": rows, "chunks": frontend_data.chunk_keys(spec, rows)}
+    with _frontend_data_lock:
+        _frontend_projections[key] = projection
+    return projection
+
+
+def _frontend_payload(spec: frontend_data.DatasetSpec, lang: str, chunk: str) -> Optional[_FrontendPayload]:
+    projection = _frontend_projection(spec, lang)
+    if projection is None or (chunk and chunk not in projection["chunks"]):
+        return None
+    key = (spec.name, lang, chunk)
+    with _frontend_data_lock:
+        cached = _frontend_payloads.get(key)
+    if cached is not None and cached["source"] == projection["version"]:
+        return cached
+    payload = frontend_data.build_payload(spec, projection["rows"], lang, chunk or None)
+    body = json_backend.dumps_bytes(payload)
+    encoded: Dict[str, bytes] = {}
+    if STATIC_PRECOMPRESS and len(body) >= STATIC_PRECOMPRESS_MIN_BYTES:
+        for encoding, _suffix in _STATIC_ENCODINGS:
+            data = _compress_static_bytes(body, encoding)
+            if data is not None and len(data) < len(body):
+                encoded[encoding] = data
+    entry: _FrontendPayload = {
+        "source": projection["version"],
+        "digest": hashlib.blake2b(body, digest_size=8).hexdigest(),
+        "body": body,
+        "encoded": encoded,
+    }
+    with _frontend_data_lock:
+        _frontend_payloads[key] = entry
+    return entry
+
+
+@app.route("/api/frontend-data")
+def frontend_data_index() -> Any:
+    """Verfügbare kompakte Datensätze mit Version und Chunk-Schlüsseln."""
+    datasets: Dict[str, Any] = {}
+    for name, spec in frontend_data.DATASETS.items():
+        projection = _frontend_projection(spec, "de")
+        if projection is None:
+            datasets[name] = {"available": False}
+            continue
+        datasets[name] = {
+            "available": True,
+            "version": projection["version"],
+            "fields": list(spec.fields),
+            "rows": len(projection["rows"]),
+            "chunks": projection["chunks"],
+        }
+    resp = jsonify({"datasets": datasets, "langs": list(frontend_data.SUPPORTED_LANGS)})
+    return _apply_no_cache_headers(resp)
+
+
+@app.route("/api/frontend-data/<dataset>")
+def frontend_data_route(dataset: str) -> Any:
+    """Kompakte Projektion eines Datensatzes (``?lang=``, optional ``?chunk=``).
+
+    Mit ``?v=<version>`` aus dem Index ist die Antwort unveränderlich und darf
+    langfristig gecacht werden; sonst wird per ETag revalidiert.
+    """
+    spec = frontend_data.DATASETS.get(dataset)
+    if spec is None:
+        return jsonify({"error": f"unknown dataset '{dataset}'"}), 404
+    lang = frontend_data.normalize_lang(request.args.get("lang"))
+    chunk = frontend_data.chunk_key(request.args.get("chunk")) if request.args.get("chunk") else ""
+    payload = _frontend_payload(spec, lang, chunk)
+    if payload is None:
+        return jsonify({"error": "dataset or chunk not available"}), 404
+    encoding = _negotiate_static_encoding(payload["encoded"])
+    if encoding is None:
+        resp = _bytes_response(payload["body"], payload["digest"], "application/json")
+    else:
+        resp = _bytes_response(payload["encoded"][encoding], f"{payload['digest']}-{encoding}", "application/json", encoding)
+    return _apply_asset_cache_headers(resp, request.args.get("v") == payload["source"])
+
 def _send_brick_static(filename: str, mimetype: str | None = None) -> Any:
     """Serve Brick-Quiz assets with the same no-cache policy as core static files."""
     if not BRICK_QUIZ_STATIC_DIR.exists():
@@ -7426,6 +8655,21 @@ def _serve_brick_asset(filename: str) -> Any:
         abort(404)
     return _send_brick_static(filename)
 
+@app.route("/api/asset-manifest")
+def asset_manifest_route() -> Any:
+    """Inhalts-Hashes der Datendateien für versionierte URLs im Frontend."""
+    resp = jsonify({"assets": static_asset_manifest()})
+    return _apply_no_cache_headers(resp)
+
+@app.route("/data/<path:filename>")
+def data_asset_route(filename: str) -> Any:
+    """Datendateien versioniert ausliefern (spezifischer als die Static-Route)."""
+    relative = f"data/{filename}"
+    file_path = Path(relative)
+    if _is_static_request_blocked(relative, file_path):
+        abort(404)
+    return _send_versioned_asset(relative, mimetype=_resolve_static_mimetype(relative, file_path))
+
 @app.route("/favicon.ico")
 def favicon_ico():
     """Stellt das klassische Favicon für ältere Browser-Anfragen bereit."""
@@ -7455,6 +8699,17 @@ def serve_static(filename: str):
     mimetype = _resolve_static_mimetype(filename, file_path)
     return _send_static(filename, mimetype=mimetype)
 
+if STATIC_PRECOMPRESS and STATIC_WARM == "background":
+    # gzip -9/brotli über alle Datendateien dauert Sekunden; nicht im Import-Pfad
+    threading.Thread(target=warm_static_assets, name="static-warm", daemon=True).start()
+
+if DIAGNOSTICS_MEMORY_REPORT_ON_LOAD and daten_geladen:
+    # erst hier: alle globalen Strukturen und Caches sind definiert
+    logger.info("Speicherbedarf nach load_data():\n%s", memory_diagnostics.format_report(
+        memory_diagnostics.dataset_report(_memory_datasets())
+    ))
+
+
 def _run_local() -> None:
     """Lokaler Debug-Server (wird von Render **nicht** aufgerufen)."""
     port = int(os.environ.get("PORT", 8000))
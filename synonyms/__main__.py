@@ -39,6 +39,8 @@ try:
 except ImportError as e:
     raise RuntimeError("tkinter ist nicht installiert oder unter diesem Interpreter nicht verfügbar") from e
 
+import json_backend
+
 from . import generator, storage, synonyms_tk, diff_view
 from .models import SynonymCatalog, SynonymEntry
 from .synonyms_tk import open_synonym_editor
@@ -134,8 +136,7 @@ def load_merged_config() -> configparser.ConfigParser:
             config_section[key] = value
     return config
 try:
-    with LEISTUNGSKATALOG_PATH.open("r", encoding="utf-8") as f:
-        _leistungskatalog_list = json.load(f)
+    _leistungskatalog_list = json_backend.load_file(LEISTUNGSKATALOG_PATH)
     # Katalog mit dem Editor-Dialog teilen, damit Nachschlagen schnell bleibt.
     synonyms_tk.leistungskatalog_dict = {
         str(item.get("LKN")).strip(): item
@@ -14,6 +14,8 @@ import re
 from pathlib import Path
 from typing import Dict, Iterable, List
 
+import json_backend
+
 from .models import SynonymCatalog, SynonymEntry
 
 logger = logging.getLogger(__name__)
@@ -118,12 +120,12 @@ def load_synonyms(path: str | Path) -> SynonymCatalog:
         return catalog
 
     try:
-        data = json.loads(text)
+        data = json_backend.loads(text)
     except json.JSONDecodeError:
         cleaned = "".join(ch for ch in text if ch >= " " or ch in "\n\t\r")
         if not cleaned.strip():
             return catalog
-        data = json.loads(cleaned)
+        data = json_backend.loads(cleaned)
 
     if not isinstance(data, dict):
         logger.error("Unerwartetes Synonymkatalog-Format: %s", type(data).__name__)
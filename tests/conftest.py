@@ -24,3 +24,6 @@ def _add_repo_root_to_sys_path() -> None:
 
 _add_repo_root_to_sys_path()
 
+# Kein Vorkomprimieren der Datendateien beim Import von ``server`` in Tests.
+os.environ.setdefault("STATIC_WARM", "off")
+
@@ -0,0 +1,56 @@
+import server
+from benchmarks.cases import build_benchmarks, load_cases, offline_llm
+from benchmarks.harness import (
+    Benchmark,
+    Thresholds,
+    append_history,
+    compare,
+    load_history,
+    percentile,
+    run_benchmark,
+)
+
+
+def test_percentile_interpolates_like_numpy():
+    values = [1.0, 2.0, 3.0, 4.0]
+    assert percentile(values, 50) == 2.5
+    assert percentile(values, 0) == 1.0
+    assert percentile(values, 100) == 4.0
+    assert abs(percentile(values, 90) - 3.7) < 1e-9
+
+
+def test_run_benchmark_reports_percentiles_and_allocations():
+    calls = []
+
+    def work():
+        calls.append(1)
+        return [0] * 50000
+
+    result = run_benchmark(Benchmark("work", work), repeat=5, warmup=1)
+    assert result["n"] == 5
+    assert len(calls) == 1 + 5 + 1  # Aufwärmen, Messung, tracemalloc-Lauf
+    assert result["min_ms"] <= result["p50_ms"] <= result["p99_ms"] <= result["max_ms"]
+    assert result["peak_kib"] >= 350
+
+
+def test_compare_flags_only_regressions_beyond_threshold(tmp_path):
+    previous = {"results": {"a": {"p50_ms": 10.0, "peak_kib": 100.0}, "b": {"p50_ms": 10.0, "peak_kib": 100.0}}}
+    current = {"results": {"a": {"p50_ms": 14.0, "peak_kib": 100.0}, "b": {"p50_ms": 11.0, "peak_kib": 400.0}}}
+    regressions = compare(current, previous, Thresholds(time_ratio=0.25))
+    assert [(r["benchmark"], r["metric"]) for r in regressions] == [("a", "p50_ms"), ("b", "peak_kib")]
+    assert compare(current, previous, Thresholds(time_ratio=0.25, per_benchmark={"a": 0.5}))[0]["benchmark"] == "b"
+    assert compare(current, None, Thresholds()) == []
+
+    history_file = tmp_path / "history.json"
+    for i in range(3):
+        append_history(history_file, {"timestamp": str(i), "results": {}}, keep=2)
+    assert [run["timestamp"] for run in load_history(history_file)] == ["1", "2"]
+
+
+def test_real_data_benchmarks_run_offline():
+    benchmarks = {bench.name: bench for bench in build_benchmarks(server, load_cases())}
+    assert {"search_icd", "pruefe_abrechnungsfaehigkeit", "determine_applicable_pauschale", "load_data"} <= set(benchmarks)
+    with offline_llm(server):
+        result = run_benchmark(benchmarks["pruefe_abrechnungsfaehigkeit"], repeat=1, warmup=0, allocations=False)
+    assert result["n"] == 1
+    assert server.chat_completion_safe.__name__ == "chat_completion_safe"
@@ -0,0 +1,49 @@
+import server
+
+CONTEXT = {"LKN": ["C08.AA.0010"], "ICD": ["S02.6"], "Alter": 30, "Geschlecht": "m", "useIcd": True}
+
+
+def _post(client, context, headers=None):
+    return client.post(
+        "/api/pauschale-conditions-html",
+        json={"code": "C08.50A", "lang": "de", "context": context},
+        headers=headers or {},
+    )
+
+
+def test_same_context_shares_cache_entry_and_etag():
+    server.clear_render_caches()
+    client = server.app.test_client()
+    first = _post(client, CONTEXT)
+    assert first.status_code == 200
+    assert first.headers.get("ETag")
+    assert len(server._conditions_html_cache) == 1
+
+    reordered = dict(reversed(list(CONTEXT.items())))
+    second = _post(client, reordered)
+    assert second.headers["ETag"] == first.headers["ETag"]
+    assert second.get_json() == first.get_json()
+    assert len(server._conditions_html_cache) == 1
+
+
+def test_if_none_match_returns_304_until_data_reload():
+    server.clear_render_caches()
+    client = server.app.test_client()
+    etag = _post(client, CONTEXT).headers["ETag"]
+
+    revalidated = _post(client, CONTEXT, headers={"If-None-Match": etag})
+    assert revalidated.status_code == 304
+
+    server.clear_render_caches()
+    after_reload = _post(client, CONTEXT, headers={"If-None-Match": etag})
+    assert after_reload.status_code == 200
+    assert after_reload.headers["ETag"] != etag
+
+
+def test_get_with_render_token_uses_stored_context():
+    server.clear_render_caches()
+    client = server.app.test_client()
+    token = server.register_render_context(CONTEXT)
+    via_get = client.get(f"/api/pauschale-conditions-html?code=C08.50A&lang=de&render_token={token}")
+    assert via_get.status_code == 200
+    assert via_get.headers["ETag"] == _post(client, CONTEXT).headers["ETag"]
@@ -0,0 +1,47 @@
+import frontend_data
+import server
+
+
+def test_projection_keeps_only_ui_fields_in_requested_language():
+    spec = frontend_data.DATASETS["leistungskatalog"]
+    raw = [
+        {"LKN": "C08.AA.0010", "Typ": "E", "Beschreibung": "Biopsie", "Beschreibung_f": "Biopsie (fr)",
+         "MedizinischeInterpretation": "", "Grouperrelevanz": "x"},
+        {"LKN": "AA.00.0010", "Beschreibung": "Konsultation"},
+    ]
+    rows = frontend_data.project_dataset(spec, raw, "fr")
+    assert rows == [
+        ["C08.AA.0010", "Biopsie (fr)", None],
+        ["AA.00.0010", "Konsultation", None],
+    ]
+    assert frontend_data.chunk_keys(spec, rows) == ["AA", "C08"]
+    chunk = frontend_data.build_payload(spec, rows, "fr", "c08")
+    assert chunk["chunk"] == "C08"
+    assert chunk["rows"] == [rows[0]]
+
+
+def test_sectioned_source_is_flattened():
+    spec = frontend_data.DATASETS["interpretationen"]
+    raw = {
+        "Kapitelinterpretationen": [{"KNR": "C08", "Bezeichnung": "Kapitel", "Interpretation": "Text", "Nr": 1}],
+        "AllgemeineDefinitionen": [{"KNR": "GI-1", "Bezeichnung": "Def", "Interpretation_i": "Testo", "Interpretation": "Text"}],
+    }
+    assert frontend_data.project_dataset(spec, raw, "it") == [
+        ["C08", "Kapitel", "Text"],
+        ["GI-1", "Def", "Testo"],
+    ]
+
+
+def test_endpoint_serves_versioned_compact_payload():
+    client = server.app.test_client()
+    index = client.get("/api/frontend-data").get_json()["datasets"]
+    meta = index["pauschalen"]
+    assert meta["available"] is True
+    resp = client.get(f"/api/frontend-data/pauschalen?lang=it&v={meta['version']}")
+    assert resp.status_code == 200
+    assert "immutable" in resp.headers["Cache-Control"]
+    body = resp.get_json()
+    assert body["fields"] == list(frontend_data.DATASETS["pauschalen"].fields)
+    assert len(body["rows"]) == meta["rows"]
+    assert client.get("/api/frontend-data/pauschalen?chunk=ZZZ").status_code == 404
+    assert client.get("/api/frontend-data/unbekannt").status_code == 404
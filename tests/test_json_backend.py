@@ -0,0 +1,46 @@
+import codecs
+import json
+import math
+
+import pytest
+
+import json_backend
+import server
+
+BACKENDS = ["json"] + (["orjson"] if json_backend.orjson is not None else [])
+
+
+@pytest.fixture(params=BACKENDS)
+def backend(request):
+    assert json_backend.configure(request.param) == request.param
+    yield request.param
+    json_backend.configure(server.JSON_BACKEND)
+
+
+def test_round_trip_matches_stdlib(backend):
+    obj = {"LKN": "C08.AA.0010", "Text": "Gefäss – Öffnung", "Menge": 2, "TP": 12.5, "Liste": [None, True]}
+    data = json_backend.dumps_bytes(obj, sort_keys=True)
+    assert data == json.dumps(obj, ensure_ascii=False, sort_keys=True, separators=(",", ":")).encode("utf-8")
+    assert json_backend.loads(data) == obj
+    assert json_backend.loads(data.decode("utf-8")) == obj
+
+
+def test_inputs_rejected_by_orjson_fall_back_to_stdlib(backend):
+    assert math.isnan(json_backend.loads('{"x": NaN}')["x"])
+    assert json_backend.dumps({"n": 2 ** 70}) == '{"n":1180591620717411303424}'
+    with pytest.raises(json_backend.JSONDecodeError):
+        json_backend.loads("{kaputt")
+
+
+def test_load_file_ignores_bom(backend, tmp_path):
+    path = tmp_path / "bom.json"
+    path.write_bytes(codecs.BOM_UTF8 + '{"a": "ä"}'.encode("utf-8"))
+    assert json_backend.load_file(path) == {"a": "ä"}
+
+
+def test_flask_provider_serves_same_json():
+    client = server.app.test_client()
+    resp = client.get('/api/version')
+    assert resp.status_code == 200
+    assert resp.get_json() == json.loads(resp.get_data(as_text=True))
+    assert server.app.json.loads(b'{"a": [1, 2]}') == {"a": [1, 2]}
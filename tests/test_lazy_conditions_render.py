@@ -0,0 +1,26 @@
+import server
+
+
+def test_render_token_is_stable_and_ignores_internal_keys():
+    server.clear_render_caches()
+    token_a = server.register_render_context({"LKN": ["C08.AA.0010"], "Alter": 30, "__cache": object()})
+    token_b = server.register_render_context({"Alter": 30, "LKN": ["C08.AA.0010"]})
+    assert token_a == token_b
+    assert server.resolve_render_context(token_a) == {"Alter": 30, "LKN": ["C08.AA.0010"]}
+    assert server.resolve_render_context("unbekannt") is None
+
+
+def test_render_context_store_is_bounded():
+    server.clear_render_caches()
+    tokens = [server.register_render_context({"n": i}) for i in range(server.RENDER_CONTEXT_CACHE_SIZE + 1)]
+    assert server.resolve_render_context(tokens[0]) is None
+    assert server.resolve_render_context(tokens[-1]) == {"n": server.RENDER_CONTEXT_CACHE_SIZE}
+
+
+def test_conditions_html_with_unknown_token_is_gone():
+    client = server.app.test_client()
+    resp = client.post(
+        "/api/pauschale-conditions-html",
+        json={"code": "C08.50A", "lang": "de", "render_token": "abgelaufen"},
+    )
+    assert resp.status_code == 410
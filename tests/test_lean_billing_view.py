@@ -0,0 +1,99 @@
+import json
+
+import server
+
+
+def _full_payload():
+    evaluated = [
+        {"code": "C08.50A", "is_valid_structured": True, "bedingungs_pruef_html": "<div>gross</div>",
+         "conditions_structured": [{"group": 1}], "details": {"Pauschale": "C08.50A"}},
+    ]
+    return {
+        "llm_ergebnis_stufe1": {"identified_leistungen": []},
+        "regel_ergebnisse_details": [],
+        "abrechnung": {"type": "Pauschale", "details": {"Pauschale": "C08.50A"},
+                       "bedingungs_pruef_html": "<div>gross</div>", "evaluated_pauschalen": evaluated},
+        "llm_ergebnis_stufe2": {"mapping_results": [{"tardoc_lkn": "AA.00.0010"}]},
+        "evaluated_pauschalen": evaluated,
+        "token_usage": {"llm_stage1": {"input_tokens": 1, "output_tokens": 2}},
+        "fallback_pauschale_search": False,
+        "pauschale_context": {"LKN": ["C08.AA.0010"]},
+        "render_token": "abc",
+    }
+
+
+def test_lean_payload_drops_duplicates_html_and_context():
+    full = _full_payload()
+    lean = server._build_lean_billing_payload(full, "tok")
+    assert lean["view"] == "lean"
+    assert "evaluated_pauschalen" not in lean["abrechnung"]
+    assert "bedingungs_pruef_html" not in lean["abrechnung"]
+    assert lean["evaluated_pauschalen"] == [
+        {"code": "C08.50A", "is_valid_structured": True, "details": {"Pauschale": "C08.50A"}}
+    ]
+    assert "pauschale_context" not in lean
+    assert lean["llm_ergebnis_stufe2"] == {"mapping_results": [], "deferred": 1}
+    assert lean["diagnostics"]["evaluated_count"] == 1
+    assert lean["details_token"] == "tok" and lean["render_token"] == "abc"
+    # Die vollständige Antwort bleibt unverändert
+    assert "evaluated_pauschalen" in full["abrechnung"]
+
+
+def test_details_endpoint_returns_requested_sections():
+    client = server.app.test_client()
+    token = server.register_billing_details(_full_payload())
+    resp = client.get(f"/api/analyze-billing/details/{token}?section=pauschale_context")
+    assert resp.status_code == 200
+    assert resp.get_json() == {"pauschale_context": {"LKN": ["C08.AA.0010"]}}
+    assert client.get(f"/api/analyze-billing/details/{token}?section=unbekannt").status_code == 400
+    assert client.get("/api/analyze-billing/details/abgelaufen").status_code == 410
+    # Gemerkt werden nur die zurückgehaltenen Abschnitte, nicht die ganze Antwort
+    assert set(server.resolve_billing_details(token)) == {"pauschale_context", "llm_ergebnis_stufe2"}
+
+
+def test_lazy_payload_moves_context_behind_details_token():
+    full = _full_payload()
+    lazy = server._defer_pauschale_context(full)
+    assert "pauschale_context" not in lazy
+    assert lazy["render_token"] == "abc"
+    assert lazy["llm_ergebnis_stufe2"] == full["llm_ergebnis_stufe2"]
+    assert server.resolve_billing_details(lazy["details_token"]) == {
+        "pauschale_context": {"LKN": ["C08.AA.0010"]}
+    }
+    assert "pauschale_context" in full
+
+
+def test_feedback_with_lean_view_resolves_stage2_mapping(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv("GITHUB_TOKEN", raising=False)
+    full = _full_payload()
+    lean = server._build_lean_billing_payload(full, server.register_billing_details(full))
+    client = server.app.test_client()
+    resp = client.post("/api/submit-feedback", json={
+        "message": "falsche LKN",
+        "begruendung_llm2": json.dumps(lean["llm_ergebnis_stufe2"]),
+        "details_token": lean["details_token"],
+    })
+    assert resp.status_code == 200
+    (entry,) = json.loads((tmp_path / "feedback_local.json").read_text(encoding="utf-8"))
+    assert json.loads(entry["begruendung_llm2"]) == full["llm_ergebnis_stufe2"]
+    # Abgelaufenes Token: der Platzhalter bleibt erhalten
+    resp = client.post("/api/submit-feedback", json={
+        "begruendung_llm2": json.dumps(lean["llm_ergebnis_stufe2"]), "details_token": "abgelaufen",
+    })
+    assert resp.status_code == 200
+    entry = json.loads((tmp_path / "feedback_local.json").read_text(encoding="utf-8"))[-1]
+    assert json.loads(entry["begruendung_llm2"]) == {"mapping_results": [], "deferred": 1}
+
+
+def test_analyze_billing_lean_view_is_smaller():
+    client = server.app.test_client()
+    body = {"inputText": "C08.AA.0010 Reposition Unterkiefer", "icd": ["S02.6"], "useIcd": True,
+            "age": 30, "gender": "M", "lang": "de"}
+    full = client.post("/api/analyze-billing", json=body)
+    lean = client.post("/api/analyze-billing?view=lean", json=body)
+    assert lean.status_code == 200
+    data = lean.get_json()
+    assert data["view"] == "lean"
+    assert data["abrechnung"]["type"] == full.get_json()["abrechnung"]["type"]
+    assert len(lean.data) < len(full.data)
@@ -0,0 +1,54 @@
+from regelpruefer_pauschale import build_lkn_candidate_index
+
+
+def _indices():
+    pauschale_lp_index = {"C08.50A": {"C08.AA.0010"}}
+    pauschale_cond_lkn_index = {"C08.50B": {"C08.AA.0010"}}
+    pauschale_cond_table_index = {"C08.50C": {"cap08"}, "C99.10A": {"or"}, "X00.00A": {"or"}}
+    lkn_to_tables_index = {"C08.AA.0010": ["CAP08", "OR"], "ZZ.00.0001": ["or"]}
+    pauschalen_dict = {code: {} for code in ("C08.50A", "C08.50B", "C08.50C", "C99.10A")}
+    return (
+        pauschale_lp_index,
+        pauschale_cond_lkn_index,
+        pauschale_cond_table_index,
+        lkn_to_tables_index,
+        pauschalen_dict,
+    )
+
+
+def test_split_index_separates_precise_and_broad_candidates():
+    lp, cond_lkn, cond_table, lkn_tables, pauschalen = _indices()
+    index = build_lkn_candidate_index(
+        lp,
+        cond_lkn,
+        cond_table,
+        lkn_tables,
+        pauschale_cond_table_index_precise={"C08.50C": {"cap08"}},
+        pauschale_cond_table_index_broad={"C99.10A": {"or"}, "X00.00A": {"or"}},
+        lkn_to_tables_index_precise={"C08.AA.0010": ["cap08"]},
+        lkn_to_tables_index_broad={"C08.AA.0010": ["or"], "ZZ.00.0001": ["or"]},
+        pauschalen_dict=pauschalen,
+    )
+    entry = index["C08.AA.0010"]
+    assert entry.precise == {"C08.50A", "C08.50B", "C08.50C"}
+    assert entry.broad == {"C99.10A"}
+    assert entry.linked == {"C08.50A", "C08.50B", "C08.50C", "C99.10A"}
+    assert index["ZZ.00.0001"].precise == frozenset()
+    assert index["ZZ.00.0001"].broad is entry.broad
+
+
+def test_unsplit_tables_count_as_precise_and_keep_provenance():
+    lp, cond_lkn, cond_table, lkn_tables, pauschalen = _indices()
+    index = build_lkn_candidate_index(lp, cond_lkn, cond_table, lkn_tables, lkn_codes=["c08.aa.0010"])
+    assert set(index) == {"C08.AA.0010"}
+    entry = index["C08.AA.0010"]
+    assert entry.precise == {"C08.50A", "C08.50B", "C08.50C", "C99.10A", "X00.00A"}
+    sources = sorted(
+        (pc, rec["source"], rec["table"] or "")
+        for pc, rec in entry.sources_for("C08.AA.0010", {"C08.50B", "C08.50C", "C99.10A"})
+    )
+    assert sources == [
+        ("C08.50B", "direct", ""),
+        ("C08.50C", "table", "cap08"),
+        ("C99.10A", "table", "or"),
+    ]
@@ -0,0 +1,74 @@
+import pytest
+
+import llm_cassette
+import openai_wrapper
+import server
+from mock_llm import MockSettings, start_in_thread
+
+CONTEXT = "\n".join([
+    "LKN: AA.00.0010, Typ: E, Beschreibung: Konsultation, erste 5 Min.",
+    "LKN: C08.GD.0030, Typ: P, Beschreibung: Reposition Luxation Kiefergelenk geschlossen",
+])
+
+
+@pytest.fixture(autouse=True)
+def _cassette_off():
+    yield
+    llm_cassette.configure(llm_cassette.MODE_OFF)
+
+
+def test_key_ignores_whitespace_and_roundtrips_gzip(tmp_path):
+    assert llm_cassette.interaction_key("gemini", "m", "a  b\n\n c ") == llm_cassette.interaction_key("gemini", "m", "a b\nc")
+    assert llm_cassette.interaction_key("gemini", "m", "a") != llm_cassette.interaction_key("gemini", "other", "a")
+
+    path = tmp_path / "cassette.json.gz"
+    cassette = llm_cassette.Cassette(path)
+    with llm_cassette.scope("1/de"):
+        cassette.record("gemini", "m", "Prompt", {"candidates": []})
+    cassette.save()
+    loaded = llm_cassette.Cassette.load(path)
+    assert len(loaded) == 1
+    assert loaded.by_position == {"1/de|gemini/m|unknown#1": llm_cassette.interaction_key("gemini", "m", "Prompt")}
+    assert loaded.lookup("gemini", "m", "Prompt") == {"candidates": []}
+
+
+def test_drift_is_reported_and_policy_applies(tmp_path):
+    cassette = llm_cassette.Cassette(tmp_path / "c.json")
+    with llm_cassette.scope("3/fr"):
+        cassette.record("openai", "gpt", "Zeile 1\nZeile 2", {"choices": []})
+    with llm_cassette.scope("3/fr"):
+        assert cassette.lookup("openai", "gpt", "Zeile 1\nZeile 2 neu") == {"choices": []}
+    drift = cassette.report()["drift"][0]
+    assert drift["position"] == "3/fr|openai/gpt|unknown#1"
+    assert drift["diff"] == ["@@ -2 +2 @@", "-Zeile 2", "+Zeile 2 neu"]
+    with llm_cassette.scope("3/fr"), pytest.raises(llm_cassette.CassetteMiss):
+        cassette.lookup("openai", "gpt", "anders", on_drift="error")
+    with pytest.raises(llm_cassette.CassetteMiss):
+        cassette.lookup("openai", "gpt", "ohne Scope")
+    assert cassette.report()["misses"] == 1
+
+
+def test_record_then_replay_without_network(tmp_path, monkeypatch):
+    monkeypatch.setattr(openai_wrapper, "_read_llm_min_interval", lambda: 0.0)
+    path = tmp_path / "baseline.json.gz"
+    instance = start_in_thread(MockSettings(port=0))
+    try:
+        monkeypatch.setenv("GEMINI_BASE_URL", f"{instance.base_url}/v1beta")
+        monkeypatch.setenv("GEMINI_API_KEY", "mock-key")
+        llm_cassette.configure(llm_cassette.MODE_RECORD, path)
+        with llm_cassette.scope("7/de"):
+            recorded, recorded_tokens = server.call_gemini_stage1("Konsultation 10 Minuten", CONTEXT, "gemini-mock", "de")
+        llm_cassette.flush()
+    finally:
+        instance.shutdown()
+        instance.server_close()
+    assert path.is_file()
+
+    # Mock gestoppt, kein API-Key: die Antwort kommt allein aus der Cassette
+    monkeypatch.delenv("GEMINI_API_KEY")
+    llm_cassette.configure(llm_cassette.MODE_REPLAY, path)
+    with llm_cassette.scope("7/de"):
+        replayed, replayed_tokens = server.call_gemini_stage1("Konsultation 10 Minuten", CONTEXT, "gemini-mock", "de")
+    assert replayed["identified_leistungen"] == recorded["identified_leistungen"]
+    assert replayed_tokens == recorded_tokens
+    assert llm_cassette.report()["hits"] == 1
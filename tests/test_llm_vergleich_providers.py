@@ -17,3 +17,93 @@ def test_load_server_sets_stage_specific_env(monkeypatch):
     assert os.environ['STAGE2_LLM_PROVIDER'] == 'prov2'
     assert os.environ['STAGE2_LLM_MODEL'] == 'model2'
     assert srv is reloaded
+
+
+def _fake_server():
+    from flask import Flask, jsonify, request
+
+    app = Flask(__name__)
+    calls = []
+
+    @app.route('/api/test-example', methods=['POST'])
+    def test_example():
+        data = request.get_json()
+        calls.append((str(data['id']), data['lang']))
+        return jsonify({
+            'passed': data['lang'] != 'it',
+            'diff': 'missing X' if data['lang'] == 'it' else '',
+            'result': {},
+            'token_usage': {'llm_stage1': {'input_tokens': 1000, 'output_tokens': 100}},
+        })
+
+    return types.SimpleNamespace(app=app), calls
+
+
+def test_worker_resumes_and_summary_uses_structured_results(monkeypatch, tmp_path):
+    srv, calls = _fake_server()
+    monkeypatch.setattr(llm_vergleich, 'load_server', lambda *args: srv)
+    entry = {'Provider': 'gemini', 'Model': 'm', 'Price_Input_CHF': 1.0, 'Price_Output_CHF': 10.0}
+    examples = [('1', 'de'), ('1', 'it'), ('2', 'de')]
+    path = tmp_path / 'gemini_m.jsonl'
+    path.write_text('{"id": "1", "lang": "de", "passed": true, "duration_ms": 10.0, "tokens": {}}\n{"id": "2", "la', encoding='utf-8')
+
+    llm_vergleich._run_model_worker(entry, examples, str(path))
+    assert calls == [('1', 'it'), ('2', 'de')]
+    records = llm_vergleich.read_records(path)
+    llm_vergleich.summarize_model(entry, records, len(examples))
+    assert (entry['Passed'], entry['Prozent_Korrekt']) == (2, 66.67)
+    assert entry['Bemerkungen'] == [{'id': '1', 'lang': 'it', 'error': 'missing X'}]
+    assert (entry['InputTokens'], entry['OutputTokens']) == (2000, 200)
+    assert entry['InputToken_CHF'] == 0.002 and entry['OutputToken_CHF'] == 0.002
+
+
+def test_pareto_front_marks_non_dominated_models():
+    done = {'Total_Tests': 3, 'Progress_Index': 3}
+    models = [
+        {'Provider': 'a', 'Model': 'best', 'Prozent_Korrekt': 98.0, 'InputToken_CHF': 0.05, 'Latency_p50_Seconds': 9.0, **done},
+        {'Provider': 'b', 'Model': 'cheap', 'Prozent_Korrekt': 90.0, 'InputToken_CHF': 0.001, 'Latency_p50_Seconds': 4.0, **done},
+        {'Provider': 'c', 'Model': 'worse', 'Prozent_Korrekt': 89.0, 'InputToken_CHF': 0.002, 'Latency_p50_Seconds': 5.0, **done},
+    ]
+    assert llm_vergleich.pareto_front(models) == [True, True, False]
+    table = llm_vergleich.format_pareto_table(models)
+    assert [line.endswith('*') for line in table.splitlines()[1:]] == [True, True, False]
+
+
+def test_incomplete_run_drops_stale_accuracy_and_stays_off_pareto_front():
+    entry = {'Provider': 'd', 'Model': 'aborted', 'Prozent_Korrekt': 99.0, 'InputToken_CHF': 0.5, 'OutputToken_CHF': 0.5}
+    llm_vergleich.summarize_model(entry, [{'id': '1', 'lang': 'de', 'passed': True, 'duration_ms': 1.0}], 3)
+    assert not llm_vergleich.is_complete(entry)
+    assert 'Prozent_Korrekt' not in entry and 'InputToken_CHF' not in entry
+    complete = {'Provider': 'a', 'Model': 'ok', 'Prozent_Korrekt': 50.0, 'InputToken_CHF': 0.05,
+                'Latency_p50_Seconds': 9.0, 'Total_Tests': 3, 'Progress_Index': 3}
+    # ohne Ergebnisse hätte das abgebrochene Modell Kosten 0 und würde alles dominieren
+    assert llm_vergleich.pareto_front([complete, entry]) == [True, False]
+    assert 'unvollständig (1/3)' in llm_vergleich.format_pareto_table([complete, entry])
+
+
+def test_only_updates_selected_models_and_keeps_full_matrix(monkeypatch, tmp_path):
+    from concurrent.futures import ThreadPoolExecutor
+
+    srv, calls = _fake_server()
+    monkeypatch.setattr(llm_vergleich, 'load_server', lambda *args: srv)
+    # Threads statt Prozesse, damit die Monkeypatches im "Worker" gelten
+    monkeypatch.setattr(llm_vergleich, 'ProcessPoolExecutor',
+                        lambda max_workers, **_: ThreadPoolExecutor(max_workers=max_workers))
+    baseline = tmp_path / 'baseline.json'
+    baseline.write_text('{"1": {"query": {"de": "x"}}}', encoding='utf-8')
+    monkeypatch.setattr(llm_vergleich, 'BASELINE_PATH', baseline)
+    monkeypatch.setattr(llm_vergleich, 'MODELS_FILE', tmp_path / 'models.json')
+    other = {'Provider': 'openai', 'Model': 'alt', 'Prozent_Korrekt': 80.0, 'Total_Tests': 1, 'Progress_Index': 1}
+    chosen = {'Provider': 'gemini', 'Model': 'neu'}
+    llm_vergleich.save_models([other, chosen])
+
+    models = llm_vergleich.load_models()
+    selected = llm_vergleich.run_comparison(
+        models, llm_vergleich.QCStatus(gui=False), only=['gemini/neu'], results_dir=tmp_path / 'res'
+    )
+    assert [llm_vergleich.model_label(m) for m in selected] == ['gemini/neu']
+    assert calls == [('1', 'de')]
+    saved = llm_vergleich.load_models()
+    assert [llm_vergleich.model_label(m) for m in saved] == ['openai/alt', 'gemini/neu']
+    assert saved[0]['Prozent_Korrekt'] == 80.0
+    assert saved[1]['Prozent_Korrekt'] == 100.0
@@ -0,0 +1,132 @@
+import random
+import threading
+
+from flask import Flask, jsonify, request
+from werkzeug.serving import make_server
+
+import loadtest
+from loadtest.runner import format_stage_table
+
+METRICS_BEFORE = """# TYPE arzttarif_http_requests_total counter
+arzttarif_http_requests_total{method="POST",route="/api/analyze-billing",status="200"} 3
+# TYPE arzttarif_stage_duration_seconds histogram
+arzttarif_stage_duration_seconds_sum{stage="llm_stage1"} 1.5
+arzttarif_stage_duration_seconds_count{stage="llm_stage1"} 3
+"""
+METRICS_AFTER = """# TYPE arzttarif_http_requests_total counter
+arzttarif_http_requests_total{method="POST",route="/api/analyze-billing",status="200"} 7
+arzttarif_http_requests_total{method="GET",route="/api/icd",status="200"} 10
+# TYPE arzttarif_stage_duration_seconds histogram
+arzttarif_stage_duration_seconds_sum{stage="llm_stage1"} 3.5
+arzttarif_stage_duration_seconds_count{stage="llm_stage1"} 7
+# TYPE arzttarif_llm_requests_total counter
+arzttarif_llm_requests_total{outcome="ok",provider="gemini"} 4
+# TYPE arzttarif_cache_entries gauge
+arzttarif_cache_entries{cache="render_contexts"} 5
+"""
+
+
+def _fake_server(expire_tokens=False):
+    app = Flask(__name__)
+    seen = {"conditions_tokens": 0}
+
+    @app.route("/api/analyze-billing", methods=["POST"])
+    def analyze():
+        data = request.get_json()
+        assert data["view"] == "lean" and data["inputText"]
+        resp = jsonify({"render_token": "tok", "evaluated_pauschalen": [{"code": "C05.10A"}]})
+        resp.headers["Server-Timing"] = "llm_stage1;dur=4.0, total;dur=6.0"
+        return resp
+
+    @app.route("/api/icd")
+    @app.route("/api/chop")
+    def search():
+        return jsonify([]) if len(request.args["q"]) >= 3 else ("", 400)
+
+    @app.route("/api/pauschale-conditions-html", methods=["GET", "POST"])
+    def conditions():
+        if request.method == "GET" and request.args.get("render_token") == "tok":
+            seen["conditions_tokens"] += 1
+            if expire_tokens:  # wie ein anderer gunicorn-Worker ohne den Render-Kontext
+                return jsonify({"error": "render token expired"}), 410
+        return jsonify({"html": "<div></div>"})
+
+    @app.route("/", defaults={"path": ""})
+    @app.route("/<path:path>")
+    def static_files(path):
+        resp = app.response_class("x")
+        resp.set_etag("v1")
+        return resp.make_conditional(request)
+
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, seen
+
+
+def test_profile_mixes_kinds_and_varies_queries():
+    profile = loadtest.TrafficProfile.from_data(mix=loadtest.parse_mix("analyze:1,icd:1,static:1"), variation=1.0)
+    rng = random.Random(1)
+    kinds = {profile.next_request(rng).kind for _ in range(60)}
+    assert kinds == {"analyze", "icd", "static"}
+    assert {lang for _, lang in profile.queries} == {"de", "fr", "it"}
+    text = "Konsultation 10 Minuten, Untersuchung 5 Minuten, Beratung 15 Minuten"
+    variants = {loadtest.vary_query(text, random.Random(seed)) for seed in range(10)}
+    assert len(variants) > 3
+
+
+def test_stage_against_fake_server_reports_latency_and_harvests_tokens():
+    server, seen = _fake_server()
+    try:
+        base_url = f"http://127.0.0.1:{server.server_port}"
+        profile = loadtest.TrafficProfile.from_data(mix=loadtest.parse_mix("analyze:1,conditions:1,icd:1,static:1"))
+        stage = loadtest.Stage(rate=60.0, duration=1.0)
+        samples, wall, max_inflight = loadtest.run_stage(base_url, profile, stage, concurrency=8, seed=3)
+    finally:
+        server.shutdown()
+    summary = loadtest.summarize_stage(stage, samples, wall, max_inflight=max_inflight)
+    assert summary["completed"] == len(samples) > 20
+    assert summary["errors"] == 0
+    assert summary["latency_ms"]["p99"] >= summary["latency_ms"]["p50"] > 0
+    assert summary["per_kind"]["analyze"]["server_timing_ms"]["llm_stage1"] == 4.0
+    assert seen["conditions_tokens"] > 0
+    assert "304" in summary["status"]
+
+
+def test_render_tokens_from_other_workers_are_not_errors():
+    server, seen = _fake_server(expire_tokens=True)
+    try:
+        base_url = f"http://127.0.0.1:{server.server_port}"
+        profile = loadtest.TrafficProfile.from_data(mix=loadtest.parse_mix("analyze:1,conditions:2"))
+        stage = loadtest.Stage(rate=60.0, duration=1.0)
+        samples, wall, max_inflight = loadtest.run_stage(base_url, profile, stage, concurrency=8, seed=5)
+    finally:
+        server.shutdown()
+    summary = loadtest.summarize_stage(stage, samples, wall, max_inflight=max_inflight)
+    assert summary["expired"] == summary["per_kind"]["conditions"]["expired"] == seen["conditions_tokens"] > 0
+    assert summary["errors"] == 0 and summary["error_rate"] == 0.0
+    assert "410" in summary["status"]
+
+
+def test_server_delta_and_saturation():
+    delta = loadtest.server_delta(METRICS_BEFORE, METRICS_AFTER)
+    assert delta["http_requests"] == {"/api/analyze-billing": 4, "/api/icd": 10}
+    assert delta["stage_mean_ms"] == {"llm_stage1": 500.0}
+    assert delta["llm_requests"] == {"gemini/ok": 4}
+    assert delta["gauges"] == {"cache_entries{cache=render_contexts}": 5.0}
+
+    def _stage(rate, throughput, analyze_p95, analyze_count=10):
+        latency = {"p50": analyze_p95 / 2, "p95": analyze_p95, "p99": analyze_p95}
+        return {"offered_rps": rate, "arrival_rps": rate, "throughput_rps": throughput, "error_rate": 0.0,
+                "latency_ms": latency, "concurrency_mean": throughput * analyze_p95 / 2000,
+                "per_kind": {"analyze": {"count": analyze_count, "latency_ms": latency}}}
+
+    stages = [_stage(1, 1.0, 200, analyze_count=2), _stage(2, 2.0, 250), _stage(4, 3.1, 900)]
+    saturation = loadtest.find_saturation(stages)
+    assert saturation["saturated_at_rps"] == 4 and saturation["reason"] == "Durchsatz"
+    assert saturation["capacity_rps"] == 2.0
+    assert "Sättigung ab 4" in format_stage_table(stages, saturation)
+    assert loadtest.find_saturation(stages[:2])["saturated_at_rps"] is None
+
+    # zu wenige Analyse-Messungen in Stufe 1: Vergleich startet bei Stufe 2
+    slow = [_stage(1, 1.0, 100, analyze_count=2), _stage(2, 2.0, 250), _stage(4, 4.0, 800)]
+    assert loadtest.find_saturation(slow)["reason"] == "p95 analyze"
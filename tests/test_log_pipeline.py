@@ -0,0 +1,85 @@
+import logging
+import threading
+import time
+
+import server
+from log_pipeline import DroppingQueueHandler, LazyJSON, LogPipeline
+
+
+class _BlockingHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.gate = threading.Event()
+        self.messages = []
+
+    def emit(self, record):
+        self.gate.wait(5)
+        self.messages.append(self.format(record))
+
+
+def _isolated_logger(name):
+    target = logging.getLogger(name)
+    target.handlers[:] = []
+    target.propagate = False
+    target.setLevel(logging.INFO)
+    return target
+
+
+def test_stalled_writer_never_blocks_callers_and_counts_drops():
+    target = _isolated_logger("test.log_pipeline.stall")
+    sink = _BlockingHandler()
+    target.addHandler(sink)
+    pipeline = LogPipeline(maxsize=2)
+    pipeline.attach(target)
+    pipeline.start()
+    try:
+        start = time.perf_counter()
+        for i in range(20):
+            target.info("eintrag %d", i)
+        assert time.perf_counter() - start < 1.0
+        assert pipeline.stats()["dropped"] > 0
+        sink.gate.set()
+        assert pipeline.flush()
+        target.warning("danach")
+        assert pipeline.flush()
+    finally:
+        sink.gate.set()
+        pipeline.stop()
+    assert any("Logeinträge verworfen" in msg for msg in sink.messages)
+    assert sink.messages[-1] == "danach"
+
+
+def test_lazy_json_is_only_formatted_for_enabled_levels():
+    rendered = []
+
+    class _Counted:
+        def __str__(self):
+            rendered.append(1)
+            return "x"
+
+    target = _isolated_logger("test.log_pipeline.lazy")
+    target.setLevel(logging.WARNING)
+    sink = _BlockingHandler()
+    sink.gate.set()
+    target.addHandler(sink)
+    pipeline = LogPipeline()
+    pipeline.attach(target)
+    pipeline.start()
+    try:
+        target.info("payload %s", LazyJSON({"a": _Counted()}))
+        assert rendered == []
+        target.warning("payload %s", LazyJSON({"a": [1, _Counted()]}, indent=False))
+        assert pipeline.flush()
+    finally:
+        pipeline.stop()
+    assert rendered == [1]
+    assert sink.messages == ['payload {"a":[1,"x"]}']
+
+
+def test_server_loggers_write_through_queue():
+    if not server.LOG_QUEUE_ENABLED:
+        return
+    for name in (None, "detail", "werkzeug"):
+        handlers = logging.getLogger(name).handlers
+        assert any(isinstance(h, DroppingQueueHandler) for h in handlers)
+    assert server.log_pipeline.stats()["running"] is True
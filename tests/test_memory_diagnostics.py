@@ -0,0 +1,85 @@
+import os
+import sys
+
+import pytest
+
+import memory_diagnostics
+import profiling
+import server
+
+
+@pytest.fixture
+def admin(monkeypatch):
+    monkeypatch.setattr(server, "PROFILING_ADMIN_TOKEN", "geheim")
+    profiling.configure(admin_token="geheim")
+    yield {"X-Profile-Token": "geheim"}
+    memory_diagnostics.stop_tracing()
+    profiling.configure(
+        server.PROFILING_ENABLED,
+        sample_every=server.PROFILING_SAMPLE_EVERY,
+        mode=server.PROFILING_MODE,
+        directory=server.PROFILING_DIRECTORY,
+        interval_ms=server.PROFILING_SAMPLER_INTERVAL_MS,
+        max_files=server.PROFILING_MAX_FILES,
+        admin_token=os.getenv('PROFILING_ADMIN_TOKEN', ''),
+    )
+
+
+class _Slotted:
+    __slots__ = ("payload",)
+
+    def __init__(self, payload):
+        self.payload = payload
+
+
+def test_shared_references_are_counted_once():
+    rows = [{"LKN": f"AA.00.{i:04d}", "Beschreibung": "x" * 200} for i in range(50)]
+    by_code = {row["LKN"]: row for row in rows}
+    slotted_obj = _Slotted(rows)
+    report = memory_diagnostics.dataset_report({"data": rows, "dict": by_code, "slotted": slotted_obj})
+    data, lookup, slotted = report["datasets"]
+    assert data["shared_bytes"] == 0 and data["items"] == 50
+    # Dict und Slot-Objekt teilen alles ausser ihrem eigenen Container mit der Liste
+    assert lookup["shared_bytes"] == data["bytes"] - sys.getsizeof(rows)
+    assert lookup["unique_bytes"] == sys.getsizeof(by_code)
+    assert slotted["unique_bytes"] == sys.getsizeof(slotted_obj)
+    assert report["total_bytes"] == sum(entry["unique_bytes"] for entry in report["datasets"])
+    assert "data" in memory_diagnostics.format_report(report)
+
+
+def test_memory_endpoint_covers_loaded_datasets(admin):
+    client = server.app.test_client()
+    assert client.get('/api/diagnostics/memory').status_code == 403
+    report = client.get('/api/diagnostics/memory', headers=admin).get_json()
+    sizes = {entry["name"]: entry for entry in report["datasets"]}
+    assert sizes["leistungskatalog_data"]["bytes"] > 0
+    # Das Dict verweist auf dieselben Katalogeinträge wie die Liste
+    assert sizes["leistungskatalog_dict"]["shared_bytes"] > sizes["leistungskatalog_dict"]["unique_bytes"]
+    assert {"synonym_catalog.index", "prepared_structures", "tabellen_dict_by_table", "faiss_index"} <= set(sizes)
+
+
+def test_tracemalloc_snapshot_diff_finds_growth(admin):
+    client = server.app.test_client()
+    assert client.post('/api/diagnostics/tracemalloc').status_code == 403
+    first = client.post('/api/diagnostics/tracemalloc', json={"label": "vorher"}, headers=admin).get_json()
+    assert first["tracing_started"] and first["label"] == "vorher"
+    leak = [bytearray(64 * 1024) for _ in range(8)]
+    diff = client.get(f'/api/diagnostics/tracemalloc/diff?base={first["id"]}&limit=5', headers=admin).get_json()
+    assert diff["size_diff"] >= 8 * 64 * 1024
+    assert any(entry["location"].startswith(__file__) for entry in diff["top"])
+    assert client.get('/api/diagnostics/tracemalloc/diff?base=s0', headers=admin).status_code == 404
+    assert client.get(f'/api/diagnostics/tracemalloc/diff?base={first["id"]}&group=x', headers=admin).status_code == 400
+
+    status = client.delete('/api/diagnostics/tracemalloc', headers=admin).get_json()
+    assert status["tracing"] is False and status["snapshots"] == []
+    del leak
+
+
+def test_diagnostics_routes_are_locked_without_token(monkeypatch):
+    monkeypatch.setattr(server, "PROFILING_ADMIN_TOKEN", "")
+    client = server.app.test_client()
+    # auch lokale Aufrufe (z.B. über einen Reverse Proxy auf demselben Host)
+    local = {"REMOTE_ADDR": "127.0.0.1"}
+    assert client.post('/api/diagnostics/tracemalloc', environ_base=local).status_code == 403
+    assert client.get('/api/diagnostics/memory', environ_base=local).status_code == 403
+    assert not memory_diagnostics.tracing_status()["tracing"]
@@ -0,0 +1,44 @@
+import metrics
+import server
+
+
+def test_span_feeds_histogram_and_request_timings():
+    metrics.reset()
+    with metrics.request_timings() as timings:
+        with metrics.span("rule_check"):
+            pass
+        with metrics.span("rule_check"):
+            pass
+    assert set(timings) == {"rule_check"}
+    hist = metrics.snapshot()["histograms"][metrics.STAGE_METRIC]
+    assert hist[(("stage", "rule_check"),)]["count"] == 2
+    assert metrics.current_request_timings() == {}
+
+
+def test_render_uses_prometheus_text_format():
+    metrics.reset()
+    metrics.inc("llm_tokens_total", 120, stage="llm_stage1", direction="input")
+    metrics.observe("llm_throttle_wait_seconds", 0.02)
+    text = metrics.render()
+    assert "# TYPE arzttarif_llm_tokens_total counter" in text
+    assert 'arzttarif_llm_tokens_total{direction="input",stage="llm_stage1"} 120' in text
+    assert 'arzttarif_llm_throttle_wait_seconds_bucket{le="0.025"} 1' in text
+    assert 'arzttarif_llm_throttle_wait_seconds_bucket{le="0.01"} 0' in text
+    assert 'arzttarif_llm_throttle_wait_seconds_bucket{le="+Inf"} 1' in text
+    assert "arzttarif_llm_throttle_wait_seconds_count 1" in text
+
+
+def test_metrics_endpoint_counts_requests_and_sets_server_timing():
+    metrics.reset()
+    client = server.app.test_client()
+    resp = client.get('/api/version')
+    assert resp.status_code == 200
+    if server.METRICS_SERVER_TIMING:
+        assert "total;dur=" in resp.headers["Server-Timing"]
+    resp = client.get('/metrics')
+    assert resp.status_code == 200
+    assert resp.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+    body = resp.get_data(as_text=True)
+    assert 'arzttarif_http_requests_total{method="GET",route="/api/version",status="200"} 1' in body
+    assert 'arzttarif_cache_entries{cache="conditions_html"}' in body
+    assert "arzttarif_data_loaded 1" in body
@@ -0,0 +1,83 @@
+import json
+import urllib.request
+
+import pytest
+
+import openai_wrapper
+import server
+from mock_llm import CannedResponses, MockSettings, detect_stage, parse_latency, respond, start_in_thread
+from prompts import get_stage1_prompt, get_stage2_ranking_prompt
+
+CONTEXT = "\n".join([
+    "LKN: AA.00.0010, Typ: E, Beschreibung: Konsultation, erste 5 Min.",
+    "LKN: C08.GD.0030, Typ: P, Beschreibung: Reposition Luxation Kiefergelenk geschlossen",
+    "LKN: KF.05.0050, Typ: E, Beschreibung: Rheumatologische Untersuchung",
+])
+
+
+@pytest.fixture
+def mock_server(monkeypatch):
+    started = []
+
+    def _start(**overrides):
+        settings = MockSettings(port=0, **overrides)
+        instance = start_in_thread(settings)
+        started.append(instance)
+        monkeypatch.setenv("GEMINI_BASE_URL", f"{instance.base_url}/v1beta")
+        monkeypatch.setenv("GEMINI_API_KEY", "mock-key")
+        monkeypatch.setattr(openai_wrapper, "_read_llm_min_interval", lambda: 0.0)
+        return instance
+
+    yield _start
+    for instance in started:
+        instance.shutdown()
+        instance.server_close()
+
+
+def test_responses_are_derived_from_prompt_context():
+    prompt = get_stage1_prompt("Geschlossene Reposition einer Luxation des Kiefergelenks", CONTEXT, "de")
+    stage, text = respond(prompt, stage1_max_lkns=1)
+    assert stage == "stage1"
+    assert json.loads(text)["identified_leistungen"][0]["lkn"] == "C08.GD.0030"
+    assert respond(prompt) == respond(prompt)
+
+    ranking = get_stage2_ranking_prompt("Blinddarmentfernung", "C06.00A: Appendektomie Blinddarmentfernung\nC08.50E: Reposition", "de")
+    assert detect_stage(ranking) == "stage2_ranking"
+    assert respond(ranking)[1] == "C06.00A"
+
+    canned = CannedResponses([{"stage": "stage2_ranking", "match": "Blinddarm", "text": "C99.99Z"}])
+    assert respond(ranking, canned)[1] == "C99.99Z"
+
+
+def test_latency_specs():
+    import random
+
+    rng = random.Random(1)
+    assert parse_latency("fixed:0.25")(rng) == 0.25
+    assert 0.1 <= parse_latency("uniform:0.1:0.2")(rng) <= 0.2
+    assert parse_latency("lognormal:0.5:0.3")(rng) > 0
+    with pytest.raises(ValueError):
+        parse_latency("gamma:1")
+
+
+def test_gemini_stage1_against_mock_counts_tokens(mock_server):
+    instance = mock_server()
+    result, tokens = server.call_gemini_stage1(
+        "Konsultation 10 Minuten", CONTEXT, "gemini-mock", "de"
+    )
+    assert [item["lkn"] for item in result["identified_leistungen"]][:1] == ["AA.00.0010"]
+    stats = json.loads(urllib.request.urlopen(f"{instance.base_url}/stats").read())
+    assert stats["requests"] == 1
+    assert stats["by_key"]["gemini/gemini-mock/stage1"]["prompt_tokens"] > 0
+    assert tokens["output_tokens"] > 0
+
+
+def test_retry_logic_recovers_from_injected_errors(mock_server, monkeypatch):
+    monkeypatch.setattr(server, "GEMINI_BACKOFF_SECONDS", 0.0)
+    monkeypatch.setattr(server, "GEMINI_MAX_RETRIES", 3)
+    instance = mock_server(fail_sequence=[429, 503])
+    result, _ = server.call_gemini_stage1("Rheumatologische Untersuchung", CONTEXT, "gemini-mock", "de")
+    assert result["identified_leistungen"]
+    stats = instance.state.snapshot()
+    assert stats["requests"] == 3
+    assert stats["injected_errors"] == {"429": 1, "503": 1}
@@ -0,0 +1,36 @@
+from regelpruefer_pauschale import build_pauschale_selection_index
+
+
+def _index():
+    bedingungen = [
+        {"Pauschale": "C08.50A", "Bedingungstyp": "HAUPTDIAGNOSE IN TABELLE", "Werte": "CAP08"},
+        {"Pauschale": "C08.50A", "Bedingungstyp": "Hauptdiagnose in Tabelle", "Werte": "CAP09"},
+        {"Pauschale": "C08.50A", "Bedingungstyp": "ICD IN LISTE", "Werte": "S02.4"},
+    ]
+    pauschalen = {code: {} for code in ("C08.50A", "C08.50B", "C08.51A", "C90.01A", "c08.50c")}
+    tabellen = {
+        "cap08": [
+            {"Tabelle": "CAP08", "Tabelle_Typ": "icd", "Code": "S02.6", "Code_Text": "Unterkiefer", "Code_Text_f": "Mandibule"},
+            {"Tabelle": "CAP08", "Tabelle_Typ": "icd", "Code": "S02.4", "Code_Text": "Jochbein"},
+        ],
+        "cap09": [{"Tabelle": "CAP09", "Tabelle_Typ": "icd", "Code": "S02.4", "Code_Text": "Jochbein (CAP09)"}],
+    }
+    return build_pauschale_selection_index(bedingungen, pauschalen, tabellen)
+
+
+def test_icd_suggestions_are_sorted_unique_and_shared_per_language():
+    index = _index()
+    assert index.icd_suggestions("C08.50A", "de") == [
+        {"Code": "S02.4", "Code_Text": "Jochbein (CAP09)"},
+        {"Code": "S02.6", "Code_Text": "Unterkiefer"},
+    ]
+    assert index.icd_suggestions("C08.50A", "fr")[1]["Code_Text"] == "Mandibule"
+    assert index.icd_suggestions("C08.50B", "de") == []
+    assert len(index.icd_suggestions_cache) == 2
+
+
+def test_sibling_and_fallback_groups():
+    index = _index()
+    assert index.siblings("c08.50b") == ("C08.50A", "C08.50B", "C08.50C")
+    assert index.siblings("C08.51A") == ("C08.51A",)
+    assert index.fallback_codes == frozenset({"C90.01A"})
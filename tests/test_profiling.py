@@ -0,0 +1,88 @@
+import os
+import time
+
+import pytest
+
+import profiling
+import server
+from scripts import profiles
+
+
+@pytest.fixture
+def profile_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(server, "PROFILING_ADMIN_TOKEN", "geheim")
+    profiling.configure(True, sample_every=2, directory=tmp_path, max_files=3, admin_token="geheim")
+    yield tmp_path
+    profiling.configure(
+        server.PROFILING_ENABLED,
+        sample_every=server.PROFILING_SAMPLE_EVERY,
+        mode=server.PROFILING_MODE,
+        directory=server.PROFILING_DIRECTORY,
+        interval_ms=server.PROFILING_SAMPLER_INTERVAL_MS,
+        max_files=server.PROFILING_MAX_FILES,
+        admin_token=os.getenv('PROFILING_ADMIN_TOKEN', ''),
+    )
+
+
+def test_disabled_profiler_never_samples():
+    profiling.configure(False, sample_every=1)
+    try:
+        assert not any(profiling.should_profile("x") for _ in range(5))
+    finally:
+        profiling.configure(server.PROFILING_ENABLED, sample_every=server.PROFILING_SAMPLE_EVERY,
+                            directory=server.PROFILING_DIRECTORY, admin_token=server.PROFILING_ADMIN_TOKEN)
+
+
+def test_every_nth_request_and_admin_header_are_profiled(profile_dir):
+    client = server.app.test_client()
+    first = client.get('/api/version')
+    second = client.get('/api/version')
+    assert "X-Profile-Id" not in first.headers
+    name = second.headers["X-Profile-Id"]
+    assert name.endswith(".pstats") and (profile_dir / name).is_file()
+
+    forced = client.get('/api/version', headers={"X-Profile-Token": "geheim", "X-Profile-Mode": "sampler"})
+    assert forced.headers["X-Profile-Id"].endswith(".collapsed")
+    # Admin-Anfragen zählen nicht mit; die nächste gesampelte ist wieder die zweite.
+    assert "X-Profile-Id" not in client.get('/api/version').headers
+    ignored_mode = client.get('/api/version', headers={"X-Profile-Mode": "sampler"})
+    assert ignored_mode.headers["X-Profile-Id"].endswith(".pstats")
+
+
+def test_profiles_endpoints_require_token(profile_dir):
+    client = server.app.test_client()
+    name = client.get('/api/version', headers={"X-Profile-Token": "geheim"}).headers["X-Profile-Id"]
+    assert client.get('/api/profiles').status_code == 403
+
+    listing = client.get('/api/profiles', headers={"X-Profile-Token": "geheim"}).get_json()
+    assert listing["profiles"][0]["name"] == name
+    fetched = client.get(f'/api/profiles/{name}', headers={"X-Profile-Token": "geheim"})
+    assert fetched.status_code == 200 and fetched.data
+    missing = client.get('/api/profiles/..%2Fconfig.ini', headers={"X-Profile-Token": "geheim"})
+    assert missing.status_code == 404
+
+
+def test_profiles_endpoints_are_locked_without_token(monkeypatch):
+    monkeypatch.setattr(server, "PROFILING_ADMIN_TOKEN", "")
+    client = server.app.test_client()
+    # auch lokale Aufrufe (z.B. über einen Reverse Proxy auf demselben Host)
+    local = {"REMOTE_ADDR": "127.0.0.1"}
+    assert client.get('/api/profiles', environ_base=local).status_code == 403
+    assert client.get('/api/profiles/x.pstats', environ_base=local).status_code == 403
+
+
+def test_sampler_writes_collapsed_stacks_and_prunes(profile_dir):
+    def busy():
+        deadline = time.perf_counter() + 0.1
+        while time.perf_counter() < deadline:
+            pass
+
+    for i in range(4):
+        session = profiling.start(f"req_{i}", "sampler")
+        busy()
+        path = session.stop()
+    stacks = profiles.read_collapsed(path)
+    assert any("test_profiling:busy" in stack for stack in stacks)
+    assert len(profiling.list_profiles()) == 3
+    samples, rows = profiles.collapsed_summary(stacks)
+    assert samples == sum(stacks.values()) and rows
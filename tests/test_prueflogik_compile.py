@@ -0,0 +1,50 @@
+import pytest
+
+from pauschalen.expression_parser import compile_boolean_function, evaluate_boolean_expression_safe
+from regelpruefer_pauschale import build_normalized_context, compile_prueflogik
+
+
+@pytest.mark.parametrize(
+    "expression",
+    [
+        "a and b or not c",
+        "not ( a or b ) and true",
+        "a or unknown",
+        "( a and ( b or c ) ) or false",
+        "",
+    ],
+)
+def test_compiled_boolean_function_matches_rpn_evaluation(expression):
+    names = ("a", "b", "c")
+    func = compile_boolean_function(expression, {name: i for i, name in enumerate(names)})
+    for mask in range(8):
+        values = [bool(mask & (1 << i)) for i in range(3)]
+        context = dict(zip(names, values))
+        assert func(values) == evaluate_boolean_expression_safe(expression, context)
+
+
+def test_malformed_boolean_expression_raises_on_call():
+    func = compile_boolean_function("a and", {"a": 0})
+    with pytest.raises(IndexError):
+        func([True])
+
+
+def test_compiled_prueflogik_binds_conditions_to_slots():
+    tables = {
+        "cap08": [{"Tabelle": "CAP08", "Tabelle_Typ": "icd", "Code": "S02.6", "Code_Text": "Unterkiefer"}],
+    }
+    compiled = compile_prueflogik(
+        "(Hauptdiagnose in Tabelle (CAP08) oder Leistungspositionen in Liste (C08.AA.0010)) "
+        "und Alter in Jahren bei Eintritt >= 16"
+    )
+    assert compiled.template.count("__COND") == 3
+
+    adult = build_normalized_context({"ICD": ["S02.6"], "LKN": [], "AlterBeiEintritt": 30})
+    child = build_normalized_context({"ICD": [], "LKN": ["C08.AA.0010"], "AlterBeiEintritt": 8})
+    assert compiled(adult, tables) is True
+    assert compiled(child, tables) is False
+
+
+def test_prueflogik_without_conditions_is_rejected():
+    with pytest.raises(ValueError):
+        compile_prueflogik("irgendwas ohne Bedingung")
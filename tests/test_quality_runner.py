@@ -0,0 +1,77 @@
+import threading
+import time
+
+from flask import Flask, jsonify, request
+
+import quality_runner
+from perf_common import Thresholds
+
+
+def _fake_app():
+    app = Flask(__name__)
+    active = {"now": 0, "max": 0}
+    lock = threading.Lock()
+
+    @app.route("/api/test-example", methods=["POST"])
+    def test_example():
+        data = request.get_json()
+        with lock:
+            active["now"] += 1
+            active["max"] = max(active["max"], active["now"])
+        time.sleep(0.05)
+        with lock:
+            active["now"] -= 1
+        passed = data["id"] != 2
+        resp = jsonify({
+            "passed": passed,
+            "diff": "" if passed else "missing AA.00.0010",
+            "result": {"pauschale": None, "einzelleistungen": []},
+            "token_usage": {"llm_stage1": {"input_tokens": 100, "output_tokens": 10}},
+        })
+        resp.headers["Server-Timing"] = "context_build;dur=12.5, llm_stage1;dur=40.0, total;dur=55.1"
+        return resp
+
+    return app, active
+
+
+def test_parse_server_timing():
+    assert quality_runner.parse_server_timing("a;dur=1.5, llm_network;dur=20") == {"a": 1.5, "llm_network": 20.0}
+    assert quality_runner.parse_server_timing(None) == {}
+
+
+def test_parallel_run_keeps_order_and_collects_breakdown():
+    app, active = _fake_app()
+    examples = quality_runner.baseline_examples({
+        "_groups": {}, "1": {"query": {"de": "x", "fr": "y"}}, "2": {"query": {"de": "z"}}, "3": {"query": {"de": "w"}},
+    })
+    records, wall = quality_runner.run_examples(app, examples, workers=4)
+    assert [(r["id"], r["lang"]) for r in records] == [("1", "de"), ("1", "fr"), ("2", "de"), ("3", "de")]
+    assert active["max"] > 1
+    assert records[0]["timings_ms"]["llm_stage1"] == 40.0
+    report = quality_runner.build_report(records, wall, workers=4)
+    summary = report["summary"]
+    assert (summary["total"], summary["passed"]) == (4, 3)
+    assert summary["tokens"]["llm_stage1"] == {"input_tokens": 400, "output_tokens": 40}
+    assert summary["stages_ms"]["context_build"]["p50"] == 12.5
+
+
+def _report(passed, duration, stage_ms):
+    return {
+        "timestamp": "t", "git_commit": None,
+        "summary": {"pass_rate": 100.0 if passed else 0.0, "stages_ms": {"llm_stage1": {"p50": stage_ms}}, "tokens": {}},
+        "examples": [{"id": "1", "lang": "de", "passed": passed, "diff": "" if passed else "missing X",
+                      "duration_ms": duration, "result": {}}],
+    }
+
+
+def test_diff_flags_accuracy_and_latency_regressions():
+    thresholds = Thresholds(time_ratio=0.25, min_delta_ms=100)
+    diff = quality_runner.diff_reports(_report(True, 1000.0, 500.0), _report(False, 2000.0, 900.0), thresholds)
+    assert diff["newly_failing"] == [{"example": "1/de", "diff": "missing X"}]
+    assert diff["slower_examples"][0]["current"] == 2000.0
+    assert diff["stages"][0]["regression"]
+    assert quality_runner.has_regressions(diff)
+    assert "NEU FEHLERHAFT 1/de" in quality_runner.format_diff(diff)
+
+    same = quality_runner.diff_reports(_report(True, 1000.0, 500.0), _report(True, 1050.0, 520.0), thresholds)
+    assert not quality_runner.has_regressions(same)
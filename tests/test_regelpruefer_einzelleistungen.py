@@ -161,3 +161,111 @@ def test_nur_als_zuschlag_basis_vorhanden():
     }
     result = rp.pruefe_abrechnungsfaehigkeit(fall, regelwerk)
     assert result["abrechnungsfaehig"]
+
+
+def test_compiled_regelwerk_resolves_selectors():
+    regelwerk = {
+        "AA.00.0001": [
+            {"Typ": "Nur kumulierbar mit", "LKNs": ["Kapitel CA.05", "Leistungsgruppe LG-001", "AA.00.0002"]},
+            {"Typ": "Nicht kumulierbar (E, V) mit", "LKNs": ["ca.00.0010"]},
+            {"Typ": "Mögliche Zusatzpositionen", "LKNs": ["AA.00.0020", "AA.00.0020"]},
+        ],
+        "AA.00.0002": [],
+    }
+    compiled = rp.compile_regelwerk(regelwerk, {"lg-001": ["CA.10.0010"]})
+    assert set(compiled) == {"AA.00.0001"}
+    rule_set = compiled["AA.00.0001"]
+    nur, nicht = rule_set.rules
+    assert nur.selector.codes == {"CA.10.0010", "AA.00.0002"}
+    assert nur.selector.kapitel_prefixes == ("CA.05",)
+    assert nicht.not_with == {"CA.00.0010"} and nicht.typen_filter == {"E", "V"}
+    assert rule_set.zusatzpositionen == ("AA.00.0020",)
+
+
+def test_pruefe_leistungen_matches_single_checks():
+    regelwerk = {
+        "AA.00.0020": [{"Typ": "Nur als Zuschlag zu", "LKNs": ["AA.00.0010"]}],
+        "AA.00.0010": [
+            {"Typ": "Mengenbeschränkung", "MaxMenge": 1},
+            {"Typ": "Nicht kumulierbar (E) mit", "LKNs": ["CA.00.0010"]},
+        ],
+        "CA.00.0010": [{"Typ": "Diagnosepflicht", "ICD": ["S02.4"]}],
+    }
+    leistungen = [
+        {"lkn": "AA.00.0010", "menge": 2, "typ": "E"},
+        {"lkn": "AA.00.0020", "menge": 1, "typ": "EZ"},
+        {"lkn": "CA.00.0010", "menge": 1, "typ": "E"},
+        {"lkn": "ZZ.00.0001", "menge": 1, "typ": "E"},
+    ]
+    fall = {"ICD": ["s02.4"], "Pauschalen": []}
+    typen = {l["lkn"]: l["typ"] for l in leistungen}
+    erwartet = [
+        rp.pruefe_abrechnungsfaehigkeit(
+            {
+                **fall,
+                "LKN": l["lkn"],
+                "Menge": l["menge"],
+                "Typ": l["typ"],
+                "Begleit_LKNs": [o["lkn"] for o in leistungen if o["lkn"] != l["lkn"]],
+                "Begleit_Typen": {c: t for c, t in typen.items() if c != l["lkn"]},
+            },
+            regelwerk,
+        )
+        for l in leistungen
+    ]
+    ergebnisse = rp.pruefe_leistungen(leistungen, rp.compile_regelwerk(regelwerk), fall)
+    assert [r.as_dict() for r in ergebnisse] == erwartet
+    assert ergebnisse[0].fehler() == [
+        "Mengenbeschränkung überschritten (max. 1, angefragt 2)",
+        "Nicht kumulierbar mit: CA.00.0010",
+    ]
+    assert all(r.abrechnungsfaehig and not r.outcomes for r in ergebnisse[1:])
+
+
+def test_outcomes_are_structured_and_rendered_per_language():
+    regelwerk = {
+        "AA.00.0010": [
+            {"Typ": "Mengenbeschränkung", "MaxMenge": 2},
+            {"Typ": "Nur kumulierbar mit", "LKNs": ["AA.00.0020"]},
+        ]
+    }
+    (ergebnis,) = rp.pruefe_leistungen([{"lkn": "AA.00.0010", "menge": 5}], regelwerk)
+    menge, kumulation = ergebnis.outcomes
+    assert (menge.code, dict(menge.params), menge.adjusted_menge) == (
+        "rule_qty_exceeded",
+        {"max": 2, "req": 5},
+        2,
+    )
+    assert kumulation.code == "rule_only_cumulable" and kumulation.adjusted_menge is None
+    assert (menge.severity, kumulation.severity) == (rp.SEVERITY_ADJUSTED, rp.SEVERITY_ERROR)
+    assert ergebnis.adjusted_menge == 2
+    assert ergebnis.fehler("fr") == [
+        "Limite de quantité dépassée (max. 2, demandé 5)",
+        "Cumulable uniquement avec : AA.00.0020",
+    ]
+
+
+def test_patient_age_bounds_are_params_and_translated():
+    regelwerk = {
+        "AA.00.0010": [
+            {"Typ": "Patientenbedingung", "Feld": "Alter", "MinWert": 18, "MaxWert": 65},
+        ]
+    }
+    (ergebnis,) = rp.pruefe_leistungen(
+        [{"lkn": "AA.00.0010", "menge": 1}], regelwerk, {"Alter": 12}
+    )
+    (outcome,) = ergebnis.outcomes
+    assert dict(outcome.params) == {
+        "field": "Alter",
+        "value": 12,
+        "min": 18,
+        "max": None,
+        "exact": None,
+    }
+    assert ergebnis.fehler() == ["Patientenbedingung (Alter) (min. 18) nicht erfüllt (Patient: 12)"]
+    assert ergebnis.fehler("fr") == [
+        "Condition patient (Alter) (au moins 18) non remplie (patient : 12)"
+    ]
+    assert ergebnis.fehler("it") == [
+        "Condizione paziente (Alter) (almeno 18) non soddisfatta (paziente: 12)"
+    ]
@@ -0,0 +1,43 @@
+import pytest
+
+import server
+
+pytestmark = pytest.mark.skipif(server.bleach is None, reason="bleach not installed")
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache():
+    server.clear_sanitize_cache()
+    yield
+    server.clear_sanitize_cache()
+
+
+def test_repeated_fragments_are_served_from_cache():
+    html = '<div class="x"><script>alert(1)</script><a href="#" data-code="C08.50A">C08.50A</a></div>'
+    first = server.sanitize_html_fragment(html)
+    second = server.sanitize_html_fragment(html)
+    assert first == second
+    assert "<script>" not in first and 'data-code="C08.50A"' in first
+    stats = server.get_sanitize_stats()
+    assert (stats["hits"], stats["misses"], stats["size"]) == (1, 1, 1)
+
+
+def test_cache_is_bounded(monkeypatch):
+    monkeypatch.setattr(server, "SANITIZE_CACHE_SIZE", 2)
+    for i in range(4):
+        server.sanitize_html_fragment(f"<p>{i}</p>")
+    assert server.get_sanitize_stats()["size"] == 2
+    server.sanitize_html_fragment("<p>3</p>")
+    assert server.get_sanitize_stats()["hits"] == 1
+
+
+def test_payload_is_sanitized_once_per_fragment():
+    payload = {
+        "bedingungs_pruef_html": "<b onclick='x()'>ok</b>",
+        "details": {"pauschale_erklaerung_html": "<b onclick='x()'>ok</b>"},
+        "evaluated_pauschalen": [{"bedingungs_pruef_html": "<i>a</i>"}, {"code": "X"}],
+    }
+    server._sanitize_abrechnung_payload(payload)
+    assert payload["bedingungs_pruef_html"] == "<b>ok</b>"
+    stats = server.get_sanitize_stats()
+    assert (stats["misses"], stats["hits"]) == (2, 1)
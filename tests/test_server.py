@@ -148,6 +148,23 @@ def test_test_example_french_muscle():
             assert data.get('passed') is True
             assert data.get('result', {}).get('pauschale', {}).get('code') == 'C02.25D'
 
+def test_test_example_leaves_cached_baseline_untouched(monkeypatch):
+    entry = {
+        'query': {'de': 'Konsultation 5 Minuten'},
+        'baseline': {'pauschale': None, 'einzelleistungen': [{'code': 'CA.00.0010', 'qty': 1}]},
+    }
+    snapshot = json.loads(json.dumps(entry))
+    analysis = {'abrechnung': {'type': 'TARDOC', 'leistungen': [{'lkn': 'CA.00.0010', 'menge': 1}]}}
+    monkeypatch.setattr(server, 'daten_geladen', True)
+    monkeypatch.setattr(server, '_current_baseline_results', lambda: {'7': entry})
+    monkeypatch.setattr(server, 'perform_analysis', MagicMock(return_value=analysis))
+    with server.app.test_client() as client:
+        resp = client.post('/api/test-example', json={'id': 7, 'lang': 'de'})
+    assert resp.status_code == 200
+    assert resp.get_json()['passed'] is True
+    assert entry == snapshot
+
+
 def test_submit_feedback_local(tmp_path, monkeypatch):
     monkeypatch.chdir(tmp_path)
     monkeypatch.delenv("GITHUB_TOKEN", raising=False)
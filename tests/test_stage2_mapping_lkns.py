@@ -0,0 +1,43 @@
+import server
+
+
+def test_mapping_lkns_on_the_fly_for_custom_data():
+    bedingungen = [
+        {"Pauschale": "X01.00A", "Bedingungstyp": "LKN IN TABELLE", "Werte": "TAB1, OR"},
+        {"Pauschale": "X01.00A", "Bedingungstyp": "LEISTUNGSPOSITIONEN IN LISTE", "Werte": "wa.20.0010"},
+        {"Pauschale": "X02.00A", "Bedingungstyp": "ICD IN LISTE", "Werte": "S02.4"},
+    ]
+    tabellen = {
+        "tab1": [{"Tabelle": "TAB1", "Tabelle_Typ": "service_catalog", "Code": "C08.AA.0010", "Code_Text": "Reposition", "Code_Text_f": "Réduction"}],
+        "or": [{"Tabelle": "OR", "Tabelle_Typ": "service_catalog", "Code": "ZZ.00.0001", "Code_Text": "Breit"}],
+        "anast": [{"Tabelle": "ANAST", "Tabelle_Typ": "service_catalog", "Code": "WA.10.0010", "Code_Text": "Anästhesie"}],
+    }
+    katalog = {"WA.20.0010": {"Beschreibung": "Anästhesie Zeit"}}
+
+    result = server.get_LKNs_from_pauschalen_conditions(
+        {"X01.00A", "X02.00A"}, bedingungen, tabellen, katalog, lang="fr", skip_table_names={"or"}
+    )
+
+    assert result == {
+        "C08.AA.0010": "Réduction",
+        "WA.20.0010": "Anästhesie Zeit",
+        "WA.10.0010": "Anästhesie",
+    }
+
+
+def test_precomputed_mapping_lkns_match_on_the_fly_collection():
+    codes = set(list(server.pauschale_mapping_lkns)[:25])
+    precomputed = server.get_LKNs_from_pauschalen_conditions(
+        codes,
+        server.pauschale_bedingungen_data,
+        server.tabellen_dict_by_table,
+        server.leistungskatalog_dict,
+        bedingungen_indexed=server.pauschale_bedingungen_indexed,
+    )
+    on_the_fly = server.get_LKNs_from_pauschalen_conditions(
+        codes,
+        server.pauschale_bedingungen_data,
+        dict(server.tabellen_dict_by_table),
+        server.leistungskatalog_dict,
+    )
+    assert precomputed == on_the_fly
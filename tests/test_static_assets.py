@@ -0,0 +1,47 @@
+import gzip
+
+import server
+
+ASSET = "data/PAUSCHALEN_Pauschalen.json"
+
+
+def test_manifest_lists_content_hashes():
+    client = server.app.test_client()
+    resp = client.get("/api/asset-manifest")
+    assets = resp.get_json()["assets"]
+    assert assets[ASSET] == server._load_static_asset(ASSET)["digest"]
+    assert "no-store" in resp.headers["Cache-Control"]
+
+
+def test_versioned_url_is_immutable_and_precompressed():
+    client = server.app.test_client()
+    digest = server.static_asset_manifest()[ASSET]
+    resp = client.get(f"/{ASSET}?v={digest}", headers={"Accept-Encoding": "gzip"})
+    assert resp.status_code == 200
+    assert resp.headers["Content-Encoding"] == "gzip"
+    assert "immutable" in resp.headers["Cache-Control"]
+    assert "Accept-Encoding" in resp.headers["Vary"]
+    raw = (server._STATIC_ROOT / ASSET).read_bytes()
+    assert gzip.decompress(resp.data) == raw
+
+
+def test_unversioned_url_revalidates_with_etag():
+    client = server.app.test_client()
+    first = client.get(f"/{ASSET}", headers={"Accept-Encoding": "identity"})
+    assert first.status_code == 200
+    assert "no-cache" in first.headers["Cache-Control"]
+    assert "Content-Encoding" not in first.headers
+    again = client.get(
+        f"/{ASSET}",
+        headers={"Accept-Encoding": "identity", "If-None-Match": first.headers["ETag"]},
+    )
+    assert again.status_code == 304
+
+
+def test_llm_cassettes_are_never_served(tmp_path, monkeypatch):
+    (tmp_path / "data").mkdir()
+    (tmp_path / "data" / "llm_cassette.json").write_text("{}", encoding="utf-8")
+    monkeypatch.setattr(server, "_STATIC_ROOT", tmp_path)
+    assert "data/llm_cassette.json" not in server.static_asset_manifest()
+    client = server.app.test_client()
+    assert client.get("/data/llm_cassette.json").status_code == 404
@@ -0,0 +1,58 @@
+from utils import (
+    activate_table_content_cache,
+    build_table_catalog,
+    deactivate_table_content_cache,
+    get_table_catalog,
+    get_table_codes,
+    get_table_content,
+)
+
+
+def _tables():
+    return {
+        "cap08": [
+            {"Tabelle": "CAP08", "Tabelle_Typ": "icd", "Code": "S02.4", "Code_Text": "Jochbeinfraktur", "Code_Text_f": "Fracture"},
+            {"Tabelle": "CAP08", "Tabelle_Typ": "icd", "Code": "s02.6", "Code_Text": "Unterkieferfraktur"},
+        ],
+        "or": [
+            {"Tabelle": "OR", "Tabelle_Typ": "Service_Catalog", "Code": "C08.AA.0010", "Code_Text": "Reposition"},
+            {"Tabelle": "OR", "Tabelle_Typ": "402", "Code": "1234567", "Code_Text": "Medikament"},
+            {"Tabelle": "OR", "Tabelle_Typ": "", "Code": "ZZ.00.0001", "Code_Text": "Ohne Typ"},
+        ],
+    }
+
+
+def test_table_codes_are_filtered_by_normalized_type():
+    tables = _tables()
+    build_table_catalog(tables)
+    assert get_table_codes("OR", "service_catalog", tables) == frozenset({"C08.AA.0010", "ZZ.00.0001"})
+    assert get_table_codes("or", "tariff", tables) == frozenset({"1234567", "ZZ.00.0001"})
+    assert get_table_codes("CAP08, OR", "icd", tables) == frozenset({"S02.4", "S02.6", "ZZ.00.0001"})
+    assert get_table_codes("UNKNOWN", "icd", tables) == frozenset()
+
+
+def test_catalog_is_shared_and_rebuilt_on_load():
+    tables = _tables()
+    first = build_table_catalog(tables)
+    assert get_table_catalog(tables) is first
+    tables["cap08"].append({"Tabelle": "CAP08", "Tabelle_Typ": "icd", "Code": "S02.9"})
+    second = build_table_catalog(tables)
+    assert second is not first
+    assert "S02.9" in get_table_codes("CAP08", "icd", tables)
+
+
+def test_table_content_renders_language_texts_per_request():
+    tables = _tables()
+    build_table_catalog(tables)
+    token = activate_table_content_cache()
+    try:
+        de_entries = get_table_content("CAP08", "icd", tables, "de")
+        fr_entries = get_table_content("CAP08", "icd", tables, "fr")
+        assert get_table_content("CAP08", "icd", tables, "de") is de_entries
+    finally:
+        deactivate_table_content_cache(token)
+    assert de_entries == [
+        {"Code": "S02.4", "Code_Text": "Jochbeinfraktur"},
+        {"Code": "s02.6", "Code_Text": "Unterkieferfraktur"},
+    ]
+    assert fr_entries[0]["Code_Text"] == "Fracture"
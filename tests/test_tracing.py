@@ -0,0 +1,64 @@
+import pytest
+
+import metrics
+import server
+import tracing
+from scripts import trace_view
+
+
+@pytest.fixture
+def exported():
+    spans = []
+    tracing.configure(True, exporter=spans.extend)
+    yield spans
+    tracing.configure(
+        server.TRACING_ENABLED and bool(server.trace_logger.handlers),
+        exporter=tracing.logger_exporter(server.trace_logger),
+        sample_rate=server.TRACING_SAMPLE_RATE,
+    )
+
+
+def test_span_tree_is_exported_when_root_ends(exported):
+    with tracing.trace("job", kind="INTERNAL") as root:
+        with metrics.span("context_build"):
+            with tracing.span("rank_leistungskatalog_entries", tokens=3):
+                tracing.add_event("retry", attempt=1)
+        with pytest.raises(ValueError):
+            with tracing.span("llm_network"):
+                raise ValueError("timeout")
+    by_name = {span.name: span for span in exported}
+    assert set(by_name) == {"job", "context_build", "rank_leistungskatalog_entries", "llm_network"}
+    assert {span.trace_id for span in exported} == {root.trace_id}
+    assert by_name["rank_leistungskatalog_entries"].parent_span_id == by_name["context_build"].span_id
+    assert by_name["context_build"].parent_span_id == root.span_id
+    assert by_name["rank_leistungskatalog_entries"].to_dict()["events"][0]["name"] == "retry"
+    assert by_name["llm_network"].status == "ERROR"
+    assert tracing.current_span() is None
+
+
+def test_spans_without_active_trace_are_noops(exported):
+    with tracing.span("orphan") as span:
+        tracing.set_attributes(x=1)
+        assert span is None
+    assert exported == []
+
+
+def test_api_request_gets_trace_id_header(exported):
+    client = server.app.test_client()
+    resp = client.get('/api/version')
+    assert resp.status_code == 200
+    trace_id = resp.headers["X-Trace-Id"]
+    root = next(span for span in exported if span.parent_span_id is None)
+    assert root.trace_id == trace_id
+    assert root.attributes["http.route"] == "/api/version"
+    assert root.attributes["http.status_code"] == 200
+
+
+def test_viewer_self_time_subtracts_children():
+    spans = [
+        {"span_id": "a", "parent_span_id": None, "duration_ms": 10.0, "attributes": {"request.id": "req_1"}, "trace_id": "t"},
+        {"span_id": "b", "parent_span_id": "a", "duration_ms": 6.0, "trace_id": "t"},
+        {"span_id": "c", "parent_span_id": "b", "duration_ms": 2.5, "trace_id": "t"},
+    ]
+    assert trace_view.self_times(spans) == {"a": 4.0, "b": 3.5, "c": 2.5}
+    assert trace_view.find_trace(trace_view.group_traces(spans), request_id="req_1") == "t"
@@ -0,0 +1,248 @@
+"""Request-Tracing mit Span-Bäumen, exportiert als JSONL.
+
+Das Datenmodell folgt OpenTelemetry (``trace_id``/``span_id`` in Hex,
+``parent_span_id``, Zeitstempel in Unix-Nanosekunden, Attribute, Events,
+Status), braucht aber keinen Collector: ist der Wurzel-Span einer Anfrage
+beendet, übergibt ``end_trace`` alle Spans des Traces an den Exporter. In
+``server.py`` schreibt dieser über die Log-Pipeline in eine rotierende Datei
+(eine Zeile pro Span); ``scripts/trace_view.py`` wertet sie aus.
+
+Ohne aktiven Trace sind ``span``/``traced``/``set_attributes`` praktisch
+kostenlos (ein ContextVar-Zugriff). ``metrics.span`` öffnet zusätzlich einen
+gleichnamigen Trace-Span, sodass gemessene Abschnitte auch im Baum erscheinen.
+"""
+
+from __future__ import annotations
+
+import contextvars
+import logging
+import os
+import random
+import time
+from contextlib import contextmanager
+from functools import wraps
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, TypeVar
+
+from log_pipeline import LazyJSON
+
+F = TypeVar("F", bound=Callable[..., Any])
+Exporter = Callable[[List["Span"]], None]
+
+_enabled = False
+_sample_rate = 1.0
+_exporter: Optional[Exporter] = None
+_resource: Dict[str, Any] = {"service.name": "arzttarif-assistent"}
+_current: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("trace_span", default=None)
+
+
+def _attr_value(value: Any) -> Any:
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return [_attr_value(v) if isinstance(v, (bool, int, float, str)) else str(v) for v in value]
+    return str(value)
+
+
+class Span:
+    """Ein Abschnitt im Trace-Baum; ``finished`` sammelt beendete Spans am Wurzel-Span."""
+
+    __slots__ = (
+        "name", "kind", "trace_id", "span_id", "parent_span_id", "root",
+        "start_ns", "end_ns", "attributes", "events", "status", "status_message", "finished",
+    )
+
+    def __init__(self, name: str, parent: Optional["Span"] = None, kind: str = "INTERNAL") -> None:
+        self.name = name
+        self.kind = kind
+        self.trace_id = parent.trace_id if parent is not None else os.urandom(16).hex()
+        self.span_id = os.urandom(8).hex()
+        self.parent_span_id = parent.span_id if parent is not None else None
+        self.root: Span = parent.root if parent is not None else self
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes: Dict[str, Any] = {}
+        self.events: List[Dict[str, Any]] = []
+        self.status = "UNSET"
+        self.status_message = ""
+        self.finished: List[Span] = []
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = _attr_value(value)
+
+    def add_event(self, name: str, **attributes: Any) -> None:
+        self.events.append({
+            "name": name,
+            "time_unix_nano": time.time_ns(),
+            "attributes": {k: _attr_value(v) for k, v in attributes.items()},
+        })
+
+    def record_exception(self, exc: BaseException) -> None:
+        self.status = "ERROR"
+        self.status_message = f"{type(exc).__name__}: {exc}"
+        self.add_event("exception", **{"exception.type": type(exc).__name__, "exception.message": str(exc)})
+
+    def end(self) -> None:
+        if self.end_ns is not None:
+            return
+        self.end_ns = time.time_ns()
+        if self.status == "UNSET":
+            self.status = "OK"
+        self.root.finished.append(self)
+
+    @property
+    def duration_ms(self) -> float:
+        end = self.end_ns if self.end_ns is not None else time.time_ns()
+        return (end - self.start_ns) / 1e6
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "start_time_unix_nano": self.start_ns,
+            "end_time_unix_nano": self.end_ns,
+            "duration_ms": round(self.duration_ms, 3),
+            "attributes": self.attributes,
+            "events": self.events,
+            "status": {"code": self.status, "message": self.status_message},
+            "resource": _resource,
+        }
+
+
+def configure(
+    enabled: bool = True,
+    exporter: Optional[Exporter] = None,
+    sample_rate: float = 1.0,
+    service_name: Optional[str] = None,
+) -> None:
+    global _enabled, _exporter, _sample_rate
+    _enabled = bool(enabled)
+    _exporter = exporter
+    _sample_rate = min(1.0, max(0.0, float(sample_rate)))
+    if service_name:
+        _resource["service.name"] = service_name
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def logger_exporter(target: logging.Logger) -> Exporter:
+    """Exporter, der jeden Span als JSON-Zeile an ``target`` übergibt."""
+
+    def export(spans: List[Span]) -> None:
+        for finished in spans:
+            target.info("%s", LazyJSON(finished.to_dict(), indent=False))
+
+    return export
+
+
+def begin_trace(name: str, kind: str = "SERVER", **attributes: Any) -> Tuple[Optional[Span], Optional[contextvars.Token]]:
+    """Startet einen Wurzel-Span (sofern aktiviert und gesampelt)."""
+    if not _enabled or (_sample_rate < 1.0 and random.random() >= _sample_rate):
+        return None, None
+    root = Span(name, kind=kind)
+    for key, value in attributes.items():
+        root.set_attribute(key, value)
+    return root, _current.set(root)
+
+
+def end_trace(root: Optional[Span], token: Optional[contextvars.Token], error: Optional[BaseException] = None) -> None:
+    """Beendet den Wurzel-Span und exportiert alle Spans des Traces."""
+    if root is None:
+        return
+    if token is not None:
+        try:
+            _current.reset(token)
+        except ValueError:
+            _current.set(None)
+    if error is not None:
+        root.record_exception(error)
+    root.end()
+    if _exporter is not None:
+        try:
+            _exporter(list(root.finished))
+        except Exception:
+            logging.getLogger(__name__).debug("Trace-Export fehlgeschlagen", exc_info=True)
+
+
+@contextmanager
+def trace(name: str, kind: str = "INTERNAL", **attributes: Any) -> Iterator[Optional[Span]]:
+    """Wurzel-Span für Skripte und Hintergrundarbeiten."""
+    root, token = begin_trace(name, kind=kind, **attributes)
+    error: Optional[BaseException] = None
+    try:
+        yield root
+    except BaseException as exc:
+        error = exc
+        raise
+    finally:
+        end_trace(root, token, error)
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Optional[Span]]:
+    """Kind-Span des aktuellen Spans; ohne aktiven Trace ein No-op."""
+    parent = _current.get()
+    if parent is None:
+        yield None
+        return
+    child = Span(name, parent)
+    for key, value in attributes.items():
+        child.set_attribute(key, value)
+    token = _current.set(child)
+    try:
+        yield child
+    except BaseException as exc:
+        child.record_exception(exc)
+        raise
+    finally:
+        _current.reset(token)
+        child.end()
+
+
+def traced(name: str) -> Callable[[F], F]:
+    """Dekorator-Variante von ``span``."""
+
+    def decorator(func: F) -> F:
+        @wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if _current.get() is None:
+                return func(*args, **kwargs)
+            with span(name):
+                return func(*args, **kwargs)
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
+
+
+def current_span() -> Optional[Span]:
+    return _current.get()
+
+
+def current_trace_id() -> Optional[str]:
+    active = _current.get()
+    return active.trace_id if active is not None else None
+
+
+def set_attributes(**attributes: Any) -> None:
+    active = _current.get()
+    if active is not None:
+        for key, value in attributes.items():
+            active.set_attribute(key, value)
+
+
+def set_root_attributes(**attributes: Any) -> None:
+    active = _current.get()
+    if active is not None:
+        for key, value in attributes.items():
+            active.root.set_attribute(key, value)
+
+
+def add_event(name: str, **attributes: Any) -> None:
+    active = _current.get()
+    if active is not None:
+        active.add_event(name, **attributes)
@@ -25,8 +25,11 @@ from typing import (
     cast,
 )
 import re
+import threading
 import unicodedata
 
+import tracing
+
 logger = logging.getLogger(__name__)
 
 # --- Tabellen-Cache für Request-Lebenszyklen ---------------------------------
@@ -92,6 +95,140 @@ def escape(text: Any) -> str:
     """Maskiert HTML-Sonderzeichen in einem String."""
     return html.escape(str(text))
 
+_TABLE_TYPE_SYNONYMS: Dict[str, str] = {
+    '402': 'tariff',
+    'tarif': 'tariff',
+    'tariff': 'tariff',
+    'tarifposition': 'tariff',
+    'tarifpositionen': 'tariff',
+    'servicecatalog': 'service_catalog',
+    'servicekatalog': 'service_catalog',
+    'icd': 'icd',
+}
+
+
+def normalize_table_type(raw_value: Any) -> str:
+    """Normalisiert ``Tabelle_Typ``-Werte (z.B. ``402`` -> ``tariff``)."""
+    if raw_value is None:
+        return ''
+    value = str(raw_value).strip().lower()
+    value = value.replace('-', '').replace('_', '')
+    return _TABLE_TYPE_SYNONYMS.get(value, value)
+
+
+def _split_table_ref(table_ref: str) -> Tuple[List[str], TableNameTuple]:
+    raw_table_names = [t.strip() for t in str(table_ref or '').split(',') if t.strip()]
+    return raw_table_names, tuple(name.lower() for name in raw_table_names)
+
+
+class TableCatalog:
+    """Prozessweiter, schreibgeschützter Index über ``tabellen_dict_by_table``.
+
+    Pro (Tabelle, normalisierter Typ) hält der Katalog ein ``Code -> Zeile``-Dict
+    sowie das Frozenset der Codes (Grossschreibung). Die Einträge werden beim
+    Datenladen vorberechnet und von allen Requests geteilt; nur die
+    sprachabhängige Textaufbereitung bleibt im Request-Cache von
+    :func:`get_table_content`.
+    """
+
+    def __init__(self, tabellen_dict_by_table: Mapping[str, Sequence[Dict[str, Any]]]) -> None:
+        self.source = tabellen_dict_by_table
+        self._rows: Dict[Tuple[str, str], Dict[str, Dict[str, Any]]] = {}
+        self._codes: Dict[Tuple[TableNameTuple, str], frozenset] = {}
+        for table_name, entries in tabellen_dict_by_table.items():
+            table_key = str(table_name).lower()
+            present_types = {normalize_table_type(entry.get('Tabelle_Typ')) for entry in entries}
+            present_types.add('')
+            for table_type in present_types:
+                self.rows(table_key, table_type)
+
+    def _build_rows(self, table_key: str, requested_type: str) -> Optional[Dict[str, Dict[str, Any]]]:
+        entries = self.source.get(table_key)
+        if entries is None:
+            return None
+        rows: Dict[str, Dict[str, Any]] = {}
+        for entry in entries:
+            entry_type = normalize_table_type(entry.get('Tabelle_Typ'))
+            if requested_type and entry_type and entry_type != requested_type:
+                continue
+            code = entry.get('Code')
+            if code:
+                rows[code] = entry
+        return rows
+
+    def rows(self, table_name: str, table_type: str) -> Optional[Dict[str, Dict[str, Any]]]:
+        """Liefert ``Code -> Zeile`` für eine Tabelle oder ``None``, falls unbekannt."""
+        requested_type = normalize_table_type(table_type)
+        key = (str(table_name).strip().lower(), requested_type)
+        cached = self._rows.get(key)
+        if cached is not None:
+            return cached
+        rows = self._build_rows(key[0], requested_type)
+        if rows is not None:
+            self._rows[key] = rows
+        return rows
+
+    def codes(self, table_ref: str, table_type: str) -> frozenset:
+        """Liefert alle Codes (gross geschrieben) der kommaseparierten Tabellenreferenz."""
+        _, normalized_names = _split_table_ref(table_ref)
+        requested_type = normalize_table_type(table_type)
+        key = (normalized_names, requested_type)
+        cached = self._codes.get(key)
+        if cached is not None:
+            return cached
+        collected: Set[str] = set()
+        for name in normalized_names:
+            rows = self.rows(name, requested_type)
+            if rows:
+                collected.update(str(code).upper() for code in rows)
+        result = frozenset(collected)
+        self._codes[key] = result
+        return result
+
+
+_TABLE_CATALOG_LIMIT = 8
+_table_catalogs: Dict[int, TableCatalog] = {}
+_table_catalog_lock = threading.Lock()
+
+
+def build_table_catalog(
+    tabellen_dict_by_table: Mapping[str, Sequence[Dict[str, Any]]]
+) -> TableCatalog:
+    """Baut den Tabellenkatalog (neu) auf und registriert ihn prozessweit."""
+    catalog = TableCatalog(tabellen_dict_by_table)
+    with _table_catalog_lock:
+        _table_catalogs.pop(id(tabellen_dict_by_table), None)
+        while len(_table_catalogs) >= _TABLE_CATALOG_LIMIT:
+            _table_catalogs.pop(next(iter(_table_catalogs)))
+        _table_catalogs[id(tabellen_dict_by_table)] = catalog
+    return catalog
+
+
+def discard_table_catalog(tabellen_dict_by_table: Mapping[str, Sequence[Dict[str, Any]]]) -> None:
+    """Verwirft den registrierten Katalog, z.B. bevor Tabellen neu geladen werden."""
+    with _table_catalog_lock:
+        _table_catalogs.pop(id(tabellen_dict_by_table), None)
+
+
+def get_table_catalog(
+    tabellen_dict_by_table: Mapping[str, Sequence[Dict[str, Any]]]
+) -> TableCatalog:
+    """Liefert den Katalog zu ``tabellen_dict_by_table`` (baut ihn bei Bedarf)."""
+    catalog = _table_catalogs.get(id(tabellen_dict_by_table))
+    if catalog is not None and catalog.source is tabellen_dict_by_table:
+        return catalog
+    return build_table_catalog(tabellen_dict_by_table)
+
+
+def get_table_codes(
+    table_ref: str,
+    table_type: str,
+    tabellen_dict_by_table: Mapping[str, Sequence[Dict[str, Any]]],
+) -> frozenset:
+    """Frozenset aller Codes (gross) einer Tabellenreferenz für einen Typ."""
+    return get_table_catalog(tabellen_dict_by_table).codes(table_ref, table_type)
+
+
 def get_table_content(
     table_ref: str,
     table_type: str,
@@ -99,61 +236,41 @@ def get_table_content(
     lang: str = 'de',
 ) -> List[Dict[str, Any]]:
     """Holt Einträge für eine Tabelle und einen Typ (Case-Insensitive).
-    Berücksichtigt die Sprache für den Text."""
-    TAB_CODE_KEY = 'Code'; TAB_TEXT_KEY = 'Code_Text'; TAB_TYP_KEY = 'Tabelle_Typ'
-
-    def _normalize_table_type_value(raw_value: Any) -> str:
-        if raw_value is None:
-            return ''
-        value = str(raw_value).strip().lower()
-        value = value.replace('-', '').replace('_', '')
-        synonyms = {
-            '402': 'tariff',
-            'tarif': 'tariff',
-            'tariff': 'tariff',
-            'tarifposition': 'tariff',
-            'tarifpositionen': 'tariff',
-            'servicecatalog': 'service_catalog',
-            'servicekatalog': 'service_catalog',
-            'icd': 'icd',
-        }
-        return synonyms.get(value, value)
-
-    requested_type = _normalize_table_type_value(table_type)
+    Berücksichtigt die Sprache für den Text.
+
+    Die gelieferte Liste stammt aus dem Request-Cache und darf nicht verändert
+    werden."""
+    requested_type = normalize_table_type(table_type)
     lang_code = str(lang or 'de').lower()
 
-    raw_table_names = [t.strip() for t in table_ref.split(',') if t.strip()]
-    normalized_table_names: TableNameTuple = tuple(name.lower() for name in raw_table_names)
+    raw_table_names, normalized_table_names = _split_table_ref(table_ref)
 
     cache_bucket = _get_cache_bucket(tabellen_dict_by_table)
     cache_key: TableContentCacheKey = (normalized_table_names, requested_type, lang_code)
     if cache_bucket is not None:
         cached_entries = cache_bucket.get(cache_key)
         if cached_entries is not None:
-            return cached_entries[:]
+            return cached_entries
 
-    all_entries_for_type: List[Dict[str, Any]] = []
+    catalog = get_table_catalog(tabellen_dict_by_table)
+    merged_rows: Dict[str, Dict[str, Any]] = {}
     for name_original, normalized_key in zip(raw_table_names, normalized_table_names):
-        if normalized_key in tabellen_dict_by_table:
-            for entry in tabellen_dict_by_table[normalized_key]:
-                entry_type_normalized = _normalize_table_type_value(entry.get(TAB_TYP_KEY))
-                if requested_type and entry_type_normalized and entry_type_normalized != requested_type:
-                    continue
-                code = entry.get(TAB_CODE_KEY)
-                text = get_lang_field(entry, TAB_TEXT_KEY, lang)
-                if code:
-                    all_entries_for_type.append({"Code": code, "Code_Text": text or "N/A"})
-        else:
+        rows = catalog.rows(normalized_key, requested_type)
+        if rows is None:
             logger.info(
                 "INFO (get_table_content): Normalisierter Schlüssel '%s' (Original: '%s') nicht in tabellen_dict_by_table gefunden.",
                 normalized_key,
                 name_original,
             )
+            continue
+        merged_rows.update(rows)
 
-    unique_content = {item['Code']: item for item in all_entries_for_type}.values()
-    result_list = sorted(unique_content, key=lambda x: x.get('Code', ''))
+    result_list = [
+        {"Code": code, "Code_Text": get_lang_field(entry, 'Code_Text', lang) or "N/A"}
+        for code, entry in sorted(merged_rows.items(), key=lambda item: item[0])
+    ]
     if cache_bucket is not None:
-        cache_bucket[cache_key] = result_list[:]
+        cache_bucket[cache_key] = result_list
     return result_list
 
 def get_lang_field(entry: Dict[str, Any], base_key: str, lang: str) -> Any:
@@ -357,15 +474,35 @@ _TRANSLATIONS: Dict[str, Dict[str, str]] = {
         'fr': 'Non cumulable avec : {codes}',
         'it': 'Non cumulabile con: {codes}'
     },
+    'rule_only_cumulable': {
+        'de': 'Nur kumulierbar mit: {codes}',
+        'fr': 'Cumulable uniquement avec : {codes}',
+        'it': 'Cumulabile solo con: {codes}'
+    },
     'rule_patient_field_missing': {
         'de': 'Patientenbedingung ({field}) nicht erfüllt: Kontextwert fehlt',
         'fr': 'Condition patient ({field}) non remplie : valeur manquante',
         'it': 'Condizione paziente ({field}) non soddisfatta: valore mancante'
     },
     'rule_patient_age': {
-        'de': 'Patientenbedingung ({detail}) nicht erfüllt (Patient: {value})',
-        'fr': 'Condition patient ({detail}) non remplie (patient : {value})',
-        'it': 'Condizione paziente ({detail}) non soddisfatta (paziente: {value})'
+        'de': 'Patientenbedingung ({field}) ({detail}) nicht erfüllt (Patient: {value})',
+        'fr': 'Condition patient ({field}) ({detail}) non remplie (patient : {value})',
+        'it': 'Condizione paziente ({field}) ({detail}) non soddisfatta (paziente: {value})'
+    },
+    'rule_patient_age_min': {
+        'de': 'min. {value}',
+        'fr': 'au moins {value}',
+        'it': 'almeno {value}'
+    },
+    'rule_patient_age_max': {
+        'de': 'max. {value}',
+        'fr': 'au plus {value}',
+        'it': 'al massimo {value}'
+    },
+    'rule_patient_age_exact': {
+        'de': 'exakt {value}',
+        'fr': 'exactement {value}',
+        'it': 'esattamente {value}'
     },
     'rule_patient_age_invalid': {
         'de': 'Patientenbedingung (Alter): Ungültiger Alterswert im Fall ({value})',
@@ -373,17 +510,17 @@ _TRANSLATIONS: Dict[str, Dict[str, str]] = {
         'it': 'Condizione paziente (età): valore età non valido ({value})'
     },
     'rule_patient_gender_mismatch': {
-        'de': 'Patientenbedingung (Geschlecht): erwartet {exp}, gefunden {found}',
+        'de': "Patientenbedingung (Geschlecht): erwartet '{exp}', gefunden '{found}'",
         'fr': 'Condition patient (sexe) : attendu {exp}, trouvé {found}',
         'it': 'Condizione paziente (sesso): atteso {exp}, trovato {found}'
     },
     'rule_patient_gender_invalid': {
-        'de': 'Patientenbedingung (Geschlecht): Ungueltige Werte fuer Geschlechtspruefung',
+        'de': 'Patientenbedingung (Geschlecht): Ungültige Werte für Geschlechtsprüfung',
         'fr': 'Condition patient (sexe) : valeurs non valides pour le controle du sexe',
         'it': 'Condizione paziente (sesso): valori non validi per il controllo del sesso'
     },
     'rule_patient_medication_missing': {
-        'de': 'Patientenbedingung (Medikamente): Erwartet einen von {required}, nicht gefunden',
+        'de': 'Patientenbedingung ({field}): Erwartet einen von {required}, nicht gefunden',
         'fr': "Condition patient (medicaments) : attendu l'un de {required}, non trouve",
         'it': 'Condizione paziente (farmaci): previsto uno di {required}, non trovato'
     },
@@ -669,35 +806,6 @@ def translate(key: str, lang: str = 'de', **kwargs) -> str:
     template = _TRANSLATIONS.get(key, {}).get(lang) or _TRANSLATIONS.get(key, {}).get('de') or key
     return template.format(**kwargs)
 
-def translate_rule_error_message(msg: str, lang: str = 'de') -> str:
-    """Übersetzt häufige Regelprüfer-Meldungen anhand einfacher Muster."""
-    if lang == 'de' or not msg:
-        return msg
-    import re
-    patterns = [
-        (r'^Mengenbeschränkung überschritten \(max\. (?P<max>\d+), angefragt (?P<req>\d+)\)$', 'rule_qty_exceeded'),
-        (r'^Menge auf (?P<value>\d+) reduziert \(Mengenbeschränkung\)$', 'rule_qty_reduced'),
-        (r'^Nur als Zuschlag zu (?P<code>[A-Z0-9.]+) zulässig \(Basis fehlt\)$', 'rule_only_supplement'),
-        (r'^Nicht kumulierbar mit: (?P<codes>.+)$', 'rule_not_cumulable'),
-        (r'^Patientenbedingung \((?P<field>[^)]+)\) nicht erfüllt: Kontextwert fehlt$', 'rule_patient_field_missing'),
-        (r'^Patientenbedingung \((?P<detail>[^)]+)\) nicht erfüllt \(Patient: (?P<value>[^)]+)\)$', 'rule_patient_age'),
-        (r'^Patientenbedingung \(Alter\): Ungültiger Alterswert im Fall \((?P<value>[^)]+)\)$', 'rule_patient_age_invalid'),
-        (r"^Patientenbedingung \(Geschlecht\): erwartet '(?P<exp>[^']+)', gefunden '(?P<found>[^']+)'$", 'rule_patient_gender_mismatch'),
-        (r'^Patientenbedingung \(Geschlecht\): Ungültige Werte für Geschlechtsprüfung$', 'rule_patient_gender_invalid'),
-        (r"^Patientenbedingung \((?:Medikamente|GTIN)\): Erwartet einen von (?P<required>.+), nicht gefunden$", 'rule_patient_medication_missing'),
-        (r'^Erforderliche Diagnose\(n\) nicht vorhanden \(Benötigt: (?P<codes>.+)\)$', 'rule_diagnosis_missing'),
-        (r'^Leistung nicht zulässig bei gleichzeitiger Abrechnung der Pauschale\(n\): (?P<codes>.+)$', 'rule_pauschale_exclusion'),
-        (r'^Interner Fehler bei Regelprüfung: (?P<error>.+)$', 'rule_internal_error'),
-        (r'^Regelprüfung nicht verfügbar\.$', 'rule_check_not_available'),
-        (r'^Regelprüfung nicht durchgeführt\.$', 'rule_check_not_performed'),
-        (r'^Keine LKN vom LLM identifiziert/validiert\.$', 'llm_no_lkn'),
-    ]
-    for pattern, key in patterns:
-        m = re.match(pattern, msg)
-        if m:
-            return translate(key, lang, **m.groupdict())
-    return msg
-
 def translate_condition_type(cond_type: str, lang: str = 'de') -> str:
     """Übersetzt bekannte Pauschalen-Bedingungstypen."""
     if not cond_type:
@@ -1027,6 +1135,7 @@ def compute_token_doc_freq(
             token_doc_freq[t] = token_doc_freq.get(t, 0) + 1
 
 
+@tracing.traced("rank_leistungskatalog_entries")
 def rank_leistungskatalog_entries(
     tokens: Set[str],
     leistungskatalog_dict: Dict[str, Dict[str, Any]],
@@ -1072,6 +1181,7 @@ def rank_leistungskatalog_entries(
         if score > 0:
             scored.append((score, lkn_code))
     scored.sort(key=lambda x: x[0], reverse=True)
+    tracing.set_attributes(tokens=len(tokens), limit=limit, matches=len(scored))
     if return_scores:
         return scored[:limit]
     return [code for _, code in scored[:limit]]